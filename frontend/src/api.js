@@ -4,4 +4,14 @@ const api = axios.create({
   baseURL: "http://127.0.0.1:5000", // Flask backend URL
 });
 
+// List endpoints return one page at a time. The cursor for the next page
+// comes back in the X-Next-Cursor header and is missing on the last page.
+export const PAGE_SIZE = 100;
+
+export const getPage = async (path, cursor = null) => {
+  const params = cursor ? { limit: PAGE_SIZE, cursor } : { limit: PAGE_SIZE };
+  const res = await api.get(path, { params });
+  return { items: res.data, nextCursor: res.headers["x-next-cursor"] || null };
+};
+
 export default api;
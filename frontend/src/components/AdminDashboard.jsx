@@ -13,14 +13,15 @@ const AdminDashboard = () => {
   });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
   const { user: _user } = useContext(AuthContext);
 
   useEffect(() => {
     fetchData();
   }, [activeTab]);
 
-  const fetchData = async () => {
-    setLoading(true);
+  const fetchData = async (cursor = null) => {
+    if (!cursor) setLoading(true);
     setError('');
     
     try {
@@ -39,6 +40,11 @@ const AdminDashboard = () => {
           endpoint = 'http://127.0.0.1:5000/admin/analytics';
       }
 
+      if (activeTab !== 'analytics') {
+        // Bookings and users are paged; see X-Next-Cursor
+        endpoint += cursor ? `?limit=100&cursor=${encodeURIComponent(cursor)}` : '?limit=100';
+      }
+
       const response = await fetch(endpoint, {
         headers: {
           'Authorization': `Bearer ${localStorage.getItem('token')}`
@@ -47,7 +53,13 @@ const AdminDashboard = () => {
       
       const result = await response.json();
       
-      if (response.ok) {
+      if (response.ok && Array.isArray(result)) {
+        setData(prev => ({
+          ...prev,
+          [activeTab]: cursor ? [...(prev[activeTab] || []), ...result] : result
+        }));
+        setNextCursor(response.headers.get('X-Next-Cursor'));
+      } else if (response.ok) {
         setData(result.data || result);
       } else {
         setError(result.error || 'Failed to fetch data');
@@ -165,6 +177,11 @@ const AdminDashboard = () => {
       ) : (
         <p>No bookings found</p>
       )}
+      {nextCursor && (
+        <button className="nav-btn" style={{marginTop: '15px'}} onClick={() => fetchData(nextCursor)}>
+          Load more
+        </button>
+      )}
     </div>
   );
 
@@ -203,6 +220,11 @@ const AdminDashboard = () => {
       ) : (
         <p>No users found</p>
       )}
+      {nextCursor && (
+        <button className="nav-btn" style={{marginTop: '15px'}} onClick={() => fetchData(nextCursor)}>
+          Load more
+        </button>
+      )}
     </div>
   );
 
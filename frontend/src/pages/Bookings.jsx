@@ -1,18 +1,20 @@
 import { useEffect, useState } from "react";
-import api from "../api";
+import api, { getPage } from "../api";
 
 export default function Bookings() {
   const [bookings, setBookings] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [form, setForm] = useState({ user_id: "", room_id: "", check_in: "", check_out: "", booking_status: "Pending", arrival_status: "Not Arrived" });
 
-  const loadBookings = async () => {
+  const loadBookings = async (cursor = null) => {
     try {
-      setLoading(true);
+      if (!cursor) setLoading(true);
       setError(null);
-      const res = await api.get("/bookings");
-      setBookings(res.data);
+      const page = await getPage("/bookings", cursor);
+      setBookings((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Failed to load bookings");
       console.error(err);
@@ -139,6 +141,11 @@ export default function Bookings() {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button onClick={() => loadBookings(nextCursor)} style={{ marginTop: '10px', padding: '5px 10px' }}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
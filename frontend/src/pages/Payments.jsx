@@ -1,18 +1,20 @@
 import { useEffect, useState } from "react";
-import api from "../api";
+import api, { getPage } from "../api";
 
 export default function Payments() {
   const [payments, setPayments] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [form, setForm] = useState({ booking_id: "", amount: "", payment_method: "Paytm", payment_status: "Pending" });
 
-  const loadPayments = async () => {
+  const loadPayments = async (cursor = null) => {
     try {
-      setLoading(true);
+      if (!cursor) setLoading(true);
       setError(null);
-      const res = await api.get("/payments");
-      setPayments(res.data);
+      const page = await getPage("/payments", cursor);
+      setPayments((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Failed to load payments");
       console.error(err);
@@ -126,6 +128,11 @@ export default function Payments() {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button onClick={() => loadPayments(nextCursor)} style={{ marginTop: '10px', padding: '5px 10px' }}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -1,18 +1,20 @@
 import { useEffect, useState } from "react";
-import api from "../api";
+import api, { getPage } from "../api";
 
 export default function Reviews() {
   const [reviews, setReviews] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [form, setForm] = useState({ user_id: "", room_id: "", rating: "", comment: "" });
 
-  const loadReviews = async () => {
+  const loadReviews = async (cursor = null) => {
     try {
-      setLoading(true);
+      if (!cursor) setLoading(true);
       setError(null);
-      const res = await api.get("/reviews");
-      setReviews(res.data);
+      const page = await getPage("/reviews", cursor);
+      setReviews((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Failed to load reviews");
       console.error(err);
@@ -123,6 +125,11 @@ export default function Reviews() {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button onClick={() => loadReviews(nextCursor)} style={{ marginTop: '10px', padding: '5px 10px' }}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
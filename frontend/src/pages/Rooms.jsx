@@ -1,18 +1,20 @@
 import { useEffect, useState } from "react";
-import api from "../api";
+import api, { getPage } from "../api";
 
 export default function Rooms() {
   const [rooms, setRooms] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [form, setForm] = useState({ room_number: "", room_type: "", price: "", description: "", status: "Available" });
 
-  const loadRooms = async () => {
+  const loadRooms = async (cursor = null) => {
     try {
-      setLoading(true);
+      if (!cursor) setLoading(true);
       setError(null);
-      const res = await api.get("/rooms");
-      setRooms(res.data);
+      const page = await getPage("/rooms", cursor);
+      setRooms((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Failed to load rooms");
       console.error(err);
@@ -128,6 +130,11 @@ export default function Rooms() {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button onClick={() => loadRooms(nextCursor)} style={{ marginTop: '10px', padding: '5px 10px' }}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
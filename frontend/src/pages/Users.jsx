@@ -1,22 +1,24 @@
 import React, { useEffect, useState } from "react";
-import api from "../api";
+import api, { getPage } from "../api";
 
 function Users() {
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [form, setForm] = useState({ name: "", email: "", password: "", phone: "" });
 
   useEffect(() => {
     fetchUsers();
   }, []);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (cursor = null) => {
     try {
-      setLoading(true);
+      if (!cursor) setLoading(true);
       setError(null);
-      const res = await api.get("/users");
-      setUsers(res.data);
+      const page = await getPage("/users", cursor);
+      setUsers((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Failed to fetch users");
       console.error(err);
@@ -117,6 +119,11 @@ function Users() {
           </tbody>
         </table>
       )}
+      {nextCursor && (
+        <button onClick={() => fetchUsers(nextCursor)} style={{ marginTop: '10px', padding: '5px 10px' }}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -1,15 +1,5 @@
-import sqlite3
-import hashlib
-from datetime import datetime
-
-def get_db():
-    conn = sqlite3.connect("hotel_booking.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def hash_password(password):
-    """Simple password hashing using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+from db_pool import get_db, release_db
+from passwords import check_password, hash_password
 
 def create_initial_admin():
     """Create initial admin user"""
@@ -42,24 +32,22 @@ def create_initial_admin():
 def verify_admin_login(username, password):
     """Verify admin credentials"""
     db = get_db()
-    hashed_password = hash_password(password)
-    admin = db.execute(
-        "SELECT * FROM admins WHERE username = ? AND password = ?", 
-        (username, hashed_password)
-    ).fetchone()
+    admin = db.execute("SELECT * FROM admins WHERE username = ?", (username,)).fetchone()
     db.close()
-    return dict(admin) if admin else None
+    release_db()  # not held while the password hash waits for a worker
+    if admin and check_password("admins", admin, password):
+        return dict(admin)
+    return None
 
 def verify_user_login(email, password):
     """Verify user credentials"""
     db = get_db()
-    hashed_password = hash_password(password)
-    user = db.execute(
-        "SELECT * FROM users WHERE email = ? AND password = ?", 
-        (email, hashed_password)
-    ).fetchone()
+    user = db.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
     db.close()
-    return dict(user) if user else None
+    release_db()  # not held while the password hash waits for a worker
+    if user and check_password("users", user, password):
+        return dict(user)
+    return None
 
 def register_user(name, email, password, phone):
     """Register new user"""
@@ -71,8 +59,12 @@ def register_user(name, email, password, phone):
         db.close()
         return None, "User already exists"
     
+    db.close()
+    release_db()  # not held while the password is hashed
+    
     # Create user
     hashed_password = hash_password(password)
+    db = get_db()
     db.execute(
         "INSERT INTO users (name, email, password, phone) VALUES (?, ?, ?, ?)",
         (name, email, hashed_password, phone)
@@ -1,18 +1,19 @@
 from flask import Flask, request, jsonify
 from flask_swagger_ui import get_swaggerui_blueprint
 from flask_cors import CORS
-import sqlite3
-import hashlib
-from datetime import datetime
+from db_pool import get_db, init_pool, release_db
+from passwords import PasswordBusy, busy_response, check_password, hash_password, start_workers
+from metrics import init_metrics
+from pagination import EXPOSED_HEADERS, paginate
+from write_queue import WriteTimeout, get_writer, insert_booking, insert_payment
 
 app = Flask(__name__, static_folder='static')
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=EXPOSED_HEADERS)  # Enable CORS for all routes
 
 # ---------------- Database connection ----------------
-def get_db():
-    conn = sqlite3.connect("hotel_booking.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+start_workers()  # password hashing processes, forked before any thread starts
+init_pool(app)
+init_metrics(app)  # per-route latency, SQL and status counts on /metrics
 
 # ---------------- Swagger ----------------
 SWAGGER_URL = "/swagger"
@@ -27,20 +28,15 @@ swaggerui_blueprint = get_swaggerui_blueprint(
 app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
 # ---------------- Helper Functions ----------------
-def hash_password(password):
-    """Simple password hashing using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
 def verify_user_credentials(email, password):
     """Verify user credentials"""
     db = get_db()
-    hashed_password = hash_password(password)
-    user = db.execute(
-        "SELECT * FROM users WHERE email = ? AND password = ?", 
-        (email, hashed_password)
-    ).fetchone()
+    user = db.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
     db.close()
-    return dict(user) if user else None
+    release_db()  # not held while the password hash waits for a worker
+    if user and check_password("users", user, password):
+        return dict(user)
+    return None
 
 def verify_admin_credentials(username, password):
     """Verify admin credentials"""
@@ -96,6 +92,8 @@ def login():
         
         return jsonify({"error": "Invalid credentials"}), 401
     
+    except PasswordBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -116,8 +114,12 @@ def register():
             db.close()
             return jsonify({"error": "User already exists"}), 400
         
+        db.close()
+        release_db()  # not held while the password is hashed
+        
         # Hash password and create user
         hashed_password = hash_password(password)
+        db = get_db()
         db.execute(
             "INSERT INTO users (name, email, password, phone) VALUES (?, ?, ?, ?)",
             (name, email, hashed_password, phone)
@@ -131,6 +133,8 @@ def register():
             "user_id": user_id
         }), 201
     
+    except PasswordBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -163,15 +167,19 @@ def home():
 # ================== USERS ==================
 @app.route("/users", methods=["GET", "POST"])
 def users():
+    if request.method == "POST":
+        # Hashed before taking a connection: the hash can wait for a worker
+        try:
+            hashed_password = hash_password(request.json["password"])
+        except PasswordBusy:
+            return busy_response()
     db = get_db()
     if request.method == "GET":
-        data = db.execute("SELECT * FROM users").fetchall()
+        response = paginate(db, "SELECT * FROM users", [("user_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
-    # Hash the password before storing
-    hashed_password = hash_password(data["password"])
     db.execute(
         "INSERT INTO users (name, email, password, phone) VALUES (?, ?, ?, ?)",
         (data["name"], data["email"], hashed_password, data.get("phone"))
@@ -182,6 +190,11 @@ def users():
 
 @app.route("/users/<int:user_id>", methods=["GET", "PUT", "DELETE"])
 def user_detail(user_id):
+    if request.method == "PUT":
+        try:
+            hashed_password = hash_password(request.json["password"])  # before taking a connection
+        except PasswordBusy:
+            return busy_response()
     db = get_db()
     if request.method == "GET":
         user = db.execute("SELECT * FROM users WHERE user_id=?", (user_id,)).fetchone()
@@ -192,7 +205,6 @@ def user_detail(user_id):
 
     elif request.method == "PUT":
         data = request.json
-        hashed_password = hash_password(data["password"])
         db.execute("""
             UPDATE users SET name=?, email=?, password=?, phone=?
             WHERE user_id=?
@@ -212,9 +224,9 @@ def user_detail(user_id):
 def rooms():
     db = get_db()
     if request.method == "GET":
-        data = db.execute("SELECT * FROM rooms").fetchall()
+        response = paginate(db, "SELECT * FROM rooms", [("room_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
     db.execute(
@@ -254,24 +266,25 @@ def room_detail(room_id):
 # ================== BOOKINGS ==================
 @app.route("/bookings", methods=["GET", "POST"])
 def bookings():
-    db = get_db()
     if request.method == "GET":
-        data = db.execute("""
+        db = get_db()
+        response = paginate(db, """
             SELECT b.*, u.name as user_name, r.room_number
             FROM bookings b
             JOIN users u ON b.user_id=u.user_id
             JOIN rooms r ON b.room_id=r.room_id
-        """).fetchall()
+        """, [("b.booking_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
-    db.execute(
-        "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status) VALUES (?, ?, ?, ?, ?, ?)",
-        (data["user_id"], data["room_id"], data["check_in"], data["check_out"], data.get("booking_status", "Pending"), data.get("arrival_status", "Not Arrived"))
-    )
-    db.commit()
-    db.close()
+    try:
+        get_writer().run(
+            insert_booking,
+            data["user_id"], data["room_id"], data["check_in"], data["check_out"], data.get("booking_status", "Pending"), data.get("arrival_status", "Not Arrived")
+        )
+    except WriteTimeout as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     return jsonify({"message": "Booking created"}), 201
 
 @app.route("/bookings/<int:booking_id>", methods=["GET", "PUT", "DELETE"])
@@ -303,19 +316,20 @@ def booking_detail(booking_id):
 # ================== PAYMENTS ==================
 @app.route("/payments", methods=["GET", "POST"])
 def payments():
-    db = get_db()
     if request.method == "GET":
-        data = db.execute("SELECT * FROM payments").fetchall()
+        db = get_db()
+        response = paginate(db, "SELECT * FROM payments", [("payment_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
-    db.execute(
-        "INSERT INTO payments (booking_id, amount, payment_method, payment_status) VALUES (?, ?, ?, ?)",
-        (data["booking_id"], data["amount"], data.get("payment_method", "Paytm"), data.get("payment_status", "Pending"))
-    )
-    db.commit()
-    db.close()
+    try:
+        get_writer().run(
+            insert_payment,
+            data["booking_id"], data["amount"], data.get("payment_method", "Paytm"), data.get("payment_status", "Pending")
+        )
+    except WriteTimeout as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     return jsonify({"message": "Payment added"}), 201
 
 @app.route("/payments/<int:payment_id>", methods=["GET", "PUT", "DELETE"])
@@ -349,14 +363,14 @@ def payment_detail(payment_id):
 def reviews():
     db = get_db()
     if request.method == "GET":
-        data = db.execute("""
+        response = paginate(db, """
             SELECT r.*, u.name as user_name, rm.room_number
             FROM reviews r
             JOIN users u ON r.user_id=u.user_id
             JOIN rooms rm ON r.room_id=rm.room_id
-        """).fetchall()
+        """, [("r.review_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
     db.execute(
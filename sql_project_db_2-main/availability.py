@@ -0,0 +1,271 @@
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+import storage_profile
+
+# ---------------- Overlap rule ----------------
+# Stays are half-open [check_in, check_out): a guest checking out on the
+# 12th does not block one checking in on the 12th. Two stays overlap when
+#   existing.check_in < new.check_out AND existing.check_out > new.check_in
+ACTIVE_STATUSES = ("Pending", "Confirmed")
+
+# The same rule as a filter on a rooms row aliased r, with parameters
+# (check_in, check_out): one fixed statement however many rooms are booked.
+# Each room seeks idx_bookings_room_stays for stays ending after check_in,
+# so the cost follows the room's current bookings, not its history.
+ROOM_IS_FREE = """NOT EXISTS (
+                SELECT 1 FROM bookings b
+                WHERE b.room_id = r.room_id
+                AND b.check_out > ? AND b.check_in < ?
+                AND b.booking_status IN ('Pending', 'Confirmed')
+            )"""
+
+# Change-log entries kept for engines in other processes to catch up from
+CHANGE_RETENTION = 100000
+
+
+def day_number(value):
+    """'2026-02-10' (or a datetime string) -> proleptic ordinal day"""
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+# ---------------- Per-room calendar ----------------
+class RoomCalendar:
+    """Active stays of one room, sorted by check-in day.
+
+    Stays normally do not overlap, but rows written without a conflict
+    check (e.g. main.py's raw CRUD) may, so lookups only assume that no
+    stay is longer than `max_nights`: anything ending after `start` must
+    begin after `start - max_nights`, which bounds the scan to the stays
+    around the requested window.
+    """
+
+    __slots__ = ("starts", "ends", "ids", "max_nights")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self.max_nights = 0
+
+    def add(self, booking_id, start, end):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, booking_id)
+        if end - start > self.max_nights:
+            self.max_nights = end - start
+
+    def remove(self, booking_id, start):
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == booking_id:
+                del self.starts[i], self.ends[i], self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def conflicts(self, start, end, ignore=None):
+        """Booking ids whose stay overlaps [start, end)"""
+        lo = bisect_right(self.starts, start - self.max_nights)
+        hi = bisect_left(self.starts, end)
+        return [
+            self.ids[i] for i in range(lo, hi)
+            if self.ends[i] > start and self.ids[i] != ignore
+        ]
+
+    def is_free(self, start, end, ignore=None):
+        return not self.conflicts(start, end, ignore)
+
+    def __len__(self):
+        return len(self.starts)
+
+
+# ---------------- Availability engine ----------------
+class AvailabilityEngine:
+    """In-memory booking calendars for every room.
+
+    Loaded once from the bookings table, then kept current from the
+    booking_changes log that triggers on bookings fill in. Every query
+    first compares PRAGMA data_version, so commits made by any connection
+    or process are picked up before answering.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        storage_profile.apply_profile(self._conn)
+        self._rooms = {}
+        self._bookings = {}
+        self._last_seq = 0
+        self._data_version = None
+        self.stats = {"loads": 0, "syncs": 0, "changes_applied": 0, "queries": 0}
+        self.load()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- loading and syncing ----
+    def load(self):
+        """(Re)build every calendar from the bookings table"""
+        with self._lock:
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self._last_seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM booking_changes"
+            ).fetchone()[0]
+            self._rooms = {}
+            self._bookings = {}
+            placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+            rows = self._conn.execute(f"""
+                SELECT booking_id, room_id, check_in, check_out
+                FROM bookings
+                WHERE booking_status IN ({placeholders})
+                ORDER BY room_id, check_in
+            """, ACTIVE_STATUSES)
+            for booking_id, room_id, check_in, check_out in rows:
+                self._add(booking_id, room_id, check_in, check_out)
+            self.stats["loads"] += 1
+
+    def sync(self):
+        """Apply bookings changed since the last sync (no-op if none)"""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return 0
+            self._data_version = version
+            changes = self._conn.execute(
+                "SELECT seq, booking_id FROM booking_changes WHERE seq > ? ORDER BY seq",
+                (self._last_seq,)
+            ).fetchall()
+            if not changes:
+                return 0
+            oldest = self._conn.execute("SELECT MIN(seq) FROM booking_changes").fetchone()[0]
+            if oldest > self._last_seq + 1:
+                # Entries we never saw were pruned; start over
+                self.load()
+                return len(changes)
+            self._last_seq = changes[-1][0]
+            booking_ids = list({booking_id for _, booking_id in changes})
+            for booking_id in booking_ids:
+                self._discard(booking_id)
+            for i in range(0, len(booking_ids), 500):
+                chunk = booking_ids[i:i + 500]
+                rows = self._conn.execute(f"""
+                    SELECT booking_id, room_id, check_in, check_out, booking_status
+                    FROM bookings WHERE booking_id IN ({','.join('?' * len(chunk))})
+                """, chunk)
+                for booking_id, room_id, check_in, check_out, status in rows:
+                    if status in ACTIVE_STATUSES:
+                        self._add(booking_id, room_id, check_in, check_out)
+            self.stats["syncs"] += 1
+            self.stats["changes_applied"] += len(booking_ids)
+            if self._last_seq - oldest > 2 * CHANGE_RETENTION:
+                self._prune()
+            return len(booking_ids)
+
+    def _prune(self):
+        # Never wait for the write lock: sync() may run while the calling
+        # request itself holds it, so just try again on a later sync
+        timeout = self._conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        self._conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            self._conn.execute(
+                "DELETE FROM booking_changes WHERE seq <= ?",
+                (self._last_seq - CHANGE_RETENTION,)
+            )
+            self._conn.commit()
+        except sqlite3.OperationalError:
+            self._conn.rollback()
+        finally:
+            self._conn.execute(f"PRAGMA busy_timeout = {timeout}")
+
+    def _add(self, booking_id, room_id, check_in, check_out):
+        try:
+            start, end = day_number(check_in), day_number(check_out)
+        except (TypeError, ValueError):
+            # Not a date; such a row can never be matched reliably
+            return
+        calendar = self._rooms.get(room_id)
+        if calendar is None:
+            calendar = self._rooms[room_id] = RoomCalendar()
+        calendar.add(booking_id, start, end)
+        self._bookings[booking_id] = (room_id, start)
+
+    def _discard(self, booking_id):
+        entry = self._bookings.pop(booking_id, None)
+        if entry is not None:
+            room_id, start = entry
+            self._rooms[room_id].remove(booking_id, start)
+
+    # ---- queries ----
+    def conflicts(self, room_id, check_in, check_out, ignore=None):
+        """Active bookings of room_id that overlap [check_in, check_out)"""
+        start, end = day_number(check_in), day_number(check_out)
+        with self._lock:
+            self.sync()
+            self.stats["queries"] += 1
+            calendar = self._rooms.get(int(room_id))
+            return calendar.conflicts(start, end, ignore) if calendar else []
+
+    def is_free(self, room_id, check_in, check_out, ignore=None):
+        return not self.conflicts(room_id, check_in, check_out, ignore)
+
+    def free_rooms(self, room_ids, check_in, check_out):
+        """The subset of room_ids with no active stay in [check_in, check_out)"""
+        start, end = day_number(check_in), day_number(check_out)
+        with self._lock:
+            self.sync()
+            self.stats["queries"] += 1
+            free = []
+            for room_id in room_ids:
+                calendar = self._rooms.get(room_id)
+                if calendar is None or calendar.is_free(start, end):
+                    free.append(room_id)
+            return free
+
+    def booked_rooms(self, check_in, check_out):
+        """Room ids with at least one active stay in [check_in, check_out)"""
+        start, end = day_number(check_in), day_number(check_out)
+        with self._lock:
+            self.sync()
+            self.stats["queries"] += 1
+            return {
+                room_id for room_id, calendar in self._rooms.items()
+                if not calendar.is_free(start, end)
+            }
+
+    def booking_count(self):
+        with self._lock:
+            return len(self._bookings)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(path=None):
+    """Process-wide engine, loaded on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if path is None:
+                    from db_pool import pool
+                    path = pool.path
+                _engine = AvailabilityEngine(path)
+    return _engine
+
+
+def validate_stay(check_in, check_out):
+    """Error message for an unusable date range, or None"""
+    try:
+        start, end = day_number(check_in), day_number(check_out)
+    except ValueError:
+        return "Dates must be in YYYY-MM-DD format"
+    if end <= start:
+        return "Check-out must be after check-in"
+    return None
@@ -0,0 +1,159 @@
+"""Booking conflict checks: availability engine vs indexed SQL.
+
+Builds a scratch database with --bookings stays spread over --rooms rooms
+(1M by default), then times "is room R free" and "which rooms are free"
+through the SQL query the routes used to run and through the engine.
+With --dataset it runs on a generated seed_data.py dataset instead.
+
+Run: python bench_availability.py [--bookings 1000000 --rooms 5000 | --dataset prod]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from availability import AvailabilityEngine
+from migrations import migrate
+from seed_data import add_dataset_argument, dataset
+from storage_profile import apply_profile
+
+CONFLICT_SQL = """
+    SELECT 1 FROM bookings
+    WHERE room_id = ? AND booking_status IN ('Pending', 'Confirmed')
+    AND check_in < ? AND check_out > ?
+    LIMIT 1
+"""
+BOOKED_SQL = """
+    SELECT DISTINCT room_id FROM bookings
+    WHERE check_in < ? AND check_out > ?
+    AND booking_status IN ('Pending', 'Confirmed')
+"""
+BASE_DAY = date(2024, 1, 1)
+
+
+def build_database(path, rooms, bookings):
+    conn = sqlite3.connect(path)
+    apply_profile(conn)
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO rooms (room_number, room_type, price) VALUES (?, 'Double', 2500)",
+        [(str(n),) for n in range(1, rooms + 1)]
+    )
+    rng = random.Random(1)
+    per_room = bookings // rooms
+
+    def rows():
+        # Back-to-back stays of 1-4 nights with the odd gap, per room
+        for room_id in range(1, rooms + 1):
+            day = rng.randrange(0, 5)
+            for _ in range(per_room):
+                nights = rng.randrange(1, 5)
+                status = "Cancelled" if rng.random() < 0.1 else "Confirmed"
+                yield (1, room_id, (BASE_DAY + timedelta(days=day)).isoformat(),
+                       (BASE_DAY + timedelta(days=day + nights)).isoformat(), status)
+                day += nights + rng.randrange(0, 2)
+
+    conn.executemany(
+        "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (?, ?, ?, ?, ?)",
+        rows()
+    )
+    conn.commit()
+    return conn, per_room * 2
+
+
+def open_database(args, name):
+    """(path, conn, first check-in day, rooms): the --dataset copy, or a fresh build"""
+    if args.dataset:
+        path = dataset(args.dataset)
+        conn = sqlite3.connect(path)
+        apply_profile(conn)
+        first, rooms = conn.execute("SELECT MIN(check_in), (SELECT COUNT(*) FROM rooms) FROM bookings").fetchone()
+        return path, conn, date.fromisoformat(first), rooms
+    path = os.path.join(tempfile.mkdtemp(), name)
+    conn, _ = build_database(path, args.rooms, args.bookings)
+    return path, conn, BASE_DAY, args.rooms
+
+
+def booked_span(conn, first_day):
+    """Days from first_day to the last check-out"""
+    return int(conn.execute(
+        "SELECT julianday(MAX(check_out)) - julianday(?) FROM bookings", (first_day.isoformat(),)
+    ).fetchone()[0])
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--rooms", type=int, default=5000)
+    parser.add_argument("--checks", type=int, default=20000)
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    path, conn, first_day, rooms = open_database(args, "availability.db")
+    span = booked_span(conn, first_day)
+    bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"{bookings:,} bookings over {rooms:,} rooms ready in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    engine = AvailabilityEngine(path)
+    print(f"engine loaded {engine.booking_count():,} active stays in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(2)
+    queries = []
+    for _ in range(args.checks):
+        start = first_day + timedelta(days=rng.randrange(0, span))
+        queries.append((rng.randrange(1, rooms + 1), start.isoformat(),
+                        (start + timedelta(days=rng.randrange(1, 7))).isoformat()))
+
+    def sql_checks():
+        for room_id, check_in, check_out in queries:
+            conn.execute(CONFLICT_SQL, (room_id, check_out, check_in)).fetchone()
+
+    def engine_checks():
+        for room_id, check_in, check_out in queries:
+            engine.is_free(room_id, check_in, check_out)
+
+    sql_time = timed(sql_checks, 1) / args.checks
+    engine_time = timed(engine_checks, 1) / args.checks
+    print(f"is room R free      sql {sql_time * 1e6:8.1f} µs   engine {engine_time * 1e6:8.1f} µs"
+          f"   ({sql_time / engine_time:.1f}x)")
+
+    room_ids = list(range(1, rooms + 1))
+    _, check_in, check_out = queries[0]
+    sql_time = timed(lambda: conn.execute(BOOKED_SQL, (check_out, check_in)).fetchall(), 5)
+    engine_time = timed(lambda: engine.free_rooms(room_ids, check_in, check_out), 5)
+    print(f"which rooms are free sql {sql_time * 1e3:8.1f} ms   engine {engine_time * 1e3:8.1f} ms"
+          f"   ({sql_time / engine_time:.1f}x)")
+
+    def insert_and_sync(day=[0]):
+        day[0] += 1
+        stay = first_day + timedelta(days=span + day[0])
+        conn.execute(
+            "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (1, 1, ?, ?, 'Confirmed')",
+            (stay.isoformat(), (stay + timedelta(days=1)).isoformat())
+        )
+        conn.commit()
+        started = time.perf_counter()
+        engine.sync()
+        return time.perf_counter() - started
+
+    insert_and_sync()  # the first sync after a bulk load also prunes the change log
+    sync_time = sum(insert_and_sync() for _ in range(100)) / 100
+    print(f"incremental sync after one insert {sync_time * 1e6:.0f} µs")
+    conn.close()
+    engine.close()
+
+
+if __name__ == "__main__":
+    main()
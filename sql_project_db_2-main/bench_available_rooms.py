@@ -0,0 +1,86 @@
+"""Date-filtered room listings: NOT IN (?, ?, ...) id list vs the NOT EXISTS anti-join.
+
+Builds the bench_availability.py database with --bookings stays over
+--rooms rooms (1M over 10k by default) and, for stays at several points
+of the booked period, times the free-room listing the way the search
+routes used to build it (fetch booked ids, splice one placeholder per id)
+against the single ROOM_IS_FREE statement, on idx_bookings_room_stays and
+on the (room_id, check_in, ...) index it replaced. With --dataset it
+runs on a generated seed_data.py dataset instead.
+
+Run: python bench_available_rooms.py [--bookings 1000000 --rooms 10000 | --dataset prod]
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from availability import ROOM_IS_FREE
+from bench_availability import booked_span, open_database
+from seed_data import add_dataset_argument
+
+LISTING = "SELECT r.room_id FROM rooms r WHERE r.status = 'Available' {where} ORDER BY r.price ASC"
+BOOKED_IDS = """
+    SELECT DISTINCT room_id FROM bookings
+    WHERE (check_in < ? AND check_out > ?)
+    AND booking_status IN ('Pending', 'Confirmed')
+"""
+ANTI_JOIN = LISTING.format(where=f"AND {ROOM_IS_FREE}")
+
+
+def id_list_listing(conn, check_in, check_out):
+    booked_ids = [row[0] for row in conn.execute(BOOKED_IDS, (check_out, check_in))]
+    where = f"AND r.room_id NOT IN ({','.join('?' * len(booked_ids))})" if booked_ids else ""
+    return conn.execute(LISTING.format(where=where), booked_ids).fetchall(), len(booked_ids)
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    _, conn, first_day, rooms = open_database(args, "available.db")
+    bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"{bookings:,} bookings over {rooms:,} rooms ready in {time.perf_counter() - started:.1f}s")
+
+    # Start of the booked period, middle, near its end (where "today" sits
+    # in a live hotel) and past it
+    span = booked_span(conn, first_day)
+    stays = []
+    for day in (5, span // 4, span // 2, span - 30, span + 30):
+        start = first_day + timedelta(days=day)
+        stays.append((start.isoformat(), (start + timedelta(days=3)).isoformat()))
+
+    results = {}
+    print(f"{'check_in':<11} {'free':>6} {'placeholders':>12}   {'id list':>9}   {'anti-join':>9}")
+    for check_in, check_out in stays:
+        list_time, (rows, placeholders) = timed(lambda: id_list_listing(conn, check_in, check_out), args.repeat)
+        join_time, join_rows = timed(lambda: conn.execute(ANTI_JOIN, (check_in, check_out)).fetchall(), args.repeat)
+        assert rows == join_rows, f"{check_in}: the two listings differ"
+        results[check_in] = join_time
+        print(f"{check_in:<11} {len(rows):6} {placeholders:12}   {list_time * 1e3:7.1f}ms   {join_time * 1e3:7.1f}ms"
+              f"   ({list_time / join_time:.1f}x)")
+
+    # The same anti-join on the check_in-ordered index it replaced
+    conn.execute("CREATE INDEX idx_bookings_room_dates ON bookings(room_id, check_in, check_out, booking_status)")
+    conn.execute("DROP INDEX idx_bookings_room_stays")
+    print("anti-join on idx_bookings_room_dates (check_in second):")
+    for check_in, check_out in stays:
+        join_time, _ = timed(lambda: conn.execute(ANTI_JOIN, (check_in, check_out)).fetchall(), args.repeat)
+        print(f"{check_in:<11} {join_time * 1e3:7.1f}ms   vs {results[check_in] * 1e3:.1f}ms on idx_bookings_room_stays")
+    conn.rollback()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Room search filters: the SQL statement vs the in-memory room catalog.
+
+Builds a scratch database with --rooms rooms (10k by default), their
+features and --reviews reviews, then times /rooms/search filter
+combinations the way the route used to run them (one SQL statement,
+rows turned into listing dicts) and through RoomCatalog.search, plus the
+catalog's full load and its incremental sync after a single room write.
+Facet counts are timed against one GROUP BY query per facet over the
+same filters, and the rating/popularity/best orders fully sorted against
+the heap-selected top 20 (limit=20), after refreshing the popularity
+scores from --bookings bookings made over the last 180 days. With
+--dataset it runs on a generated seed_data.py dataset instead.
+
+Run: python bench_catalog.py [--rooms 10000 --reviews 100000 --bookings 100000 | --dataset prod]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from migrations import migrate
+from room_catalog import RoomCatalog
+from room_scores import refresh_scores
+from seed_data import add_dataset_argument, dataset
+from storage_profile import apply_profile
+
+ROOM_TYPES = ["Single", "Double", "Twin", "Suite", "Deluxe Double", "Family Suite", "Penthouse"]
+FEATURES = ["AC", "WiFi", "TV", "Minibar", "Safe", "Balcony", "Bathtub", "Sea View"]
+SQL_LISTING = """
+    SELECT r.*, GROUP_CONCAT(rf.feature_name) as features,
+           rr.avg_rating as avg_rating, COALESCE(rr.review_count, 0) as reviews_count
+    FROM rooms r
+    LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
+    LEFT JOIN room_feature_map rfm ON r.room_id = rfm.room_id
+    LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
+    WHERE r.status = 'Available' {where}
+    GROUP BY r.room_id ORDER BY r.price ASC
+"""
+# One query per facet, the way a client would otherwise get the counts
+FACET_QUERIES = [
+    "SELECT r.room_type, COUNT(*) FROM rooms r WHERE r.status = 'Available' {where} GROUP BY r.room_type",
+    """SELECT rf.feature_name, COUNT(*) FROM rooms r
+       JOIN room_feature_map rfm ON rfm.room_id = r.room_id
+       JOIN room_features rf ON rf.feature_id = rfm.feature_id
+       WHERE r.status = 'Available' {where} GROUP BY rf.feature_name""",
+    "SELECT CAST(r.price / 1000 AS INTEGER), COUNT(*) FROM rooms r WHERE r.status = 'Available' {where} GROUP BY 1",
+    """SELECT CAST(rr.avg_rating AS INTEGER), COUNT(*) FROM rooms r
+       LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
+       WHERE r.status = 'Available' {where} GROUP BY 1""",
+]
+# (label, SQL conditions, parameters, catalog.search keyword arguments)
+SEARCHES = [
+    ("no filters", "", [], {}),
+    ("price band", "AND r.price >= ? AND r.price <= ?", [3000, 6000], {"min_price": 3000, "max_price": 6000}),
+    ("type 'suite'", "AND LOWER(r.room_type) LIKE ?", ["%suite%"], {"room_type": "%suite%"}),
+    ("rating >= 4", "AND r.room_id IN (SELECT room_id FROM room_ratings WHERE avg_rating >= ?)", [4.0],
+     {"min_rating": 4.0}),
+    ("all of them", "AND r.price >= ? AND r.price <= ? AND LOWER(r.room_type) LIKE ? "
+     "AND r.room_id IN (SELECT room_id FROM room_ratings WHERE avg_rating >= ?)",
+     [3000, 12000, "%double%", 3.5], {"min_price": 3000, "max_price": 12000, "room_type": "%double%",
+                                       "min_rating": 3.5}),
+]
+
+
+def build_database(path, rooms, reviews, bookings):
+    conn = sqlite3.connect(path)
+    apply_profile(conn)
+    migrate(conn)
+    rng = random.Random(1)
+    conn.execute("INSERT INTO users (user_id, name, email, password) VALUES (1, 'Guest', 'guest@example.com', 'x')")
+    conn.executemany("INSERT INTO room_features (feature_name) VALUES (?)", [(name,) for name in FEATURES])
+    conn.executemany(
+        "INSERT INTO room_feature_map (room_id, feature_id) VALUES (?, ?)",
+        [(room_id, feature_id) for room_id in range(1, rooms + 1)
+         for feature_id in range(1, len(FEATURES) + 1) if rng.random() < 0.4]
+    )
+    conn.executemany(
+        "INSERT INTO rooms (room_number, room_type, price, status, description) VALUES (?, ?, ?, ?, 'Nice room')",
+        [(str(n), rng.choice(ROOM_TYPES), rng.randrange(1000, 20000),
+          "Maintenance" if rng.random() < 0.05 else "Available") for n in range(rooms)]
+    )
+    conn.executemany(
+        "INSERT INTO reviews (user_id, room_id, rating, comment) VALUES (1, ?, ?, 'ok')",
+        [(rng.randrange(1, rooms + 1), rng.randrange(1, 6)) for _ in range(reviews)]
+    )
+    conn.executemany(
+        "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, created_at) "
+        "VALUES (1, ?, '2026-03-01', '2026-03-02', ?, datetime('now', ?))",
+        [(rng.randrange(1, rooms + 1), rng.choice(["Confirmed", "Confirmed", "Cancelled"]),
+          f"-{rng.randrange(180)} days") for _ in range(bookings)]
+    )
+    conn.commit()
+    refresh_scores(conn)
+    return conn
+
+
+def sql_search(conn, where, params):
+    rooms = []
+    for row in conn.execute(SQL_LISTING.format(where=where), params):
+        room = dict(row)
+        room["features"] = room["features"].split(",") if room["features"] else []
+        rooms.append(room)
+    return rooms
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=10)
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.dataset:
+        path = dataset(args.dataset)
+        conn = sqlite3.connect(path)
+        apply_profile(conn)
+        refresh_scores(conn)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "catalog.db")
+        conn = build_database(path, args.rooms, args.reviews, args.bookings)
+    conn.row_factory = sqlite3.Row
+    rooms, reviews, bookings = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM rooms), (SELECT COUNT(*) FROM reviews), COUNT(*) FROM bookings"
+    ).fetchone()
+    print(f"{rooms:,} rooms, {reviews:,} reviews and {bookings:,} bookings ready "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    load_time, catalog = timed(lambda: RoomCatalog(path), 1)
+    print(f"catalog loaded in {load_time * 1e3:.0f} ms")
+
+    for label, where, params, filters in SEARCHES:
+        sql_time, sql_rooms = timed(lambda: sql_search(conn, where, params), args.repeat)
+        catalog_time, catalog_rooms = timed(lambda: catalog.search(**filters), args.repeat)
+        assert sql_rooms == catalog_rooms, f"{label}: results differ"
+        print(f"{label:<13} {len(sql_rooms):6} rooms   sql {sql_time * 1e3:7.2f} ms   "
+              f"catalog {catalog_time * 1e3:6.2f} ms   ({sql_time / catalog_time:.0f}x)")
+
+    print("facet counts:")
+    for label, where, params, filters in SEARCHES:
+        sql_time, _ = timed(
+            lambda: [conn.execute(query.format(where=where), params).fetchall() for query in FACET_QUERIES],
+            args.repeat
+        )
+        plain_time, _ = timed(lambda: catalog.search(**filters), args.repeat)
+        facet_time, _ = timed(lambda: catalog.search(facets=True, **filters), args.repeat)
+        print(f"{label:<13} {len(FACET_QUERIES)} queries {sql_time * 1e3:7.2f} ms   "
+              f"catalog pass +{(facet_time - plain_time) * 1e3:5.2f} ms on top of the search")
+
+    print("ranked (every available room):")
+    for sort in ("rating", "popularity", "best"):
+        full_time, full = timed(lambda: catalog.search(sort=sort), args.repeat)
+        top_time, top = timed(lambda: catalog.search(sort=sort, limit=20), args.repeat)
+        assert top == full[:20], f"{sort}: top 20 differs from the sorted listing"
+        print(f"sort={sort:<11} full sort {full_time * 1e3:6.2f} ms   limit=20 {top_time * 1e3:6.2f} ms")
+
+    def write_and_sync(n=[0]):
+        n[0] += 1
+        conn.execute("UPDATE rooms SET price = ? WHERE room_id = ?", (1000 + n[0], n[0]))
+        conn.commit()
+        started = time.perf_counter()
+        catalog.search(min_price=1e9)  # syncs first; matches nothing
+        return time.perf_counter() - started
+
+    sync_time = sum(write_and_sync() for _ in range(100)) / 100
+    print(f"search right after a room write (incremental sync) {sync_time * 1e3:.2f} ms")
+    catalog.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
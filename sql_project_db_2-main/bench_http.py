@@ -0,0 +1,391 @@
+"""HTTP load test: requests/s and latency per route, for every backend.
+
+Starts each backend (main.py, clean_backend.py, simplified_backend.py)
+as a local server on its own copy of a generated seed_data.py dataset,
+then --clients threads send a weighted mix of scenarios for --seconds
+(after --warmup seconds that are not counted):
+
+  browse     the room listing (/rooms/available, /rooms on main.py)
+  room       one room's page
+  search     /rooms/search with random filters
+  login      POST /auth/login as a random guest
+  book       a stay in a random room, past the generated calendars
+  dashboard  GET /admin/dashboard
+  reports    /admin/reports and /admin/analytics
+
+A backend without a route for a scenario skips it. Reports req/s,
+p50/p95/p99 latency, the share of 4xx answers (a refused booking is a
+400) and the error rate (5xx or no answer) per route.
+
+--out writes the results as JSON. --baseline compares them with an
+earlier --out file: a route whose req/s fell, or whose p99 rose, by more
+than --tolerance is flagged and the exit status is 1.
+
+Run: python bench_http.py [--dataset small --clients 16 --seconds 20 --out run.json --baseline old.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bench_wal import percentile
+from seed_data import ANCHOR, PASSWORD, PROFILES, dataset
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKENDS = ["main", "clean_backend", "simplified_backend"]
+# The app as its __main__ block would run it, minus the per-request log lines
+SERVER = """
+import logging, sys
+logging.getLogger("werkzeug").setLevel(logging.ERROR)
+backend = __import__(sys.argv[1])
+backend.app.run(host="127.0.0.1", port=int(sys.argv[2]), threaded=True)
+"""
+MIX = {"browse": 30, "room": 15, "search": 20, "login": 5, "book": 10, "dashboard": 10, "reports": 10}
+SEARCH_FILTERS = [
+    ("min_price", ["2000", "4000", "8000"]),
+    ("max_price", ["3000", "6000", "12000"]),
+    ("room_type", ["suite", "double", "deluxe", "single"]),
+    ("min_rating", ["3", "4", "4.5"]),
+    ("features", ["wifi", "balcony", "ac,tv", "sea view,bathtub"]),
+    ("sort", ["price", "rating", "popularity", "best"]),
+]
+REPORT_TYPES = ["summary", "financial", "booking"]
+
+
+# ---------------- Scenarios ----------------
+# Each returns (method, route, path, body, token) for one request; route
+# is the path template the stats are kept under
+def stay(rng, first, last):
+    check_in = ANCHOR + timedelta(days=rng.randrange(first, last))
+    return check_in.isoformat(), (check_in + timedelta(days=rng.choice([1, 1, 2, 3, 7]))).isoformat()
+
+
+def browse(ctx, rng, backend):
+    if backend == "main":
+        return "GET", "/rooms", "/rooms", None, None
+    if backend == "clean_backend":
+        return "GET", "/rooms/available", "/rooms/available", None, None
+    check_in, check_out = stay(rng, 0, 90)
+    return "GET", "/rooms/available", f"/rooms/available?check_in={check_in}&check_out={check_out}", None, None
+
+
+def room(ctx, rng, backend):
+    return "GET", "/rooms/<id>", f"/rooms/{rng.choice(ctx['rooms'])}", None, None
+
+
+def search(ctx, rng, backend):
+    if backend != "simplified_backend":
+        return None
+    check_in, check_out = stay(rng, 0, 90)
+    query = [f"check_in={check_in}", f"check_out={check_out}"]
+    for name, values in rng.sample(SEARCH_FILTERS, rng.randrange(1, 4)):
+        query.append(f"{name}={rng.choice(values)}".replace(" ", "%20"))
+    return "GET", "/rooms/search", "/rooms/search?" + "&".join(query), None, None
+
+
+def login(ctx, rng, backend):
+    if backend == "main":
+        return None
+    body = {"username": rng.choice(ctx["emails"]), "password": PASSWORD}
+    return "POST", "/auth/login", "/auth/login", body, None
+
+
+def book(ctx, rng, backend):
+    # Past the generated calendars, so most stays are free
+    check_in, check_out = stay(rng, 2 * 365, 20 * 365)
+    body = {"room_id": rng.choice(ctx["rooms"]), "check_in": check_in, "check_out": check_out}
+    if backend == "main":
+        body["user_id"] = rng.choice(ctx["user_ids"])
+        return "POST", "/bookings", "/bookings", body, None
+    return "POST", "/user/bookings", "/user/bookings", body, rng.choice(ctx["tokens"])
+
+
+def dashboard(ctx, rng, backend):
+    if backend == "main":
+        return None
+    return "GET", "/admin/dashboard", "/admin/dashboard", None, ctx["admin_token"]
+
+
+def reports(ctx, rng, backend):
+    if backend != "simplified_backend":
+        return None
+    if rng.random() < 0.25:
+        return "GET", "/admin/analytics", "/admin/analytics", None, ctx["admin_token"]
+    start = ANCHOR - timedelta(days=rng.choice([30, 90, 365]))
+    path = f"/admin/reports?type={rng.choice(REPORT_TYPES)}&start_date={start}&end_date={ANCHOR}"
+    return "GET", "/admin/reports", path, None, ctx["admin_token"]
+
+
+SCENARIOS = {
+    "browse": browse,
+    "room": room,
+    "search": search,
+    "login": login,
+    "book": book,
+    "dashboard": dashboard,
+    "reports": reports,
+}
+
+
+# ---------------- Server and client ----------------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Client:
+    """One HTTP connection, reopened whenever the server closes it; request() -> (status, body)"""
+
+    def __init__(self, port, timeout=30):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+
+    def request(self, method, path, body=None, token=None):
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        try:
+            self.conn.request(method, path, body, headers)
+            response = self.conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            raise
+
+    def close(self):
+        self.conn.close()
+
+
+def start_server(backend, path, port, log, timeout):
+    env = dict(os.environ, HOTEL_DB_PATH=path)
+    process = subprocess.Popen([sys.executable, "-c", SERVER, backend, str(port)],
+                               cwd=HERE, env=env, stdout=log, stderr=log)
+    client = Client(port, timeout=5)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if client.request("GET", "/")[0] == 200:
+                client.close()
+                return process
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    process.kill()
+    log.seek(0)
+    raise RuntimeError(f"{backend} did not start:\n{log.read().decode(errors='replace')[-2000:]}")
+
+
+def prepare(backend, path, port, clients):
+    """Rooms, guests and the tokens the scenarios use"""
+    conn = sqlite3.connect(path)
+    rooms = [row[0] for row in conn.execute("SELECT room_id FROM rooms WHERE status = 'Available'")]
+    guests = conn.execute(
+        "SELECT user_id, email FROM users WHERE status = 'active' ORDER BY user_id LIMIT 1000"
+    ).fetchall()
+    conn.close()
+    ctx = {"rooms": rooms, "user_ids": [g[0] for g in guests], "emails": [g[1] for g in guests],
+           "tokens": [], "admin_token": None}
+    if backend == "main":
+        return ctx
+    client = Client(port)
+    status, body = client.request("POST", "/auth/login",
+                                  {"username": "admin", "password": "admin123", "user_type": "admin"})
+    if status != 200:
+        raise RuntimeError(f"{backend}: admin login failed ({status}) {body[:200]!r}")
+    ctx["admin_token"] = json.loads(body)["token"]
+    for email in ctx["emails"][:clients]:
+        status, body = client.request("POST", "/auth/login", {"username": email, "password": PASSWORD})
+        if status != 200:
+            raise RuntimeError(f"{backend}: login as {email} failed ({status}) {body[:200]!r}")
+        ctx["tokens"].append(json.loads(body)["token"])
+    client.close()
+    return ctx
+
+
+def run_backend(backend, profile, clients, seconds, warmup, mix, seed, start_timeout):
+    path = dataset(profile)
+    port = free_port()
+    log = tempfile.TemporaryFile()
+    server = start_server(backend, path, port, log, start_timeout)
+    try:
+        ctx = prepare(backend, path, port, clients)
+        scenarios = [(name, SCENARIOS[name]) for name in mix]
+        weights = [mix[name] for name in mix]
+        samples = []  # (route, status, seconds)
+        lock = threading.Lock()
+        stop = threading.Event()
+        counting = [None]  # perf_counter() time counting started at
+
+        def client_loop(n):
+            rng = random.Random(seed * 1000 + n)
+            client = Client(port)
+            local = []
+            while not stop.is_set():
+                name, scenario = rng.choices(scenarios, weights)[0]
+                request = scenario(ctx, rng, backend)
+                if request is None:
+                    continue
+                method, route, target, body, token = request
+                started = time.perf_counter()
+                try:
+                    status = client.request(method, target, body, token)[0]
+                except (OSError, http.client.HTTPException):
+                    status = 0
+                if counting[0] is not None and started >= counting[0]:
+                    local.append((f"{method} {route}", status, time.perf_counter() - started))
+            client.close()
+            with lock:
+                samples.extend(local)
+
+        threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(warmup)
+        counting[0] = time.perf_counter()
+        time.sleep(seconds)
+        stop.set()
+        elapsed = time.perf_counter() - counting[0]
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return summarize(samples, elapsed)
+
+
+def summarize(samples, elapsed):
+    """Per-route (and "all") req/s, latency percentiles in ms, 4xx and error rates"""
+    routes = {}
+    for route, status, seconds in samples:
+        routes.setdefault(route, []).append((status, seconds))
+        routes.setdefault("all", []).append((status, seconds))
+    results = {}
+    for route, rows in sorted(routes.items()):
+        latencies = [seconds for _, seconds in rows]
+        results[route] = {
+            "requests": len(rows),
+            "rps": round(len(rows) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "client_error_rate": round(sum(400 <= status < 500 for status, _ in rows) / len(rows), 4),
+            "error_rate": round(sum(status == 0 or status >= 500 for status, _ in rows) / len(rows), 4),
+        }
+    return results
+
+
+# ---------------- Comparison ----------------
+def regressions(results, baseline, tolerance, min_ms=1.0):
+    """Lines for the routes that got slower than the baseline run"""
+    found = []
+    for backend, routes in results.items():
+        for route, now in routes.items():
+            before = baseline.get(backend, {}).get(route)
+            if not before:
+                continue
+            if now["rps"] < before["rps"] * (1 - tolerance):
+                found.append(f"{backend} {route}: {before['rps']} -> {now['rps']} req/s")
+            if now["p99_ms"] > before["p99_ms"] * (1 + tolerance) and now["p99_ms"] - before["p99_ms"] > min_ms:
+                found.append(f"{backend} {route}: p99 {before['p99_ms']} -> {now['p99_ms']} ms")
+            if now["error_rate"] > before["error_rate"] + 0.01:
+                found.append(f"{backend} {route}: error rate {before['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    return found
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", choices=list(PROFILES), default="small")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--scenarios", default=",".join(MIX), help="which scenarios to mix in")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start-timeout", type=float, default=300, help="seconds to wait for a server to start")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="an earlier --out file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed req/s drop or p99 rise (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    unknown = [name for name in backends if name not in BACKENDS] + \
+              [name for name in args.scenarios.split(",") if name not in MIX]
+    if unknown:
+        parser.error(f"unknown backend or scenario: {', '.join(unknown)}")
+    mix = {name: MIX[name] for name in args.scenarios.split(",")}
+
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "dataset": args.dataset,
+            "clients": args.clients,
+            "seconds": args.seconds,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "mix": mix,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "cpus": os.cpu_count(),
+        },
+        "results": {},
+    }
+    print(f"{args.dataset} dataset, {args.clients} clients, {args.seconds:g}s per backend")
+    print(f"{'backend':<20}{'route':<24}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'4xx':>8}{'errors':>8}")
+    for backend in backends:
+        results = run_backend(backend, args.dataset, args.clients, args.seconds, args.warmup, mix,
+                              args.seed, args.start_timeout)
+        report["results"][backend] = results
+        for route, r in results.items():
+            print(f"{backend:<20}{route:<24}{r['rps']:>9.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                  f"{r['p99_ms']:>9.2f}{r['client_error_rate']:>8.1%}{r['error_rate']:>8.1%}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for setting in ("dataset", "clients", "seconds", "mix", "cpus"):
+            if baseline["meta"].get(setting) != report["meta"][setting]:
+                print(f"⚠️  baseline ran with {setting}={baseline['meta'].get(setting)}, "
+                      f"this run with {report['meta'][setting]}")
+        found = regressions(report["results"], baseline["results"], args.tolerance)
+        if found:
+            print(f"❌ {len(found)} regressions against {args.baseline} (commit {baseline['meta'].get('commit')}):")
+            for line in found:
+                print(f"   {line}")
+            return 1
+        print(f"✅ no route more than {args.tolerance:.0%} worse than {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
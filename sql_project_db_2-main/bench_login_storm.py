@@ -0,0 +1,150 @@
+"""Booking latency during a login storm, with and without the hashing pool.
+
+Starts a backend as a local server (as bench_http.py does) on a copy of a
+generated seed_data.py dataset, once per --workers setting
+(HOTEL_PASSWORD_WORKERS: 0 hashes on the request threads, N in a pool of
+N worker processes). Each run has two phases of --seconds:
+
+  quiet  --clients threads browse /rooms/available and book stays
+  storm  the same, while --stormers more threads POST /auth/login as
+         random guests as fast as the server answers
+
+Reports req/s and p50/p95/p99 latency of the browse and booking routes in
+both phases and the ratio of their p95 (storm / quiet), plus the logins
+answered per second and how many of them were refused with a 503 (the
+hashing queue was full). With the pool, booking latency should stay
+close to the quiet phase while logins queue for the workers.
+
+Run: python bench_login_storm.py [--dataset small --backend simplified_backend --workers 0,1 --seconds 15]
+"""
+import argparse
+import http.client
+import os
+import random
+import tempfile
+import threading
+import time
+
+from bench_http import SCENARIOS, Client, free_port, prepare, start_server, summarize
+from seed_data import PASSWORD, PROFILES, dataset
+
+BACKENDS = ["clean_backend", "simplified_backend"]
+TRAFFIC = ["browse", "book"]
+
+
+def drive(port, ctx, backend, clients, stormers, seconds, warmup, seed):
+    """(samples of the booking traffic, samples of the logins, elapsed seconds)"""
+    samples = []
+    logins = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    counting = [None]
+
+    def timed(client, method, target, body, token):
+        started = time.perf_counter()
+        try:
+            status = client.request(method, target, body, token)[0]
+        except (OSError, http.client.HTTPException):
+            status = 0
+        return started, status, time.perf_counter() - started
+
+    def traffic_loop(n):
+        rng = random.Random(seed * 1000 + n)
+        client = Client(port)
+        local = []
+        while not stop.is_set():
+            method, route, target, body, token = SCENARIOS[rng.choice(TRAFFIC)](ctx, rng, backend)
+            started, status, took = timed(client, method, target, body, token)
+            if counting[0] is not None and started >= counting[0]:
+                local.append((f"{method} {route}", status, took))
+        client.close()
+        with lock:
+            samples.extend(local)
+
+    def storm_loop(n):
+        rng = random.Random(seed * 1000 + 500 + n)
+        client = Client(port)
+        local = []
+        while not stop.is_set():
+            body = {"username": rng.choice(ctx["emails"]), "password": PASSWORD}
+            started, status, took = timed(client, "POST", "/auth/login", body, None)
+            if counting[0] is not None and started >= counting[0]:
+                local.append(("POST /auth/login", status, took))
+        client.close()
+        with lock:
+            logins.extend(local)
+
+    threads = [threading.Thread(target=traffic_loop, args=(n,)) for n in range(clients)]
+    threads += [threading.Thread(target=storm_loop, args=(n,)) for n in range(stormers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    counting[0] = time.perf_counter()
+    time.sleep(seconds)
+    stop.set()
+    elapsed = time.perf_counter() - counting[0]
+    for thread in threads:
+        thread.join()
+    return samples, logins, elapsed
+
+
+def run(backend, profile, workers, clients, stormers, seconds, warmup, seed, start_timeout):
+    path = dataset(profile)
+    port = free_port()
+    log = tempfile.TemporaryFile()
+    os.environ["HOTEL_PASSWORD_WORKERS"] = str(workers)  # start_server() hands the environment on
+    server = start_server(backend, path, port, log, start_timeout)
+    try:
+        ctx = prepare(backend, path, port, clients)
+        quiet, _, quiet_elapsed = drive(port, ctx, backend, clients, 0, seconds, warmup, seed)
+        storm, logins, storm_elapsed = drive(port, ctx, backend, clients, stormers, seconds, warmup, seed + 1)
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return {
+        "quiet": summarize(quiet, quiet_elapsed),
+        "storm": summarize(storm, storm_elapsed),
+        "logins": summarize(logins, storm_elapsed).get("POST /auth/login"),
+        "refused": sum(status == 503 for _, status, _ in logins),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", choices=list(PROFILES), default="small")
+    parser.add_argument("--backend", choices=BACKENDS, default="simplified_backend")
+    parser.add_argument("--workers", default="0,1", help="HOTEL_PASSWORD_WORKERS settings to compare")
+    parser.add_argument("--clients", type=int, default=4, help="threads browsing and booking")
+    parser.add_argument("--stormers", type=int, default=16, help="threads logging in")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start-timeout", type=float, default=300, help="seconds to wait for a server to start")
+    args = parser.parse_args()
+
+    print(f"{args.backend} on the {args.dataset} dataset, {args.clients} clients, {args.stormers} logging in, "
+          f"{args.seconds:g}s per phase, {os.cpu_count()} CPUs")
+    print(f"{'workers':<9}{'route':<24}{'quiet p50':>10}{'p95':>8}{'req/s':>8}"
+          f"{'storm p50':>11}{'p95':>8}{'req/s':>8}{'p95 x':>8}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        result = run(args.backend, args.dataset, workers, args.clients, args.stormers, args.seconds,
+                     args.warmup, args.seed, args.start_timeout)
+        for route, quiet in result["quiet"].items():
+            storm = result["storm"].get(route)
+            if route == "all" or storm is None:
+                continue
+            print(f"{workers:<9}{route:<24}{quiet['p50_ms']:>10.2f}{quiet['p95_ms']:>8.2f}{quiet['rps']:>8.1f}"
+                  f"{storm['p50_ms']:>11.2f}{storm['p95_ms']:>8.2f}{storm['rps']:>8.1f}"
+                  f"{storm['p95_ms'] / quiet['p95_ms']:>8.2f}")
+        logins = result["logins"]
+        if logins:
+            print(f"{workers:<9}{'POST /auth/login':<24}{'':>26}{logins['p50_ms']:>11.2f}{logins['p95_ms']:>8.2f}"
+                  f"{logins['rps']:>8.1f}   {result['refused']} refused (503)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""What the request metrics cost per request.
+
+Runs the before/after/teardown hooks init_metrics installs, the way
+Flask calls them for one request to a route, --requests times inside a
+pushed request context: that is the whole per-request cost (a test
+client request alone is a few hundred µs, too noisy to see it in). Also
+times the pieces on their own: the bookkeeping (started + observe), a
+statement through the counting PooledConnection against the bare
+sqlite3 connection (with the SQL profiler off and on), and rendering
+/metrics for --routes routes.
+
+Run: python bench_metrics.py [--requests 100000 --routes 60]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+os.environ["HOTEL_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "metrics.db")
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_METRICS"] = "1"
+
+from flask import Flask, jsonify  # noqa: E402
+
+from db_pool import PooledConnection, get_db, init_pool, pool  # noqa: E402
+from metrics import Metrics, init_metrics  # noqa: E402
+from sql_profiler import profiler  # noqa: E402
+
+
+def build_app():
+    app = Flask("bench_metrics")
+    init_pool(app)
+    init_metrics(app, Metrics())
+
+    @app.route("/rooms/<int:room_id>")
+    def room(room_id):
+        return jsonify({"room_id": room_id})
+
+    return app
+
+
+def per_call(fn, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--routes", type=int, default=60)
+    args = parser.parse_args()
+
+    app = build_app()
+    before = app.before_request_funcs[None]
+    after = app.after_request_funcs[None]
+    teardown = app.teardown_request_funcs[None]
+    with app.test_request_context("/rooms/7"):
+        get_db()  # the request's pooled handle, as a route that queries would have
+        response = app.response_class("{}", mimetype="application/json")
+
+        def one_request():
+            for hook in before:
+                hook()
+            for hook in reversed(after):
+                hook(response)
+            for hook in reversed(teardown):
+                hook(None)
+
+        hooks = per_call(one_request, args.requests)
+    print(f"metrics hooks           {hooks * 1e6:7.2f} µs per request")
+
+    registry = Metrics()
+    bookkeeping = per_call(lambda: (registry.started(), registry.observe("GET", "/rooms/<int:room_id>", 200, 0.004, 1, 0.0003)),
+                           args.requests)
+    print(f"started + observe       {bookkeeping * 1e6:7.2f} µs")
+
+    raw = sqlite3.connect(os.environ["HOTEL_DB_PATH"])
+    handle = PooledConnection(None, raw)
+    bare = per_call(lambda: raw.execute("SELECT 1"), args.requests)
+    profiler.enabled = False
+    counted = per_call(lambda: handle.execute("SELECT 1"), args.requests)
+    profiler.enabled = True
+    profiler.attach(raw)
+    profiled = per_call(lambda: handle.execute("SELECT 1"), args.requests)
+    print(f"execute('SELECT 1')     bare {bare * 1e6:6.2f} µs   counted {counted * 1e6:6.2f} µs"
+          f"   (+{(counted - bare) * 1e6:.2f} µs per statement)")
+    print(f"  with the SQL profiler      profiled {profiled * 1e6:6.2f} µs   (+{(profiled - bare) * 1e6:.2f} µs per statement)")
+
+    for n in range(args.routes):
+        for status in (200, 404, 500):
+            registry.started()
+            registry.observe("GET", f"/route/{n}", status, 0.001 * (n % 30), 3, 0.0005)
+    text = registry.render(pool.stats())
+    render = per_call(lambda: registry.render(pool.stats()), 200)
+    print(f"render /metrics         {render * 1e3:7.2f} ms for {args.routes} routes ({len(text.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
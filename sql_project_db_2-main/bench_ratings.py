@@ -0,0 +1,140 @@
+"""Room listings: per-room AVG()/COUNT() subqueries vs the room_ratings table.
+
+Builds a scratch database with --reviews reviews (100k by default) over
+--rooms rooms, then times the /rooms/search listing with the correlated
+rating subqueries the routes used to run and with the join on
+room_ratings, with and without a min_rating filter, plus the extra cost
+the triggers add to a review insert. With --dataset it runs on a
+generated seed_data.py dataset instead.
+
+Run: python bench_ratings.py [--reviews 100000 --rooms 2000 | --dataset prod]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from migrations import migrate
+from room_ratings import find_drift
+from seed_data import add_dataset_argument, dataset
+from storage_profile import apply_profile
+
+OLD_LISTING = """
+    SELECT r.*, GROUP_CONCAT(rf.feature_name) as features,
+           (SELECT AVG(rating) FROM reviews WHERE room_id = r.room_id) as avg_rating,
+           (SELECT COUNT(*) FROM reviews WHERE room_id = r.room_id) as reviews_count
+    FROM rooms r
+    LEFT JOIN room_feature_map rfm ON r.room_id = rfm.room_id
+    LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
+    WHERE r.status = 'Available' {where}
+    GROUP BY r.room_id ORDER BY r.price ASC
+"""
+NEW_LISTING = """
+    SELECT r.*, GROUP_CONCAT(rf.feature_name) as features,
+           rr.avg_rating as avg_rating,
+           COALESCE(rr.review_count, 0) as reviews_count
+    FROM rooms r
+    LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
+    LEFT JOIN room_feature_map rfm ON r.room_id = rfm.room_id
+    LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
+    WHERE r.status = 'Available' {where}
+    GROUP BY r.room_id ORDER BY r.price ASC
+"""
+OLD_MIN_RATING = " AND (SELECT AVG(rating) FROM reviews WHERE room_id = r.room_id) >= ?"
+NEW_MIN_RATING = " AND r.room_id IN (SELECT room_id FROM room_ratings WHERE avg_rating >= ?)"
+
+
+def build_database(path, rooms, reviews):
+    conn = sqlite3.connect(path)
+    apply_profile(conn)
+    migrate(conn)
+    rng = random.Random(1)
+    conn.execute("INSERT INTO users (user_id, name, email, password) VALUES (1, 'Guest', 'guest@example.com', 'x')")
+    conn.executemany("INSERT INTO room_features (feature_name) VALUES (?)", [("AC",), ("WiFi",), ("TV",)])
+    conn.executemany(
+        "INSERT INTO rooms (room_number, room_type, price) VALUES (?, 'Double', ?)",
+        [(str(n), rng.randrange(1000, 9000)) for n in range(1, rooms + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO room_feature_map (room_id, feature_id) VALUES (?, ?)",
+        [(n, f) for n in range(1, rooms + 1) for f in (1, 2, 3) if rng.random() < 0.6]
+    )
+    # Each room leans towards its own typical score so min_rating is selective
+    lean = {n: rng.uniform(1.5, 4.5) for n in range(1, rooms + 1)}
+
+    def rows():
+        for _ in range(reviews):
+            room_id = rng.randrange(1, rooms + 1)
+            rating = min(5, max(1, round(rng.gauss(lean[room_id], 1))))
+            yield (room_id, rating)
+
+    conn.executemany("INSERT INTO reviews (user_id, room_id, rating, comment) VALUES (1, ?, ?, 'ok')", rows())
+    conn.commit()
+    return conn
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--min-rating", type=float, default=4.0)
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.dataset:
+        conn = sqlite3.connect(dataset(args.dataset))
+        apply_profile(conn)
+    else:
+        conn = build_database(os.path.join(tempfile.mkdtemp(), "ratings.db"), args.rooms, args.reviews)
+    rooms, reviews = conn.execute("SELECT (SELECT COUNT(*) FROM rooms), COUNT(*) FROM reviews").fetchone()
+    print(f"{reviews:,} reviews over {rooms:,} rooms ready in {time.perf_counter() - started:.1f}s")
+    assert not find_drift(conn), "room_ratings drifted during the bulk load"
+
+    cases = [
+        ("listing", OLD_LISTING.format(where=""), NEW_LISTING.format(where=""), ()),
+        (f"min_rating {args.min_rating:g}", OLD_LISTING.format(where=OLD_MIN_RATING),
+         NEW_LISTING.format(where=NEW_MIN_RATING), (args.min_rating,)),
+    ]
+    for name, old_sql, new_sql, params in cases:
+        old_rows = conn.execute(old_sql, params).fetchall()
+        new_rows = conn.execute(new_sql, params).fetchall()
+        assert old_rows == new_rows, f"{name}: results differ"
+        old_time = timed(lambda: conn.execute(old_sql, params).fetchall(), args.repeat)
+        new_time = timed(lambda: conn.execute(new_sql, params).fetchall(), args.repeat)
+        print(f"{name:<16} {len(new_rows):5} rooms   subqueries {old_time * 1e3:7.1f} ms   "
+              f"room_ratings {new_time * 1e3:7.1f} ms   ({old_time / new_time:.1f}x)")
+
+    def insert_reviews(count):
+        rng = random.Random(3)
+        started = time.perf_counter()
+        for _ in range(count):
+            conn.execute(
+                "INSERT INTO reviews (user_id, room_id, rating, comment) VALUES (1, ?, ?, 'ok')",
+                (rng.randrange(1, rooms + 1), rng.randrange(1, 6))
+            )
+        elapsed = time.perf_counter() - started
+        conn.rollback()
+        return elapsed / count
+
+    with_triggers = insert_reviews(5000)
+    for name in ("insert", "update", "delete"):
+        conn.execute(f"DROP TRIGGER trg_ratings_reviews_{name}")
+    without_triggers = insert_reviews(5000)
+    print(f"review insert     {without_triggers * 1e6:.1f} µs without triggers, "
+          f"{with_triggers * 1e6:.1f} µs with room_ratings upkeep")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Destination search: LIKE '%x%' over rooms vs the room_search FTS5 index.
+
+Builds a scratch database with --rooms rooms (50k by default) with varied
+types, descriptions and features, then times the /rooms/search listing
+filtered by a few destinations through the LIKE predicates the routes used
+to run and through the full-text index (price and relevance order). The
+LIKE version only looked at room_type and description, so its counts can
+differ from the index's. With --dataset it runs on a generated
+seed_data.py dataset instead.
+
+Run: python bench_search.py [--rooms 50000 | --dataset huge]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from migrations import migrate
+from room_search import MATCHING_ROOMS, match_expression
+from seed_data import add_dataset_argument, dataset
+from storage_profile import apply_profile
+
+LISTING = """
+    SELECT r.*, GROUP_CONCAT(rf.feature_name) as features,
+           rr.avg_rating as avg_rating, COALESCE(rr.review_count, 0) as reviews_count
+    FROM rooms r
+    {join}
+    LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
+    LEFT JOIN room_feature_map rfm ON r.room_id = rfm.room_id
+    LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
+    WHERE r.status = 'Available' {where}
+    GROUP BY r.room_id ORDER BY {order}
+"""
+LIKE_LISTING = LISTING.format(
+    join="", where="AND (LOWER(r.room_type) LIKE ? OR LOWER(r.description) LIKE ?)", order="r.price ASC"
+)
+FTS_JOIN = f"JOIN ({MATCHING_ROOMS}) rs ON rs.room_id = r.room_id"
+FTS_LISTING = LISTING.format(join=FTS_JOIN, where="", order="r.price ASC")
+FTS_RELEVANCE = LISTING.format(join=FTS_JOIN, where="", order="rs.relevance, r.price ASC")
+
+ROOM_TYPES = ["Single", "Double", "Twin", "Suite", "Deluxe Double", "Family Suite", "Penthouse"]
+VIEWS = ["sea", "garden", "city", "mountain", "pool", "courtyard", "river", "lake"]
+EXTRAS = ["balcony", "bathtub", "kitchenette", "fireplace", "terrace", "workspace", "sofa bed", "jacuzzi"]
+FEATURES = ["AC", "WiFi", "TV", "Minibar", "Safe", "Coffee Machine", "Soundproofing", "Smart TV"]
+# Broad words, a phrase, a prefix, then narrow searches where the LIKE
+# scan costs the most per room returned
+DESTINATIONS = ["suite", "jacuzzi", '"sea view"', "mount", "penthouse fireplace terrace", '"412-07"']
+
+
+def build_database(path, rooms):
+    conn = sqlite3.connect(path)
+    apply_profile(conn)
+    migrate(conn)
+    rng = random.Random(1)
+    conn.executemany("INSERT INTO room_features (feature_name) VALUES (?)", [(name,) for name in FEATURES])
+    # Features first, so each room is indexed once, when its row goes in
+    conn.executemany(
+        "INSERT INTO room_feature_map (room_id, feature_id) VALUES (?, ?)",
+        [(room_id, feature_id) for room_id in range(1, rooms + 1)
+         for feature_id in range(1, len(FEATURES) + 1) if rng.random() < 0.4]
+    )
+    conn.executemany(
+        "INSERT INTO rooms (room_number, room_type, price, description) VALUES (?, ?, ?, ?)",
+        [(f"{n // 100}-{n % 100:02d}", rng.choice(ROOM_TYPES), rng.randrange(1000, 20000),
+          f"{rng.choice(VIEWS).title()} view room with {rng.choice(EXTRAS)} and {rng.choice(EXTRAS)}")
+         for n in range(rooms)]
+    )
+    conn.commit()
+    return conn
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.dataset:
+        conn = sqlite3.connect(dataset(args.dataset))
+        apply_profile(conn)
+    else:
+        conn = build_database(os.path.join(tempfile.mkdtemp(), "search.db"), args.rooms)
+    rooms = conn.execute("SELECT COUNT(*) FROM rooms").fetchone()[0]
+    print(f"{rooms:,} rooms indexed and ready in {time.perf_counter() - started:.1f}s")
+
+    for destination in DESTINATIONS:
+        match = match_expression(destination)
+        like = f"%{destination.strip(chr(34))}%"
+        like_rows = conn.execute(LIKE_LISTING, (like, like)).fetchall()
+        fts_rows = conn.execute(FTS_LISTING, (match,)).fetchall()
+        like_time = timed(lambda: conn.execute(LIKE_LISTING, (like, like)).fetchall(), args.repeat)
+        fts_time = timed(lambda: conn.execute(FTS_LISTING, (match,)).fetchall(), args.repeat)
+        ranked_time = timed(lambda: conn.execute(FTS_RELEVANCE, (match,)).fetchall(), args.repeat)
+        print(f"{destination:<28} LIKE {len(like_rows):6} rooms {like_time * 1e3:7.1f} ms   "
+              f"fts {len(fts_rows):6} rooms {fts_time * 1e3:7.1f} ms ({like_time / fts_time:4.1f}x)   "
+              f"by relevance {ranked_time * 1e3:7.1f} ms")
+
+    started = time.perf_counter()
+    for n in range(1000):
+        conn.execute(
+            "INSERT INTO rooms (room_number, room_type, price, description) VALUES (?, 'Suite', 5000, 'Sea view')",
+            (f"new-{n}",)
+        )
+        conn.execute("INSERT INTO room_feature_map (room_id, feature_id) VALUES (last_insert_rowid(), 1)")
+    print(f"room insert + feature, index kept current: {(time.perf_counter() - started) * 1e3:.2f} µs each")
+    conn.rollback()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Peak memory of a bookings export: fetchall + jsonify vs streaming.
+
+Builds a scratch database with --bookings rows, then exports them through
+main.py's GET /bookings?limit=all (JSON array and NDJSON) and through the
+old fetchall() / [dict(x) ...] / jsonify path, reading each response body
+chunk by chunk. tracemalloc's peak is reported for each. With --dataset
+it exports every booking of a generated seed_data.py dataset instead.
+
+Run: python bench_streaming.py [--bookings 100000 | --dataset prod]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "streaming.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+
+from flask import jsonify  # noqa: E402
+
+from migrations import migrate  # noqa: E402
+from seed_data import add_dataset_argument, dataset  # noqa: E402
+
+EXPORT_SQL = """
+    SELECT b.*, u.name as user_name, r.room_number
+    FROM bookings b
+    JOIN users u ON b.user_id=u.user_id
+    JOIN rooms r ON b.room_id=r.room_id
+"""
+
+
+def build_database(bookings):
+    conn = sqlite3.connect(SCRATCH_DB)
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO users (name, email, password) VALUES (?, ?, 'x')",
+        [(f"Guest {n}", f"guest{n}@example.com") for n in range(1000)]
+    )
+    conn.executemany(
+        "INSERT INTO rooms (room_number, room_type, price) VALUES (?, 'Double', 2500)",
+        [(str(n),) for n in range(1, 201)]
+    )
+    conn.executemany(
+        "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) "
+        "VALUES (?, ?, '2026-03-01', '2026-03-03', 'Confirmed')",
+        ((n % 1000 + 1, n % 200 + 1) for n in range(bookings))
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(export):
+    """(peak bytes, seconds, body bytes) of one export.
+
+    Timed on a separate untraced run; tracemalloc slows allocation down.
+    """
+    started = time.perf_counter()
+    size = export()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=100000)
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    if args.dataset:
+        shutil.move(dataset(args.dataset), SCRATCH_DB)
+    else:
+        build_database(args.bookings)
+    conn = sqlite3.connect(SCRATCH_DB)
+    bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    conn.close()
+    import main as backend
+    from db_pool import get_db
+
+    client = backend.app.test_client()
+
+    def buffered():
+        with backend.app.app_context():
+            db = get_db()
+            data = db.execute(EXPORT_SQL).fetchall()
+            return len(jsonify([dict(x) for x in data]).get_data())
+
+    def streamed(accept):
+        def export():
+            response = client.get("/bookings?limit=all", headers={"Accept": accept})
+            size = sum(len(chunk) for chunk in response.response)
+            response.close()
+            return size
+        return export
+
+    print(f"{bookings:,} bookings")
+    for name, export in [
+        ("fetchall + jsonify", buffered),
+        ("stream JSON array", streamed("application/json")),
+        ("stream NDJSON", streamed("application/x-ndjson")),
+    ]:
+        peak, elapsed, size = measure(export)
+        print(f"{name:20} peak {peak / 2**20:8.1f} MiB   {elapsed:6.2f}s   body {size / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""What the verified-token and principal caches save per protected request.
+
+Times, on a scratch copy of the database with simplified_backend's real
+tokens (a user row as the payload): verifying a token from scratch
+(HMAC-SHA256 over the token, base64 and JSON decoding, claim checks),
+the first lookup of a token in the cache (all of that plus the
+revocation lookup), a repeat lookup, and the whole token_required check
+of a protected route inside a pushed request context with and without
+the cache (alternating, best of three rounds). --tokens distinct tokens
+are cycled through; raise it past HOTEL_TOKEN_CACHE_SIZE to see misses.
+
+For clean_backend, times reading a token's principal the way
+verify_token did before the principal cache (a pooled connection
+checked out, a SELECT of the users row, the connection released) against
+a lookup in the cache, and the whole auth_required check of a user route.
+
+Run: python bench_tokens.py [--requests 50000 --tokens 200]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "tokens.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_SCORE_REFRESHER"] = "0"
+os.environ["HOTEL_METRICS"] = "0"
+shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "hotel_booking.db"), SCRATCH_DB)
+
+import clean_backend  # noqa: E402
+import simplified_backend as backend  # noqa: E402
+from db_pool import get_db  # noqa: E402
+from principal_cache import PrincipalCache  # noqa: E402
+from token_cache import TokenCache  # noqa: E402
+
+
+def per_call(fn, items, count):
+    started = time.perf_counter()
+    for n in range(count):
+        fn(items[n % len(items)])
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    with backend.app.app_context():
+        db = backend.get_db()
+        users = [dict(row) for row in db.execute("SELECT * FROM users LIMIT 20")]
+    tokens = []
+    for n in range(args.tokens):
+        user = dict(users[n % len(users)], session=n)  # distinct tokens for the same users
+        tokens.append(backend.create_token(user, "user"))
+
+    decode = per_call(backend.decode_token, tokens, args.requests)
+    print(f"verify from scratch     {decode * 1e6:7.2f} µs per token")
+
+    fresh = [backend.create_token(dict(users[0], session=-n), "user") for n in range(min(args.requests, 20000))]
+    cache = TokenCache(SCRATCH_DB)
+    miss = per_call(lambda token: cache.verify(token, backend.decode_token), fresh, len(fresh))
+    print(f"cache miss              {miss * 1e6:7.2f} µs   (first use of a token)")
+    cache = TokenCache(SCRATCH_DB)
+    for token in tokens:
+        cache.verify(token, backend.decode_token)
+    hit = per_call(lambda token: cache.verify(token, backend.decode_token), tokens, args.requests)
+    print(f"cache hit               {hit * 1e6:7.2f} µs   ({decode / hit:.1f}x faster than verifying)")
+
+    route = backend.token_required(lambda payload: payload)
+    timings = {}
+    for _ in range(3):  # alternating, best of three
+        for name, verify in (("uncached", backend.decode_token), ("cached", backend.verify_token)):
+            backend_verify, backend.verify_token = backend.verify_token, verify
+            try:
+                started = time.perf_counter()
+                for n in range(args.requests // 3):
+                    headers = {"Authorization": "Bearer " + tokens[n % len(tokens)]}
+                    with backend.app.test_request_context("/user/bookings", headers=headers):
+                        route()
+                took = (time.perf_counter() - started) / (args.requests // 3)
+                timings[name] = min(timings.get(name, took), took)
+            finally:
+                backend.verify_token = backend_verify
+    print(f"token_required + request context   uncached {timings['uncached'] * 1e6:6.2f} µs   "
+          f"cached {timings['cached'] * 1e6:6.2f} µs   (-{(timings['uncached'] - timings['cached']) * 1e6:.2f} µs per request)")
+    print(f"hit rate {backend.get_token_cache().stats()['hit_rate']:.1%}")
+
+    user_ids = [user["user_id"] for user in users]
+
+    def read_user(user_id):
+        db = get_db()  # outside a request: a pooled connection, back to the pool on close
+        db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        db.close()
+
+    principals = PrincipalCache(SCRATCH_DB)
+    read = per_call(read_user, user_ids, args.requests)
+    cached = per_call(lambda user_id: principals.get("user", user_id), user_ids, args.requests)
+    print(f"clean_backend principal   pooled connection + SELECT {read * 1e6:6.2f} µs   "
+          f"cache {cached * 1e6:6.2f} µs   ({read / cached:.1f}x)")
+    route = clean_backend.auth_required("user")(lambda token_data: token_data)
+    started = time.perf_counter()
+    for n in range(args.requests):
+        headers = {"Authorization": f"Bearer user_{user_ids[n % len(user_ids)]}"}
+        with clean_backend.app.test_request_context("/user/bookings", headers=headers):
+            route()
+    took = (time.perf_counter() - started) / args.requests
+    print(f"auth_required + request context   {took * 1e6:6.2f} µs   "
+          f"(hit rate {clean_backend.get_principal_cache().stats()['hits'] / args.requests:.1%})")
+
+
+if __name__ == "__main__":
+    main()
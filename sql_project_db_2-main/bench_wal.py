@@ -0,0 +1,166 @@
+"""Read/write concurrency: rollback journal vs WAL.
+
+One writer thread keeps inserting bookings while reader threads run the
+/rooms/available query. With --dataset it runs on copies of a generated
+seed_data.py dataset instead of a two-table scratch database.
+
+Run: python bench_wal.py [--seconds 5 --readers 4 | --dataset prod]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from seed_data import add_dataset_argument, dataset
+from storage_profile import apply_profile
+
+AVAILABLE_QUERY = """
+    SELECT * FROM rooms
+    WHERE status = 'Available'
+    AND room_id NOT IN (
+        SELECT room_id FROM bookings
+        WHERE check_in <= ? AND check_out >= ?
+        AND booking_status IN ('Pending', 'Confirmed')
+    )
+    ORDER BY price ASC
+"""
+
+
+def build_database(path, profile, rooms, bookings):
+    conn = sqlite3.connect(path)
+    apply_profile(conn, profile)
+    conn.executescript("""
+        CREATE TABLE rooms (
+            room_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_number TEXT UNIQUE NOT NULL,
+            room_type TEXT,
+            price REAL NOT NULL,
+            status TEXT DEFAULT 'Available',
+            description TEXT
+        );
+        CREATE TABLE bookings (
+            booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            room_id INTEGER NOT NULL,
+            check_in DATE NOT NULL,
+            check_out DATE NOT NULL,
+            booking_status TEXT DEFAULT 'Pending',
+            arrival_status TEXT DEFAULT 'Not Arrived',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    conn.executemany(
+        "INSERT INTO rooms (room_number, room_type, price) VALUES (?, ?, ?)",
+        [(str(n), "Double", 1000 + n) for n in range(rooms)]
+    )
+    rng = random.Random(1)
+    conn.executemany(
+        "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (?, ?, ?, ?, ?)",
+        [random_booking(rng, rooms) for _ in range(bookings)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def random_booking(rng, rooms):
+    day = rng.randrange(1, 28)
+    return (rng.randrange(1, 1000), rng.randrange(1, rooms + 1),
+            f"2026-03-{day:02d}", f"2026-03-{day + 1:02d}", "Confirmed")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(profile, seconds, readers, rooms, bookings, generated=None):
+    if generated:
+        path = dataset(generated)
+        conn = sqlite3.connect(path)
+        apply_profile(conn, profile)  # switches the copy's journal mode
+        rooms = conn.execute("SELECT COUNT(*) FROM rooms").fetchone()[0]
+        conn.close()
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        build_database(path, profile, rooms, bookings)
+    stop = threading.Event()
+    latencies = []
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def writer():
+        conn = sqlite3.connect(path)
+        apply_profile(conn, profile)
+        rng = random.Random(2)
+        while not stop.is_set():
+            try:
+                conn.execute(
+                    "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (?, ?, ?, ?, ?)",
+                    random_booking(rng, rooms)
+                )
+                conn.commit()
+                with lock:
+                    counts["writes"] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts["errors"] += 1
+        conn.close()
+
+    def reader():
+        conn = sqlite3.connect(path)
+        apply_profile(conn, profile)
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                conn.execute(AVAILABLE_QUERY, ("2026-03-15", "2026-03-14")).fetchall()
+                local.append(time.perf_counter() - started)
+            except sqlite3.OperationalError:
+                with lock:
+                    counts["errors"] += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            counts["reads"] += len(local)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {
+        "profile": profile,
+        "reads_per_s": counts["reads"] / seconds,
+        "writes_per_s": counts["writes"] / seconds,
+        "read_p50_ms": percentile(latencies, 50) * 1000,
+        "read_p99_ms": percentile(latencies, 99) * 1000,
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=20000)
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'reads/s':>10}{'writes/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for profile in ("legacy", "default"):
+        r = run(profile, args.seconds, args.readers, args.rooms, args.bookings, args.dataset)
+        print(f"{r['profile']:<10}{r['reads_per_s']:>10.0f}{r['writes_per_s']:>10.0f}"
+              f"{r['read_p50_ms']:>10.2f}{r['read_p99_ms']:>10.2f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Concurrent booking writes: a transaction per request vs the write queue.
+
+--writers threads each book --bookings random stays as fast as they can,
+the way POST /user/bookings handles them: before the write queue every
+request opened BEGIN IMMEDIATE on its own connection, checked the
+availability engine, inserted and committed; now it hands
+write_queue.create_booking to the single writer thread, which commits
+up to HOTEL_WRITE_BATCH of them at once. Reports throughput, p50/p99
+latency per booking and "database is locked" failures, for the default
+and the durable (fsync every commit) storage profiles.
+
+Then times group reservations of --group-sizes rooms: one
+POST /user/bookings/batch (write_queue.create_bookings, one transaction)
+against the same stays booked one POST /user/bookings at a time.
+
+With --dataset every run starts from a copy of a generated seed_data.py
+dataset instead of an empty hotel of --rooms rooms.
+
+Run: python bench_write_queue.py [--writers 64 --bookings 50 --group-sizes 20,50,100,200 | --dataset prod]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import storage_profile
+from availability import AvailabilityEngine
+from bench_wal import percentile
+from migrations import migrate
+from seed_data import add_dataset_argument, dataset
+import write_queue
+
+
+def build_database(path, rooms):
+    conn = sqlite3.connect(path)
+    storage_profile.apply_profile(conn)
+    migrate(conn)
+    conn.execute("INSERT INTO users (user_id, name, email, password) VALUES (1, 'Guest', 'guest@example.com', 'x')")
+    conn.executemany("INSERT INTO rooms (room_number, room_type, price) VALUES (?, 'Double', 1000)",
+                     [(str(n),) for n in range(rooms)])
+    conn.commit()
+    conn.close()
+
+
+def open_database(rooms, generated):
+    """A fresh database (an empty hotel, or a copy of the generated dataset) and its bookable room ids"""
+    if generated:
+        path = dataset(generated)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        build_database(path, rooms)
+    conn = sqlite3.connect(path)
+    room_ids = [row[0] for row in conn.execute("SELECT room_id FROM rooms WHERE status = 'Available' ORDER BY room_id")]
+    conn.close()
+    return path, room_ids
+
+
+def random_stay(rng, rooms):
+    day = rng.randrange(1, 28)
+    return rng.randrange(1, rooms + 1), f"2026-03-{day:02d}", f"2026-03-{day + 1:02d}"
+
+
+def per_request(path, engine):
+    """The old route: one connection and one transaction per booking"""
+    local = threading.local()
+
+    def book(room_id, check_in, check_out):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = sqlite3.connect(path)
+            storage_profile.apply_profile(conn)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if not engine.is_free(room_id, check_in, check_out):
+                return None
+            return conn.execute("""
+                INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status)
+                VALUES (1, ?, ?, ?, 'Pending', 'Not Arrived')
+            """, (room_id, check_in, check_out)).lastrowid
+        finally:
+            if conn.in_transaction:
+                conn.commit()
+
+    return book
+
+
+def queued(writer):
+    def book(room_id, check_in, check_out):
+        try:
+            return writer.run(write_queue.create_booking, 1, room_id, check_in, check_out)
+        except write_queue.StayConflict:
+            return None
+
+    return book
+
+
+def run(mode, profile, writers, bookings, rooms, generated=None):
+    storage_profile.PROFILE = profile
+    path, room_ids = open_database(rooms, generated)
+    rooms = room_ids[-1]
+    engine = AvailabilityEngine(path)
+    writer = None
+    if mode == "queue":
+        writer = write_queue.WriteQueue(path, engine=engine)
+        book = queued(writer)
+    else:
+        book = per_request(path, engine)
+
+    latencies = []
+    counts = {"booked": 0, "refused": 0, "locked": 0}
+    lock = threading.Lock()
+    start = threading.Barrier(writers + 1)
+
+    def client(seed):
+        rng = random.Random(seed)
+        local = []
+        booked = refused = locked = 0
+        start.wait()
+        for _ in range(bookings):
+            stay = random_stay(rng, rooms)
+            started = time.perf_counter()
+            try:
+                if book(*stay) is None:
+                    refused += 1
+                else:
+                    booked += 1
+            except sqlite3.OperationalError:
+                locked += 1
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+            counts["booked"] += booked
+            counts["refused"] += refused
+            counts["locked"] += locked
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(writers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = writer.stats() if writer else {}
+    if writer:
+        writer.stop()
+    engine.close()
+    return {
+        "writes_per_s": (counts["booked"] + counts["refused"]) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "avg_batch": stats.get("avg_batch", 1.0),
+        **counts,
+    }
+
+
+def group_booking(profile, size, rooms, generated=None):
+    """Rooms booked, and seconds to book them as one group and one request per room"""
+    storage_profile.PROFILE = profile
+    timings = []
+    for grouped in (True, False):
+        path, room_ids = open_database(rooms, generated)
+        engine = AvailabilityEngine(path)
+        writer = write_queue.WriteQueue(path, engine=engine)
+        # Past the last generated stay, so every room is free
+        stays = [(room_id, "2027-03-10", "2027-03-13") for room_id in room_ids[:size]]
+        started = time.perf_counter()
+        if grouped:
+            booked = writer.run(write_queue.create_bookings, 1, stays, True, True)
+        else:
+            booked = [writer.run(write_queue.create_booking, 1, *stay, True) for stay in stays]
+        timings.append(time.perf_counter() - started)
+        assert len(booked) == len(stays)
+        writer.stop()
+        engine.close()
+    return len(stays), *timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--bookings", type=int, default=50, help="bookings per writer")
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--group-sizes", default="20,50,100,200")
+    add_dataset_argument(parser)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers x {args.bookings} bookings")
+    print(f"{'profile':<9}{'path':<13}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'batch':>7}{'booked':>8}{'refused':>8}{'locked':>8}")
+    for profile in ("default", "durable"):
+        for mode in ("per-request", "queue"):
+            r = run(mode, profile, args.writers, args.bookings, args.rooms, args.dataset)
+            print(f"{profile:<9}{mode:<13}{r['writes_per_s']:>10.0f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                  f"{r['avg_batch']:>7.1f}{r['booked']:>8}{r['refused']:>8}{r['locked']:>8}")
+
+    print()
+    print(f"{'profile':<9}{'rooms':>6}{'one group ms':>14}{'per room us':>13}{'one by one ms':>15}{'per room us':>13}")
+    for profile in ("default", "durable"):
+        for size in map(int, args.group_sizes.split(",")):
+            size, group, single = group_booking(profile, size, args.rooms, args.dataset)
+            print(f"{profile:<9}{size:>6}{group * 1e3:>14.2f}{group / size * 1e6:>13.0f}"
+                  f"{single * 1e3:>15.2f}{single / size * 1e6:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
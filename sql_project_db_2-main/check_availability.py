@@ -0,0 +1,122 @@
+"""Property check: the availability engine against the SQL oracle.
+
+Applies random booking inserts (overlapping ones included), date and room
+changes, cancellations and deletes through a separate connection, and
+after every step compares the engine's answers with the half-open overlap
+query run directly on SQLite. Exits 1 on the first disagreement.
+
+Run: python check_availability.py [--seed 1 --steps 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from availability import ACTIVE_STATUSES, AvailabilityEngine
+from migrations import migrate
+
+ORACLE = f"""
+    SELECT booking_id FROM bookings
+    WHERE room_id = ? AND booking_status IN ({','.join('?' * len(ACTIVE_STATUSES))})
+    AND check_in < ? AND check_out > ?
+    ORDER BY booking_id
+"""
+STATUSES = ["Pending", "Confirmed", "Cancelled"]
+BASE_DAY = date(2026, 1, 1)
+
+
+def day(offset):
+    return (BASE_DAY + timedelta(days=offset)).isoformat()
+
+
+def random_stay(rng):
+    start = rng.randrange(0, 120)
+    return day(start), day(start + rng.choice([0, 1, 1, 2, 3, 5, 14, 40]))
+
+
+def oracle_conflicts(conn, room_id, check_in, check_out):
+    return [row[0] for row in conn.execute(ORACLE, (room_id, *ACTIVE_STATUSES, check_out, check_in))]
+
+
+def random_step(conn, rng, rooms):
+    ids = [row[0] for row in conn.execute("SELECT booking_id FROM bookings")]
+    action = rng.random()
+    if action < 0.55 or not ids:
+        check_in, check_out = random_stay(rng)
+        conn.execute(
+            "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (?, ?, ?, ?, ?)",
+            (1, rng.randrange(1, rooms + 1), check_in, check_out, rng.choice(STATUSES))
+        )
+    elif action < 0.7:
+        conn.execute("UPDATE bookings SET booking_status = ? WHERE booking_id = ?",
+                     (rng.choice(STATUSES), rng.choice(ids)))
+    elif action < 0.85:
+        check_in, check_out = random_stay(rng)
+        conn.execute("UPDATE bookings SET check_in = ?, check_out = ?, room_id = ? WHERE booking_id = ?",
+                     (check_in, check_out, rng.randrange(1, rooms + 1), rng.choice(ids)))
+    else:
+        conn.execute("DELETE FROM bookings WHERE booking_id = ?", (rng.choice(ids),))
+    conn.commit()
+
+
+def compare(engine, conn, rng, rooms):
+    check_in, check_out = random_stay(rng)
+    if check_in == check_out:
+        check_out = day((date.fromisoformat(check_in) - BASE_DAY).days + 1)
+    expected_booked = set()
+    for room_id in range(1, rooms + 1):
+        expected = oracle_conflicts(conn, room_id, check_in, check_out)
+        got = sorted(engine.conflicts(room_id, check_in, check_out))
+        if got != expected:
+            return f"room {room_id} [{check_in}, {check_out}): engine {got} != sql {expected}"
+        if expected:
+            expected_booked.add(room_id)
+    if engine.booked_rooms(check_in, check_out) != expected_booked:
+        return f"booked_rooms [{check_in}, {check_out}) differs"
+    expected_free = [r for r in range(1, rooms + 1) if r not in expected_booked]
+    if engine.free_rooms(list(range(1, rooms + 1)), check_in, check_out) != expected_free:
+        return f"free_rooms [{check_in}, {check_out}) differs"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=8)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "availability.db")
+    writer = sqlite3.connect(path)
+    migrate(writer)
+    writer.executemany(
+        "INSERT INTO rooms (room_number, room_type, price) VALUES (?, 'Single', 1000)",
+        [(str(n),) for n in range(1, args.rooms + 1)]
+    )
+    writer.commit()
+
+    rng = random.Random(args.seed)
+    for _ in range(20):
+        random_step(writer, rng, args.rooms)
+    engine = AvailabilityEngine(path)
+
+    for step in range(args.steps):
+        random_step(writer, rng, args.rooms)
+        problem = compare(engine, writer, rng, args.rooms)
+        if problem is None and step % 250 == 0:
+            # A freshly loaded engine must agree with the incremental one
+            engine.load()
+            problem = compare(engine, writer, rng, args.rooms)
+        if problem:
+            print(f"❌ step {step} (seed {args.seed}): {problem}")
+            return 1
+
+    print(f"✅ {args.steps} random steps, engine matches SQL ({engine.booking_count()} active bookings)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Property check: trigger-kept dashboard counters against fresh aggregates.
+
+Applies random inserts, updates and deletes to users, rooms, bookings and
+payments and after every step compares dashboard_stats / dashboard_daily
+with the counts recomputed from the base tables. Exits 1 on the first
+drift.
+
+Run: python check_dashboard_stats.py [--seed 1 --steps 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+from dashboard_stats import find_drift
+from scratch_data import build_database, ids, run_random_action
+
+BOOKING_STATUSES = ["Pending", "Confirmed", "Cancelled", "Completed"]
+PAYMENT_STATUSES = ["Pending", "Completed", "Failed"]
+ROOM_STATUSES = ["Available", "Occupied", "Maintenance", None]
+DAYS = ["2026-01-01", "2026-01-02", "2026-01-03 10:00:00", "2026-02-14 23:59:59", None]
+
+
+def random_step(conn, rng):
+    users = ids(conn, "users", "user_id")
+    rooms = ids(conn, "rooms", "room_id")
+    bookings = ids(conn, "bookings", "booking_id")
+    payments = ids(conn, "payments", "payment_id")
+    stay = lambda: (f"2026-03-{rng.randrange(1, 15):02d}", f"2026-03-{rng.randrange(15, 29):02d}")  # noqa: E731
+    actions = [
+        (3, lambda: conn.execute(
+            "INSERT INTO users (name, email, password) VALUES ('U', ?, 'x')", (f"u{rng.random()}",))),
+        (1, lambda: users and conn.execute("DELETE FROM users WHERE user_id = ?", (rng.choice(users),))),
+        (2, lambda: conn.execute(
+            "INSERT INTO rooms (room_id, room_number, price, status) VALUES (?, ?, ?, ?)",
+            (rng.randrange(1, 40), f"R{rng.random()}", rng.choice([1000, 2500.5, 4000]), rng.choice(ROOM_STATUSES)))),
+        (2, lambda: rooms and conn.execute(
+            "UPDATE rooms SET price = ?, status = ? WHERE room_id = ?",
+            (rng.choice([900, 3000.25]), rng.choice(ROOM_STATUSES), rng.choice(rooms)))),
+        (1, lambda: rooms and conn.execute(
+            "UPDATE rooms SET room_id = ? WHERE room_id = ?", (rng.randrange(40, 80), rng.choice(rooms)))),
+        (1, lambda: rooms and conn.execute("DELETE FROM rooms WHERE room_id = ?", (rng.choice(rooms),))),
+        (6, lambda: conn.execute(
+            "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+            (rng.randrange(1, 12), rng.randrange(1, 80), *stay(), rng.choice(BOOKING_STATUSES), rng.choice(DAYS)))),
+        (4, lambda: bookings and conn.execute(
+            "UPDATE bookings SET booking_status = ? WHERE booking_id = ?",
+            (rng.choice(BOOKING_STATUSES), rng.choice(bookings)))),
+        (2, lambda: bookings and conn.execute(
+            "UPDATE bookings SET user_id = ?, room_id = ?, check_in = ?, check_out = ? WHERE booking_id = ?",
+            (rng.randrange(1, 12), rng.randrange(1, 80), *stay(), rng.choice(bookings)))),
+        (1, lambda: bookings and conn.execute(
+            "UPDATE bookings SET created_at = ? WHERE booking_id = ?", (rng.choice(DAYS), rng.choice(bookings)))),
+        (2, lambda: bookings and conn.execute("DELETE FROM bookings WHERE booking_id = ?", (rng.choice(bookings),))),
+        (3, lambda: conn.execute(
+            "INSERT OR IGNORE INTO payments (booking_id, amount, payment_status, payment_date) VALUES (?, ?, ?, ?)",
+            (rng.randrange(1, 200), rng.choice([100, 2500.5, 999.99]), rng.choice(PAYMENT_STATUSES), rng.choice(DAYS)))),
+        (2, lambda: payments and conn.execute(
+            "UPDATE payments SET amount = ?, payment_status = ?, payment_date = ? WHERE payment_id = ?",
+            (rng.choice([50, 1200.1]), rng.choice(PAYMENT_STATUSES), rng.choice(DAYS), rng.choice(payments)))),
+        (1, lambda: payments and conn.execute("DELETE FROM payments WHERE payment_id = ?", (rng.choice(payments),))),
+    ]
+    # duplicate room_id / room_number; nothing changed
+    run_random_action(conn, rng, actions, ignore=sqlite3.IntegrityError)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "stats.db")
+    conn = build_database(sqlite3.connect(path))
+    rng = random.Random(args.seed)
+
+    for step in range(args.steps):
+        random_step(conn, rng)
+        drift = find_drift(conn)
+        if drift:
+            name, stored, actual = drift[0]
+            print(f"❌ step {step} (seed {args.seed}): {name} stored {stored}, actual {actual}")
+            return 1
+
+    bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"✅ {args.steps} random steps, counters match the base tables ({bookings} bookings)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Property check: /metrics against what the requests actually did.
+
+Sends random requests to main.py's routes through the Flask test client
+(reads and writes, unknown ids, unknown paths, wrong methods and bodies
+that make a route fail with a 500) on a scratch copy of the database.
+Every statement the request thread runs is traced with
+set_trace_callback (a trigger's statements are traced as the statement
+that fired it, so consecutive repeats count once). After each request
+the route's SQL statement count in the metrics must have grown by
+exactly the statements traced, and its duration (no longer than the
+client saw) must have landed in the histogram bucket it belongs in; at
+the end /metrics must parse as Prometheus text, count every response under
+the right route and status, keep each histogram cumulative with +Inf
+equal to its count, and show no request in flight. Exits 1 on the first
+violation.
+
+Run: python check_metrics.py [--seed 1 --requests 2000]
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "metrics.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_METRICS"] = "1"
+
+from werkzeug.exceptions import MethodNotAllowed, NotFound  # noqa: E402
+
+from metrics import BUCKETS, UNMATCHED, metrics  # noqa: E402
+
+SAMPLE = re.compile(r'^([a-z_]+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-z_]+)="((?:[^"\\]|\\.)*)"')
+# Control statements the sqlite3 module issues itself; they never go through execute()
+IMPLICIT = ("BEGIN", "COMMIT", "ROLLBACK")
+
+
+def random_request(rng):
+    """(method, path, json body or None)"""
+    table, ids = rng.choice([
+        ("users", 20), ("rooms", 20), ("bookings", 60), ("payments", 40),
+        ("reviews", 40), ("features", 10), ("services", 10),
+    ])
+    kind = rng.random()
+    if kind < 0.35:
+        return "GET", f"/{table}?limit={rng.choice([1, 5, 50])}", None
+    if kind < 0.65 and table not in ("features", "services"):
+        return "GET", f"/{table}/{rng.randrange(1, ids)}", None
+    if kind < 0.72:
+        return "GET", rng.choice(["/settings", "/", "/nope", "/rooms/abc"]), None
+    if kind < 0.78:
+        return "PATCH", f"/{table}", None  # 405
+    if kind < 0.88:
+        return "POST", "/rooms", {"room_number": f"R{rng.randrange(10**6)}", "room_type": "Single", "price": 1000}
+    if kind < 0.94:
+        return "POST", "/rooms", {"room_type": "Single"}  # KeyError in the route: 500
+    day = rng.randrange(1, 28)
+    return "POST", "/bookings", {"user_id": 1, "room_id": rng.randrange(1, 5),
+                                 "check_in": f"2027-02-{day:02d}", "check_out": f"2027-02-{day + 1:02d}"}
+
+
+def route_of(app, method, path):
+    try:
+        rule, _ = app.url_map.bind("localhost").match(path.split("?")[0], method, return_rule=True)
+        return rule.rule
+    except (NotFound, MethodNotAllowed):
+        return UNMATCHED
+
+
+def check_request(before, after, traced, elapsed):
+    """Problem with what one request added to its route's stats, or None"""
+    if after is None:
+        return "not recorded under its route"
+    count = after.count - (before.count if before else 0)
+    queries = after.queries - (before.queries if before else 0)
+    seconds = after.seconds - (before.seconds if before else 0.0)
+    buckets = [a - b for a, b in zip(after.buckets, before.buckets if before else [0] * len(after.buckets))]
+    if count != 1:
+        return f"recorded {count} times"
+    if queries != len(traced):
+        return f"metrics counted {queries} statements, {len(traced)} ran: {traced}"
+    if not 0 < seconds <= elapsed + 1e-6:
+        return f"took {seconds:.6f}s by the metrics, {elapsed:.6f}s as the client saw it"
+    # The sum carries float rounding from earlier requests; only check clear cases
+    bucket = bisect_left(BUCKETS, seconds)
+    near = [bound for bound in BUCKETS if abs(bound - seconds) < 1e-6]
+    if not near and buckets.index(1) != bucket:
+        return f"{seconds:.6f}s counted in bucket {buckets.index(1)}, belongs in {bucket}"
+    return None
+
+
+def parse(text):
+    """{(name, frozenset(labels)): value}, or raises ValueError"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            continue
+        match = SAMPLE.match(line)
+        if not match:
+            raise ValueError(f"not a sample line: {line!r}")
+        name, labels, value = match.groups()
+        labels = frozenset(LABEL.findall(labels or ""))
+        samples[(name, labels)] = float(value)
+    return samples
+
+
+def check_export(samples, expected):
+    """Problem with the final /metrics samples, or None"""
+    responses = {}
+    for (name, labels), value in samples.items():
+        if name == "hotel_http_responses_total":
+            labels = dict(labels)
+            responses[(labels["method"], labels["route"], int(labels["status"]))] = value
+    if responses != expected:
+        missing = set(expected.items()) ^ set(responses.items())
+        return f"response counters differ from what was sent: {sorted(missing)[:5]}"
+
+    per_route = {}
+    for (method, route, status), count in expected.items():
+        per_route[(method, route)] = per_route.get((method, route), 0) + count
+    for (method, route), count in per_route.items():
+        key = frozenset({("method", method), ("route", route)})
+        buckets = sorted(
+            (float(dict(labels)["le"]), value) for (name, labels), value in samples.items()
+            if name == "hotel_http_request_duration_seconds_bucket" and labels - {l for l in labels if l[0] == "le"} == key
+        )
+        if not buckets:
+            return f"no histogram for {method} {route}"
+        values = [value for _, value in buckets]
+        if values != sorted(values):
+            return f"{method} {route}: histogram buckets are not cumulative"
+        if buckets[-1][0] != float("inf") or values[-1] != count:
+            return f"{method} {route}: +Inf bucket {values[-1]}, {count} requests"
+        if samples.get(("hotel_http_request_duration_seconds_count", key)) != count:
+            return f"{method} {route}: _count does not match"
+        if ("hotel_sql_queries_total", key) not in samples:
+            return f"{method} {route}: no SQL counter"
+    if samples.get(("hotel_http_requests_in_flight", frozenset())) != 0:
+        return "requests still counted as in flight"
+    if samples.get(("hotel_db_pool_connections", frozenset({("state", "in_use")}))) != 0:
+        return "pool reports connections in use after every request finished"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "hotel_booking.db"), SCRATCH_DB)
+    from db_pool import pool
+    traced = []
+    request_thread = threading.get_ident()
+
+    def trace(conn):
+        def callback(statement):
+            if threading.get_ident() != request_thread or statement.startswith("--") \
+                    or statement.lstrip().upper().startswith(IMPLICIT):
+                return
+            if not traced or traced[-1] != statement:
+                traced.append(statement)
+        conn.set_trace_callback(callback)
+
+    pool.on_connect(trace)
+    pool.close_all()
+    import main as backend
+    app = backend.app
+    app.logger.disabled = True  # the 500s are on purpose
+    client = app.test_client()
+
+    rng = random.Random(args.seed)
+    expected = {}
+    problem = None
+    for n in range(args.requests):
+        method, path, body = random_request(rng)
+        route = route_of(app, method, path)
+        _, before, _ = metrics.snapshot()
+        del traced[:]
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        response.close()
+        elapsed = time.perf_counter() - started
+        _, after, _ = metrics.snapshot()
+        key = (method, route, response.status_code)
+        expected[key] = expected.get(key, 0) + 1
+        problem = check_request(before.get((method, route)), after.get((method, route)), traced, elapsed)
+        if problem:
+            problem = f"request {n} {method} {path}: {problem}"
+            break
+
+    if problem is None:
+        response = client.get("/metrics")
+        if not response.content_type.startswith("text/plain"):
+            problem = f"/metrics served as {response.content_type}"
+        else:
+            try:
+                problem = check_export(parse(response.get_data(as_text=True)), expected)
+            except ValueError as exc:
+                problem = str(exc)
+    if problem:
+        print(f"❌ seed {args.seed}: {problem}")
+        return 1
+
+    statuses = sorted({status for _, _, status in expected})
+    print(f"✅ {args.requests} requests over {len({(m, r) for m, r, _ in expected})} routes "
+          f"(statuses {', '.join(map(str, statuses))}): counters, histograms and SQL counts match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
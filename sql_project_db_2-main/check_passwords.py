@@ -0,0 +1,167 @@
+"""Property check: password verification and hash upgrades across schemes.
+
+Random steps store a random password (empty, unicode, 64 hex digits, ...)
+as plaintext, an unsalted SHA-256 digest or an scrypt hash at one of a
+few costs (bcrypt too when the package is installed), then verify it
+through the worker pool with the right password, a wrong one and the
+stored string itself. The right password must match, and must come with
+a new hash exactly when the stored one is not scrypt at the current
+cost; the new hash must verify without another upgrade. Wrong passwords
+and stored digests presented as passwords must not match (plaintext
+excepted, where the stored string is the password). Every scrypt hash
+must carry its own salt.
+
+check_password() runs on a scratch database: a legacy row is upgraded
+after a login, and a row whose password changed after it was read is
+left alone. With every queue slot of the worker pool taken, hashing must
+raise PasswordBusy. Exits 1 on the first violation.
+
+Run: python check_passwords.py [--seed 1 --steps 300]
+"""
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "passwords.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+
+import passwords  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+COSTS = [9, 10, 11]
+COST = 10  # the current cost in this check; low to keep it quick
+ALPHABET = "abcdefXYZ0123456789 !$é日本"
+
+
+def random_password(rng):
+    kind = rng.random()
+    if kind < 0.05:
+        return ""
+    if kind < 0.15:
+        return "".join(rng.choice("0123456789abcdef") for _ in range(64))
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(1, 24)))
+
+
+def store(rng, password):
+    """(scheme, stored string)"""
+    schemes = ["plaintext", "sha256", "scrypt"] + (["bcrypt"] if passwords.bcrypt is not None else [])
+    scheme = rng.choice(schemes)
+    if scheme == "plaintext" and (not password or passwords.SHA256.fullmatch(password)):
+        scheme = "sha256"  # stored as is they read as no password, or as a digest
+    if scheme == "plaintext":
+        return scheme, password
+    if scheme == "sha256":
+        return scheme, hashlib.sha256(password.encode()).hexdigest()
+    if scheme == "bcrypt":
+        return scheme, passwords.bcrypt.hashpw(password.encode(), passwords.bcrypt.gensalt(4)).decode()
+    return scheme, passwords.hash_password(password, cost=rng.choice(COSTS))
+
+
+def check_rows():
+    db = sqlite3.connect(SCRATCH_DB)
+    migrate(db)
+    db.execute("DELETE FROM users")
+    db.execute("INSERT INTO users (user_id, name, email, password) VALUES (1, 'A', 'a@example.com', 'pass123')")
+    db.execute("INSERT INTO users (user_id, name, email, password) VALUES (2, 'B', 'b@example.com', 'pass123')")
+    db.commit()
+    db.row_factory = sqlite3.Row
+    read = lambda user_id: db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+
+    row = read(1)
+    if passwords.check_password("users", row, "wrong") or read(1)["password"] != "pass123":
+        return "a wrong password matched or changed the stored one"
+    if not passwords.check_password("users", row, "pass123"):
+        return "the plaintext password did not match"
+    upgraded = read(1)["password"]
+    if passwords.identify(upgraded) != "scrypt" or passwords.verify_password("pass123", upgraded) != (True, None):
+        return f"the plaintext password was upgraded to {upgraded!r}"
+
+    row = read(2)
+    db.execute("UPDATE users SET password = ? WHERE user_id = 2", (hashlib.sha256(b"changed").hexdigest(),))
+    db.commit()
+    if not passwords.check_password("users", row, "pass123"):
+        return "the password read before the change did not match"
+    if read(2)["password"] != hashlib.sha256(b"changed").hexdigest():
+        return "the upgrade overwrote a password changed after the row was read"
+    db.close()
+    return None
+
+
+def check_busy():
+    if passwords.WORKERS <= 0:
+        return None  # hashed on the calling thread, nothing queues
+    taken = 0
+    wait, passwords.WAIT = passwords.WAIT, 0.05
+    try:
+        while passwords._slots.acquire(blocking=False):
+            taken += 1
+        try:
+            passwords.hash_password("x", cost=COSTS[0])
+        except passwords.PasswordBusy:
+            return None
+        return f"hashing with all {taken} queue slots taken did not raise PasswordBusy"
+    finally:
+        passwords.WAIT = wait
+        for _ in range(taken):
+            passwords._slots.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    passwords.COST = COST
+    salts = set()
+    upgrades = 0
+    problem = None
+    for step in range(args.steps):
+        password = random_password(rng)
+        scheme, stored = store(rng, password)
+        if passwords.identify(stored) != scheme:
+            problem = f"step {step}: {stored!r} identified as {passwords.identify(stored)}, stored as {scheme}"
+            break
+        if scheme == "scrypt":
+            salt = stored.split("$")[4]
+            if salt in salts:
+                problem = f"step {step}: salt {salt} used twice"
+                break
+            salts.add(salt)
+        matches, upgraded = passwords.verify_password(password, stored)
+        current = scheme == "scrypt" and stored.startswith(f"scrypt${COST}$")
+        if not matches:
+            problem = f"step {step}: {password!r} does not match its {scheme} hash {stored!r}"
+        elif current != (upgraded is None):
+            problem = f"step {step}: {scheme} hash {stored!r} {'was' if current else 'was not'} upgraded"
+        elif upgraded is not None and passwords.verify_password(password, upgraded) != (True, None):
+            problem = f"step {step}: the upgraded hash {upgraded!r} does not verify as current"
+        if problem:
+            break
+        upgrades += upgraded is not None
+        wrong = password + rng.choice(ALPHABET)
+        if passwords.verify_password(wrong, stored) != (False, None):
+            problem = f"step {step}: {wrong!r} matches the {scheme} hash of {password!r}"
+        elif scheme != "plaintext" and stored != password and passwords.verify_password(stored, stored)[0]:
+            problem = f"step {step}: the {scheme} hash {stored!r} is accepted as the password"
+        if problem:
+            break
+    if problem is None:
+        problem = check_rows() or check_busy()
+
+    if problem:
+        print(f"❌ seed {args.seed}: {problem}")
+        return 1
+    print(f"✅ {args.steps} stored passwords verify across schemes ({upgrades} upgraded, {len(salts)} scrypt salts "
+          f"all distinct); logins upgrade legacy rows without overwriting changed ones; a full queue raises PasswordBusy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
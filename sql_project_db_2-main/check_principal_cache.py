@@ -0,0 +1,127 @@
+"""Property check: the principal cache against reading the row every time.
+
+Two PrincipalCache instances on one scratch database stand in for two
+worker processes, with room for fewer principals than exist. Random
+steps look users and admins up (mostly a few busy ones, some ids that
+have no row) through either cache, and insert, edit, ban (status =
+'banned'), renumber, delete and re-create users and admins on a
+separate connection, committing after every write or after a few. Every lookup must return exactly the row a
+fresh SELECT returns at that moment (None for no row), the caches must
+stay within their size, a third cache with a TTL of 0 must never answer
+from memory, and the cached ones must answer most lookups from memory.
+Exits 1 on the first violation.
+
+Run: python check_principal_cache.py [--seed 1 --steps 20000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+from migrations import migrate
+from principal_cache import PRINCIPALS, PrincipalCache
+
+SIZE = 24
+IDS = 40  # ids looked up per kind; about half have a row at any time
+
+
+def fresh(db, kind, principal_id):
+    row = db.execute(PRINCIPALS[kind], (principal_id,)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def random_write(rng, db, n):
+    kind = rng.choice(["user", "admin"])
+    principal_id = rng.randrange(1, IDS)
+    action = rng.random()
+    if kind == "user":
+        if action < 0.3:
+            db.execute("INSERT OR IGNORE INTO users (user_id, name, email, password) VALUES (?, ?, ?, ?)",
+                       (principal_id, f"User {n}", f"u{n}@example.com", "x"))
+        elif action < 0.55:
+            db.execute("UPDATE users SET status = ? WHERE user_id = ?",
+                       (rng.choice(["banned", "active"]), principal_id))
+        elif action < 0.72:
+            db.execute("UPDATE users SET name = ?, phone = ? WHERE user_id = ?", (f"Renamed {n}", str(n), principal_id))
+        elif action < 0.8:
+            db.execute("UPDATE OR IGNORE users SET user_id = ? WHERE user_id = ?", (rng.randrange(1, IDS), principal_id))
+        else:
+            db.execute("DELETE FROM users WHERE user_id = ?", (principal_id,))
+    else:
+        if action < 0.4:
+            db.execute("INSERT OR IGNORE INTO admins (admin_id, username, password) VALUES (?, ?, ?)",
+                       (principal_id, f"admin{n}", "x"))
+        elif action < 0.62:
+            db.execute("UPDATE admins SET role = ? WHERE admin_id = ?", (rng.choice(["admin", "super_admin"]), principal_id))
+        elif action < 0.7:
+            db.execute("UPDATE OR IGNORE admins SET admin_id = ? WHERE admin_id = ?", (rng.randrange(1, IDS), principal_id))
+        else:
+            db.execute("DELETE FROM admins WHERE admin_id = ?", (principal_id,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=20000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "principals.db")
+    db = sqlite3.connect(path)
+    migrate(db)
+    db.execute("DELETE FROM users")
+    db.execute("DELETE FROM admins")
+    db.commit()
+    db.row_factory = sqlite3.Row
+    rng = random.Random(args.seed)
+    caches = [PrincipalCache(path, size=SIZE, ttl=3600) for _ in range(2)]
+    uncached = PrincipalCache(path, size=SIZE, ttl=0)
+    for n in range(IDS):
+        random_write(rng, db, n)
+    db.commit()
+
+    problem = None
+    writes = 0
+    for step in range(args.steps):
+        if rng.random() < 0.1:
+            random_write(rng, db, step)
+            writes += 1
+            if rng.random() < 0.6:
+                db.commit()
+            continue
+        kind = rng.choice(["user", "admin"])
+        principal_id = rng.randrange(1, 8) if rng.random() < 0.7 else rng.randrange(1, IDS)  # a few busy ones
+        which = rng.randrange(3)
+        cache = uncached if which == 2 else caches[which]
+        if db.in_transaction:
+            db.commit()  # a lookup only has to see committed writes
+        expected = fresh(db, kind, principal_id)
+        got = cache.get(kind, principal_id)
+        if got != expected:
+            problem = f"step {step}: cache {which} has {kind} {principal_id} as {got}, the table has {expected}"
+            break
+        stats = cache.stats()
+        if stats["entries"] > SIZE:
+            problem = f"step {step}: cache {which} holds {stats['entries']} principals, size {SIZE}"
+            break
+    if problem is None:
+        if uncached.stats()["hits"]:
+            problem = f"the TTL 0 cache answered {uncached.stats()['hits']} lookups from memory"
+        elif any(cache.stats()["hits"] <= cache.stats()["misses"] for cache in caches):
+            problem = f"the caches answered less than half the lookups from memory: {[c.stats() for c in caches]}"
+
+    if problem:
+        print(f"❌ seed {args.seed}: {problem}")
+        return 1
+    stats = [cache.stats() for cache in caches]
+    hits = sum(s["hits"] for s in stats)
+    lookups = hits + sum(s["misses"] for s in stats)
+    print(f"✅ {lookups + uncached.stats()['misses']} lookups between {writes} writes match the tables; "
+          f"{hits / lookups:.0%} from memory, {sum(s['invalidations'] for s in stats)} invalidated, "
+          f"{sum(s['evictions'] for s in stats)} evicted")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
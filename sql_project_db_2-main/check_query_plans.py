@@ -0,0 +1,246 @@
+"""Fail if any route's SQL falls back to a full table scan.
+
+Drives the routes of every backend with Flask's test client against a
+scratch database built by migrations.py, records each statement through
+set_trace_callback and runs EXPLAIN QUERY PLAN on it. A plain
+"SCAN <table>" of one of the large tables that is not listed in
+ALLOWED_SCANS makes the script exit with status 1, so CI catches a
+dropped index or a non-sargable predicate.
+
+Run: python check_query_plans.py [-v]
+"""
+import hashlib
+import importlib
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+SCRATCH_DIR = tempfile.mkdtemp()
+SCRATCH_DB = os.path.join(SCRATCH_DIR, "plans.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_SCORE_REFRESHER"] = "0"
+
+import db_pool  # noqa: E402  (must see the scratch HOTEL_DB_PATH)
+from migrations import migrate  # noqa: E402
+from pagination import encode_cursor  # noqa: E402
+
+# Tables that grow with traffic; scanning these is a regression
+LARGE_TABLES = {"users", "bookings", "payments", "refunds", "reviews"}
+
+# (backend, method, path) -> tables the route legitimately reads in full
+ALLOWED_SCANS = {
+    # The first page of a primary-key ordered list walks the table from
+    # the start and stops after LIMIT rows; later pages seek on the key
+    ("main", "GET", "/users"): {"users"},
+    ("main", "GET", "/bookings"): {"bookings"},
+    ("main", "GET", "/payments"): {"payments"},
+    ("main", "GET", "/reviews"): {"reviews"},
+    ("auth_backend", "GET", "/users"): {"users"},
+    ("auth_backend", "GET", "/bookings"): {"bookings"},
+    ("auth_backend", "GET", "/payments"): {"payments"},
+    ("auth_backend", "GET", "/reviews"): {"reviews"},
+    ("clean_backend", "GET", "/admin/payments"): {"payments"},
+    ("simplified_backend", "GET", "/admin/payments"): {"payments"},
+}
+
+TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+SQL_KEYWORDS = {"where", "join", "left", "inner", "on", "group", "order", "limit", "and", "set"}
+
+
+def sha(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def build_database():
+    conn = sqlite3.connect(SCRATCH_DB)
+    migrate(conn)
+    conn.executescript(f"""
+        INSERT INTO admins (username, password, role) VALUES ('admin', '{sha("admin123")}', 'super_admin');
+        INSERT INTO users (name, email, password, phone) VALUES
+            ('Plan User', 'plan@example.com', '{sha("pass123")}', '0100'),
+            ('Other User', 'other@example.com', '{sha("pass123")}', '0200');
+        INSERT INTO rooms (room_number, room_type, price, status, description) VALUES
+            ('101', 'Single', 2000, 'Available', 'Single bed AC room'),
+            ('102', 'Double', 3000, 'Available', 'Double bed AC room'),
+            ('201', 'Suite', 6500, 'Available', 'Luxury suite room');
+        INSERT INTO room_features (feature_name) VALUES ('AC'), ('WiFi');
+        INSERT INTO room_services (service_name) VALUES ('Breakfast');
+        INSERT INTO room_feature_map VALUES (1, 1), (1, 2), (2, 1);
+        INSERT INTO room_service_map VALUES (1, 1);
+        INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES
+            (1, 1, '2026-02-10', '2026-02-12', 'Confirmed'),
+            (2, 2, '2026-02-15', '2026-02-18', 'Pending'),
+            (2, 3, '2026-03-01', '2026-03-05', 'Pending'),
+            (2, 3, '2026-03-10', '2026-03-12', 'Pending');
+        INSERT INTO payments (booking_id, amount, payment_status) VALUES (1, 4000, 'Completed');
+        INSERT INTO refunds (payment_id, refund_amount) VALUES (1, 500);
+        INSERT INTO reviews (user_id, room_id, rating, comment) VALUES (2, 2, 4, 'Good');
+    """)
+    conn.commit()
+    conn.close()
+
+
+def crud_scenarios(resource, body, update=None):
+    return [
+        ("GET", f"/{resource}", None),
+        ("GET", f"/{resource}?limit=1&cursor={encode_cursor([1])}", None),
+        ("GET", f"/{resource}/1", None),
+        ("POST", f"/{resource}", body),
+        ("PUT", f"/{resource}/1", update or body),
+    ]
+
+
+def scenarios(backend, client):
+    """(method, path, json, headers) for every route the backend serves"""
+    if backend in ("main", "auth_backend"):
+        steps = [("POST", "/auth/login", {"username": "plan@example.com", "password": "pass123"})] if backend == "auth_backend" else []
+        steps += crud_scenarios(
+            "users",
+            {"name": "N", "email": f"{backend}@example.com", "password": "x"},
+            {"name": "Plan User", "email": "plan@example.com", "password": "pass123"},
+        )
+        steps += crud_scenarios(
+            "rooms",
+            {"room_number": f"{backend}-1", "room_type": "Single", "price": 10},
+            {"room_number": "101", "room_type": "Single", "price": 2000, "status": "Available"},
+        )
+        steps += crud_scenarios("bookings", {"user_id": 1, "room_id": 1, "check_in": "2026-02-10", "check_out": "2026-02-12", "booking_status": "Confirmed"})
+        steps += crud_scenarios(
+            "payments",
+            {"booking_id": 2 if backend == "main" else 3, "amount": 9000, "payment_status": "Pending"},
+            {"booking_id": 1, "amount": 4000, "payment_status": "Completed"},
+        )
+        steps += crud_scenarios("reviews", {"user_id": 1, "room_id": 1, "rating": 5})
+        steps += [("GET", "/features", None), ("GET", "/services", None)]
+        if backend == "main":
+            steps += [("GET", "/settings", None)]
+        return [(m, p, j, {}) for m, p, j in steps]
+
+    if backend == "clean_backend":
+        user = {"Authorization": "Bearer user_1"}
+        admin = {"Authorization": "Bearer admin_1"}
+    else:
+        user_token = client.post("/auth/login", json={"username": "plan@example.com", "password": "pass123"}).json["token"]
+        admin_token = client.post("/auth/login", json={"username": "admin", "password": "admin123", "user_type": "admin"}).json["token"]
+        user = {"Authorization": f"Bearer {user_token}"}
+        admin = {"Authorization": f"Bearer {admin_token}"}
+
+    steps = [
+        ("POST", "/auth/register", {"name": "New", "email": f"new-{backend}@example.com", "password": "pw"}, {}),
+        ("POST", "/auth/login", {"username": "plan@example.com", "password": "pass123"}, {}),
+        ("POST", "/auth/login", {"username": "admin", "password": "admin123", "user_type": "admin"}, {}),
+        ("GET", "/rooms/available", None, {}),
+        ("GET", "/rooms/available?check_in=2026-02-11&check_out=2026-02-13&destination=suite", None, {}),
+        ("GET", "/rooms/available?destination=%22sea+view%22+ac&sort=relevance", None, {}),
+        ("GET", "/rooms/1", None, {}),
+        ("GET", "/user/bookings", None, user),
+        ("POST", "/user/bookings", {"room_id": 3, "check_in": "2027-01-01", "check_out": "2027-01-03"}, user),
+        ("POST", "/user/bookings", {"room_id": 3, "check_in": "2027-01-02", "check_out": "2027-01-04"}, user),
+        ("POST", "/user/bookings/batch", {"bookings": [
+            {"room_id": 1, "check_in": "2027-02-01", "check_out": "2027-02-03"},
+            {"room_id": 2, "check_in": "2027-02-01", "check_out": "2027-02-03"},
+        ], "atomic": False}, user),
+        ("GET", "/admin/dashboard", None, admin),
+        ("GET", "/admin/users", None, admin),
+        ("GET", "/admin/bookings", None, admin),
+        ("GET", f"/admin/users?limit=1&cursor={encode_cursor(['9999-12-31', 0])}", None, admin),
+        ("GET", f"/admin/bookings?limit=1&cursor={encode_cursor(['9999-12-31', 0])}", None, admin),
+        ("GET", "/admin/payments", None, admin),
+        ("GET", f"/admin/payments?limit=all&cursor={encode_cursor([2])}", None, admin),
+        ("GET", "/admin/bookings?limit=all", None, {**admin, "Accept": "application/x-ndjson"}),
+    ]
+    if backend == "clean_backend":
+        steps += [
+            ("GET", "/rooms", None, {}),
+            ("PUT", "/bookings/1", {"booking_status": "Confirmed"}, admin),
+            ("POST", "/rooms", {"room_number": "301", "room_type": "Suite", "price": 100}, admin),
+            ("PUT", "/rooms/2", {"price": 3100}, admin),
+            ("DELETE", "/rooms/2", None, admin),
+            ("DELETE", "/user/bookings/1", None, user),
+        ]
+    else:
+        steps += [
+            ("GET", "/rooms/search?check_in=2026-02-11&check_out=2026-02-13&min_price=100&max_price=9000&room_type=single&destination=ac&min_rating=1", None, {}),
+            ("GET", "/reviews", None, {}),
+            ("GET", "/reviews?room_id=2", None, {}),
+            ("POST", "/reviews", {"room_id": 1, "rating": 5, "comment": "Great"}, user),
+            ("GET", "/admin/analytics", None, admin),
+            ("GET", "/admin/reports?type=summary", None, admin),
+            ("GET", "/admin/reports?type=financial", None, admin),
+            ("GET", "/admin/reports?type=booking", None, admin),
+        ]
+    return steps
+
+
+def table_aliases(sql):
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(conn, sql):
+    """Large tables a statement reads without any index"""
+    aliases = table_aliases(sql)
+    scans = set()
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        match = re.fullmatch(r"SCAN (\w+)", row[3])
+        if match:
+            table = aliases.get(match.group(1), match.group(1))
+            if table in LARGE_TABLES:
+                scans.add(table)
+    return scans
+
+
+def main():
+    verbose = "-v" in sys.argv
+    build_database()
+
+    captured = []
+    current = {}
+    db_pool.pool.on_connect(
+        lambda conn: conn.set_trace_callback(lambda sql: captured.append((current.get("route"), sql)))
+    )
+
+    backends = ["main", "auth_backend", "clean_backend", "simplified_backend"]
+    for backend in backends:
+        module = importlib.import_module(backend)
+        client = module.app.test_client()
+        for method, path, body, headers in scenarios(backend, client):
+            current["route"] = (backend, method, path.split("?")[0])
+            response = client.open(path, method=method, json=body, headers=headers)
+            response.get_data()  # run streamed bodies to the end
+            response.close()
+            if response.status_code >= 500:
+                print(f"❌ {backend} {method} {path} -> {response.status_code} {response.get_data(as_text=True)[:200]}")
+                return 1
+
+    plan_conn = sqlite3.connect(SCRATCH_DB)
+    failures = 0
+    checked = set()
+    for route, sql in captured:
+        statement = sql.strip()
+        if not route or not re.match(r"(SELECT|UPDATE|DELETE|WITH)\b", statement, re.IGNORECASE):
+            continue
+        if (route, statement) in checked:
+            continue
+        checked.add((route, statement))
+        scans = full_scans(plan_conn, statement) - ALLOWED_SCANS.get(route, set())
+        if scans:
+            failures += 1
+            print(f"❌ {' '.join(route)} scans {', '.join(sorted(scans))}:\n   {' '.join(statement.split())}")
+        elif verbose:
+            print(f"✅ {' '.join(route)}: {' '.join(statement.split())[:100]}")
+    plan_conn.close()
+
+    print(f"{len(checked)} statements checked, {failures} full scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Property check: cached /rooms/available and /rooms/search bodies stay fresh.
+
+Applies random writes to rooms, bookings, reviews and the feature tables
+(whose names the destination search also matches), and recomputes the
+popularity scores, from a separate connection (as another worker would) and after each one
+requests a few random searches from simplified_backend. Every response
+is compared with the body computed with the cache out of the way; a
+stale body exits 1. The cache is kept small so evictions happen too.
+
+Run: python check_response_cache.py [--seed 1 --steps 1000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "cache.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_SCORE_REFRESHER"] = "0"
+os.environ.setdefault("HOTEL_RESPONSE_CACHE_BYTES", str(64 * 1024))
+
+import response_cache  # noqa: E402
+from room_scores import refresh_scores  # noqa: E402
+from scratch_data import build_database, ids, run_random_action  # noqa: E402
+
+ROOM_TYPES = ["Single", "Double", "Suite", "Deluxe Double"]
+BOOKING_STATUSES = ["Pending", "Confirmed", "Cancelled"]
+FEATURES = ["AC", "WiFi", "TV", "Balcony"]
+# Searches reuse a few stays so their cached bodies get hit (and invalidated)
+SEARCH_STAYS = [("2026-03-05", "2026-03-08"), ("2026-03-10", "2026-03-12"), ("2026-03-01", "2026-03-20")]
+
+# Words, prefixes, a phrase and feature names for the full-text destination search
+DESTINATIONS = ["double", "SUITE", "view", "gard", '"garden view"', "wifi", "ac"]
+
+
+def random_stay(rng):
+    start = rng.randrange(1, 20)
+    return f"2026-03-{start:02d}", f"2026-03-{start + rng.randrange(1, 6):02d}"
+
+
+def random_path(rng):
+    args = []
+    if rng.random() < 0.6:
+        check_in, check_out = rng.choice(SEARCH_STAYS)
+        args += [f"check_in={check_in}", f"check_out={check_out}"]
+    if rng.random() < 0.3:
+        args.append("destination=" + rng.choice(DESTINATIONS))
+        if rng.random() < 0.5:
+            args.append("sort=relevance")
+    if rng.random() < 0.5:
+        path = "/rooms/search"
+        if rng.random() < 0.3:
+            args.append(f"min_price={rng.choice(['1000', '1000.0', '2500'])}")
+        if rng.random() < 0.3:
+            args.append(f"room_type={rng.choice(['double', 'Single'])}")
+        if rng.random() < 0.3:
+            args.append(f"min_rating={rng.choice(['3', '4.5'])}")
+        if rng.random() < 0.2:
+            args.append(f"features={rng.choice(['wifi', 'AC,tv', 'Balcony'])}")
+        if rng.random() < 0.3:
+            args.append("facets=1")
+        if not any(arg.startswith("sort=") for arg in args) and rng.random() < 0.6:
+            args.append(f"sort={rng.choice(['rating', 'popularity', 'best'])}")
+        if rng.random() < 0.3:
+            args.append(f"limit={rng.choice(['1', '5'])}")
+    else:
+        path = "/rooms/available"
+    rng.shuffle(args)
+    return path + ("?" + "&".join(args) if args else "")
+
+
+def random_write(conn, rng):
+    rooms = ids(conn, "rooms", "room_id")
+    bookings = ids(conn, "bookings", "booking_id")
+    reviews = ids(conn, "reviews", "review_id")
+    actions = [
+        (6, lambda: rooms and conn.execute(
+            "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (1, ?, ?, ?, ?)",
+            (rng.choice(rooms), *random_stay(rng), rng.choice(BOOKING_STATUSES)))),
+        (3, lambda: bookings and conn.execute(
+            "UPDATE bookings SET booking_status = ? WHERE booking_id = ?",
+            (rng.choice(BOOKING_STATUSES), rng.choice(bookings)))),
+        (2, lambda: bookings and conn.execute(
+            "UPDATE bookings SET check_in = ?, check_out = ? WHERE booking_id = ?",
+            (*random_stay(rng), rng.choice(bookings)))),
+        (2, lambda: bookings and conn.execute("DELETE FROM bookings WHERE booking_id = ?", (rng.choice(bookings),))),
+        (3, lambda: rooms and conn.execute(
+            "INSERT INTO reviews (user_id, room_id, rating, comment) VALUES (1, ?, ?, 'ok')",
+            (rng.choice(rooms), rng.randrange(1, 6)))),
+        (1, lambda: reviews and conn.execute(
+            "UPDATE reviews SET rating = ? WHERE review_id = ?", (rng.randrange(1, 6), rng.choice(reviews)))),
+        (1, lambda: reviews and conn.execute("DELETE FROM reviews WHERE review_id = ?", (rng.choice(reviews),))),
+        (2, lambda: rooms and conn.execute(
+            "INSERT OR IGNORE INTO room_feature_map (room_id, feature_id) VALUES (?, ?)",
+            (rng.choice(rooms), rng.randrange(1, len(FEATURES) + 1)))),
+        (1, lambda: conn.execute(
+            "DELETE FROM room_feature_map WHERE rowid IN (SELECT rowid FROM room_feature_map ORDER BY random() LIMIT 1)")),
+        (1, lambda: conn.execute(
+            "UPDATE room_features SET feature_name = ? WHERE feature_id = ?",
+            (f"{rng.choice(FEATURES)}-{rng.randrange(1000)}", rng.randrange(1, len(FEATURES) + 1)))),
+        (1, lambda: rooms and conn.execute(
+            "UPDATE rooms SET price = ?, status = ? WHERE room_id = ?",
+            (rng.choice([900, 1500, 3000]), rng.choice(["Available", "Available", "Maintenance"]), rng.choice(rooms)))),
+        (1, lambda: conn.execute(
+            "INSERT INTO rooms (room_number, room_type, price, description) VALUES (?, ?, ?, 'Sea view')",
+            (f"N{rng.random()}", rng.choice(ROOM_TYPES), rng.choice([1200, 2600])))),
+        (3, lambda: refresh_scores(conn)),
+    ]
+    # renamed a feature to a name already taken; nothing changed
+    run_random_action(conn, rng, actions, ignore=sqlite3.IntegrityError)
+
+
+def starting_rooms():
+    return [(str(100 + n), ROOM_TYPES[n % 4], 1000 + 250 * (n % 7), "Garden view" if n % 2 else "City")
+            for n in range(30)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=4, help="searches after each write")
+    args = parser.parse_args()
+
+    writer = build_database(
+        sqlite3.connect(SCRATCH_DB), guests=1, features=FEATURES, rooms=starting_rooms(),
+        room_columns=("room_number", "room_type", "price", "description"),
+    )
+    import simplified_backend as backend
+    client = backend.app.test_client()
+    cache = response_cache.get_cache()
+    uncached = response_cache.ResponseCache(SCRATCH_DB, max_bytes=0)
+    rng = random.Random(args.seed)
+
+    for step in range(args.steps):
+        random_write(writer, rng)
+        for _ in range(args.reads):
+            path = random_path(rng)
+            response = client.get(path)
+            if response.status_code != 200:
+                print(f"❌ step {step}: {path} -> {response.status_code} {response.get_data(as_text=True)[:200]}")
+                return 1
+            got = response.get_data()
+            response_cache._cache = uncached  # the same route, computing every body afresh
+            try:
+                want = client.get(path).get_data()
+            finally:
+                response_cache._cache = cache
+            if got != want:
+                print(f"❌ step {step} (seed {args.seed}): stale body for {path}")
+                return 1
+            stats = cache.stats()
+            if stats["bytes"] > stats["max_bytes"]:
+                print(f"❌ step {step}: {stats['bytes']} bytes cached, bound is {stats['max_bytes']}")
+                return 1
+
+    stats = cache.stats()
+    print(f"✅ {args.steps * args.reads} responses fresh; hit rate {stats['hit_rate']:.0%}, "
+          f"{stats['invalidations']} invalidated, {stats['flushes']} flushes, {stats['evictions']} evicted, "
+          f"{stats['entries']} entries / {stats['bytes']} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Property check: /rooms/search on the in-memory catalog against the SQL it replaced.
+
+Applies random writes to rooms (odd prices and types included), features,
+their maps, reviews and bookings from a separate connection, then runs
+random searches through simplified_backend with the response cache out of
+the way. Every body must equal what the old single SQL statement returns
+for the same filters; the features= filter, which the SQL never had, is
+checked against the rooms' feature names, facets=1 counts are recounted
+from the rows, and the rating/popularity/best orders and limit= are
+re-ranked from the rows and the stored scores. Refreshed scores must equal
+a fresh count of the bookings. Exits 1 on the first difference.
+
+Run: python check_room_catalog.py [--seed 1 --steps 1500]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "catalog.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_SCORE_REFRESHER"] = "0"
+os.environ["HOTEL_RESPONSE_CACHE_BYTES"] = "0"
+
+from availability import ROOM_IS_FREE  # noqa: E402
+from room_catalog import BEST_MATCH_WEIGHTS, PRICE_BUCKET  # noqa: E402
+from room_scores import POPULARITY, refresh_scores, window  # noqa: E402
+from room_search import MATCHING_ROOMS, match_expression  # noqa: E402
+from scratch_data import build_database, ids, run_random_action  # noqa: E402
+
+ROOM_TYPES = ["Single", "Double", "Suite", "Deluxe Double", "50%_off", None, "ÉCO"]
+PRICES = [900, 1500, 1500.5, 3000, "call us"]
+STATUSES = ["Available", "Available", "Available", "Maintenance", None]
+FEATURES = ["AC", "WiFi", "TV", "Balcony", "Sea, view"]
+BOOKING_STATUSES = ["Pending", "Confirmed", "Cancelled"]
+
+
+def legacy_search(conn, args):
+    """The rows the route's single SQL statement produced"""
+    params = []
+    search_join = ""
+    match = match_expression(args.get("destination", "").lower())
+    if match:
+        search_join = f"JOIN ({MATCHING_ROOMS}) rs ON rs.room_id = r.room_id"
+        params.append(match)
+    sql = f"""
+        SELECT r.*, GROUP_CONCAT(rf.feature_name) as features,
+               rr.avg_rating as avg_rating, COALESCE(rr.review_count, 0) as reviews_count
+        FROM rooms r
+        {search_join}
+        LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
+        LEFT JOIN room_feature_map rfm ON r.room_id = rfm.room_id
+        LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
+        WHERE r.status = 'Available'
+    """
+    if "check_in" in args:
+        sql += f" AND {ROOM_IS_FREE}"
+        params += [args["check_in"], args["check_out"]]
+    if "min_price" in args:
+        sql += " AND r.price >= ?"
+        params.append(float(args["min_price"]))
+    if "max_price" in args:
+        sql += " AND r.price <= ?"
+        params.append(float(args["max_price"]))
+    if args.get("room_type"):
+        sql += " AND LOWER(r.room_type) LIKE ?"
+        params.append(f"%{args['room_type'].lower()}%")
+    if "min_rating" in args:
+        sql += " AND r.room_id IN (SELECT room_id FROM room_ratings WHERE avg_rating >= ?)"
+        params.append(float(args["min_rating"]))
+    sort = args.get("sort", "price")
+    order = "rs.relevance, r.price ASC" if match and sort == "relevance" else "r.price ASC"
+    sql += f" GROUP BY r.room_id ORDER BY {order}"
+    rooms = []
+    for row in conn.execute(sql, params):
+        room = dict(row)
+        room["features"] = room["features"].split(",") if room["features"] else []
+        rooms.append(room)
+    wanted = {name.strip().lower() for name in args.get("features", "").split(",") if name.strip()}
+    if wanted:
+        names = {}
+        for room_id, name in conn.execute("""
+            SELECT rfm.room_id, rf.feature_name FROM room_feature_map rfm
+            JOIN room_features rf ON rfm.feature_id = rf.feature_id
+        """):
+            names.setdefault(room_id, set()).add(name.lower())
+        rooms = [room for room in rooms if wanted <= names.get(room["room_id"], set())]
+    return rooms
+
+
+def legacy_order(conn, rooms, args):
+    """rooms (in price order) re-ranked for sort= in Python"""
+    sort = args.get("sort", "price")
+    scores = dict(conn.execute("SELECT room_id, popularity FROM room_scores"))
+    if sort == "rating":
+        return sorted(rooms, key=lambda room: math.inf if room["avg_rating"] is None else -room["avg_rating"])
+    if sort == "popularity":
+        return sorted(rooms, key=lambda room: -scores.get(room["room_id"], 0))
+    if sort == "best":
+        match = match_expression(args.get("destination", "").lower())
+        ranks = dict(conn.execute(MATCHING_ROOMS, (match,))) if match else {}
+        best_rank = min((ranks[room["room_id"]] for room in rooms), default=0) if match else 0
+        top = max(scores.values(), default=0)
+
+        def key(room):
+            score = scores.get(room["room_id"], 0) * (BEST_MATCH_WEIGHTS["popularity"] / top if top else 0)
+            if best_rank < 0:
+                score += ranks[room["room_id"]] * (BEST_MATCH_WEIGHTS["relevance"] / best_rank)
+            if room["avg_rating"] is not None:
+                score += room["avg_rating"] * (BEST_MATCH_WEIGHTS["rating"] / 5)
+            return -score
+        return sorted(rooms, key=key)
+    return rooms  # price, or relevance already ordered by the SQL
+
+
+def legacy_facets(conn, rooms):
+    """Facet counts recounted from the listing rows; features by lower-cased name"""
+    names = {}
+    for room_id, name in conn.execute("""
+        SELECT rfm.room_id, rf.feature_name FROM room_feature_map rfm
+        JOIN room_features rf ON rfm.feature_id = rf.feature_id
+    """):
+        names.setdefault(room_id, set()).add(name.lower())
+    types, features, prices, ratings = {}, {}, {}, {}
+    for room in rooms:
+        types[room["room_type"]] = types.get(room["room_type"], 0) + 1
+        for name in names.get(room["room_id"], ()):
+            features[name] = features.get(name, 0) + 1
+        price = room["price"]
+        bucket = math.floor(price / PRICE_BUCKET) * PRICE_BUCKET if isinstance(price, (int, float)) else None
+        prices[bucket] = prices.get(bucket, 0) + 1
+        rating = None if room["avg_rating"] is None else math.floor(room["avg_rating"])
+        ratings[rating] = ratings.get(rating, 0) + 1
+    return types, features, prices, ratings
+
+
+def got_facets(facets):
+    return (
+        {facet["value"]: facet["count"] for facet in facets["room_type"]},
+        {facet["value"].lower(): facet["count"] for facet in facets["features"]},
+        {facet["min"]: facet["count"] for facet in facets["price"]},
+        {facet["min"]: facet["count"] for facet in facets["rating"]},
+    )
+
+
+def random_search(rng):
+    args = {}
+    if rng.random() < 0.4:
+        start = rng.randrange(1, 20)
+        args["check_in"] = f"2026-03-{start:02d}"
+        args["check_out"] = f"2026-03-{start + rng.randrange(1, 6):02d}"
+    if rng.random() < 0.3:
+        args["min_price"] = rng.choice(["1000", "1500", "1500.5"])
+    if rng.random() < 0.3:
+        args["max_price"] = rng.choice(["1500", "2999.99", "1e9"])
+    if rng.random() < 0.3:
+        args["room_type"] = rng.choice(["double", "SUITE", "%", "_", "0%_", "é", "éco", "x"])
+    if rng.random() < 0.3:
+        args["min_rating"] = rng.choice(["1", "3", "4.5"])
+    if rng.random() < 0.25:
+        args["destination"] = rng.choice(["double", "sea", "view", "wifi", '"sea view"'])
+        if rng.random() < 0.5:
+            args["sort"] = "relevance"
+    if "sort" not in args and rng.random() < 0.4:
+        args["sort"] = rng.choice(["price", "rating", "popularity", "best"])
+    if rng.random() < 0.3:
+        args["limit"] = rng.choice(["1", "3", "10"])
+    if rng.random() < 0.25:
+        args["features"] = rng.choice(["wifi", "AC,tv", "sea, view", "Balcony,WIFI", "sauna"])
+    if rng.random() < 0.3:
+        args["facets"] = "1"
+    return args
+
+
+def random_write(conn, rng):
+    rooms = ids(conn, "rooms", "room_id")
+    reviews = ids(conn, "reviews", "review_id")
+    room = lambda: rng.choice(rooms) if rooms else 1  # noqa: E731
+    actions = [
+        (2, lambda: conn.execute(
+            "INSERT INTO rooms (room_number, room_type, price, status, description) VALUES (?, ?, ?, ?, ?)",
+            (f"N{rng.random()}", rng.choice(ROOM_TYPES), rng.choice(PRICES), rng.choice(STATUSES),
+             rng.choice(["Sea view", "Garden view", None])))),
+        (3, lambda: conn.execute(
+            "UPDATE rooms SET price = ?, status = ?, room_type = ? WHERE room_id = ?",
+            (rng.choice(PRICES), rng.choice(STATUSES), rng.choice(ROOM_TYPES), room()))),
+        (1, lambda: conn.execute("DELETE FROM rooms WHERE room_id = ?", (room(),))),
+        (3, lambda: conn.execute(
+            "INSERT OR IGNORE INTO room_feature_map (room_id, feature_id) VALUES (?, ?)",
+            (room(), rng.randrange(1, len(FEATURES) + 1)))),
+        (2, lambda: conn.execute(
+            "DELETE FROM room_feature_map WHERE rowid IN (SELECT rowid FROM room_feature_map ORDER BY random() LIMIT 1)")),
+        (1, lambda: conn.execute(
+            "UPDATE room_features SET feature_name = ? WHERE feature_id = ?",
+            (f"{rng.choice(FEATURES)} {rng.randrange(100)}", rng.randrange(1, len(FEATURES) + 1)))),
+        (3, lambda: conn.execute(
+            "INSERT INTO reviews (user_id, room_id, rating, comment) VALUES (1, ?, ?, 'ok')",
+            (room(), rng.randrange(1, 6)))),
+        (1, lambda: reviews and conn.execute("DELETE FROM reviews WHERE review_id = ?", (rng.choice(reviews),))),
+        (4, lambda: conn.execute(
+            "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (1, ?, ?, ?, ?)",
+            (room(), *(lambda start: (f"2026-03-{start:02d}", f"2026-03-{start + rng.randrange(1, 5):02d}"))(
+                rng.randrange(1, 22)), rng.choice(BOOKING_STATUSES)))),
+        (1, lambda: conn.execute(
+            "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, created_at) "
+            "VALUES (1, ?, '2026-03-01', '2026-03-02', ?, datetime('now', ?))",
+            (room(), rng.choice(BOOKING_STATUSES), rng.choice(["-1 days", "-89 days", "-91 days", "-400 days"])))),
+        (1, lambda: refresh_scores(conn)),
+        (1, lambda: conn.execute(
+            "UPDATE bookings SET booking_status = 'Cancelled' WHERE rowid IN "
+            "(SELECT rowid FROM bookings ORDER BY random() LIMIT 1)")),
+    ]
+    # duplicate feature name; nothing changed
+    run_random_action(conn, rng, actions, ignore=sqlite3.IntegrityError)
+
+
+def starting_rooms():
+    rng = random.Random(0)
+    return [(str(100 + n), rng.choice(ROOM_TYPES), rng.choice(PRICES), rng.choice(["Sea view", "City"]))
+            for n in range(25)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=1500)
+    args = parser.parse_args()
+
+    writer = build_database(
+        sqlite3.connect(SCRATCH_DB), guests=1, features=FEATURES, rooms=starting_rooms(),
+        room_columns=("room_number", "room_type", "price", "description"),
+    )
+    import simplified_backend as backend
+    from room_catalog import get_catalog
+    client = backend.app.test_client()
+    reader = sqlite3.connect(SCRATCH_DB)
+    reader.row_factory = sqlite3.Row
+    rng = random.Random(args.seed)
+
+    for step in range(args.steps):
+        random_write(writer, rng)
+        for _ in range(3):
+            search = random_search(rng)
+            response = client.get("/rooms/search", query_string=search)
+            if response.status_code != 200:
+                print(f"❌ step {step}: {search} -> {response.status_code} {response.get_data(as_text=True)[:200]}")
+                return 1
+            legacy = legacy_search(reader, search)
+            want = json.loads(json.dumps(legacy_order(reader, legacy, search)[:int(search.get("limit", 10 ** 9))]))
+            got = response.json
+            if "facets" in search:
+                got, facets = got["rooms"], got["facets"]
+                if got_facets(facets) != legacy_facets(reader, legacy):
+                    print(f"❌ step {step} (seed {args.seed}): {search} facets\n   got  {got_facets(facets)}\n"
+                          f"   want {legacy_facets(reader, legacy)}")
+                    return 1
+            if got != want:
+                got_ids = [room["room_id"] for room in got]
+                want_ids = [room["room_id"] for room in want]
+                print(f"❌ step {step} (seed {args.seed}): {search}\n   got  {got_ids}\n   want {want_ids}")
+                return 1
+
+        if step % 100 == 99:
+            refresh_scores(writer)
+            stored = dict(reader.execute("SELECT room_id, popularity FROM room_scores"))
+            counted = dict(reader.execute(POPULARITY, (window(),)))
+            if stored != counted:
+                print(f"❌ step {step}: refreshed scores {stored} != counted {counted}")
+                return 1
+
+    stats = get_catalog().stats()
+    print(f"✅ {args.steps * 3} searches match the SQL path; catalog of {stats['rooms']} rooms, "
+          f"{stats['syncs']} syncs reloaded {stats['rooms_reloaded']} rooms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
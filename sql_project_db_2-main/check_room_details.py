@@ -0,0 +1,151 @@
+"""Property check: cached GET /rooms/<id> documents against the old five queries.
+
+Applies random writes to rooms, their feature/service maps, reviews,
+feature and service names and reviewer names from a separate connection
+(as another worker would), then fetches random room pages from
+simplified_backend. Every document must equal the one the old
+room / features / services / reviews / rating queries assemble, a miss
+must cost one SQL statement and a hit none. Exits 1 on the first
+difference.
+
+Run: python check_room_details.py [--seed 1 --steps 3000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "rooms.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_SCORE_REFRESHER"] = "0"
+
+import db_pool  # noqa: E402
+from scratch_data import build_database, ids, run_random_action  # noqa: E402
+
+ROOMS = 12
+
+
+def legacy_room_details(conn, room_id):
+    """The document the route built with five separate queries"""
+    room = conn.execute("SELECT * FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
+    if not room:
+        return None
+    features = conn.execute("""
+        SELECT rf.feature_name FROM room_feature_map rfm
+        JOIN room_features rf ON rfm.feature_id = rf.feature_id WHERE rfm.room_id = ?
+    """, (room_id,)).fetchall()
+    services = conn.execute("""
+        SELECT rs.service_name FROM room_service_map rsm
+        JOIN room_services rs ON rsm.service_id = rs.service_id WHERE rsm.room_id = ?
+    """, (room_id,)).fetchall()
+    # review_id breaks created_at ties, as the new query does
+    reviews = conn.execute("""
+        SELECT r.review_id, r.rating, r.comment, r.created_at, u.name as user_name
+        FROM reviews r JOIN users u ON r.user_id = u.user_id
+        WHERE r.room_id = ? ORDER BY r.created_at DESC, r.review_id DESC
+    """, (room_id,)).fetchall()
+    avg_rating = conn.execute(
+        "SELECT AVG(rating) as avg_rating, COUNT(*) as review_count FROM reviews WHERE room_id = ?", (room_id,)
+    ).fetchone()
+    room_dict = dict(room)
+    room_dict['features'] = [f['feature_name'] for f in features]
+    room_dict['services'] = [s['service_name'] for s in services]
+    room_dict['reviews'] = [dict(review) for review in reviews]
+    room_dict['avg_rating'] = round(avg_rating['avg_rating'], 1) if avg_rating['avg_rating'] else 0
+    room_dict['review_count'] = avg_rating['review_count'] if avg_rating['review_count'] else 0
+    return room_dict
+
+
+def random_write(conn, rng):
+    room = rng.randrange(1, ROOMS + 2)
+    reviews = ids(conn, "reviews", "review_id")
+    actions = [
+        (2, lambda: conn.execute(
+            "UPDATE rooms SET price = ?, description = ? WHERE room_id = ?",
+            (rng.choice([1000, 2500.5]), rng.choice(["Sea view", "Quiet – back side", None]), room))),
+        (1, lambda: conn.execute("DELETE FROM rooms WHERE room_id = ?", (room,))),
+        (1, lambda: conn.execute(
+            "INSERT OR IGNORE INTO rooms (room_id, room_number, room_type, price) VALUES (?, ?, 'Double', 1800)",
+            (room, f"R{room}"))),
+        (3, lambda: conn.execute(
+            "INSERT OR IGNORE INTO room_feature_map (room_id, feature_id) VALUES (?, ?)", (room, rng.randrange(1, 5)))),
+        (2, lambda: conn.execute(
+            "DELETE FROM room_feature_map WHERE room_id = ? AND feature_id = ?", (room, rng.randrange(1, 5)))),
+        (2, lambda: conn.execute(
+            "INSERT OR IGNORE INTO room_service_map (room_id, service_id) VALUES (?, ?)", (room, rng.randrange(1, 4)))),
+        (1, lambda: conn.execute(
+            "DELETE FROM room_service_map WHERE room_id = ? AND service_id = ?", (room, rng.randrange(1, 4)))),
+        (1, lambda: conn.execute(
+            "UPDATE room_features SET feature_name = ? WHERE feature_id = ?",
+            (f"Feature {rng.randrange(10000)}", rng.randrange(1, 5)))),
+        (1, lambda: conn.execute(
+            "UPDATE room_services SET service_name = ? WHERE service_id = ?",
+            (f"Service {rng.randrange(10000)}", rng.randrange(1, 4)))),
+        (4, lambda: conn.execute(
+            "INSERT INTO reviews (user_id, room_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)",
+            (rng.randrange(1, 6), room, rng.randrange(1, 6), rng.choice(["Great", "\"Meh\"", "Nice ☀"]),
+             f"2026-03-0{rng.randrange(1, 4)} 10:00:00"))),
+        (2, lambda: reviews and conn.execute(
+            "UPDATE reviews SET comment = ?, rating = ? WHERE review_id = ?",
+            ("Edited", rng.randrange(1, 6), rng.choice(reviews)))),
+        (1, lambda: reviews and conn.execute("DELETE FROM reviews WHERE review_id = ?", (rng.choice(reviews),))),
+        (1, lambda: conn.execute(
+            "UPDATE users SET name = ? WHERE user_id = ?", (f"Guest {rng.randrange(1000)}", rng.randrange(1, 6)))),
+        (1, lambda: conn.execute("UPDATE users SET status = 'inactive' WHERE user_id = ?", (rng.randrange(1, 6),))),
+    ]
+    run_random_action(conn, rng, actions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=3000)
+    args = parser.parse_args()
+
+    writer = build_database(
+        sqlite3.connect(SCRATCH_DB), guests=5, features=["AC", "WiFi", "TV", "Balcony"],
+        services=["Breakfast", "Laundry", "Spa"],
+        rooms=[(n, str(100 + n), "Single", 1200) for n in range(1, ROOMS + 1)],
+        room_columns=("room_id", "room_number", "room_type", "price"),
+    )
+    import simplified_backend as backend
+    from room_details import get_room_cache
+    client = backend.app.test_client()
+    reader = sqlite3.connect(SCRATCH_DB)
+    reader.row_factory = sqlite3.Row
+
+    statements = []
+    db_pool.pool.on_connect(lambda conn: conn.set_trace_callback(statements.append))
+    db_pool.pool.close_all()  # reconnect with the trace hook
+    rng = random.Random(args.seed)
+    cache = get_room_cache()
+
+    for step in range(args.steps):
+        if rng.random() < 0.3:
+            random_write(writer, rng)
+        room_id = rng.randrange(1, ROOMS + 2)
+        hits = cache.stats()["hits"]
+        del statements[:]
+        response = client.get(f"/rooms/{room_id}")
+        hit = cache.stats()["hits"] > hits
+        want = legacy_room_details(reader, room_id)
+        got = response.json if response.status_code == 200 else None
+        if got != want:
+            print(f"❌ step {step} (seed {args.seed}): room {room_id} {'hit' if hit else 'miss'} differs\n"
+                  f"   got  {got}\n   want {want}")
+            return 1
+        if len(statements) != (0 if hit else 1):
+            print(f"❌ step {step}: room {room_id} {'hit' if hit else 'miss'} ran {len(statements)} statements")
+            return 1
+
+    stats = cache.stats()
+    print(f"✅ {args.steps} room pages match the five-query version; {stats['hits']} hits (no SQL), "
+          f"{stats['misses']} misses (one statement), {stats['invalidations']} invalidated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Property check: trigger-kept room_ratings against fresh aggregates over reviews.
+
+Applies random review inserts, rating/room moves and deletes (NULL ratings
+and room-less reviews included) and after every step compares room_ratings
+with the counts and averages recomputed from reviews. Exits 1 on the
+first drift.
+
+Run: python check_room_ratings.py [--seed 1 --steps 3000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+from room_ratings import find_drift
+from scratch_data import build_database, ids, run_random_action
+
+ROOMS = 15
+RATINGS = [1, 2, 3, 4, 5, 5, 4.5, None]
+
+
+def random_step(conn, rng):
+    reviews = ids(conn, "reviews", "review_id")
+    room = lambda: rng.choice([rng.randrange(1, ROOMS + 1)] * 9 + [None])  # noqa: E731
+    actions = [
+        (6, lambda: conn.execute(
+            "INSERT INTO reviews (user_id, room_id, rating, comment) VALUES (1, ?, ?, 'ok')",
+            (room(), rng.choice(RATINGS)))),
+        (3, lambda: reviews and conn.execute(
+            "UPDATE reviews SET rating = ? WHERE review_id = ?", (rng.choice(RATINGS), rng.choice(reviews)))),
+        (2, lambda: reviews and conn.execute(
+            "UPDATE reviews SET room_id = ? WHERE review_id = ?", (room(), rng.choice(reviews)))),
+        (1, lambda: reviews and conn.execute(
+            "UPDATE reviews SET comment = 'edited' WHERE review_id = ?", (rng.choice(reviews),))),
+        (3, lambda: reviews and conn.execute("DELETE FROM reviews WHERE review_id = ?", (rng.choice(reviews),))),
+        (1, lambda: conn.execute("DELETE FROM reviews WHERE room_id = ?", (rng.randrange(1, ROOMS + 1),))),
+    ]
+    run_random_action(conn, rng, actions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=3000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "ratings.db")
+    conn = build_database(
+        sqlite3.connect(path), guests=1,
+        rooms=[(n, str(100 + n), 1500) for n in range(1, ROOMS + 1)], room_columns=("room_id", "room_number", "price"),
+    )
+    rng = random.Random(args.seed)
+
+    for step in range(args.steps):
+        random_step(conn, rng)
+        drift = find_drift(conn)
+        if drift:
+            room_id, stored, actual = drift[0]
+            print(f"❌ step {step} (seed {args.seed}): room {room_id} stored {stored}, actual {actual}")
+            return 1
+
+    reviews = conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+    print(f"✅ {args.steps} random steps, room_ratings match reviews ({reviews} reviews)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Property check: the room_search full-text index against the rooms it indexes.
+
+Applies random writes to rooms, their feature maps and feature names and
+after every step compares the index with what INDEXED_ROOMS reads from the
+base tables, then runs a few destination searches through the index and
+through a plain Python matcher over the same columns (word prefixes, quoted
+phrases). Exits 1 on the first difference.
+
+Run: python check_room_search.py [--seed 1 --steps 2000]
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+
+from room_search import INDEXED_ROOMS, MATCHING_ROOMS, find_drift, match_expression
+from scratch_data import build_database, ids, run_random_action
+
+ROOM_TYPES = ["Single", "Double", "Suite", "Deluxe Double", None]
+DESCRIPTIONS = ["Sea view", "Garden view, quiet", "Double bed AC room", "Suite with sea-view balcony", None]
+FEATURES = ["AC", "WiFi", "TV", "Balcony", "Sea View"]
+SEARCHES = ["double", "sea", "vi", "AC", '"sea view"', '"garden view"', "suite balc", "wifi tv", "10", '"view quiet"']
+
+
+def words(text):
+    return re.findall(r"[^\W_]+", (text or "").lower())
+
+
+def matches(columns, text):
+    """What the FTS5 query for `text` should find, worked out by hand"""
+    columns = [words(column) for column in columns]
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        terms = words(phrase or word)
+        if not terms:
+            continue
+        found = False
+        for tokens in columns:
+            for start in range(len(tokens) - len(terms) + 1):
+                window = tokens[start:start + len(terms)]
+                if window[:-1] == terms[:-1] and (
+                    window[-1] == terms[-1] if phrase else window[-1].startswith(terms[-1])
+                ):
+                    found = True
+        if not found:
+            return False
+    return True
+
+
+def random_step(conn, rng):
+    rooms = ids(conn, "rooms", "room_id")
+    feature = lambda: rng.randrange(1, len(FEATURES) + 1)  # noqa: E731
+    actions = [
+        (3, lambda: conn.execute(
+            "INSERT INTO rooms (room_number, room_type, price, description) VALUES (?, ?, 1500, ?)",
+            (str(rng.randrange(100, 400)), rng.choice(ROOM_TYPES), rng.choice(DESCRIPTIONS)))),
+        (3, lambda: rooms and conn.execute(
+            "UPDATE rooms SET room_type = ?, description = ? WHERE room_id = ?",
+            (rng.choice(ROOM_TYPES), rng.choice(DESCRIPTIONS), rng.choice(rooms)))),
+        (1, lambda: rooms and conn.execute(
+            "UPDATE rooms SET price = price + 1, status = 'Maintenance' WHERE room_id = ?", (rng.choice(rooms),))),
+        (1, lambda: rooms and conn.execute(
+            "UPDATE rooms SET room_id = ? WHERE room_id = ?", (rng.randrange(500, 600), rng.choice(rooms)))),
+        (1, lambda: rooms and conn.execute("DELETE FROM rooms WHERE room_id = ?", (rng.choice(rooms),))),
+        (4, lambda: conn.execute(
+            "INSERT OR IGNORE INTO room_feature_map (room_id, feature_id) VALUES (?, ?)",
+            (rng.choice(rooms + [999]), feature()))),
+        (1, lambda: conn.execute(
+            "UPDATE room_feature_map SET room_id = ? WHERE rowid IN "
+            "(SELECT rowid FROM room_feature_map ORDER BY random() LIMIT 1)", (rng.choice(rooms + [999]),))),
+        (2, lambda: conn.execute(
+            "DELETE FROM room_feature_map WHERE rowid IN (SELECT rowid FROM room_feature_map ORDER BY random() LIMIT 1)")),
+        (1, lambda: conn.execute(
+            "UPDATE room_features SET feature_name = ? WHERE feature_id = ?",
+            (f"{rng.choice(FEATURES)} {rng.randrange(100)}", feature()))),
+        (1, lambda: conn.execute("DELETE FROM room_features WHERE feature_id = ?", (feature(),))),
+        (1, lambda: conn.execute(
+            "INSERT OR IGNORE INTO room_features (feature_id, feature_name) VALUES (?, ?)",
+            (feature(), rng.choice(FEATURES)))),
+    ]
+    # duplicate room_number / feature_name; nothing changed
+    run_random_action(conn, rng, actions, ignore=sqlite3.IntegrityError)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "search.db")
+    conn = build_database(sqlite3.connect(path), features=FEATURES)
+    rng = random.Random(args.seed)
+
+    for step in range(args.steps):
+        random_step(conn, rng)
+        drift = find_drift(conn)
+        if drift:
+            room_id, indexed, actual = drift[0]
+            print(f"❌ step {step} (seed {args.seed}): room {room_id} indexed {indexed}, actual {actual}")
+            return 1
+        rooms = conn.execute(INDEXED_ROOMS).fetchall()
+        for text in rng.sample(SEARCHES, 3):
+            got = {row[0] for row in conn.execute(MATCHING_ROOMS, (match_expression(text),))}
+            want = {room[0] for room in rooms if matches(room[1:], text)}
+            if got != want:
+                print(f"❌ step {step} (seed {args.seed}): {text!r} found {sorted(got)}, expected {sorted(want)}")
+                return 1
+
+    rooms = conn.execute("SELECT COUNT(*) FROM room_search").fetchone()[0]
+    print(f"✅ {args.steps} random steps, index matches the rooms and searches agree ({rooms} rooms indexed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
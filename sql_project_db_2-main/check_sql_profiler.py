@@ -0,0 +1,248 @@
+"""Property check: the SQL profiler's fingerprints, totals and slow log.
+
+Runs random statements from a handful of templates through pooled
+connection handles on a scratch copy of the database, each time with
+fresh literals written into the text or bound as parameters (positional
+or named), random whitespace, comments and IN lists or VALUES rows of
+random length. With the slow threshold at 0 every statement is slow.
+Afterwards every template must have exactly one fingerprint, no two
+templates may share one, each fingerprint must count exactly the
+statements run from its template and the totals must add up to what the
+handles timed. Every slow entry must carry the types of its parameters
+but none of their values and a query plan if it is a read (EXPLAIN must
+not fail on any). A booking insert of any number of rows, one statement
+or a batch, must report the statements its triggers ran, the same number
+per row every time, while a read reports none. The report must be sorted
+by each order it offers, and a profiler that has seen too many
+fingerprints must total the rest under OTHER. Exits 1 on the first violation.
+
+Run: python check_sql_profiler.py [--seed 1 --statements 2000]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+
+SCRATCH_DB = os.path.join(tempfile.mkdtemp(), "profiler.db")
+os.environ["HOTEL_DB_PATH"] = SCRATCH_DB
+os.environ["HOTEL_WAL_CHECKPOINTER"] = "0"
+os.environ["HOTEL_SQL_PROFILE"] = "1"
+os.environ["HOTEL_SLOW_QUERY_MS"] = "0"
+os.environ["HOTEL_SLOW_QUERY_LOG"] = "1000000"
+
+import sql_profiler  # noqa: E402
+from sql_profiler import MAX_FINGERPRINTS, OTHER, SORTS, Profiler, fingerprint, profiler  # noqa: E402
+
+# Every bound string starts with this; it must never show up in the report
+SECRET = "secret-"
+
+
+class Statement:
+    def __init__(self, template, sql, parameters=(), many=False, rows=1):
+        self.template = template
+        self.sql = sql
+        self.parameters = parameters
+        self.many = many
+        self.rows = rows  # rows a booking insert adds
+
+
+def spaced(rng, sql):
+    """`sql` with its single spaces widened or turned into newlines, maybe a comment"""
+    words = sql.split(" ")
+    out = words[0]
+    for word in words[1:]:
+        out += rng.choice([" ", " ", "  ", "\n    ", "\t"]) + word
+    if rng.random() < 0.2:
+        out = rng.choice(["-- from the check\n", "/* check */ "]) + out
+    if rng.random() < 0.2:
+        out += ";"
+    return out
+
+
+def secret(rng):
+    return f"{SECRET}{rng.randrange(10**9)}"
+
+
+def random_statement(rng, room_ids, n):
+    kind = rng.randrange(7)
+    inline = rng.random() < 0.4
+    if kind == 0:
+        room_id = rng.choice(room_ids)
+        if inline:
+            return Statement("room", spaced(rng, f"SELECT * FROM rooms WHERE room_id = {room_id}"))
+        if rng.random() < 0.5:
+            return Statement("room", spaced(rng, "SELECT * FROM rooms WHERE room_id = :room_id"), {"room_id": room_id})
+        return Statement("room", spaced(rng, "SELECT * FROM rooms WHERE room_id = ?"), (room_id,))
+    if kind == 1:
+        ids = rng.sample(room_ids, rng.randrange(1, len(room_ids) + 1))
+        if inline:
+            return Statement("rooms_in", spaced(rng, f"SELECT room_id, price FROM rooms WHERE room_id IN ({', '.join(map(str, ids))})"))
+        return Statement("rooms_in", spaced(rng, f"SELECT room_id, price FROM rooms WHERE room_id IN ({','.join('?' * len(ids))})"),
+                         tuple(ids))
+    if kind == 2:
+        low = round(rng.uniform(0, 3000), rng.choice([0, 2]))
+        if inline:
+            return Statement("price", spaced(rng, f"SELECT COUNT(*) FROM rooms WHERE price >= {low} AND room_type != 'it''s {secret(rng)}'"))
+        return Statement("price", spaced(rng, "SELECT COUNT(*) FROM rooms WHERE price >= ? AND room_type != ?"), (low, secret(rng)))
+    if kind == 3:
+        # never matches: the secret is only ever bound
+        return Statement("user", spaced(rng, "SELECT user_id FROM users WHERE email = ? AND name IS NOT ?"), (secret(rng), None))
+    if kind == 4:
+        rows = [booking(rng, room_ids, n * 10 + i) for i in range(rng.choice([1, 1, 2, 5]))]
+        values = ", ".join(["(?, ?, ?, ?, ?)"] * len(rows))
+        return Statement("book", spaced(rng, f"INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES {values}"),
+                         tuple(value for row in rows for value in row), rows=len(rows))
+    if kind == 5:
+        rows = [booking(rng, room_ids, n * 10 + i) for i in range(rng.randrange(1, 6))]
+        return Statement("book", "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status) VALUES (?, ?, ?, ?, ?)",
+                         rows, many=True, rows=len(rows))
+    limit = rng.randrange(1, 50)
+    if inline:
+        return Statement("recent", spaced(rng, f"SELECT booking_id FROM bookings ORDER BY booking_id DESC LIMIT {limit}"))
+    return Statement("recent", spaced(rng, "SELECT booking_id FROM bookings ORDER BY booking_id DESC LIMIT ?"), (limit,))
+
+
+def booking(rng, room_ids, n):
+    """A stay far in the future that no other statement of the run overlaps"""
+    check_in = date(2040, 1, 1) + timedelta(days=n)
+    return (1, rng.choice(room_ids), check_in.isoformat(), (check_in + timedelta(days=1)).isoformat(),
+            rng.choice(["Pending", "Cancelled"]))
+
+
+def check_report(report, ran, seconds):
+    """Problem with the profiler's report after running `ran`, or None"""
+    by_template = {}
+    for statement in ran:
+        by_template.setdefault(statement.template, set()).add(fingerprint(statement.sql))
+    for template, found in by_template.items():
+        if len(found) != 1:
+            return f"template {template} has {len(found)} fingerprints: {sorted(found)}"
+    owners = {}
+    for template, (found,) in by_template.items():
+        if found in owners:
+            return f"templates {owners[found]} and {template} share the fingerprint {found!r}"
+        owners[found] = template
+
+    expected = {}
+    for statement in ran:
+        found = fingerprint(statement.sql)
+        expected[found] = expected.get(found, 0) + 1
+    counts = {entry["fingerprint"]: entry["count"] for entry in report["top"]}
+    if counts != expected:
+        return f"counts {counts} for statements {expected}"
+    if report["statements"] != len(ran) or report["fingerprints"] != len(expected):
+        return f"report totals {report['statements']} statements / {report['fingerprints']} fingerprints, ran {len(ran)} / {len(expected)}"
+    if abs(report["total_ms"] - seconds * 1000) > 0.01 + 0.005 * len(expected):
+        return f"report totals {report['total_ms']} ms, the handles timed {seconds * 1000:.3f} ms"
+    for entry in report["top"]:
+        if entry["slow"] != entry["count"] or not entry["max_ms"] <= entry["total_ms"] + 0.001:
+            return f"inconsistent entry {entry}"
+
+    per_row = set()
+    if len(report["slow_queries"]) != len(ran):
+        return f"{len(report['slow_queries'])} slow entries for {len(ran)} statements over a 0 ms threshold"
+    for statement, entry in zip(reversed(ran), report["slow_queries"]):
+        if entry["fingerprint"] != fingerprint(statement.sql):
+            return f"slow log out of order: {entry['fingerprint']!r} for {statement.sql!r}"
+        if entry["plan"][:1] != [] and entry["plan"][0].startswith("no plan") \
+                or not entry["plan"] and statement.template != "book":  # INSERT ... VALUES has an empty plan
+            return f"no query plan for {statement.sql!r}: {entry['plan']}"
+        if statement.many:
+            if not entry["parameters"].startswith(f"{len(statement.parameters)} rows of (int x2, str x3)"):
+                return f"batch of {len(statement.parameters)} logged as {entry['parameters']!r}"
+        elif statement.parameters:
+            shape = sql_profiler.parameter_shape(statement.parameters)
+            if entry["parameters"] != shape:
+                return f"parameters logged as {entry['parameters']!r}, bound {shape}"
+        if statement.template == "book":
+            per_row.add(entry["nested_statements"] / statement.rows)
+        elif entry["nested_statements"]:
+            return f"{statement.template} reports {entry['nested_statements']} nested statements"
+    if len(per_row) != 1 or min(per_row) < 1:
+        return f"booking inserts report {sorted(per_row)} trigger statements per row, the same number every time"
+    text = json.dumps(report)
+    if SECRET in text:
+        return f"a parameter value leaked into the report: ...{text[text.index(SECRET) - 80:text.index(SECRET) + 40]}..."
+
+    for sort, key in SORTS.items():
+        top = profiler.report(sort, 3)["top"]
+        if len(top) != min(3, len(expected)):
+            return f"sort={sort} limit=3 returned {len(top)} entries"
+        full = profiler.report(sort, len(expected))["top"]
+        values = [{"total": e["total_ms"], "max": e["max_ms"], "count": e["count"], "avg": e["avg_ms"]}[sort] for e in full]
+        if values != sorted(values, reverse=True):
+            return f"sort={sort} is not in order: {values}"
+    return None
+
+
+def check_overflow():
+    """Problem with a profiler past MAX_FINGERPRINTS, or None"""
+    overflow = Profiler(slow_ms=10**9)
+    extra = 25
+    for n in range(MAX_FINGERPRINTS + extra):
+        overflow.record(None, f"SELECT column_{n} FROM t", (), 0.001)
+    overflow.record(None, "SELECT column_0 FROM t WHERE 1 = 1", (), 0.001)
+    overflow.record(None, "SELECT column_5 FROM t", (), 0.001)
+    report = overflow.report("count", MAX_FINGERPRINTS + 10)
+    counts = {entry["fingerprint"]: entry["count"] for entry in report["top"]}
+    if report["fingerprints"] != MAX_FINGERPRINTS + 1 or counts.get(OTHER) != extra + 1:
+        return f"past the limit: {report['fingerprints']} fingerprints, {counts.get(OTHER)} under {OTHER}"
+    if counts.get("SELECT column_5 FROM t") != 2 or report["statements"] != MAX_FINGERPRINTS + extra + 2:
+        return "a known fingerprint stopped counting past the limit"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--statements", type=int, default=2000)
+    args = parser.parse_args()
+
+    shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "hotel_booking.db"), SCRATCH_DB)
+    from db_pool import pool
+    from migrations import migrate
+
+    conn = pool.connect()
+    migrate(conn)
+    room_ids = [row[0] for row in conn.execute("SELECT room_id FROM rooms")]
+    conn.close()
+    logging.getLogger("hotel.sql").setLevel(logging.ERROR)  # every statement is slow here
+    profiler.reset()
+
+    rng = random.Random(args.seed)
+    ran = []
+    seconds = 0.0
+    handle = pool.checkout()
+    for n in range(args.statements):
+        if rng.random() < 0.05:
+            seconds += handle.sql_seconds
+            handle.commit()
+            handle.release()
+            handle = pool.checkout()
+        statement = random_statement(rng, room_ids, n)
+        if statement.many:
+            handle.executemany(statement.sql, iter(statement.parameters)).fetchall()
+        else:
+            handle.execute(statement.sql, statement.parameters).fetchall()
+        ran.append(statement)
+    seconds += handle.sql_seconds
+    handle.commit()
+    handle.release()
+
+    problem = check_report(profiler.report("total", 100), ran, seconds) or check_overflow()
+    if problem:
+        print(f"❌ seed {args.seed}: {problem}")
+        return 1
+    templates = len({statement.template for statement in ran})
+    print(f"✅ {len(ran)} statements from {templates} templates: one fingerprint each, counts, "
+          f"totals, slow log plans, parameter shapes and trigger statement counts match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Property check: the verified-token cache against verifying every time.
+
+Two TokenCache instances on one scratch database stand in for two
+worker processes. Random steps issue tokens that expire at random times
+(some signed with the wrong key, some with a tampered payload), present
+old and new tokens to either cache, revoke tokens through either one
+(committing on a separate connection, as a route would), and move a fake
+clock forward past expiry times. Every answer must equal what verifying
+the token from scratch says: the payload of a correctly signed token
+that has not expired and was never revoked, else None. A revocation
+must hold in both caches from the next lookup on, the caches must stay
+within their size, and each must have decoded exactly the tokens it
+missed. Exits 1 on the first violation.
+
+Run: python check_token_cache.py [--seed 1 --steps 20000]
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+import jwt
+
+from migrations import migrate
+from token_cache import TokenCache
+
+KEY = "check_token_cache-signing-key-0123456789"
+SIZE = 64
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def tampered(token):
+    """The token with its payload changed and the signature left alone"""
+    header, payload, signature = token.split(".")
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    claims["type"] = "admin"
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=").decode()
+    return f"{header}.{payload}.{signature}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=20000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "tokens.db")
+    db = sqlite3.connect(path)
+    migrate(db)
+    rng = random.Random(args.seed)
+    clock = Clock(1_900_000_000)
+    decoded = []
+
+    def decode(token):
+        decoded.append(token)
+        try:
+            payload = jwt.decode(token, KEY, algorithms=["HS256"], options={"verify_exp": False})
+        except jwt.InvalidTokenError:
+            return None
+        return payload if payload["exp"] > clock() else None
+
+    caches = [TokenCache(path, size=SIZE, clock=clock) for _ in range(2)]
+    tokens = []  # (token, payload or None if it never verifies)
+    revoked = set()
+    lookups = [0, 0]
+    decodes = [0, 0]
+    problem = None
+    for step in range(args.steps):
+        action = rng.random()
+        if action < 0.08 or not tokens:
+            payload = {"user": {"user_id": rng.randrange(1, 1000)}, "type": rng.choice(["user", "admin"]),
+                       "exp": clock() + rng.choice([1, 5, 60, 600, 3600])}
+            token = jwt.encode(payload, KEY, algorithm="HS256")
+            kind = rng.random()
+            if kind < 0.1:
+                tokens.append((jwt.encode(payload, KEY[::-1], algorithm="HS256"), None))
+            elif kind < 0.2:
+                tokens.append((tampered(token), None))
+            tokens.append((token, payload))
+        elif action < 0.12:
+            token, payload = rng.choice(tokens)
+            if payload is not None and payload["exp"] > clock():
+                which = rng.randrange(2)
+                caches[which].revoke(db, token, payload["exp"])
+                db.commit()
+                revoked.add(token)
+        elif action < 0.15:
+            clock.now += rng.choice([1, 3, 30, 300])
+        else:
+            # recent tokens more often, as the same clients keep coming back
+            token, payload = tokens[-1 - min(int(rng.expovariate(0.05)), len(tokens) - 1)]
+            which = rng.randrange(2)
+            before = len(decoded)
+            got = caches[which].verify(token, decode)
+            lookups[which] += 1
+            decodes[which] += len(decoded) - before
+            valid = payload is not None and payload["exp"] > clock() and token not in revoked
+            expected = payload if valid else None
+            if got != expected:
+                problem = (f"step {step}: cache {which} returned {got} for a token that is "
+                           f"{'valid' if valid else 'revoked' if token in revoked else 'expired or forged'}")
+                break
+        for which, cache in enumerate(caches):
+            stats = cache.stats()
+            if stats["entries"] > SIZE:
+                problem = f"step {step}: cache {which} holds {stats['entries']} tokens, size {SIZE}"
+            elif stats["hits"] + stats["misses"] != lookups[which]:
+                problem = f"step {step}: cache {which} counted {stats['hits'] + stats['misses']} lookups, {lookups[which]} made"
+            elif stats["misses"] != decodes[which]:
+                problem = f"step {step}: cache {which} decoded {decodes[which]} tokens on {stats['misses']} misses"
+        if problem:
+            break
+
+    if problem:
+        print(f"❌ seed {args.seed}: {problem}")
+        return 1
+    stats = [cache.stats() for cache in caches]
+    remaining = db.execute("SELECT COUNT(*) FROM revoked_tokens").fetchone()[0]
+    print(f"✅ {sum(lookups)} lookups of {len(tokens)} tokens ({len(revoked)} revoked, {remaining} still listed) match "
+          f"verifying every time; hit rates {stats[0]['hit_rate']:.0%} / {stats[1]['hit_rate']:.0%}, "
+          f"{sum(s['evictions'] for s in stats)} evicted, {sum(s['revoked'] for s in stats)} dropped on revocation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
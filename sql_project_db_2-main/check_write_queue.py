@@ -0,0 +1,232 @@
+"""Property check: the single-writer queue under concurrent clients.
+
+Client threads submit random bookings (many overlapping, some for rooms
+that do not exist or are under maintenance), group bookings of several
+such stays (all-or-nothing or best-effort), groups that fail after
+booking, and payments (some without an amount, or for a booking that
+already has one, which the constraints reject) to one WriteQueue. A
+payment confirms its booking before inserting the payment row, so a
+failed one has already written when it raises. Afterwards the database must hold no overlapping active stays,
+every returned id must be the row that was asked for (and no other rows
+exist), every refused booking must overlap a booking that was committed
+or an earlier stay of its own group, and every failed payment or refused
+all-or-nothing group must have left nothing behind while the rest of its
+batch committed. Exits 1 on the first violation.
+
+Run: python check_write_queue.py [--seed 1 --clients 50 --writes 40]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+from datetime import date, timedelta
+
+from availability import AvailabilityEngine
+from migrations import migrate
+import write_queue
+
+BASE_DAY = date(2026, 1, 1)
+ROOMS = 12  # room 1 is under maintenance, room ROOMS + 1 does not exist
+OVERLAPS = """
+    SELECT a.booking_id, b.booking_id FROM bookings a
+    JOIN bookings b ON b.room_id = a.room_id AND b.booking_id > a.booking_id
+    WHERE a.booking_status IN ('Pending', 'Confirmed') AND b.booking_status IN ('Pending', 'Confirmed')
+    AND a.check_in < b.check_out AND b.check_in < a.check_out
+"""
+CONFLICTING = """
+    SELECT COUNT(*) FROM bookings
+    WHERE room_id = ? AND booking_status IN ('Pending', 'Confirmed') AND check_in < ? AND check_out > ?
+"""
+
+
+def day(offset):
+    return (BASE_DAY + timedelta(days=offset)).isoformat()
+
+
+def pay(conn, batch, booking_id, amount):
+    """Confirm a booking and record its payment (fails without an amount or if already paid)"""
+    conn.execute("UPDATE bookings SET booking_status = 'Confirmed' WHERE booking_id = ?", (booking_id,))
+    return write_queue.insert_payment(conn, batch, booking_id, amount, "Paytm", "Pending")
+
+
+def book_then_fail(conn, batch, user_id, stays):
+    """Book a best-effort group, then fail: its stays must not block later operations"""
+    write_queue.create_bookings(conn, batch, user_id, stays, False, True)
+    raise sqlite3.IntegrityError("failed after booking")
+
+
+def random_stay(rng, rooms):
+    start = rng.randrange(60)
+    room_id = rng.randrange(1, rooms + 2)  # rooms + 1 does not exist
+    return room_id, day(start), day(start + rng.choice([1, 1, 2, 3, 7]))
+
+
+def client(writer, rng, rooms, writes, results):
+    booked = []
+    for _ in range(writes):
+        action = rng.random()
+        if booked and action < 0.25:
+            booking_id = rng.choice(booked)
+            future = writer.submit(pay, booking_id, None if rng.random() < 0.3 else 1000)
+            results.append(("payment", (booking_id,), future))
+            continue
+        if action < 0.3:
+            stays = [random_stay(rng, rooms) for _ in range(rng.randrange(1, 4))]
+            future = writer.submit(book_then_fail, rng.randrange(1, 4), stays)
+            results.append(("failed group", (stays,), future))
+            continue
+        if action < 0.45:
+            stays = [random_stay(rng, rooms) for _ in range(rng.randrange(1, 8))]
+            atomic = rng.random() < 0.5
+            future = writer.submit(write_queue.create_bookings, rng.randrange(1, 4), stays, atomic, True)
+            results.append(("group", (stays, atomic), future))
+            try:
+                booked.extend(result for result in future.result(write_queue.WRITE_TIMEOUT) if isinstance(result, int))
+            except write_queue.GroupRejected:
+                pass
+            continue
+        stay = random_stay(rng, rooms)
+        future = writer.submit(write_queue.create_booking, rng.randrange(1, 4), *stay, True)
+        results.append(("booking", stay, future))
+        try:
+            booked.append(future.result(write_queue.WRITE_TIMEOUT))
+        except write_queue.WriteRejected:
+            pass
+
+
+def check_stay(conn, stay, outcome, earlier):
+    """Problem with one booking's outcome (a booking_id or the exception), or None"""
+    room_id, check_in, check_out = stay
+    if isinstance(outcome, int):
+        row = conn.execute(
+            "SELECT room_id, check_in, check_out FROM bookings WHERE booking_id = ?", (outcome,)
+        ).fetchone()
+        if row != stay:
+            return f"booking {outcome} is {row}, asked for {stay}"
+        if room_id > ROOMS or room_id == 1:
+            return f"booked room {room_id}, which does not exist or is under maintenance"
+    elif isinstance(outcome, write_queue.RoomNotFound):
+        if room_id <= ROOMS:
+            return f"room {room_id} reported missing"
+    elif isinstance(outcome, write_queue.StayConflict):
+        overlaps_earlier = any(r == room_id and a < check_out and b > check_in for r, a, b in earlier)
+        if not overlaps_earlier and not conn.execute(CONFLICTING, (room_id, check_out, check_in)).fetchone()[0]:
+            return f"room {room_id} [{check_in}, {check_out}) refused without a conflict"
+    elif isinstance(outcome, write_queue.RoomUnavailable):
+        if room_id != 1:
+            return f"room {room_id} reported unavailable"
+    else:
+        return f"booking {stay} failed: {outcome!r}"
+    return None
+
+
+def check(conn, results):
+    overlap = conn.execute(OVERLAPS).fetchone()
+    if overlap:
+        return f"bookings {overlap[0]} and {overlap[1]} overlap"
+    paid = {}
+    acknowledged = 0
+    for kind, args, future in results:
+        exc = future.exception()
+        if kind == "booking":
+            acknowledged += exc is None
+            problem = check_stay(conn, args, exc or future.result(), [])
+            if problem:
+                return problem
+        elif kind == "group":
+            stays, atomic = args
+            if isinstance(exc, write_queue.GroupRejected):
+                outcomes = exc.results
+                if not atomic or not any(outcomes):
+                    return f"group {stays} rejected as a whole (atomic={atomic})"
+            elif exc is not None:
+                return f"group {stays} failed: {exc!r}"
+            else:
+                outcomes = future.result()
+                if atomic and not all(isinstance(outcome, int) for outcome in outcomes):
+                    return f"all-or-nothing group {stays} partly booked"
+                acknowledged += sum(isinstance(outcome, int) for outcome in outcomes)
+            for i, (stay, outcome) in enumerate(zip(stays, outcomes)):
+                # A refused all-or-nothing group leaves its other stays unbooked (None)
+                if outcome is None and isinstance(exc, write_queue.GroupRejected):
+                    continue
+                accepted = [s for s, o in zip(stays[:i], outcomes) if not isinstance(o, write_queue.WriteRejected)]
+                problem = check_stay(conn, tuple(stay), outcome, accepted)
+                if problem:
+                    return f"group: {problem}"
+        elif kind == "failed group":
+            if not isinstance(exc, sqlite3.IntegrityError):
+                return f"group {args[0]} booked and then failed, got {exc!r}"
+        else:
+            booking_id = args[0]
+            if exc is None:
+                paid.setdefault(booking_id, []).append(future.result())
+            elif not isinstance(exc, sqlite3.IntegrityError):
+                return f"payment for booking {booking_id} failed: {exc!r}"
+    rows = dict(conn.execute("SELECT booking_id, payment_id FROM payments"))
+    if {booking_id: [payment_id] for booking_id, payment_id in rows.items()} != paid:
+        return "payments table does not match the payments that were acknowledged"
+    confirmed = {row[0] for row in conn.execute("SELECT booking_id FROM bookings WHERE booking_status = 'Confirmed'")}
+    if confirmed != set(paid):
+        return "a failed payment left its booking confirmed"
+    bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    if bookings != acknowledged:
+        return f"{bookings} bookings written, {acknowledged} acknowledged"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=40)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "write_queue.db")
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany("INSERT INTO users (name, email, password) VALUES (?, ?, 'x')",
+                     [(f"Guest {n}", f"guest{n}@example.com") for n in range(1, 4)])
+    conn.executemany("INSERT INTO rooms (room_number, room_type, price) VALUES (?, 'Single', 1000)",
+                     [(str(n),) for n in range(1, ROOMS + 1)])
+    conn.execute("UPDATE rooms SET status = 'Maintenance' WHERE room_id = 1")
+    conn.commit()
+
+    engine = AvailabilityEngine(path)
+    writer = write_queue.WriteQueue(path, engine=engine)
+    rng = random.Random(args.seed)
+    results = []
+    threads = [
+        threading.Thread(target=client, args=(writer, random.Random(rng.random()), ROOMS, args.writes, results))
+        for _ in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.stop()
+
+    problem = check(conn, results)
+    stats = writer.stats()
+    if problem is None and stats["operations"] != len(results):
+        problem = f"writer ran {stats['operations']} operations, {len(results)} were submitted"
+    if problem is None and stats["batches"] >= stats["operations"]:
+        problem = "no two operations ever shared a commit"
+    if problem:
+        print(f"❌ seed {args.seed}: {problem}")
+        return 1
+
+    bookings = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"✅ {len(results)} writes from {args.clients} clients in {stats['batches']} commits "
+          f"(avg batch {stats['avg_batch']}, largest {stats['largest_batch']}): "
+          f"{bookings} bookings, {stats['rejected']} refused, {stats['failed']} failed alone")
+    engine.close()
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
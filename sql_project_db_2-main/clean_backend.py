@@ -1,21 +1,25 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import sqlite3
-import hashlib
-from datetime import datetime
+from db_pool import get_db, init_pool, release_db
+from metrics import init_metrics
+from pagination import EXPOSED_HEADERS, paginate
+from dashboard_stats import read_stats
+from availability import get_engine, validate_stay
+from principal_cache import get_principal_cache
+from passwords import PasswordBusy, busy_response, check_password, hash_password, start_workers
+import write_queue
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=EXPOSED_HEADERS)
 
-# Database connection
-def get_db():
-    conn = sqlite3.connect("hotel_booking.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+start_workers()  # password hashing processes, forked before any thread starts
 
-# Password hashing
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# Database connection
+init_pool(app)
+init_metrics(app)  # per-route latency, SQL and status counts on /metrics
+get_engine()  # load the booking calendars up front
+get_principal_cache()
 
 # Create tables if they don't exist
 def init_database():
@@ -126,8 +130,12 @@ def register():
             db.close()
             return jsonify({"error": "User already exists"}), 400
         
+        db.close()
+        release_db()  # not held while the password is hashed
+        
         # Create user
         hashed_password = hash_password(password)
+        db = get_db()
         db.execute(
             "INSERT INTO users (name, email, password, phone) VALUES (?, ?, ?, ?)",
             (name, email, hashed_password, phone)
@@ -141,6 +149,8 @@ def register():
             "user_id": user_id
         }), 201
         
+    except PasswordBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -156,17 +166,14 @@ def login():
             return jsonify({"error": "Username and password required"}), 400
             
         db = get_db()
-        hashed_password = hash_password(password)
         
         if user_type == "admin":
             # Admin login
-            admin = db.execute(
-                "SELECT * FROM admins WHERE username = ? AND password = ?", 
-                (username, hashed_password)
-            ).fetchone()
+            admin = db.execute("SELECT * FROM admins WHERE username = ?", (username,)).fetchone()
+            db.close()
+            release_db()  # not held while the password hash waits for a worker
             
-            if admin:
-                db.close()
+            if admin and check_password("admins", admin, password):
                 return jsonify({
                     "token": f"admin_{admin['admin_id']}",
                     "user": {
@@ -178,13 +185,11 @@ def login():
                 }), 200
         else:
             # User login
-            user = db.execute(
-                "SELECT * FROM users WHERE email = ? AND password = ?", 
-                (username, hashed_password)
-            ).fetchone()
+            user = db.execute("SELECT * FROM users WHERE email = ?", (username,)).fetchone()
+            db.close()
+            release_db()  # not held while the password hash waits for a worker
             
-            if user:
-                db.close()
+            if user and check_password("users", user, password):
                 return jsonify({
                     "token": f"user_{user['user_id']}",
                     "user": {
@@ -196,9 +201,10 @@ def login():
                     }
                 }), 200
         
-        db.close()
         return jsonify({"error": "Invalid credentials"}), 401
         
+    except PasswordBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -232,41 +238,43 @@ def verify_token(token):
     if not token:
         return None
     
-    # Extract user type and ID from token
+    # Extract user type and ID from token; the row comes from the principal cache
     if token.startswith('user_'):
         try:
             user_id = int(token.split('_')[1])
-            db = get_db()
-            user = db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
-            db.close()
-            return {'type': 'user', 'id': user_id, 'data': dict(user) if user else None}
+            return {'type': 'user', 'id': user_id, 'data': get_principal_cache().get('user', user_id)}
         except:
             return None
     elif token.startswith('admin_'):
         try:
             admin_id = int(token.split('_')[1])
-            db = get_db()
-            admin = db.execute("SELECT * FROM admins WHERE admin_id = ?", (admin_id,)).fetchone()
-            db.close()
-            return {'type': 'admin', 'id': admin_id, 'data': dict(admin) if admin else None}
+            return {'type': 'admin', 'id': admin_id, 'data': get_principal_cache().get('admin', admin_id)}
         except:
             return None
     return None
 
+def auth_required(principal_type, error='Invalid or expired token', status=401):
+    """Route decorator: pass the Bearer token's principal (verify_token) to the route first"""
+    def decorator(f):
+        def decorated(*args, **kwargs):
+            auth_header = request.headers.get('Authorization')
+            if not auth_header or not auth_header.startswith('Bearer '):
+                return jsonify({'error': 'Authorization required'}), 401
+            
+            token_data = verify_token(auth_header.split(' ')[1])
+            if not token_data or token_data['type'] != principal_type:
+                return jsonify({'error': error}), status
+            
+            return f(token_data, *args, **kwargs)
+        decorated.__name__ = f.__name__
+        return decorated
+    return decorator
+
 # User protected routes
 @app.route("/user/bookings", methods=["GET"])
-def get_user_bookings():
+@auth_required('user')
+def get_user_bookings(token_data):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'user':
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         db = get_db()
         bookings = db.execute("""
             SELECT b.*, r.room_number, r.room_type, r.price
@@ -283,18 +291,9 @@ def get_user_bookings():
         return jsonify({'error': str(e)}), 500
 
 @app.route("/user/bookings", methods=["POST"])
-def create_user_booking():
+@auth_required('user')
+def create_user_booking(token_data):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'user':
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         data = request.json
         room_id = data.get('room_id')
         check_in = data.get('check_in')
@@ -303,60 +302,47 @@ def create_user_booking():
         if not all([room_id, check_in, check_out]):
             return jsonify({'error': 'Room ID, check-in, and check-out dates are required'}), 400
         
-        db = get_db()
-        
-        # Check if room exists
-        room = db.execute("SELECT * FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
-        if not room:
-            db.close()
-            return jsonify({'error': 'Room does not exist'}), 400
-        
-        # Check if room is already booked for the requested dates
-        existing_booking = db.execute("""
-            SELECT * FROM bookings 
-            WHERE room_id = ? 
-            AND booking_status != 'Cancelled'
-            AND check_in < ?
-            AND check_out > ?
-        """, (room_id, check_out, check_in)).fetchone()
-        
-        if existing_booking:
-            db.close()
-            return jsonify({'error': 'Room is already booked for the selected dates'}), 400
-        
-        # Check if room is marked as unavailable
-        if room['status'] != 'Available':
-            db.close()
-            return jsonify({'error': 'Room is not available'}), 400
-        
-        # Create booking
-        db.execute("""
-            INSERT INTO bookings (user_id, room_id, check_in, check_out) 
-            VALUES (?, ?, ?, ?)
-        """, (token_data['id'], room_id, check_in, check_out))
+        date_error = validate_stay(check_in, check_out)
+        if date_error:
+            return jsonify({'error': date_error}), 400
         
-        db.commit()
-        booking_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
-        db.close()
+        # The writer thread checks that the room exists, is free for the
+        # dates and is Available, then inserts, all in one transaction
+        try:
+            booking_id = write_queue.get_writer().run(
+                write_queue.create_booking, token_data['id'], room_id, check_in, check_out, True
+            )
+        except write_queue.WriteRejected as e:
+            return jsonify({'error': str(e)}), 400
+        except write_queue.WriteTimeout as e:
+            return jsonify({'error': str(e)}), 503, {"Retry-After": "1"}
         
         return jsonify({'message': 'Booking created successfully', 'booking_id': booking_id}), 201
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route("/user/bookings/batch", methods=["POST"])
+@auth_required('user')
+def create_group_booking(token_data):
+    """Book many rooms at once: {"bookings": [{room_id, check_in, check_out}, ...], "atomic": true}.
+
+    All stays are checked and inserted in one transaction. With atomic
+    (the default) either every stay is booked or none is; otherwise each
+    stay that can be booked is. The response has one result per stay.
+    """
+    try:
+        body, status = write_queue.book_group(token_data['id'], request.json or {})
+        return jsonify(body), status
+    except write_queue.WriteTimeout as e:
+        return jsonify({'error': str(e)}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route("/user/bookings/<int:booking_id>", methods=["DELETE"])
-def cancel_user_booking(booking_id):
+@auth_required('user')
+def cancel_user_booking(token_data, booking_id):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'user':
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         db = get_db()
         
         # Check if booking belongs to user
@@ -383,32 +369,19 @@ def cancel_user_booking(booking_id):
 
 # Admin protected routes
 @app.route("/admin/dashboard", methods=["GET"])
-def admin_dashboard():
+@auth_required('admin')
+def admin_dashboard(token_data):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'admin':
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         db = get_db()
+        row = read_stats(db)
         stats = {
-            'total_users': db.execute("SELECT COUNT(*) as count FROM users").fetchone()['count'],
-            'total_rooms': db.execute("SELECT COUNT(*) as count FROM rooms").fetchone()['count'],
-            'total_bookings': db.execute("SELECT COUNT(*) as count FROM bookings").fetchone()['count'],
-            'pending_bookings': db.execute("SELECT COUNT(*) as count FROM bookings WHERE booking_status = 'Pending'").fetchone()['count'],
-            'confirmed_bookings': db.execute("SELECT COUNT(*) as count FROM bookings WHERE booking_status = 'Confirmed'").fetchone()['count'],
-            'cancelled_bookings': db.execute("SELECT COUNT(*) as count FROM bookings WHERE booking_status = 'Cancelled'").fetchone()['count'],
-            'total_revenue': db.execute("""
-                SELECT COALESCE(SUM(r.price * (julianday(b.check_out) - julianday(b.check_in))), 0) as revenue
-                FROM bookings b
-                JOIN rooms r ON b.room_id = r.room_id
-                WHERE b.booking_status = 'Confirmed'
-            """).fetchone()['revenue']
+            'total_users': row['total_users'],
+            'total_rooms': row['total_rooms'],
+            'total_bookings': row['total_bookings'],
+            'pending_bookings': row['pending_bookings'],
+            'confirmed_bookings': row['confirmed_bookings'],
+            'cancelled_bookings': row['cancelled_bookings'],
+            'total_revenue': row['confirmed_stay_value']
         }
         db.close()
         
@@ -418,69 +391,59 @@ def admin_dashboard():
         return jsonify({'error': str(e)}), 500
 
 @app.route("/admin/users", methods=["GET"])
-def admin_get_users():
+@auth_required('admin')
+def admin_get_users(token_data):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'admin':
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         db = get_db()
-        users = db.execute("SELECT * FROM users ORDER BY created_at DESC").fetchall()
+        response = paginate(db, "SELECT * FROM users", [("created_at", "DESC"), ("user_id", "DESC")])
         db.close()
         
-        return jsonify([dict(user) for user in users]), 200
+        return response
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route("/admin/bookings", methods=["GET"])
-def admin_get_bookings():
+@auth_required('admin')
+def admin_get_bookings(token_data):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'admin':
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         db = get_db()
-        bookings = db.execute("""
+        response = paginate(db, """
             SELECT b.*, u.name as user_name, u.email as user_email, r.room_number, r.room_type
             FROM bookings b
             JOIN users u ON b.user_id = u.user_id
             JOIN rooms r ON b.room_id = r.room_id
-            ORDER BY b.created_at DESC
-        """).fetchall()
+        """, [("b.created_at", "DESC"), ("b.booking_id", "DESC")])
         db.close()
         
-        return jsonify([dict(booking) for booking in bookings]), 200
+        return response
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route("/admin/payments", methods=["GET"])
+@auth_required('admin')
+def admin_get_payments(token_data):
+    try:
+        db = get_db()
+        response = paginate(db, """
+            SELECT p.*, b.room_id, u.name as user_name, u.email as user_email
+            FROM payments p
+            LEFT JOIN bookings b ON p.booking_id = b.booking_id
+            LEFT JOIN users u ON b.user_id = u.user_id
+        """, [("p.payment_id", "DESC")])
+        db.close()
+        
+        return response
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Booking update route
 @app.route("/bookings/<int:booking_id>", methods=["PUT"])
-def update_booking(booking_id):
+@auth_required('admin', 'Admin access required', 403)
+def update_booking(token_data, booking_id):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.json
         new_status = data.get('booking_status')
         
@@ -516,18 +479,9 @@ def update_booking(booking_id):
 
 # Additional room management routes
 @app.route("/rooms", methods=["POST"])
-def create_room():
+@auth_required('admin', 'Admin access required', 403)
+def create_room(token_data):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.json
         room_number = data.get('room_number')
         room_type = data.get('room_type')
@@ -562,18 +516,9 @@ def create_room():
         return jsonify({'error': str(e)}), 500
 
 @app.route("/rooms/<int:room_id>", methods=["PUT"])
-def update_room(room_id):
+@auth_required('admin', 'Admin access required', 403)
+def update_room(token_data, room_id):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.json
         db = get_db()
         
@@ -612,18 +557,9 @@ def update_room(room_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route("/rooms/<int:room_id>", methods=["DELETE"])
-def delete_room(room_id):
+@auth_required('admin', 'Admin access required', 403)
+def delete_room(token_data, room_id):
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization required'}), 401
-        
-        token = auth_header.split(' ')[1]
-        token_data = verify_token(token)
-        
-        if not token_data or token_data['type'] != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         db = get_db()
         
         # Check if room exists
@@ -0,0 +1,139 @@
+"""Admin dashboard counters kept by triggers (see migrations.DASHBOARD_STATS).
+
+The dashboard reads one row from dashboard_stats (plus today's row of
+dashboard_daily) instead of re-counting users, rooms, bookings and
+payments on every load. This module recomputes both tables from the base
+tables, either to rebuild them or to check the trigger-kept values for
+drift.
+
+Run: python dashboard_stats.py [--db hotel_booking.db] [--rebuild]
+"""
+import argparse
+import sqlite3
+import sys
+
+# stat -> query computing it from the base tables (what the dashboards ran)
+RAW_STATS = {
+    "total_users": "SELECT COUNT(*) FROM users",
+    "total_rooms": "SELECT COUNT(*) FROM rooms",
+    "occupied_rooms": "SELECT COUNT(*) FROM rooms WHERE status = 'Occupied'",
+    "total_bookings": "SELECT COUNT(*) FROM bookings",
+    "pending_bookings": "SELECT COUNT(*) FROM bookings WHERE booking_status = 'Pending'",
+    "confirmed_bookings": "SELECT COUNT(*) FROM bookings WHERE booking_status = 'Confirmed'",
+    "cancelled_bookings": "SELECT COUNT(*) FROM bookings WHERE booking_status = 'Cancelled'",
+    "active_users": "SELECT COUNT(DISTINCT user_id) FROM bookings WHERE booking_status = 'Confirmed'",
+    "completed_revenue": "SELECT COALESCE(SUM(amount), 0) FROM payments WHERE payment_status = 'Completed'",
+    "confirmed_stay_value": """
+        SELECT COALESCE(SUM(r.price * (julianday(b.check_out) - julianday(b.check_in))), 0)
+        FROM bookings b
+        JOIN rooms r ON b.room_id = r.room_id
+        WHERE b.booking_status = 'Confirmed'
+    """,
+}
+
+RAW_DAILY = """
+    SELECT day, SUM(bookings_created) AS bookings_created, SUM(completed_revenue) AS completed_revenue
+    FROM (
+        SELECT substr(created_at, 1, 10) AS day, 1 AS bookings_created, 0 AS completed_revenue
+        FROM bookings WHERE created_at IS NOT NULL
+        UNION ALL
+        SELECT substr(payment_date, 1, 10), 0, amount
+        FROM payments WHERE payment_date IS NOT NULL AND payment_status = 'Completed'
+    )
+    GROUP BY day
+"""
+
+# Revenue is summed as REAL in a different order than a fresh SUM()
+MONEY_TOLERANCE = 0.005
+
+
+def read_stats(db):
+    """The dashboard row, with today's counters as bookings_today / revenue_today"""
+    row = db.execute("""
+        SELECT s.*,
+            COALESCE(d.bookings_created, 0) AS bookings_today,
+            COALESCE(d.completed_revenue, 0) AS revenue_today
+        FROM dashboard_stats s
+        LEFT JOIN dashboard_daily d ON d.day = DATE('now')
+        WHERE s.id = 1
+    """).fetchone()
+    return dict(row)
+
+
+def compute_stats(conn):
+    return {name: conn.execute(sql).fetchone()[0] for name, sql in RAW_STATS.items()}
+
+
+def rebuild_stats(conn):
+    """Recompute both tables from scratch in the caller's transaction"""
+    stats = compute_stats(conn)
+    conn.execute("DELETE FROM dashboard_stats")
+    conn.execute(
+        f"INSERT INTO dashboard_stats (id, {', '.join(stats)}) VALUES (1, {', '.join('?' * len(stats))})",
+        list(stats.values())
+    )
+    conn.execute("DELETE FROM dashboard_daily")
+    conn.execute(f"INSERT INTO dashboard_daily (day, bookings_created, completed_revenue) {RAW_DAILY}")
+    return stats
+
+
+def find_drift(conn):
+    """[(name, stored, actual)] for every counter that disagrees with the base tables"""
+    drift = []
+    cursor = conn.execute("SELECT * FROM dashboard_stats WHERE id = 1")
+    row = cursor.fetchone()
+    stored = dict(zip([d[0] for d in cursor.description], row)) if row else {}
+    for name, actual in compute_stats(conn).items():
+        if not close_enough(stored.get(name), actual):
+            drift.append((name, stored.get(name), actual))
+
+    kept = {day: (count, revenue) for day, count, revenue in conn.execute(
+        "SELECT day, bookings_created, completed_revenue FROM dashboard_daily"
+    )}
+    for day, count, revenue in conn.execute(RAW_DAILY):
+        have = kept.pop(day, (0, 0))
+        if have[0] != count:
+            drift.append((f"bookings_created[{day}]", have[0], count))
+        if not close_enough(have[1], revenue):
+            drift.append((f"completed_revenue[{day}]", have[1], revenue))
+    # Days the base tables no longer have must have gone back to zero
+    for day, (count, revenue) in kept.items():
+        if count:
+            drift.append((f"bookings_created[{day}]", count, 0))
+        if not close_enough(revenue, 0):
+            drift.append((f"completed_revenue[{day}]", revenue, 0))
+    return drift
+
+
+def close_enough(stored, actual):
+    if stored is None:
+        return False
+    if isinstance(actual, float) or isinstance(stored, float):
+        return abs(stored - actual) <= MONEY_TOLERANCE
+    return stored == actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check (and optionally rebuild) the dashboard counters")
+    parser.add_argument("--db", default="hotel_booking.db")
+    parser.add_argument("--rebuild", action="store_true", help="recompute both tables from scratch")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("BEGIN IMMEDIATE")  # no writes between reading and comparing
+    drift = find_drift(conn)
+    for name, stored, actual in drift:
+        print(f"❌ {name}: stored {stored}, actual {actual}")
+    if args.rebuild:
+        rebuild_stats(conn)
+        conn.commit()
+        print("✅ Dashboard stats rebuilt")
+    else:
+        conn.rollback()
+        print(f"{'❌' if drift else '✅'} {len(drift)} counters drifted")
+    conn.close()
+    return 1 if drift and not args.rebuild else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, has_app_context
+
+import migrations
+import storage_profile
+from sql_profiler import profiler
+
+# ---------------- Configuration ----------------
+DB_PATH = os.environ.get("HOTEL_DB_PATH", "hotel_booking.db")
+POOL_SIZE = int(os.environ.get("HOTEL_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("HOTEL_DB_POOL_TIMEOUT", "30"))
+# Per-connection prepared statement cache (sqlite3's built-in LRU)
+STATEMENT_CACHE_SIZE = int(os.environ.get("HOTEL_DB_STATEMENT_CACHE", "256"))
+# Run WAL checkpoints on a background thread instead of inside commits
+RUN_CHECKPOINTER = os.environ.get("HOTEL_WAL_CHECKPOINTER", "1") == "1"
+# Bring the schema up to date when an app starts
+AUTO_MIGRATE = os.environ.get("HOTEL_DB_AUTO_MIGRATE", "1") == "1"
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free in time"""
+
+
+# ---------------- Pooled connection handle ----------------
+class PooledConnection:
+    """Wraps a pooled sqlite3 connection so that close() gives it back.
+
+    Request-scoped handles are shared by everything that calls get_db()
+    during one request; close() only rolls back uncommitted work and the
+    connection goes back to the pool on app-context teardown.
+
+    `queries` and `sql_seconds` count the statements run through the
+    handle and the time spent in execute() (for a query, running it up to
+    its first row); the request metrics read them. Each statement is also
+    handed to the SQL profiler.
+    """
+
+    def __init__(self, pool, conn, request_scoped=False):
+        self._pool = pool
+        self._conn = conn
+        self._request_scoped = request_scoped
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def _timed(self, method, sql, parameters):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        many = method == "executemany"
+        if many and profiler.enabled and not isinstance(parameters, (list, tuple)):
+            parameters = list(parameters)  # the slow log looks at the rows again
+        traced = profiler.statements_started()
+        started = time.perf_counter()
+        try:
+            return getattr(conn, method)(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_seconds += elapsed
+            if profiler.enabled:
+                profiler.record(conn, sql, parameters, elapsed, many, profiler.statements_started() - traced)
+
+    def execute(self, sql, parameters=()):
+        return self._timed("execute", sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed("executemany", sql, seq_of_parameters)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def close(self):
+        if self._conn is None:
+            return
+        if self._request_scoped:
+            if self._conn.in_transaction:
+                self._conn.rollback()
+            return
+        self.release()
+
+    def release(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+
+# ---------------- Connection pool ----------------
+class ConnectionPool:
+    """Bounded per-process pool of SQLite connections.
+
+    Idle connections are kept LIFO so the most recently used one (with the
+    warmest statement cache) is handed out first. A forked worker starts
+    with a fresh, empty pool.
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 cached_statements=STATEMENT_CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._connect_hooks = []
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._open = 0
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "checkouts": 0,
+            "releases": 0,
+            "discarded": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    def on_connect(self, hook):
+        """Register hook(conn) to run once on every new connection"""
+        self._connect_hooks.append(hook)
+        return hook
+
+    def _new_connection(self):
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        for hook in self._connect_hooks:
+            hook(conn)
+        return conn
+
+    def connect(self):
+        """A new connection set up like the pooled ones, owned by the caller"""
+        return self._new_connection()
+
+    def checkout(self, request_scoped=False):
+        """Take a connection from the pool, opening one if below the bound"""
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset()
+            self._stats["checkouts"] += 1
+            deadline = None
+            while not self._idle and self._open >= self.size:
+                if deadline is None:
+                    self._stats["waits"] += 1
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout("Timed out waiting for a database connection")
+                self._cond.wait(remaining)
+            if self._idle:
+                self._stats["reused"] += 1
+                return PooledConnection(self, self._idle.pop(), request_scoped)
+            self._open += 1
+        try:
+            conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return PooledConnection(self, conn, request_scoped)
+
+    def release(self, conn):
+        """Return a connection, rolling back anything left uncommitted"""
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            healthy = False
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._stats["releases"] += 1
+            if healthy:
+                self._idle.append(conn)
+            else:
+                self._stats["discarded"] += 1
+                self._open -= 1
+            self._cond.notify()
+        if not healthy:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+        return stats
+
+
+pool = ConnectionPool()
+pool.on_connect(storage_profile.apply_profile)
+pool.on_connect(profiler.attach)
+
+
+# ---------------- Flask integration ----------------
+def get_db():
+    """Connection for the current request, or a standalone pooled one.
+
+    Inside an app context every call returns the same handle, which is
+    returned to the pool on teardown even if the route forgot to close it.
+    """
+    if has_app_context():
+        handle = g.get("_pooled_db")
+        if handle is None:
+            handle = g._pooled_db = pool.checkout(request_scoped=True)
+        return handle
+    return pool.checkout()
+
+
+def detach_db(handle):
+    """Take the request's connection out of the request: teardown no longer
+    releases it, and whoever holds `handle` must call handle.release()"""
+    if has_app_context() and g.get("_pooled_db") is handle:
+        g.pop("_pooled_db")
+
+
+def release_db(exc=None):
+    """Give the request's connection back to the pool now; a later get_db() checks out another"""
+    if not has_app_context():
+        return
+    handle = g.pop("_pooled_db", None)
+    if handle is not None:
+        handle.release()
+
+
+def init_pool(app):
+    """Hook the pool into a Flask app and migrate the schema.
+
+    The request's connection goes back to the pool on app-context teardown.
+    """
+    app.teardown_appcontext(release_db)
+    if AUTO_MIGRATE:
+        conn = pool.checkout()
+        try:
+            migrations.migrate(conn)
+        finally:
+            conn.release()
+    if RUN_CHECKPOINTER:
+        storage_profile.start_checkpointer(pool.path)
+
+
+def pool_stats():
+    return pool.stats()
+
+
+def storage_stats():
+    return storage_profile.storage_stats(pool.path)
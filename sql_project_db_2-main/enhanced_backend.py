@@ -2,9 +2,11 @@ from flask import Flask, request, jsonify
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
 from flask_swagger_ui import get_swaggerui_blueprint
 from flask_cors import CORS
-import sqlite3
-import bcrypt
-from datetime import datetime, timedelta
+from datetime import timedelta
+from db_pool import get_db, init_pool, release_db
+from metrics import init_metrics
+from availability import ROOM_IS_FREE
+from passwords import PasswordBusy, busy_response, check_password, hash_password, start_workers
 
 app = Flask(__name__)
 CORS(app)
@@ -15,10 +17,9 @@ app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 jwt = JWTManager(app)
 
 # Database connection
-def get_db():
-    conn = sqlite3.connect("hotel_booking.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+start_workers()  # password hashing processes, forked before any thread starts
+init_pool(app)
+init_metrics(app)  # per-route latency, SQL and status counts on /metrics
 
 # Create initial admin user if not exists
 def create_initial_admin():
@@ -26,10 +27,10 @@ def create_initial_admin():
     # Check if admin exists
     admin = db.execute("SELECT * FROM admins WHERE username = ?", ("admin",)).fetchone()
     if not admin:
-        hashed_password = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt())
+        hashed_password = hash_password("admin123")
         db.execute(
             "INSERT INTO admins (username, password, role) VALUES (?, ?, ?)",
-            ("admin", hashed_password.decode('utf-8'), "super_admin")
+            ("admin", hashed_password, "super_admin")
         )
         db.commit()
         print("✅ Initial admin user created (username: admin, password: admin123)")
@@ -52,8 +53,10 @@ def login():
                 "SELECT * FROM admins WHERE username = ?", 
                 (username,)
             ).fetchone()
+            db.close()
+            release_db()  # not held while the password hash waits for a worker
             
-            if admin and bcrypt.checkpw(password.encode('utf-8'), admin['password'].encode('utf-8')):
+            if admin and check_password("admins", admin, password):
                 access_token = create_access_token(
                     identity={
                         'id': admin['admin_id'],
@@ -62,7 +65,6 @@ def login():
                         'type': 'admin'
                     }
                 )
-                db.close()
                 return jsonify({
                     "access_token": access_token,
                     "user": {
@@ -78,8 +80,10 @@ def login():
                 "SELECT * FROM users WHERE email = ?", 
                 (username,)
             ).fetchone()
+            db.close()
+            release_db()  # not held while the password hash waits for a worker
             
-            if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+            if user and check_password("users", user, password):
                 access_token = create_access_token(
                     identity={
                         'id': user['user_id'],
@@ -88,7 +92,6 @@ def login():
                         'type': 'user'
                     }
                 )
-                db.close()
                 return jsonify({
                     "access_token": access_token,
                     "user": {
@@ -100,9 +103,10 @@ def login():
                     }
                 }), 200
         
-        db.close()
         return jsonify({"error": "Invalid credentials"}), 401
     
+    except PasswordBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -127,17 +131,23 @@ def register():
             db.close()
             return jsonify({"error": "User already exists"}), 400
         
+        db.close()
+        release_db()  # not held while the password is hashed
+        
         # Hash password and create user
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = hash_password(password)
+        db = get_db()
         db.execute(
             "INSERT INTO users (name, email, password, phone) VALUES (?, ?, ?, ?)",
-            (name, email, hashed_password.decode('utf-8'), phone)
+            (name, email, hashed_password, phone)
         )
         db.commit()
         db.close()
         
         return jsonify({"message": "User registered successfully"}), 201
     
+    except PasswordBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -223,21 +233,12 @@ def get_available_rooms():
         
         if check_in and check_out:
             # Get rooms that are not booked in the given date range
-            booked_room_ids = db.execute("""
-                SELECT DISTINCT room_id FROM bookings 
-                WHERE (check_in <= ? AND check_out >= ?) 
-                AND booking_status IN ('Pending', 'Confirmed')
-            """, (check_out, check_in)).fetchall()
-            
-            booked_ids = [row['room_id'] for row in booked_room_ids]
-            booked_ids_placeholder = ','.join('?' * len(booked_ids)) if booked_ids else '0'
-            
             rooms = db.execute(f"""
-                SELECT * FROM rooms 
+                SELECT * FROM rooms r
                 WHERE status = 'Available' 
-                AND room_id NOT IN ({booked_ids_placeholder})
+                AND {ROOM_IS_FREE}
                 ORDER BY price ASC
-            """, booked_ids).fetchall()
+            """, (check_in, check_out)).fetchall()
         else:
             # Get all available rooms
             rooms = db.execute("""
@@ -1,16 +1,19 @@
 from flask import Flask, request, jsonify
 from flask_swagger_ui import get_swaggerui_blueprint
 from flask_cors import CORS
-import sqlite3
+from db_pool import get_db, init_pool
+from passwords import PasswordBusy, busy_response, hash_password, start_workers
+from metrics import init_metrics
+from pagination import EXPOSED_HEADERS, paginate
+from write_queue import WriteTimeout, get_writer, insert_booking, insert_payment
 
 app = Flask(__name__, static_folder='static')
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=EXPOSED_HEADERS)  # Enable CORS for all routes
 
 # ---------------- Database connection ----------------
-def get_db():
-    conn = sqlite3.connect("hotel_booking.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+start_workers()  # password hashing processes, forked before any thread starts
+init_pool(app)
+init_metrics(app)  # per-route latency, SQL and status counts on /metrics
 
 # ---------------- Swagger ----------------
 SWAGGER_URL = "/swagger"
@@ -32,16 +35,22 @@ def home():
 # ================== USERS ==================
 @app.route("/users", methods=["GET", "POST"])
 def users():
+    if request.method == "POST":
+        # Hashed before taking a connection: the hash can wait for a worker
+        try:
+            hashed_password = hash_password(request.json["password"])
+        except PasswordBusy:
+            return busy_response()
     db = get_db()
     if request.method == "GET":
-        data = db.execute("SELECT * FROM users").fetchall()
+        response = paginate(db, "SELECT * FROM users", [("user_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
     db.execute(
         "INSERT INTO users (name, email, password, phone) VALUES (?, ?, ?, ?)",
-        (data["name"], data["email"], data["password"], data.get("phone"))
+        (data["name"], data["email"], hashed_password, data.get("phone"))
     )
     db.commit()
     db.close()
@@ -49,6 +58,11 @@ def users():
 
 @app.route("/users/<int:user_id>", methods=["GET", "PUT", "DELETE"])
 def user_detail(user_id):
+    if request.method == "PUT":
+        try:
+            hashed_password = hash_password(request.json["password"])  # before taking a connection
+        except PasswordBusy:
+            return busy_response()
     db = get_db()
     if request.method == "GET":
         user = db.execute("SELECT * FROM users WHERE user_id=?", (user_id,)).fetchone()
@@ -62,7 +76,7 @@ def user_detail(user_id):
         db.execute("""
             UPDATE users SET name=?, email=?, password=?, phone=?
             WHERE user_id=?
-        """, (data["name"], data["email"], data["password"], data.get("phone"), user_id))
+        """, (data["name"], data["email"], hashed_password, data.get("phone"), user_id))
         db.commit()
         db.close()
         return jsonify({"message": "User updated"})
@@ -78,9 +92,9 @@ def user_detail(user_id):
 def rooms():
     db = get_db()
     if request.method == "GET":
-        data = db.execute("SELECT * FROM rooms").fetchall()
+        response = paginate(db, "SELECT * FROM rooms", [("room_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
     db.execute(
@@ -120,24 +134,25 @@ def room_detail(room_id):
 # ================== BOOKINGS ==================
 @app.route("/bookings", methods=["GET", "POST"])
 def bookings():
-    db = get_db()
     if request.method == "GET":
-        data = db.execute("""
+        db = get_db()
+        response = paginate(db, """
             SELECT b.*, u.name as user_name, r.room_number
             FROM bookings b
             JOIN users u ON b.user_id=u.user_id
             JOIN rooms r ON b.room_id=r.room_id
-        """).fetchall()
+        """, [("b.booking_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
-    db.execute(
-        "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status) VALUES (?, ?, ?, ?, ?, ?)",
-        (data["user_id"], data["room_id"], data["check_in"], data["check_out"], data.get("booking_status", "Pending"), data.get("arrival_status", "Not Arrived"))
-    )
-    db.commit()
-    db.close()
+    try:
+        get_writer().run(
+            insert_booking,
+            data["user_id"], data["room_id"], data["check_in"], data["check_out"], data.get("booking_status", "Pending"), data.get("arrival_status", "Not Arrived")
+        )
+    except WriteTimeout as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     return jsonify({"message": "Booking created"}), 201
 
 @app.route("/bookings/<int:booking_id>", methods=["GET", "PUT", "DELETE"])
@@ -169,19 +184,20 @@ def booking_detail(booking_id):
 # ================== PAYMENTS ==================
 @app.route("/payments", methods=["GET", "POST"])
 def payments():
-    db = get_db()
     if request.method == "GET":
-        data = db.execute("SELECT * FROM payments").fetchall()
+        db = get_db()
+        response = paginate(db, "SELECT * FROM payments", [("payment_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
-    db.execute(
-        "INSERT INTO payments (booking_id, amount, payment_method, payment_status) VALUES (?, ?, ?, ?)",
-        (data["booking_id"], data["amount"], data.get("payment_method", "Paytm"), data.get("payment_status", "Pending"))
-    )
-    db.commit()
-    db.close()
+    try:
+        get_writer().run(
+            insert_payment,
+            data["booking_id"], data["amount"], data.get("payment_method", "Paytm"), data.get("payment_status", "Pending")
+        )
+    except WriteTimeout as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     return jsonify({"message": "Payment added"}), 201
 
 @app.route("/payments/<int:payment_id>", methods=["GET", "PUT", "DELETE"])
@@ -215,14 +231,14 @@ def payment_detail(payment_id):
 def reviews():
     db = get_db()
     if request.method == "GET":
-        data = db.execute("""
+        response = paginate(db, """
             SELECT r.*, u.name as user_name, rm.room_number
             FROM reviews r
             JOIN users u ON r.user_id=u.user_id
             JOIN rooms rm ON r.room_id=rm.room_id
-        """).fetchall()
+        """, [("r.review_id", "ASC")])
         db.close()
-        return jsonify([dict(x) for x in data])
+        return response
 
     data = request.json
     db.execute(
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+# ---------------- Request metrics ----------------
+# init_metrics(app) times every request and serves the totals on /metrics
+# in the Prometheus text format:
+#
+#   hotel_http_request_duration_seconds   histogram per method and route
+#   hotel_http_responses_total            counter per method, route, status
+#   hotel_http_requests_in_flight         gauge
+#   hotel_sql_queries_total               statements run per method and route
+#   hotel_sql_seconds_total               time spent in them
+#   hotel_db_pool_*                       connection pool gauges and counters
+#
+# The route is the URL rule ("/rooms/<int:room_id>"), so the number of
+# series stays bounded; requests no rule matched share one label. SQL is
+# counted by the request's pooled connection handle (db_pool.PooledConnection),
+# so statements the write queue runs for a request are not in it; their
+# wait is in the request's duration. A request costs two clock reads, a
+# bisect and two short critical sections; the text is only built when
+# /metrics is scraped.
+ENABLED = os.environ.get("HOTEL_METRICS", "1") == "1"
+# Upper bounds of the latency histogram, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RouteStats:
+    __slots__ = ("buckets", "count", "seconds", "queries", "sql_seconds")
+
+    def __init__(self, size):
+        self.buckets = [0] * size  # per bucket, not cumulative; the last one is +Inf
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = buckets
+        self._lock = threading.Lock()
+        self._routes = {}  # (method, route) -> RouteStats
+        self._responses = {}  # (method, route, status) -> count
+        self.in_flight = 0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, method, route, status, seconds, queries=0, sql_seconds=0.0):
+        """Record one finished request (and take it off the in-flight gauge)"""
+        bucket = bisect_left(self.bounds, seconds)
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats(len(self.bounds) + 1)
+            stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.seconds += seconds
+            stats.queries += queries
+            stats.sql_seconds += sql_seconds
+            key = (method, route, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def snapshot(self):
+        """(in_flight, {(method, route): RouteStats copy}, {(method, route, status): count})"""
+        with self._lock:
+            routes = {}
+            for key, stats in self._routes.items():
+                copy = routes[key] = RouteStats(0)
+                copy.buckets = list(stats.buckets)
+                copy.count, copy.seconds = stats.count, stats.seconds
+                copy.queries, copy.sql_seconds = stats.queries, stats.sql_seconds
+            return self.in_flight, routes, dict(self._responses)
+
+    def render(self, pool_stats=None):
+        """Everything in the Prometheus text exposition format"""
+        in_flight, routes, responses = self.snapshot()
+        lines = [
+            "# HELP hotel_http_request_duration_seconds Time to handle a request, by route",
+            "# TYPE hotel_http_request_duration_seconds histogram",
+        ]
+        for (method, route), stats in sorted(routes.items()):
+            labels = f'method="{method}",route="{escape(route)}"'
+            total = 0
+            for bound, count in zip(self.bounds, stats.buckets):
+                total += count
+                lines.append(f'hotel_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f'hotel_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"hotel_http_request_duration_seconds_sum{{{labels}}} {stats.seconds!r}")
+            lines.append(f"hotel_http_request_duration_seconds_count{{{labels}}} {stats.count}")
+
+        lines += [
+            "# HELP hotel_http_responses_total Responses sent, by route and status code",
+            "# TYPE hotel_http_responses_total counter",
+        ]
+        for (method, route, status), count in sorted(responses.items()):
+            lines.append(f'hotel_http_responses_total{{method="{method}",route="{escape(route)}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP hotel_http_requests_in_flight Requests being handled right now",
+            "# TYPE hotel_http_requests_in_flight gauge",
+            f"hotel_http_requests_in_flight {in_flight}",
+            "# HELP hotel_sql_queries_total SQL statements run by requests, by route",
+            "# TYPE hotel_sql_queries_total counter",
+        ]
+        for (method, route), stats in sorted(routes.items()):
+            lines.append(f'hotel_sql_queries_total{{method="{method}",route="{escape(route)}"}} {stats.queries}')
+        lines += [
+            "# HELP hotel_sql_seconds_total Time requests spent running SQL statements, by route",
+            "# TYPE hotel_sql_seconds_total counter",
+        ]
+        for (method, route), stats in sorted(routes.items()):
+            lines.append(f'hotel_sql_seconds_total{{method="{method}",route="{escape(route)}"}} {stats.sql_seconds!r}')
+
+        if pool_stats is not None:
+            lines += [
+                "# HELP hotel_db_pool_connections Pooled connections, by state",
+                "# TYPE hotel_db_pool_connections gauge",
+            ]
+            for state in ("open", "idle", "in_use"):
+                lines.append(f'hotel_db_pool_connections{{state="{state}"}} {pool_stats[state]}')
+            lines += [
+                "# HELP hotel_db_pool_size Most connections the pool opens",
+                "# TYPE hotel_db_pool_size gauge",
+                f"hotel_db_pool_size {pool_stats['size']}",
+            ]
+            for name, help_text in (
+                ("checkouts", "Connections handed out"),
+                ("created", "Connections opened"),
+                ("waits", "Checkouts that had to wait for a free connection"),
+                ("timeouts", "Checkouts that gave up waiting"),
+                ("discarded", "Connections closed because they were broken"),
+            ):
+                lines += [
+                    f"# HELP hotel_db_pool_{name}_total {help_text}",
+                    f"# TYPE hotel_db_pool_{name}_total counter",
+                    f"hotel_db_pool_{name}_total {pool_stats[name]}",
+                ]
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+# ---------------- Flask integration ----------------
+def init_metrics(app, registry=metrics):
+    """Time every request of `app` and serve the totals on GET /metrics"""
+    if not ENABLED:
+        return
+
+    from db_pool import pool
+
+    def start():
+        if request.endpoint == "metrics":
+            return
+        registry.started()
+        g._metrics_started = time.perf_counter()
+
+    def finish(status):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        rule = request.url_rule
+        db = g.get("_pooled_db")
+        registry.observe(
+            request.method, rule.rule if rule is not None else UNMATCHED, status, elapsed,
+            db.queries if db is not None else 0, db.sql_seconds if db is not None else 0.0
+        )
+
+    def after(response):
+        finish(response.status_code)
+        return response
+
+    def teardown(exc=None):
+        finish(500)  # only if after() never ran for this request
+
+    def export():
+        return Response(registry.render(pool.stats()), content_type=CONTENT_TYPE)
+
+    app.before_request(start)
+    app.after_request(after)
+    app.teardown_request(teardown)
+    app.add_url_rule("/metrics", "metrics", export, methods=["GET"])
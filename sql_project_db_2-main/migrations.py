@@ -0,0 +1,995 @@
+import sqlite3
+
+import dashboard_stats
+import rollups
+import room_ratings
+import room_scores
+import room_search
+
+# ================== MIGRATIONS ==================
+# Ordered (version, name, steps). Each step is either a SQL string or a
+# function taking the connection; every step must be safe to re-run so a
+# half-migrated database (or one built by an older create_database.py)
+# can be brought up to date.
+
+
+def add_column(table, column, decl):
+    def step(conn):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return step
+
+
+BASELINE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        phone TEXT,
+        status TEXT DEFAULT 'active',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS admins (
+        admin_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT DEFAULT 'admin'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rooms (
+        room_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_number TEXT UNIQUE NOT NULL,
+        room_type TEXT,
+        price REAL NOT NULL,
+        status TEXT DEFAULT 'Available',
+        description TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS room_features (
+        feature_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        feature_name TEXT UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS room_services (
+        service_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        service_name TEXT UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS room_feature_map (
+        room_id INTEGER,
+        feature_id INTEGER,
+        PRIMARY KEY (room_id, feature_id),
+        FOREIGN KEY (room_id) REFERENCES rooms(room_id) ON DELETE CASCADE,
+        FOREIGN KEY (feature_id) REFERENCES room_features(feature_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS room_service_map (
+        room_id INTEGER,
+        service_id INTEGER,
+        PRIMARY KEY (room_id, service_id),
+        FOREIGN KEY (room_id) REFERENCES rooms(room_id) ON DELETE CASCADE,
+        FOREIGN KEY (service_id) REFERENCES room_services(service_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bookings (
+        booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        room_id INTEGER NOT NULL,
+        check_in DATE NOT NULL,
+        check_out DATE NOT NULL,
+        booking_status TEXT DEFAULT 'Pending',
+        arrival_status TEXT DEFAULT 'Not Arrived',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(user_id),
+        FOREIGN KEY (room_id) REFERENCES rooms(room_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payments (
+        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_id INTEGER UNIQUE,
+        amount REAL NOT NULL,
+        payment_method TEXT DEFAULT 'Paytm',
+        payment_status TEXT DEFAULT 'Pending',
+        payment_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (booking_id) REFERENCES bookings(booking_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS refunds (
+        refund_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payment_id INTEGER,
+        refund_amount REAL,
+        refund_status TEXT DEFAULT 'Initiated',
+        refund_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (payment_id) REFERENCES payments(payment_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reviews (
+        review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        room_id INTEGER,
+        rating INTEGER CHECK (rating BETWEEN 1 AND 5),
+        comment TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(user_id),
+        FOREIGN KEY (room_id) REFERENCES rooms(room_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS invoices (
+        invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_id INTEGER UNIQUE,
+        total_amount REAL,
+        invoice_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (booking_id) REFERENCES bookings(booking_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS system_settings (
+        setting_key TEXT PRIMARY KEY,
+        setting_value TEXT
+    )
+    """,
+]
+
+# Secondary indexes for the queries the backends run on every request
+HOT_PATH_INDEXES = [
+    # Booking conflict check: room_id = ? AND check_in < ? AND check_out > ?
+    "CREATE INDEX IF NOT EXISTS idx_bookings_room_dates ON bookings(room_id, check_in, check_out, booking_status)",
+    # Date-only availability filter; check_out first skips past stays
+    "CREATE INDEX IF NOT EXISTS idx_bookings_dates ON bookings(check_out, check_in, booking_status, room_id)",
+    # /user/bookings ... WHERE user_id = ? ORDER BY created_at DESC
+    "CREATE INDEX IF NOT EXISTS idx_bookings_user ON bookings(user_id, created_at)",
+    # Dashboard per-status counts and COUNT(DISTINCT user_id)
+    "CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(booking_status, user_id)",
+    # Analytics and reports filter on created_at ranges
+    "CREATE INDEX IF NOT EXISTS idx_bookings_created ON bookings(created_at)",
+    # Rating subqueries: AVG(rating) / COUNT(*) WHERE room_id = ?
+    "CREATE INDEX IF NOT EXISTS idx_reviews_room ON reviews(room_id, rating)",
+    # Review listings ORDER BY created_at DESC
+    "CREATE INDEX IF NOT EXISTS idx_reviews_created ON reviews(created_at)",
+    # "already reviewed this room" check
+    "CREATE INDEX IF NOT EXISTS idx_reviews_user_room ON reviews(user_id, room_id)",
+    # Revenue sums: payment_status = 'Completed' AND payment_date ...
+    "CREATE INDEX IF NOT EXISTS idx_payments_status_date ON payments(payment_status, payment_date, amount)",
+    "CREATE INDEX IF NOT EXISTS idx_refunds_payment ON refunds(payment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_refunds_date ON refunds(refund_date)",
+    # /admin/users ORDER BY created_at DESC
+    "CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at)",
+]
+
+# Every booking write is logged so in-memory availability calendars (in
+# this and other worker processes) can catch up incrementally
+BOOKING_CHANGE_LOG = [
+    """
+    CREATE TABLE IF NOT EXISTS booking_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_id INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_bookings_log_insert AFTER INSERT ON bookings
+    BEGIN
+        INSERT INTO booking_changes (booking_id) VALUES (NEW.booking_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_bookings_log_update
+    AFTER UPDATE OF booking_id, room_id, check_in, check_out, booking_status ON bookings
+    BEGIN
+        INSERT INTO booking_changes (booking_id) VALUES (OLD.booking_id);
+        INSERT INTO booking_changes (booking_id)
+        SELECT NEW.booking_id WHERE NEW.booking_id != OLD.booking_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_bookings_log_delete AFTER DELETE ON bookings
+    BEGIN
+        INSERT INTO booking_changes (booking_id) VALUES (OLD.booking_id);
+    END
+    """,
+]
+
+# Admin dashboard counters, kept current by triggers so the dashboard
+# reads one row instead of re-counting the tables. "Today" counters are
+# kept per day in dashboard_daily, keyed by the date part of created_at /
+# payment_date. dashboard_stats.py rebuilds both and checks for drift.
+#
+#   confirmed_stay_value  SUM(room price * nights) of Confirmed bookings
+#   active_users          users with at least one Confirmed booking
+STAY_VALUE = """CASE WHEN {b}.booking_status IS 'Confirmed' THEN COALESCE(
+                (SELECT price FROM rooms WHERE room_id = {b}.room_id)
+                * (julianday({b}.check_out) - julianday({b}.check_in)), 0) ELSE 0 END"""
+CONFIRMED_NIGHTS = """(SELECT COALESCE(SUM(julianday(check_out) - julianday(check_in)), 0)
+                FROM bookings WHERE room_id = {r}.room_id AND booking_status = 'Confirmed')"""
+# 1 when booking {b} is Confirmed and no other Confirmed booking (ignoring
+# the row being changed) belongs to the same user
+FIRST_CONFIRMED = """({b}.booking_status IS 'Confirmed' AND NOT EXISTS (
+                SELECT 1 FROM bookings WHERE user_id = {b}.user_id
+                AND booking_status = 'Confirmed' AND booking_id NOT IN ({ignore})))"""
+COMPLETED = "CASE WHEN {p}.payment_status IS 'Completed' THEN {p}.amount ELSE 0 END"
+ADD_TO_DAY = """INSERT INTO dashboard_daily (day, {column})
+        SELECT substr({day}, 1, 10), {amount} WHERE {day} IS NOT NULL
+        ON CONFLICT(day) DO UPDATE SET {column} = {column} + excluded.{column};"""
+TAKE_FROM_DAY = "UPDATE dashboard_daily SET {column} = {column} - ({amount}) WHERE day = substr({day}, 1, 10);"
+
+DASHBOARD_STATS = [
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_users INTEGER NOT NULL DEFAULT 0,
+        total_rooms INTEGER NOT NULL DEFAULT 0,
+        occupied_rooms INTEGER NOT NULL DEFAULT 0,
+        total_bookings INTEGER NOT NULL DEFAULT 0,
+        pending_bookings INTEGER NOT NULL DEFAULT 0,
+        confirmed_bookings INTEGER NOT NULL DEFAULT 0,
+        cancelled_bookings INTEGER NOT NULL DEFAULT 0,
+        active_users INTEGER NOT NULL DEFAULT 0,
+        completed_revenue REAL NOT NULL DEFAULT 0,
+        confirmed_stay_value REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_daily (
+        day TEXT PRIMARY KEY,
+        bookings_created INTEGER NOT NULL DEFAULT 0,
+        completed_revenue REAL NOT NULL DEFAULT 0
+    )
+    """,
+    # ---- users ----
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_insert AFTER INSERT ON users
+    BEGIN
+        UPDATE dashboard_stats SET total_users = total_users + 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_users_delete AFTER DELETE ON users
+    BEGIN
+        UPDATE dashboard_stats SET total_users = total_users - 1 WHERE id = 1;
+    END
+    """,
+    # ---- rooms ----
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rooms_insert AFTER INSERT ON rooms
+    BEGIN
+        UPDATE dashboard_stats SET
+            total_rooms = total_rooms + 1,
+            occupied_rooms = occupied_rooms + (NEW.status IS 'Occupied'),
+            confirmed_stay_value = confirmed_stay_value + NEW.price * {CONFIRMED_NIGHTS.format(r="NEW")}
+        WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rooms_update AFTER UPDATE OF room_id, status, price ON rooms
+    BEGIN
+        UPDATE dashboard_stats SET
+            occupied_rooms = occupied_rooms + (NEW.status IS 'Occupied') - (OLD.status IS 'Occupied'),
+            confirmed_stay_value = confirmed_stay_value
+                + NEW.price * {CONFIRMED_NIGHTS.format(r="NEW")}
+                - OLD.price * {CONFIRMED_NIGHTS.format(r="OLD")}
+        WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rooms_delete AFTER DELETE ON rooms
+    BEGIN
+        UPDATE dashboard_stats SET
+            total_rooms = total_rooms - 1,
+            occupied_rooms = occupied_rooms - (OLD.status IS 'Occupied'),
+            confirmed_stay_value = confirmed_stay_value - OLD.price * {CONFIRMED_NIGHTS.format(r="OLD")}
+        WHERE id = 1;
+    END
+    """,
+    # ---- bookings ----
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_bookings_insert AFTER INSERT ON bookings
+    BEGIN
+        UPDATE dashboard_stats SET
+            total_bookings = total_bookings + 1,
+            pending_bookings = pending_bookings + (NEW.booking_status IS 'Pending'),
+            confirmed_bookings = confirmed_bookings + (NEW.booking_status IS 'Confirmed'),
+            cancelled_bookings = cancelled_bookings + (NEW.booking_status IS 'Cancelled'),
+            active_users = active_users + {FIRST_CONFIRMED.format(b="NEW", ignore="NEW.booking_id")},
+            confirmed_stay_value = confirmed_stay_value + {STAY_VALUE.format(b="NEW")}
+        WHERE id = 1;
+        {ADD_TO_DAY.format(column="bookings_created", day="NEW.created_at", amount=1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_bookings_update
+    AFTER UPDATE OF booking_id, user_id, room_id, check_in, check_out, booking_status ON bookings
+    BEGIN
+        UPDATE dashboard_stats SET
+            pending_bookings = pending_bookings
+                + (NEW.booking_status IS 'Pending') - (OLD.booking_status IS 'Pending'),
+            confirmed_bookings = confirmed_bookings
+                + (NEW.booking_status IS 'Confirmed') - (OLD.booking_status IS 'Confirmed'),
+            cancelled_bookings = cancelled_bookings
+                + (NEW.booking_status IS 'Cancelled') - (OLD.booking_status IS 'Cancelled'),
+            active_users = active_users
+                + {FIRST_CONFIRMED.format(b="NEW", ignore="OLD.booking_id, NEW.booking_id")}
+                - {FIRST_CONFIRMED.format(b="OLD", ignore="OLD.booking_id, NEW.booking_id")},
+            confirmed_stay_value = confirmed_stay_value
+                + {STAY_VALUE.format(b="NEW")}
+                - {STAY_VALUE.format(b="OLD")}
+        WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_bookings_created AFTER UPDATE OF created_at ON bookings
+    WHEN OLD.created_at IS NOT NEW.created_at
+    BEGIN
+        {TAKE_FROM_DAY.format(column="bookings_created", day="OLD.created_at", amount=1)}
+        {ADD_TO_DAY.format(column="bookings_created", day="NEW.created_at", amount=1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_bookings_delete AFTER DELETE ON bookings
+    BEGIN
+        UPDATE dashboard_stats SET
+            total_bookings = total_bookings - 1,
+            pending_bookings = pending_bookings - (OLD.booking_status IS 'Pending'),
+            confirmed_bookings = confirmed_bookings - (OLD.booking_status IS 'Confirmed'),
+            cancelled_bookings = cancelled_bookings - (OLD.booking_status IS 'Cancelled'),
+            active_users = active_users - {FIRST_CONFIRMED.format(b="OLD", ignore="OLD.booking_id")},
+            confirmed_stay_value = confirmed_stay_value - {STAY_VALUE.format(b="OLD")}
+        WHERE id = 1;
+        {TAKE_FROM_DAY.format(column="bookings_created", day="OLD.created_at", amount=1)}
+    END
+    """,
+    # ---- payments ----
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_payments_insert AFTER INSERT ON payments
+    BEGIN
+        UPDATE dashboard_stats SET completed_revenue = completed_revenue + {COMPLETED.format(p="NEW")} WHERE id = 1;
+        {ADD_TO_DAY.format(column="completed_revenue", day="NEW.payment_date", amount=COMPLETED.format(p="NEW"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_payments_update
+    AFTER UPDATE OF amount, payment_status, payment_date ON payments
+    BEGIN
+        UPDATE dashboard_stats SET completed_revenue = completed_revenue
+            + {COMPLETED.format(p="NEW")} - {COMPLETED.format(p="OLD")} WHERE id = 1;
+        {TAKE_FROM_DAY.format(column="completed_revenue", day="OLD.payment_date", amount=COMPLETED.format(p="OLD"))}
+        {ADD_TO_DAY.format(column="completed_revenue", day="NEW.payment_date", amount=COMPLETED.format(p="NEW"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_stats_payments_delete AFTER DELETE ON payments
+    BEGIN
+        UPDATE dashboard_stats SET completed_revenue = completed_revenue - {COMPLETED.format(p="OLD")} WHERE id = 1;
+        {TAKE_FROM_DAY.format(column="completed_revenue", day="OLD.payment_date", amount=COMPLETED.format(p="OLD"))}
+    END
+    """,
+    # Start both tables off from the rows already there
+    lambda conn: dashboard_stats.rebuild_stats(conn),
+]
+
+# Daily fact tables for /admin/analytics and /admin/reports (see
+# rollups.py). Every write logs the days whose facts it changes -- the
+# row's own day and, through payments and refunds, the days of the rows
+# they join to -- and rollups.refresh_rollups() recomputes those days.
+LOG_DAY = "INSERT INTO rollup_changes (day) VALUES (COALESCE(substr({day}, 1, 10), ''));"
+LOG_BOOKING_DAY = """INSERT INTO rollup_changes (day)
+        SELECT COALESCE(substr(created_at, 1, 10), '') FROM bookings WHERE booking_id = {booking_id};"""
+LOG_PAYMENT_DAY = """INSERT INTO rollup_changes (day)
+        SELECT COALESCE(substr(payment_date, 1, 10), '') FROM payments WHERE payment_id = {payment_id};"""
+LOG_ROOM_DAYS = """INSERT INTO rollup_changes (day)
+        SELECT DISTINCT COALESCE(substr(created_at, 1, 10), '') FROM bookings WHERE room_id = {room_id};"""
+
+ANALYTICS_ROLLUPS = [
+    """
+    CREATE TABLE IF NOT EXISTS rollup_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        day TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        high_water INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_bookings (
+        day TEXT NOT NULL,
+        room_type TEXT,
+        room_found INTEGER NOT NULL,
+        booking_status TEXT,
+        bookings INTEGER NOT NULL,
+        nights REAL,
+        stays INTEGER NOT NULL,
+        paid_bookings INTEGER NOT NULL,
+        paid_revenue REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_rollup_bookings_day ON rollup_bookings(day)",
+    """
+    CREATE TABLE IF NOT EXISTS rollup_payments (
+        day TEXT NOT NULL,
+        payment_method TEXT,
+        payments INTEGER NOT NULL,
+        revenue REAL,
+        net_gross REAL,
+        net_refunds REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_rollup_payments_day ON rollup_payments(day)",
+    """
+    CREATE TABLE IF NOT EXISTS rollup_refunds (
+        day TEXT NOT NULL,
+        refunds INTEGER NOT NULL,
+        refunded REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_rollup_refunds_day ON rollup_refunds(day)",
+    # ---- bookings ----
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_bookings_insert AFTER INSERT ON bookings
+    BEGIN
+        {LOG_DAY.format(day="NEW.created_at")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_bookings_update
+    AFTER UPDATE OF booking_id, room_id, check_in, check_out, booking_status, created_at ON bookings
+    BEGIN
+        {LOG_DAY.format(day="OLD.created_at")}
+        {LOG_DAY.format(day="NEW.created_at")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_bookings_delete AFTER DELETE ON bookings
+    BEGIN
+        {LOG_DAY.format(day="OLD.created_at")}
+    END
+    """,
+    # ---- rooms: room_type is a dimension of every booking in the room ----
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_rooms_insert AFTER INSERT ON rooms
+    BEGIN
+        {LOG_ROOM_DAYS.format(room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_rooms_update AFTER UPDATE OF room_id, room_type ON rooms
+    BEGIN
+        {LOG_ROOM_DAYS.format(room_id="OLD.room_id")}
+        {LOG_ROOM_DAYS.format(room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_rooms_delete AFTER DELETE ON rooms
+    BEGIN
+        {LOG_ROOM_DAYS.format(room_id="OLD.room_id")}
+    END
+    """,
+    # ---- payments: their own day and their booking's day ----
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_payments_insert AFTER INSERT ON payments
+    BEGIN
+        {LOG_DAY.format(day="NEW.payment_date")}
+        {LOG_BOOKING_DAY.format(booking_id="NEW.booking_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_payments_update
+    AFTER UPDATE OF payment_id, booking_id, amount, payment_method, payment_status, payment_date ON payments
+    BEGIN
+        {LOG_DAY.format(day="OLD.payment_date")}
+        {LOG_DAY.format(day="NEW.payment_date")}
+        {LOG_BOOKING_DAY.format(booking_id="OLD.booking_id")}
+        {LOG_BOOKING_DAY.format(booking_id="NEW.booking_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_payments_delete AFTER DELETE ON payments
+    BEGIN
+        {LOG_DAY.format(day="OLD.payment_date")}
+        {LOG_BOOKING_DAY.format(booking_id="OLD.booking_id")}
+    END
+    """,
+    # ---- refunds: their own day and their payment's day ----
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_refunds_insert AFTER INSERT ON refunds
+    BEGIN
+        {LOG_DAY.format(day="NEW.refund_date")}
+        {LOG_PAYMENT_DAY.format(payment_id="NEW.payment_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_refunds_update
+    AFTER UPDATE OF payment_id, refund_amount, refund_date ON refunds
+    BEGIN
+        {LOG_DAY.format(day="OLD.refund_date")}
+        {LOG_DAY.format(day="NEW.refund_date")}
+        {LOG_PAYMENT_DAY.format(payment_id="OLD.payment_id")}
+        {LOG_PAYMENT_DAY.format(payment_id="NEW.payment_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_refunds_delete AFTER DELETE ON refunds
+    BEGIN
+        {LOG_DAY.format(day="OLD.refund_date")}
+        {LOG_PAYMENT_DAY.format(payment_id="OLD.payment_id")}
+    END
+    """,
+    # Start the rollups off from the rows already there
+    lambda conn: rollups.rebuild_rollups(conn),
+]
+
+# Writes that can change a cached /rooms/available or /rooms/search body
+# (see response_cache.py). Bookings only matter while Pending/Confirmed.
+ACTIVE = "{b}.booking_status IN ('Pending', 'Confirmed')"
+LOG_STAY = """INSERT INTO cache_changes (kind, room_id, check_in, check_out)
+        SELECT '{kind}', {b}.room_id, {b}.check_in, {b}.check_out WHERE {active};"""
+LOG_ROOM = "INSERT INTO cache_changes (kind, room_id) VALUES ('{kind}', {room_id});"
+
+RESPONSE_CACHE_LOG = [
+    """
+    CREATE TABLE IF NOT EXISTS cache_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        room_id INTEGER,
+        check_in TEXT,
+        check_out TEXT
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_bookings_insert AFTER INSERT ON bookings
+    BEGIN
+        {LOG_STAY.format(kind="booked", b="NEW", active=ACTIVE.format(b="NEW"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_bookings_update
+    AFTER UPDATE OF room_id, check_in, check_out, booking_status ON bookings
+    BEGIN
+        {LOG_STAY.format(kind="freed", b="OLD", active=ACTIVE.format(b="OLD"))}
+        {LOG_STAY.format(kind="booked", b="NEW", active=ACTIVE.format(b="NEW"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_bookings_delete AFTER DELETE ON bookings
+    BEGIN
+        {LOG_STAY.format(kind="freed", b="OLD", active=ACTIVE.format(b="OLD"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_reviews_insert AFTER INSERT ON reviews
+    BEGIN
+        {LOG_ROOM.format(kind="review", room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_reviews_update AFTER UPDATE OF room_id, rating ON reviews
+    BEGIN
+        {LOG_ROOM.format(kind="review", room_id="OLD.room_id")}
+        {LOG_ROOM.format(kind="review", room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_reviews_delete AFTER DELETE ON reviews
+    BEGIN
+        {LOG_ROOM.format(kind="review", room_id="OLD.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_feature_map_insert AFTER INSERT ON room_feature_map
+    BEGIN
+        {LOG_ROOM.format(kind="features", room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_feature_map_update AFTER UPDATE ON room_feature_map
+    BEGIN
+        {LOG_ROOM.format(kind="features", room_id="OLD.room_id")}
+        {LOG_ROOM.format(kind="features", room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_feature_map_delete AFTER DELETE ON room_feature_map
+    BEGIN
+        {LOG_ROOM.format(kind="features", room_id="OLD.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_features_update AFTER UPDATE ON room_features
+    BEGIN
+        {LOG_ROOM.format(kind="rooms", room_id="NULL")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_features_delete AFTER DELETE ON room_features
+    BEGIN
+        {LOG_ROOM.format(kind="rooms", room_id="NULL")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_rooms_insert AFTER INSERT ON rooms
+    BEGIN
+        {LOG_ROOM.format(kind="rooms", room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_rooms_update AFTER UPDATE ON rooms
+    BEGIN
+        {LOG_ROOM.format(kind="rooms", room_id="NEW.room_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_rooms_delete AFTER DELETE ON rooms
+    BEGIN
+        {LOG_ROOM.format(kind="rooms", room_id="OLD.room_id")}
+    END
+    """,
+]
+
+# Per-room document versions for room_details.py: every write that can
+# change GET /rooms/<id> stamps the affected rooms with the next number.
+BUMP_ROOMS = """INSERT INTO room_versions (room_id, version)
+        SELECT room_id, (SELECT COALESCE(MAX(version), 0) + 1 FROM room_versions)
+        FROM ({rooms}) WHERE room_id IS NOT NULL
+        ON CONFLICT(room_id) DO UPDATE SET version = excluded.version;"""
+
+STATEMENT_BREAK = "\n        "
+
+
+def bump_room(room_id):
+    return BUMP_ROOMS.format(rooms=f"SELECT {room_id} AS room_id")
+
+
+def version_triggers(table, bumps, events=("INSERT", "UPDATE", "DELETE"), update_of=None):
+    """One trigger per event on `table`; bumps maps event -> statements"""
+    return [
+        f"""
+    CREATE TRIGGER IF NOT EXISTS trg_room_version_{table}_{event.lower()}
+    AFTER {event}{f" OF {update_of}" if event == "UPDATE" and update_of else ""} ON {table}
+    BEGIN
+        {STATEMENT_BREAK.join(bumps[event])}
+    END
+    """
+        for event in events
+    ]
+
+
+ROOM_VERSIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS room_versions (
+        room_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_room_versions_version ON room_versions(version)",
+    *[
+        trigger
+        for table in ("rooms", "room_feature_map", "room_service_map", "reviews")
+        for trigger in version_triggers(table, {
+            "INSERT": [bump_room("NEW.room_id")],
+            "UPDATE": [bump_room("OLD.room_id"), bump_room("NEW.room_id")],
+            "DELETE": [bump_room("OLD.room_id")],
+        })
+    ],
+    # Renamed features/services and reviewers show up in the documents too
+    *version_triggers("room_features", {
+        event: [BUMP_ROOMS.format(rooms="SELECT room_id FROM room_feature_map WHERE feature_id = OLD.feature_id")]
+        for event in ("UPDATE", "DELETE")
+    }, events=("UPDATE", "DELETE")),
+    *version_triggers("room_services", {
+        event: [BUMP_ROOMS.format(rooms="SELECT room_id FROM room_service_map WHERE service_id = OLD.service_id")]
+        for event in ("UPDATE", "DELETE")
+    }, events=("UPDATE", "DELETE")),
+    *version_triggers("users", {
+        "INSERT": [BUMP_ROOMS.format(rooms="SELECT DISTINCT room_id FROM reviews WHERE user_id = NEW.user_id")],
+        "UPDATE": [
+            BUMP_ROOMS.format(rooms="SELECT DISTINCT room_id FROM reviews WHERE user_id = OLD.user_id"),
+            BUMP_ROOMS.format(rooms="SELECT DISTINCT room_id FROM reviews WHERE user_id = NEW.user_id"),
+        ],
+        "DELETE": [BUMP_ROOMS.format(rooms="SELECT DISTINCT room_id FROM reviews WHERE user_id = OLD.user_id")],
+    }, update_of="user_id, name"),
+]
+
+# Per-room review aggregates for the room listings (see room_ratings.py).
+# A side table rather than columns on rooms: rooms rows stay untouched by
+# reviews, so caches keyed on room writes are not flushed by every review.
+ADD_RATING = """INSERT INTO room_ratings (room_id, review_count, rating_count, rating_sum)
+        SELECT {r}.room_id, 1, {r}.rating IS NOT NULL, COALESCE({r}.rating, 0) WHERE {r}.room_id IS NOT NULL
+        ON CONFLICT(room_id) DO UPDATE SET
+            review_count = review_count + 1,
+            rating_count = rating_count + excluded.rating_count,
+            rating_sum = rating_sum + excluded.rating_sum;"""
+TAKE_RATING = """UPDATE room_ratings SET
+            review_count = review_count - 1,
+            rating_count = rating_count - ({r}.rating IS NOT NULL),
+            rating_sum = rating_sum - COALESCE({r}.rating, 0)
+        WHERE room_id = {r}.room_id;"""
+
+ROOM_RATINGS = [
+    """
+    CREATE TABLE IF NOT EXISTS room_ratings (
+        room_id INTEGER PRIMARY KEY,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        rating_count INTEGER NOT NULL DEFAULT 0,
+        rating_sum REAL NOT NULL DEFAULT 0,
+        avg_rating REAL GENERATED ALWAYS AS (
+            CASE WHEN rating_count > 0 THEN rating_sum / rating_count END
+        ) STORED
+    )
+    """,
+    # min_rating filter: avg_rating >= ?
+    "CREATE INDEX IF NOT EXISTS idx_room_ratings_avg ON room_ratings(avg_rating)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_reviews_insert AFTER INSERT ON reviews
+    BEGIN
+        {ADD_RATING.format(r="NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_reviews_update AFTER UPDATE OF room_id, rating ON reviews
+    BEGIN
+        {TAKE_RATING.format(r="OLD")}
+        {ADD_RATING.format(r="NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_reviews_delete AFTER DELETE ON reviews
+    BEGIN
+        {TAKE_RATING.format(r="OLD")}
+    END
+    """,
+    # Start the table off from the reviews already there
+    lambda conn: room_ratings.rebuild_ratings(conn),
+]
+
+# Full-text index behind the destination search (see room_search.py).
+# Every write that changes what a room is found by re-indexes that room.
+UNINDEX_ROOMS = "DELETE FROM room_search WHERE rowid IN ({rooms});"
+INDEX_ROOMS = """INSERT INTO room_search (rowid, room_number, room_type, description, features)
+        SELECT * FROM ({indexed}) WHERE room_id IN ({rooms});"""
+
+
+def reindex_rooms(rooms):
+    return [UNINDEX_ROOMS.format(rooms=rooms), INDEX_ROOMS.format(indexed=room_search.INDEXED_ROOMS, rooms=rooms)]
+
+
+def search_trigger(name, event, table, statements):
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS trg_search_{name} AFTER {event} ON {table}
+    BEGIN
+        {STATEMENT_BREAK.join(statements)}
+    END
+    """
+
+
+ROOM_SEARCH = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS room_search USING fts5(
+        room_number, room_type, description, features,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"INSERT INTO room_search (room_search, rank) VALUES ('rank', '{room_search.RANK}')",
+    search_trigger("rooms_insert", "INSERT", "rooms", reindex_rooms("NEW.room_id")),
+    search_trigger(
+        "rooms_update", "UPDATE OF room_id, room_number, room_type, description", "rooms",
+        [UNINDEX_ROOMS.format(rooms="OLD.room_id"), *reindex_rooms("NEW.room_id")]
+    ),
+    search_trigger("rooms_delete", "DELETE", "rooms", [UNINDEX_ROOMS.format(rooms="OLD.room_id")]),
+    search_trigger("feature_map_insert", "INSERT", "room_feature_map", reindex_rooms("NEW.room_id")),
+    search_trigger(
+        "feature_map_update", "UPDATE", "room_feature_map",
+        [*reindex_rooms("OLD.room_id"), *reindex_rooms("NEW.room_id")]
+    ),
+    search_trigger("feature_map_delete", "DELETE", "room_feature_map", reindex_rooms("OLD.room_id")),
+    # Map rows can outlive their feature and pick its name up again
+    search_trigger(
+        "features_insert", "INSERT", "room_features",
+        reindex_rooms("SELECT room_id FROM room_feature_map WHERE feature_id = NEW.feature_id")
+    ),
+    search_trigger(
+        "features_update", "UPDATE OF feature_id, feature_name", "room_features",
+        [*reindex_rooms("SELECT room_id FROM room_feature_map WHERE feature_id = OLD.feature_id"),
+         *reindex_rooms("SELECT room_id FROM room_feature_map WHERE feature_id = NEW.feature_id")]
+    ),
+    search_trigger(
+        "features_delete", "DELETE", "room_features",
+        reindex_rooms("SELECT room_id FROM room_feature_map WHERE feature_id = OLD.feature_id")
+    ),
+    # Index the rooms already there
+    lambda conn: room_search.rebuild_index(conn),
+]
+
+# Availability filters and conflict checks look for a room's stays ending
+# after the requested check-in. With check_out second in the key they seek
+# straight to the current and future stays; with check_in second they had
+# to walk the room's whole booking history up to the requested check-out.
+BOOKING_STAY_INDEX = [
+    "CREATE INDEX IF NOT EXISTS idx_bookings_room_stays ON bookings(room_id, check_out, check_in, booking_status)",
+    "DROP INDEX IF EXISTS idx_bookings_room_dates",
+]
+
+# Popularity per room (bookings in the last room_scores.POPULARITY_DAYS
+# days), recomputed wholesale by room_scores.refresh_scores(). Rooms with
+# no recent booking have no row. A refresh that changed any score bumps
+# score_state.version; the trigger tells the response cache to drop
+# listings ordered by score.
+ROOM_SCORES = [
+    """
+    CREATE TABLE IF NOT EXISTS room_scores (
+        room_id INTEGER PRIMARY KEY,
+        popularity INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS score_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0,
+        computed_at DATETIME
+    )
+    """,
+    "INSERT OR IGNORE INTO score_state (id, version) VALUES (1, 0)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_cache_scores_update AFTER UPDATE OF version ON score_state
+    BEGIN
+        {LOG_ROOM.format(kind="scores", room_id="NULL")}
+    END
+    """,
+    lambda conn: room_scores.compute_scores(conn),
+]
+
+# JWTs revoked before they expire (POST /auth/logout), by SHA-256 of the
+# token. The verified-token cache in every process reads the rows past
+# the last revoked_id it saw whenever PRAGMA data_version moves, and drops
+# those tokens; a token it has not cached yet is looked up by hash. Rows
+# of tokens that have expired anyway are deleted by later revocations.
+REVOKED_TOKENS = [
+    """
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        revoked_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        token_hash BLOB NOT NULL UNIQUE,
+        expires INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens(expires)",
+]
+
+# Per-principal versions for principal_cache.py: every insert, update or
+# delete of a users or admins row stamps it with the next number, so the
+# principal cache in every process drops the ones that changed (a status
+# change such as a ban included) the next time it is used.
+BUMP_PRINCIPAL = """INSERT INTO principal_versions (kind, principal_id, version)
+        VALUES ('{kind}', {principal_id}, (SELECT COALESCE(MAX(version), 0) + 1 FROM principal_versions))
+        ON CONFLICT(kind, principal_id) DO UPDATE SET version = excluded.version;"""
+
+
+def principal_triggers(kind, table, key):
+    return [
+        f"""
+    CREATE TRIGGER IF NOT EXISTS trg_principal_version_{table}_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        {STATEMENT_BREAK.join(BUMP_PRINCIPAL.format(kind=kind, principal_id=f"{row}.{key}") for row in rows)}
+    END
+    """
+        for event, rows in (("INSERT", ["NEW"]), ("UPDATE", ["OLD", "NEW"]), ("DELETE", ["OLD"]))
+    ]
+
+
+PRINCIPAL_VERSIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS principal_versions (
+        kind TEXT NOT NULL,
+        principal_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        PRIMARY KEY (kind, principal_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_principal_versions_version ON principal_versions(version)",
+    *principal_triggers("user", "users", "user_id"),
+    *principal_triggers("admin", "admins", "admin_id"),
+]
+
+MIGRATIONS = [
+    (1, "baseline schema", BASELINE_SCHEMA),
+    (2, "rooms.photo_url", [add_column("rooms", "photo_url", "TEXT")]),
+    (3, "hot path indexes", HOT_PATH_INDEXES),
+    (4, "booking change log", BOOKING_CHANGE_LOG),
+    (5, "dashboard stats", DASHBOARD_STATS),
+    (6, "analytics rollups", ANALYTICS_ROLLUPS),
+    (7, "response cache log", RESPONSE_CACHE_LOG),
+    (8, "room document versions", ROOM_VERSIONS),
+    (9, "room rating aggregates", ROOM_RATINGS),
+    (10, "room search index", ROOM_SEARCH),
+    (11, "booking stay index", BOOKING_STAY_INDEX),
+    (12, "room popularity scores", ROOM_SCORES),
+    (13, "revoked tokens", REVOKED_TOKENS),
+    (14, "principal versions", PRINCIPAL_VERSIONS),
+]
+
+
+# ================== RUNNER ==================
+def ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def current_version(conn):
+    ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, target=None, migrations=None):
+    """Apply every pending migration in order; returns the versions applied.
+
+    Each migration runs in its own BEGIN IMMEDIATE transaction and re-checks
+    schema_version inside it, so workers starting together apply it once.
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    ensure_version_table(conn)
+    applied = []
+    for version, name, steps in migrations:
+        if target is not None and version > target:
+            break
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute(
+                "SELECT 1 FROM schema_version WHERE version = ?", (version,)
+            ).fetchone()
+            if done:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--db", default="hotel_booking.db")
+    parser.add_argument("--target", type=int, default=None)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    applied = migrate(conn, args.target)
+    print(f"✅ Schema at version {current_version(conn)} (applied: {applied or 'none'})")
+    conn.close()
@@ -0,0 +1,125 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from flask import jsonify, request
+
+import streaming
+from db_pool import detach_db
+
+# ---------------- Keyset pagination ----------------
+# List endpoints return one page at a time, ordered on a unique key (the
+# primary key, or (created_at, id) for "newest first" lists). The next
+# page starts strictly after the last row sent, so pages stay stable while
+# rows are inserted and every page costs an index seek, not an OFFSET scan.
+#
+# The body stays a plain JSON array (or NDJSON, see streaming.py); the
+# cursor for the next page travels in the X-Next-Cursor header (plus a
+# Link: rel="next" URL) and is absent on the last page.
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+EXPOSED_HEADERS = [NEXT_CURSOR_HEADER, "Link"]
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, width):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != width:
+        raise PaginationError("Invalid cursor")
+    return values
+
+
+def page_args():
+    """(limit, cursor) from the query string; limit is None for ?limit=all"""
+    limit = request.args.get("limit", DEFAULT_LIMIT)
+    if limit == "all":
+        return None, request.args.get("cursor") or None
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer or 'all'")
+    if limit < 1:
+        raise PaginationError("limit must be at least 1")
+    return min(limit, MAX_LIMIT), request.args.get("cursor") or None
+
+
+def keyset_query(select, order, where=None, params=(), cursor=None, limit=None):
+    """(sql, args) for `select` ordered by `order`, resuming after `cursor`.
+
+    `order` is a list of (column, "ASC" | "DESC") that together identify a
+    row, all in the same direction, e.g. [("b.created_at", "DESC"),
+    ("b.booking_id", "DESC")]. The select must return every key column
+    under its bare name.
+    """
+    columns = [column for column, _ in order]
+    direction = order[0][1].upper()
+    clauses = [where] if where else []
+    args = list(params)
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        operator = "<" if direction == "DESC" else ">"
+        clauses.append(f"({', '.join(columns)}) {operator} ({', '.join('?' * len(columns))})")
+        args.extend(values)
+
+    sql = select
+    if clauses:
+        sql += " WHERE " + " AND ".join(f"({clause})" for clause in clauses)
+    sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column in columns)
+    if limit is not None:
+        sql += " LIMIT ?"
+        args.append(limit)
+    return sql, args
+
+
+def fetch_page(db, select, order, where=None, params=(), limit=DEFAULT_LIMIT, cursor=None):
+    """One page of the keyset query; returns (rows, next_cursor)"""
+    sql, args = keyset_query(select, order, where, params, cursor, limit + 1)
+    rows = db.execute(sql, args).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([last[column.split(".")[-1]] for column, _ in order])
+
+
+def page_response(rows, next_cursor):
+    response = streaming.rows_response(rows)
+    if next_cursor:
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        response.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
+
+
+def paginate(db, select, order, where=None, params=()):
+    """Run a list query for the current request and build its response.
+
+    ?limit=all exports every row (from ?cursor on, if given) as a stream
+    instead of a page; see streaming.py.
+    """
+    try:
+        limit, cursor = page_args()
+        if limit is None:
+            sql, args = keyset_query(select, order, where, params, cursor)
+            cursor = db.execute(sql, args)
+            # The stream outlives the request: it owns the connection from here
+            detach_db(db)
+            return streaming.stream_cursor(cursor, release=db.release), 200
+        rows, next_cursor = fetch_page(db, select, order, where, params, limit, cursor)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    return page_response(rows, next_cursor), 200
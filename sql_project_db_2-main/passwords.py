@@ -0,0 +1,213 @@
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+# ---------------- Password hashing ----------------
+# Passwords are stored as scrypt hashes,
+#   scrypt$<cost>$<block size>$<parallelism>$<salt>$<key>
+# with N = 2**cost and the salt and key base64 encoded. One hash takes
+# tens of milliseconds of CPU on purpose (about 75 ms at the default cost
+# of 14). A login storm hashing on the request threads would take that CPU
+# from every other request, so the hashing runs in a small pool of worker
+# processes at a lower scheduling priority (HOTEL_PASSWORD_NICE), and at
+# most HOTEL_PASSWORD_QUEUE hashes wait for a worker. A request that finds
+# the queue full for HOTEL_PASSWORD_WAIT seconds gets PasswordBusy, which
+# every route that hashes answers with busy_response(): a 503 and
+# Retry-After. With HOTEL_PASSWORD_WORKERS=0 the hashing runs on the
+# calling thread instead.
+#
+# The backends used to store unsalted SHA-256 hex digests, plaintext
+# (seed_data.py's demo rows, main.py) and bcrypt (enhanced_backend.py,
+# checked only while the bcrypt package is installed). All of them still
+# verify, and a successful login replaces them, or a scrypt hash made at
+# another cost, with one made at HOTEL_PASSWORD_COST. A password of 64 hex
+# digits stored in plaintext is taken for a SHA-256 digest and no longer
+# matches; the stored digest itself is never accepted as the password.
+#
+# seed_data.py uses it without an app, so flask and the connection pool are
+# only imported by the functions that need them.
+COST = int(os.environ.get("HOTEL_PASSWORD_COST", "14"))
+BLOCK_SIZE = 8
+PARALLELISM = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+WORKERS = int(os.environ.get("HOTEL_PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+QUEUE = int(os.environ.get("HOTEL_PASSWORD_QUEUE", str(8 * max(1, WORKERS))))
+WAIT = float(os.environ.get("HOTEL_PASSWORD_WAIT", "5"))
+NICE = int(os.environ.get("HOTEL_PASSWORD_NICE", "10"))
+
+# table -> its primary key, for the hash upgrade after a login
+ACCOUNTS = {"users": "user_id", "admins": "admin_id"}
+
+SCRYPT = re.compile(r"scrypt\$(\d+)\$(\d+)\$(\d+)\$([A-Za-z0-9+/]+)\$([A-Za-z0-9+/]+)")
+SHA256 = re.compile(r"[0-9a-fA-F]{64}")
+
+BUSY_MESSAGE = "Password hashing is busy, try again shortly"
+
+
+class PasswordBusy(Exception):
+    """Raised when too many password hashes are already waiting for a worker"""
+
+
+def identify(stored):
+    """'scrypt', 'bcrypt', 'sha256' or 'plaintext'"""
+    if SCRYPT.fullmatch(stored):
+        return "scrypt"
+    if stored.startswith(("$2a$", "$2b$", "$2y$")):
+        return "bcrypt"
+    if SHA256.fullmatch(stored):
+        return "sha256"
+    return "plaintext"
+
+
+# ---------------- In the workers ----------------
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, cost, block_size, parallelism):
+    n = 1 << cost
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=block_size, p=parallelism,
+                          maxmem=256 * block_size * n * parallelism + (1 << 20), dklen=KEY_BYTES)
+
+
+def _encode(password, cost):
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, cost, BLOCK_SIZE, PARALLELISM)
+    return f"scrypt${cost}${BLOCK_SIZE}${PARALLELISM}${_b64(salt)}${_b64(key)}"
+
+
+def _check(password, stored, cost):
+    """(matches, the hash to store instead or None)"""
+    scheme = identify(stored)
+    current = False
+    if scheme == "scrypt":
+        stored_cost, block_size, parallelism, salt, key = SCRYPT.fullmatch(stored).groups()
+        params = (int(stored_cost), int(block_size), int(parallelism))
+        matches = hmac.compare_digest(_scrypt(password, _unb64(salt), *params), _unb64(key))
+        current = params == (cost, BLOCK_SIZE, PARALLELISM)
+    elif scheme == "bcrypt":
+        matches = bcrypt is not None and bcrypt.checkpw(password.encode(), stored.encode())
+    elif scheme == "sha256":
+        matches = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored.lower())
+    else:
+        matches = hmac.compare_digest(password.encode(), stored.encode())
+    if not matches:
+        return False, None
+    return True, None if current else _encode(password, cost)
+
+
+def _lower_priority(nice):
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+# ---------------- Worker pool ----------------
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, QUEUE))
+
+
+def _context():
+    # Forked workers start without re-importing the app (a spawned or fork
+    # server child runs the __main__ script again), but a fork copies
+    # whatever locks other threads hold at that moment: start_workers()
+    # forks them all before the app starts its threads
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def _executor():
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(WORKERS, mp_context=_context(),
+                                            initializer=_lower_priority, initargs=(NICE,))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _run(fn, *args):
+    global _pool
+    if WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(timeout=WAIT):
+        raise PasswordBusy(f"more than {QUEUE} password hashes waiting")
+    try:
+        pool = _executor()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            with _pool_lock:
+                if _pool is pool:
+                    _pool = None  # a worker died; the next call starts a new pool
+            raise
+    finally:
+        _slots.release()
+
+
+# ---------------- API ----------------
+def start_workers():
+    """Start the hashing workers now; backends call it before starting any thread"""
+    if WORKERS > 0:
+        _executor().submit(int).result()
+
+
+def hash_password(password, cost=None):
+    """The string to store for `password`"""
+    return _run(_encode, password, COST if cost is None else cost)
+
+
+def verify_password(password, stored, cost=None):
+    """(matches, the hash to store instead or None) for a stored hash of any known scheme"""
+    if not isinstance(password, str) or not isinstance(stored, str) or not stored:
+        return False, None
+    return _run(_check, password, stored, COST if cost is None else cost)
+
+
+def busy_response():
+    """The 503 a route returns when hashing raised PasswordBusy"""
+    from flask import jsonify
+    return jsonify({"error": BUSY_MESSAGE}), 503, {"Retry-After": "1"}
+
+
+def check_password(table, row, password):
+    """True if `password` matches the users / admins row's; upgrades an outdated stored hash.
+
+    Call it holding no pooled connection: the hash can wait for a worker,
+    and login requests holding connections meanwhile would starve the rest.
+    """
+    matches, upgraded = verify_password(password, row["password"])
+    if matches and upgraded is not None:
+        from db_pool import get_db
+        key = ACCOUNTS[table]
+        db = get_db()
+        try:
+            # Only if nobody changed the password since the row was read
+            db.execute(f"UPDATE {table} SET password = ? WHERE {key} = ? AND password = ?",
+                       (upgraded, row[key], row["password"]))
+            db.commit()
+        except sqlite3.OperationalError:
+            db.rollback()  # the login stands; the upgrade happens at the next one
+        finally:
+            db.close()
+    return matches
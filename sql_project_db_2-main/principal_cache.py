@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import storage_profile
+
+# ---------------- Principal cache ----------------
+# clean_backend's tokens name a principal ("user_<id>", "admin_<id>"), and
+# every protected request used to take a pooled connection to read that
+# users / admins row again. The rows (or None for ids with no row) are
+# kept here per (kind, id), LRU-ordered and bounded by count, and read on
+# the cache's own connection when missing.
+#
+# principal_versions (migrations.PRINCIPAL_VERSIONS) gives every principal
+# the sequence number of the last insert, update or delete of its row.
+# Like the room document cache, every lookup first compares PRAGMA
+# data_version and, after any commit, drops the principals whose version
+# moved past the one they were read at, so a ban or an edit made by any
+# process is seen on the next request. The TTL bounds how long a row is
+# served without being read again even so.
+#
+# The rows are shared by every request of the principal; callers must not
+# change them.
+CACHE_SIZE = int(os.environ.get("HOTEL_PRINCIPAL_CACHE_SIZE", "4096"))
+TTL = float(os.environ.get("HOTEL_PRINCIPAL_CACHE_TTL", "60"))
+
+# kind -> statement reading the principal's row
+PRINCIPALS = {
+    "user": "SELECT * FROM users WHERE user_id = ?",
+    "admin": "SELECT * FROM admins WHERE admin_id = ?",
+}
+
+
+class PrincipalCache:
+    def __init__(self, path, size=CACHE_SIZE, ttl=TTL):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        storage_profile.apply_profile(self._conn)
+        self._principals = OrderedDict()  # (kind, id) -> (expires, row dict or None)
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._seen = self._conn.execute(
+            "SELECT COALESCE(MAX(version), 0) FROM principal_versions"
+        ).fetchone()[0]
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "invalidations": 0, "evictions": 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, kind, principal_id):
+        """The principal's users / admins row as a dict, None if it has none"""
+        key = (kind, principal_id)
+        with self._lock:
+            self._sync()
+            cached = self._principals.get(key)
+            if cached is not None:
+                if cached[0] > time.monotonic():
+                    self._principals.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return cached[1]
+                del self._principals[key]
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            # Read after the sync: a commit that lands later moves
+            # data_version and drops the row at the next lookup
+            row = self._conn.execute(PRINCIPALS[kind], (principal_id,)).fetchone()
+            row = dict(row) if row is not None else None
+            self._principals[key] = (time.monotonic() + self.ttl, row)
+            while len(self._principals) > self.size:
+                self._principals.popitem(last=False)
+                self._stats["evictions"] += 1
+            return row
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._principals), size=self.size, ttl=self.ttl)
+
+    def _sync(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        changed = self._conn.execute(
+            "SELECT kind, principal_id, version FROM principal_versions WHERE version > ?", (self._seen,)
+        ).fetchall()
+        for kind, principal_id, principal_version in changed:
+            self._seen = max(self._seen, principal_version)
+            if self._principals.pop((kind, principal_id), None) is not None:
+                self._stats["invalidations"] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_principal_cache(path=None):
+    """Process-wide principal cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if path is None:
+                    from db_pool import pool
+                    path = pool.path
+                _cache = PrincipalCache(path)
+    return _cache
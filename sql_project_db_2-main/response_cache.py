@@ -0,0 +1,246 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import storage_profile
+
+# ---------------- Response cache ----------------
+# /rooms/available and /rooms/search answer the same handful of filter
+# combinations over and over; their JSON bodies are kept here, LRU-ordered
+# and bounded by total body size.
+#
+# Entries are dropped as soon as a write could change them. Triggers on
+# rooms, bookings, reviews and the feature tables append to cache_changes
+# (migrations.RESPONSE_CACHE_LOG); like the availability engine, every
+# lookup first compares PRAGMA data_version and, if anything committed,
+# reads the new log entries:
+#
+#   booked    an active stay appeared: entries for overlapping dates that
+#             list that room
+#   freed     an active stay went away: every entry for overlapping dates
+#   review    entries listing that room, and all min_rating searches
+#   features  entries listing that room, and all searches by destination
+#             or features= (both match on feature names)
+#   scores    the popularity scores were recomputed: entries ordered by them
+#   rooms     a room row or feature name changed: everything
+#
+# An entry whose body depends on rooms it does not list (facet counts
+# over a limited listing) is stored with rooms=None and treated as listing
+# every room.
+#
+# The TTL counts from put(), and hits do not extend it: however often an
+# entry is read, it is rebuilt at least every TTL seconds.
+MAX_BYTES = int(os.environ.get("HOTEL_RESPONSE_CACHE_BYTES", str(16 * 1024 * 1024)))
+TTL = float(os.environ.get("HOTEL_RESPONSE_CACHE_TTL", "60"))
+
+# Change-log entries kept for caches in other processes to catch up from
+CHANGE_RETENTION = 100000
+
+
+class AnyRoom:
+    """The rooms of an entry that depends on every room"""
+
+    def __contains__(self, room_id):
+        return True
+
+
+ANY_ROOM = AnyRoom()
+
+
+class CacheEntry:
+    __slots__ = ("body", "expires", "rooms", "stay", "ratings", "text", "scores")
+
+    def __init__(self, body, expires, rooms, stay, ratings, text, scores):
+        self.body = body
+        self.expires = expires
+        self.rooms = rooms
+        self.stay = stay
+        self.ratings = ratings
+        self.text = text
+        self.scores = scores
+
+
+def overlaps(stay, check_in, check_out):
+    """Same test as the routes' SQL: check_in < stay end AND check_out > stay start"""
+    if check_in is None or check_out is None:
+        return False
+    if not isinstance(check_in, str) or not isinstance(check_out, str):
+        return True  # SQLite orders numbers before text; don't second-guess it
+    return check_in < stay[1] and check_out > stay[0]
+
+
+class ResponseCache:
+    def __init__(self, path, max_bytes=MAX_BYTES, ttl=TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        storage_profile.apply_profile(self._conn)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._last_seq = self._conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM cache_changes"
+        ).fetchone()[0]
+        self._stats = {
+            "hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+            "expirations": 0, "invalidations": 0, "flushes": 0, "stale_skips": 0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- lookups ----
+    def get(self, key):
+        """(body, version): the cached body or None, and the version to pass to put()"""
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._drop(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, self._last_seq
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.body, self._last_seq
+
+    def put(self, key, body, version, rooms, stay=None, ratings=False, text=False, scores=False):
+        """Cache `body` for `key` unless something changed since get() returned `version`.
+
+        rooms: room ids listed in the body (None: it depends on every room);
+        stay: the (check_in, check_out) the result was filtered on; ratings:
+        whether it filtered or ranked on ratings; text: whether it filtered on
+        feature names (destination or features=); scores: whether it ranked
+        on the popularity scores.
+        """
+        size = len(body)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            self._sync()
+            if self._last_seq != version:
+                # A write landed while the body was being built
+                self._stats["stale_skips"] += 1
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = CacheEntry(
+                body, time.monotonic() + self.ttl, ANY_ROOM if rooms is None else frozenset(rooms),
+                stay, ratings, text, scores
+            )
+            self._bytes += size
+            self._stats["stores"] += 1
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                ttl=self.ttl,
+                hit_rate=round(self._stats["hits"] / max(1, self._stats["hits"] + self._stats["misses"]), 4),
+            )
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+    # ---- invalidation ----
+    def _sync(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        changes = self._conn.execute(
+            "SELECT seq, kind, room_id, check_in, check_out FROM cache_changes WHERE seq > ? ORDER BY seq",
+            (self._last_seq,)
+        ).fetchall()
+        if not changes:
+            return
+        oldest = self._conn.execute("SELECT MIN(seq) FROM cache_changes").fetchone()[0]
+        gap = oldest > self._last_seq + 1
+        self._last_seq = changes[-1][0]
+        if gap or any(kind == "rooms" for _, kind, _, _, _ in changes):
+            # Entries we never saw were pruned, or a room row changed
+            self._entries.clear()
+            self._bytes = 0
+            self._stats["flushes"] += 1
+        else:
+            stale = [key for key, entry in self._entries.items() if self._affected(entry, changes)]
+            for key in stale:
+                self._drop(key)
+            self._stats["invalidations"] += len(stale)
+        if self._last_seq - oldest > 2 * CHANGE_RETENTION:
+            self._prune()
+
+    @staticmethod
+    def _affected(entry, changes):
+        for _, kind, room_id, check_in, check_out in changes:
+            if kind == "booked":
+                if entry.stay and room_id in entry.rooms and overlaps(entry.stay, check_in, check_out):
+                    return True
+            elif kind == "freed":
+                if entry.stay and overlaps(entry.stay, check_in, check_out):
+                    return True
+            elif kind == "review":
+                if entry.ratings or room_id in entry.rooms:
+                    return True
+            elif kind == "features":
+                if entry.text or room_id in entry.rooms:
+                    return True
+            elif kind == "scores":
+                if entry.scores:
+                    return True
+            elif room_id in entry.rooms:
+                return True
+        return False
+
+    def _prune(self):
+        # Never wait for the write lock; a later sync will try again
+        timeout = self._conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        self._conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            self._conn.execute(
+                "DELETE FROM cache_changes WHERE seq <= ?",
+                (self._last_seq - CHANGE_RETENTION,)
+            )
+            self._conn.commit()
+        except sqlite3.OperationalError:
+            self._conn.rollback()
+        finally:
+            self._conn.execute(f"PRAGMA busy_timeout = {timeout}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(path=None):
+    """Process-wide response cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if path is None:
+                    from db_pool import pool
+                    path = pool.path
+                _cache = ResponseCache(path)
+    return _cache
@@ -0,0 +1,224 @@
+"""Daily rollups behind /admin/analytics and /admin/reports.
+
+Three fact tables (see migrations.ANALYTICS_ROLLUPS) hold one row per day
+and dimension:
+
+    rollup_bookings  bookings by created day, room_type and status: count,
+                     nights, and the Completed payments made for them
+    rollup_payments  Completed payments by payment day and method: revenue,
+                     plus the sums the net revenue report needs
+    rollup_refunds   refunds by refund day
+
+"Day" is the date part of the timestamp ('' for NULL). Triggers append
+every day a write touches to rollup_changes; refresh_rollups() recomputes
+the days logged past rollup_state.high_water and moves the mark up.
+
+query() answers a date range from the stored facts for the days it covers
+completely, and computes the rest -- the days not refreshed yet and the
+partial days at the ends of the range -- from the base tables with the
+same fact query. Results match the raw queries (float sums up to
+summation order).
+
+Run: python rollups.py [--db hotel_booking.db] [--rebuild]
+"""
+import argparse
+import sqlite3
+import sys
+
+BOOKING_FACTS = """
+    SELECT COALESCE(substr(b.created_at, 1, 10), '') AS day,
+        r.room_type, r.room_id IS NOT NULL AS room_found, b.booking_status,
+        COUNT(*) AS bookings,
+        SUM(julianday(b.check_out) - julianday(b.check_in)) AS nights,
+        COUNT(julianday(b.check_out) - julianday(b.check_in)) AS stays,
+        COUNT(p.payment_id) AS paid_bookings,
+        SUM(p.amount) AS paid_revenue
+    FROM bookings b
+    LEFT JOIN rooms r ON r.room_id = b.room_id
+    LEFT JOIN payments p ON p.booking_id = b.booking_id AND p.payment_status = 'Completed'
+    WHERE {where}
+    GROUP BY 1, 2, 3, 4
+"""
+
+# net_gross / net_refunds reproduce payments LEFT JOIN refunds, where a
+# payment is counted once per refund row
+PAYMENT_FACTS = """
+    SELECT COALESCE(substr(p.payment_date, 1, 10), '') AS day, p.payment_method,
+        COUNT(*) AS payments,
+        SUM(p.amount) AS revenue,
+        SUM(p.amount * MAX(1, (SELECT COUNT(*) FROM refunds f WHERE f.payment_id = p.payment_id))) AS net_gross,
+        SUM((SELECT SUM(f.refund_amount) FROM refunds f WHERE f.payment_id = p.payment_id)) AS net_refunds
+    FROM payments p
+    WHERE p.payment_status = 'Completed' AND {where}
+    GROUP BY 1, 2
+"""
+
+REFUND_FACTS = """
+    SELECT COALESCE(substr(f.refund_date, 1, 10), '') AS day,
+        COUNT(*) AS refunds,
+        SUM(f.refund_amount) AS refunded
+    FROM refunds f
+    WHERE {where}
+    GROUP BY 1
+"""
+
+# kind -> (rollup table, its columns, fact query, timestamp column)
+FACTS = {
+    "bookings": ("rollup_bookings", [
+        "day", "room_type", "room_found", "booking_status", "bookings",
+        "nights", "stays", "paid_bookings", "paid_revenue",
+    ], BOOKING_FACTS, "b.created_at"),
+    "payments": ("rollup_payments", [
+        "day", "payment_method", "payments", "revenue", "net_gross", "net_refunds",
+    ], PAYMENT_FACTS, "p.payment_date"),
+    "refunds": ("rollup_refunds", ["day", "refunds", "refunded"], REFUND_FACTS, "f.refund_date"),
+}
+
+# Sorts after any timestamp starting with a given day
+DAY_END = "\U0010ffff"
+
+
+def day_filter(column, day):
+    """(where, params) matching the rows whose day is `day`"""
+    if day == "":
+        return f"({column} IS NULL OR {column} = '')", []
+    return (
+        f"{column} >= ? AND {column} < ? AND substr({column}, 1, 10) = ?",
+        [day, day + DAY_END, day]
+    )
+
+
+def pending_days(db):
+    """Days changed since the last refresh: the un-rolled tail"""
+    return {row[0] for row in db.execute("""
+        SELECT DISTINCT day FROM rollup_changes
+        WHERE seq > (SELECT high_water FROM rollup_state WHERE id = 1)
+    """)}
+
+
+def facts_sql(db, kind, start=None, end=None):
+    """(sql, params) selecting the facts of rows with start <= timestamp <= end.
+
+    Same string comparison as `timestamp BETWEEN start AND end`; either end
+    may be None. Days strictly inside the range come from the rollup table
+    unless they are pending; the rest are recomputed from the base rows.
+    """
+    table, columns, live, column = FACTS[kind]
+    tail = pending_days(db)
+    lo = start[:10] if start is not None else None
+    hi = end[:10] if end is not None else None
+
+    stored, params = [], []
+    if lo is not None:
+        # A bare date as the start takes in its whole day
+        stored.append("day >= ?" if start == lo else "day > ?")
+        params.append(lo)
+    if hi is not None:
+        stored.append("day < ?")
+        params.append(hi)
+    if tail:
+        stored.append(f"day NOT IN ({', '.join('?' * len(tail))})")
+        params.extend(sorted(tail))
+    parts = [f"SELECT {', '.join(columns)} FROM {table}"
+             + (" WHERE " + " AND ".join(stored) if stored else "")]
+
+    live_days = {day for day in tail if (lo is None or day >= lo) and (hi is None or day <= hi)}
+    if lo is not None and start != lo:
+        live_days.add(lo)
+    if hi is not None:
+        live_days.add(hi)
+    for day in sorted(live_days):
+        where, args = day_filter(column, day)
+        if start is not None:
+            where += f" AND {column} >= ?"
+            args.append(start)
+        if end is not None:
+            where += f" AND {column} <= ?"
+            args.append(end)
+        parts.append(live.format(where=where))
+        params.extend(args)
+    return " UNION ALL ".join(parts), params
+
+
+def query(db, kind, select, params=(), start=None, end=None):
+    """Run `select` against the facts of [start, end], named `facts`"""
+    sql, args = facts_sql(db, kind, start, end)
+    return db.execute(f"WITH facts AS ({sql}) {select}", [*args, *params])
+
+
+def refresh_day(conn, day):
+    for table, columns, live, column in FACTS.values():
+        where, args = day_filter(column, day)
+        conn.execute(f"DELETE FROM {table} WHERE day = ?", (day,))
+        conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) {live.format(where=where)}", args)
+
+
+def refresh_rollups(conn, wait=True):
+    """Recompute the days logged since the high-water mark; returns how many.
+
+    With wait=False a refresh that would have to wait for another writer
+    is skipped (returns None); readers handle the tail either way.
+    """
+    if not pending_days(conn):
+        return 0
+    if conn.in_transaction:
+        conn.commit()
+    if wait:
+        conn.execute("BEGIN IMMEDIATE")
+    else:
+        timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {timeout}")
+    try:
+        top = conn.execute("SELECT MAX(seq) FROM rollup_changes").fetchone()[0]
+        days = pending_days(conn)
+        for day in sorted(days):
+            refresh_day(conn, day)
+        if top is not None:
+            conn.execute("UPDATE rollup_state SET high_water = ? WHERE id = 1", (top,))
+            conn.execute("DELETE FROM rollup_changes WHERE seq <= ?", (top,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(days)
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup from scratch in the caller's transaction"""
+    for table, columns, live, _ in FACTS.values():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) {live.format(where='1')}")
+    conn.execute("""
+        INSERT OR REPLACE INTO rollup_state (id, high_water)
+        VALUES (1, COALESCE((SELECT MAX(seq) FROM rollup_changes),
+                            (SELECT high_water FROM rollup_state WHERE id = 1), 0))
+    """)
+    conn.execute("DELETE FROM rollup_changes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh (or rebuild) the analytics rollups")
+    parser.add_argument("--db", default="hotel_booking.db")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every day from scratch")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.rebuild:
+        conn.execute("BEGIN IMMEDIATE")
+        rebuild_rollups(conn)
+        conn.commit()
+        print("✅ Rollups rebuilt")
+    else:
+        print(f"✅ {refresh_rollups(conn)} days refreshed")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from heapq import nsmallest
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+import storage_profile
+
+# ---------------- Room catalog ----------------
+# /rooms/search filters the catalog on status, price, type, rating and
+# features. Instead of having SQL re-evaluate those predicates (and
+# re-join features and ratings) for every room on every search, the
+# catalog keeps them in memory as parallel columns, one slot per room,
+# ordered the way the listing is (price, then room_id):
+#
+#   _prices     array('d'); text prices, which SQLite sorts after every
+#               number, are +inf
+#   _types      array('l') codes into _type_names; a LIKE on room_type is
+#               matched once per distinct type, not once per room
+#   _statuses   array('l') codes into _status_names
+#   _ratings    array('d') avg_rating from room_ratings, NaN when unrated
+#   _features   int bitmask per room, one bit per (lower-cased) feature name
+#   _rows       the room's listing entry, ready to serialise
+#
+# A search bisects the price range, narrows it filter by filter and never
+# re-sorts. room_versions (migrations.ROOM_VERSIONS) stamps a room on every
+# write to its row, features or reviews; like the room document cache, the
+# catalog compares PRAGMA data_version and re-reads only the rooms stamped
+# since.
+#
+# Facet counts (rooms per type, feature, price bucket and rating bucket)
+# are taken from the same columns in one pass over the final slots.
+# Other orders (relevance, rating, popularity, best match) rank the final
+# slots by key -- a heap when only the top `limit` are wanted -- with ties
+# left in price order. Popularity comes from room_scores.py's precomputed
+# table, reloaded whenever score_state.version moves.
+PRICE_BUCKET = float(os.environ.get("HOTEL_PRICE_BUCKET", "1000"))
+SORTS = ("price", "relevance", "rating", "popularity", "best")
+# sort=best: weighted sum of terms each scaled to [0, 1] -- bm25 relative to
+# the best match, avg_rating / 5, popularity relative to the most popular
+BEST_MATCH_WEIGHTS = {"relevance": 0.5, "rating": 0.3, "popularity": 0.2}
+ROOM_ROWS = """
+    SELECT r.*, rr.avg_rating AS avg_rating, COALESCE(rr.review_count, 0) AS reviews_count
+    FROM rooms r
+    LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
+"""
+ROOM_FEATURES = """
+    SELECT rfm.room_id, rf.feature_name
+    FROM room_feature_map rfm
+    LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
+"""
+
+
+def sort_key(price, room_id):
+    """The listing's ORDER BY r.price: numbers first, then text"""
+    if isinstance(price, (int, float)):
+        return (0, price, room_id)
+    return (1, str(price), room_id)
+
+
+def like(pattern):
+    """Matcher for `value LIKE pattern` as SQLite evaluates it (ASCII-only case folding)"""
+    regex = "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in pattern)
+    return re.compile(regex, re.ASCII | re.IGNORECASE | re.DOTALL).fullmatch
+
+
+class RoomCatalog:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        storage_profile.apply_profile(self._conn)
+        self._stats = {"loads": 0, "syncs": 0, "rooms_reloaded": 0, "searches": 0}
+        self.load()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- loading and syncing ----
+    def load(self):
+        """(Re)build every column from the rooms tables"""
+        with self._lock:
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            self._seen = self._conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM room_versions"
+            ).fetchone()[0]
+            self._type_names, self._type_codes = [], {}
+            self._status_names, self._status_codes = [], {}
+            self._feature_bits = {}
+            self._feature_names = []  # bit -> name as first seen
+            self._keys = []
+            self._ids = array("q")
+            self._prices = array("d")
+            self._types = array("l")
+            self._statuses = array("l")
+            self._ratings = array("d")
+            self._features = []
+            self._rows = []
+            self._slots = {}  # room_id -> sort key
+            for entry in sorted(self._read_rooms(), key=lambda entry: entry[0]):
+                self._append(*entry)
+            self._load_scores()
+            self._stats["loads"] += 1
+
+    def _load_scores(self):
+        self._score_version = self._conn.execute("SELECT version FROM score_state WHERE id = 1").fetchone()[0]
+        self._scores = dict(self._conn.execute("SELECT room_id, popularity FROM room_scores"))
+        self._max_popularity = max(self._scores.values(), default=0)
+
+    def _read_rooms(self, room_ids=None):
+        """[(sort key, row, feature names)] for room_ids (or every room)"""
+        where, params = "", ()
+        if room_ids is not None:
+            where = f" WHERE {{column}} IN ({','.join('?' * len(room_ids))})"
+            params = room_ids
+        names = {}
+        for room_id, name in self._conn.execute(
+            ROOM_FEATURES + where.format(column="rfm.room_id") + " ORDER BY rfm.room_id, rfm.feature_id", params
+        ):
+            names.setdefault(room_id, []).append(name)
+        entries = []
+        for row in self._conn.execute(ROOM_ROWS + where.format(column="r.room_id"), params):
+            row = dict(row)
+            # Same list the SQL path got from splitting GROUP_CONCAT(feature_name)
+            present = [name for name in names.get(row["room_id"], ()) if name is not None]
+            joined = ",".join(present) if present else None
+            row["features"] = joined.split(",") if joined else []
+            entries.append((sort_key(row["price"], row["room_id"]), row, present))
+        return entries
+
+    def _code(self, names, codes, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def _mask(self, names):
+        mask = 0
+        for name in names:
+            bit = self._feature_bits.get(name.lower())
+            if bit is None:
+                bit = self._feature_bits[name.lower()] = len(self._feature_names)
+                self._feature_names.append(name)
+            mask |= 1 << bit
+        return mask
+
+    def _columns(self, key, row, names):
+        price = row["price"]
+        rating = row["avg_rating"]
+        return (
+            key,
+            row["room_id"],
+            float(price) if isinstance(price, (int, float)) else math.inf,
+            self._code(self._type_names, self._type_codes, row["room_type"]),
+            self._code(self._status_names, self._status_codes, row["status"]),
+            math.nan if rating is None else float(rating),
+            self._mask(names),
+            row,
+        )
+
+    def _append(self, key, row, names):
+        self._insert(len(self._keys), key, row, names)
+
+    def _insert(self, i, key, row, names):
+        key, room_id, price, type_code, status_code, rating, mask, row = self._columns(key, row, names)
+        self._keys.insert(i, key)
+        self._ids.insert(i, room_id)
+        self._prices.insert(i, price)
+        self._types.insert(i, type_code)
+        self._statuses.insert(i, status_code)
+        self._ratings.insert(i, rating)
+        self._features.insert(i, mask)
+        self._rows.insert(i, row)
+        self._slots[room_id] = key
+
+    def _remove(self, room_id):
+        key = self._slots.pop(room_id, None)
+        if key is None:
+            return
+        i = bisect_left(self._keys, key)
+        for column in (self._keys, self._ids, self._prices, self._types,
+                       self._statuses, self._ratings, self._features, self._rows):
+            del column[i]
+
+    def _sync(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        score_version = self._conn.execute("SELECT version FROM score_state WHERE id = 1").fetchone()[0]
+        if score_version != self._score_version:
+            self._load_scores()
+        changed = self._conn.execute(
+            "SELECT room_id, version FROM room_versions WHERE version > ?", (self._seen,)
+        ).fetchall()
+        if not changed:
+            return
+        self._seen = max(room_version for _, room_version in changed)
+        room_ids = [room_id for room_id, _ in changed]
+        for i in range(0, len(room_ids), 500):
+            chunk = room_ids[i:i + 500]
+            for room_id in chunk:
+                self._remove(room_id)
+            for key, row, names in self._read_rooms(chunk):
+                self._insert(bisect_left(self._keys, key), key, row, names)
+        self._stats["syncs"] += 1
+        self._stats["rooms_reloaded"] += len(room_ids)
+
+    # ---- queries ----
+    def search(self, min_price=None, max_price=None, room_type=None, min_rating=None, features=(), rooms=None,
+               free=None, facets=False, sort="price", limit=None):
+        """Available rooms passing every filter, as listing entries in `sort` order.
+
+        room_type is a LIKE pattern on the type; features are names the room
+        must all have (any case); rooms, if given, is a container of the
+        room ids to choose from -- for sort=relevance (and to weigh it into
+        sort=best) a mapping of room id to bm25 rank; free, if given, is
+        called last with the remaining room ids and returns the ones to
+        keep. limit keeps only the first `limit` entries. With facets,
+        returns (entries, facet counts over every room that passed, limit
+        or not).
+        """
+        with self._lock:
+            self._sync()
+            self._stats["searches"] += 1
+            # Slots are in price order, so the price filters are a range
+            prices = self._prices
+            lo, hi = 0, len(prices)
+            if min_price is not None:
+                lo = bisect_left(prices, min_price)
+            if max_price is not None:
+                # A text price is above any number but never <= one
+                hi = min(bisect_right(prices, max_price), bisect_left(prices, math.inf))
+            available = self._status_codes.get("Available")
+            statuses = self._statuses
+            slots = [i for i in range(lo, hi) if statuses[i] == available]
+            if rooms is not None:
+                ids = self._ids
+                slots = [i for i in slots if ids[i] in rooms]
+            if room_type is not None:
+                matches = like(room_type)
+                codes = {
+                    code for code, name in enumerate(self._type_names)
+                    if name is not None and matches(str(name))
+                }
+                types = self._types
+                slots = [i for i in slots if types[i] in codes]
+            if min_rating is not None:
+                ratings = self._ratings
+                slots = [i for i in slots if ratings[i] >= min_rating]
+            if features:
+                bits = [self._feature_bits.get(name.lower()) for name in features]
+                if None in bits:
+                    slots = []  # no room has that feature
+                else:
+                    mask = sum(1 << bit for bit in set(bits))
+                    masks = self._features
+                    slots = [i for i in slots if masks[i] & mask == mask]
+            if free is not None and slots:
+                ids = self._ids
+                keep = set(free([ids[i] for i in slots]))
+                slots = [i for i in slots if ids[i] in keep]
+            counts = self._facets(slots) if facets else None
+            if sort != "price":
+                key = self._rank_key(sort, slots, rooms)
+                slots = nsmallest(limit, slots, key) if limit is not None else sorted(slots, key=key)
+            elif limit is not None:
+                slots = slots[:limit]
+            rows = self._rows
+            entries = [rows[i] for i in slots]
+            if facets:
+                return entries, counts
+            return entries
+
+    def _rank_key(self, sort, slots, relevance):
+        """Key over slots for `sort`, smallest first"""
+        ids, ratings, scores = self._ids, self._ratings, self._scores
+        if sort == "relevance":
+            return lambda i: relevance[ids[i]]
+        if sort == "rating":
+            return lambda i: math.inf if math.isnan(ratings[i]) else -ratings[i]
+        if sort == "popularity":
+            return lambda i: -scores.get(ids[i], 0)
+        if sort == "best":
+            weights = BEST_MATCH_WEIGHTS
+            # bm25 ranks are negative, the best match the most negative
+            best_rank = min((relevance[ids[i]] for i in slots), default=0) if isinstance(relevance, dict) else 0
+            text = weights["relevance"] / best_rank if best_rank < 0 else 0
+            rating = weights["rating"] / 5
+            popularity = weights["popularity"] / self._max_popularity if self._max_popularity else 0
+
+            def key(i):
+                score = scores.get(ids[i], 0) * popularity
+                if text:
+                    score += relevance[ids[i]] * text
+                if not math.isnan(ratings[i]):
+                    score += ratings[i] * rating
+                return -score
+            return key
+        raise ValueError(f"sort must be one of: {', '.join(SORTS)}")
+
+    def _facets(self, slots):
+        """Rooms per type, feature, price bucket and rating bucket among slots.
+
+        Price buckets are PRICE_BUCKET wide ({"min", "max"}; text prices in
+        one bucket with both null); rating buckets are whole stars ({"min"}
+        covers [min, min + 1), null for unrated rooms).
+        """
+        # Count each column's distinct values (a C-level pass over the slots),
+        # then fold those into masks' bits, price buckets and whole stars
+        types = Counter(map(self._types.__getitem__, slots))
+        features = Counter()
+        for mask, count in Counter(map(self._features.__getitem__, slots)).items():
+            while mask:
+                low = mask & -mask
+                features[low.bit_length() - 1] += count
+                mask ^= low
+        prices = Counter()
+        for price, count in Counter(map(self._prices.__getitem__, slots)).items():
+            prices[None if price == math.inf else math.floor(price / PRICE_BUCKET)] += count
+        ratings = Counter()
+        for rating, count in Counter(map(self._ratings.__getitem__, slots)).items():
+            ratings[None if math.isnan(rating) else math.floor(rating)] += count
+
+        def by_count(counts, names):
+            return sorted(
+                ({"value": names[code], "count": count} for code, count in counts.items()),
+                key=lambda facet: (-facet["count"], str(facet["value"]))
+            )
+
+        def by_bucket(counts):
+            # Numbered buckets in order, then the null one
+            return sorted(counts.items(), key=lambda item: (item[0] is None, item[0] or 0))
+
+        return {
+            "room_type": by_count(types, self._type_names),
+            "features": by_count(features, self._feature_names),
+            "price": [
+                {"min": None, "max": None, "count": count} if bucket is None else
+                {"min": bucket * PRICE_BUCKET, "max": (bucket + 1) * PRICE_BUCKET, "count": count}
+                for bucket, count in by_bucket(prices)
+            ],
+            "rating": [{"min": bucket, "count": count} for bucket, count in by_bucket(ratings)],
+        }
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, rooms=len(self._keys), feature_bits=len(self._feature_bits))
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog(path=None):
+    """Process-wide room catalog, loaded on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                if path is None:
+                    from db_pool import pool
+                    path = pool.path
+                _catalog = RoomCatalog(path)
+    return _catalog
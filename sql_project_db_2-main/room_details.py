@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import storage_profile
+
+# ---------------- Room detail documents ----------------
+# GET /rooms/<id> assembles the room row, its feature and service names,
+# its reviews (with reviewer names) and the rating aggregate. All of it is
+# read in one statement -- the lists as JSON arrays -- together with the
+# room's entry in room_versions, and the assembled document is cached per
+# room.
+#
+# room_versions (migrations.ROOM_VERSIONS) gives every room the sequence
+# number of the last write that touched its document: the room row, its
+# feature/service maps, its reviews, or the names those point at. The
+# cache watches PRAGMA data_version and, after any commit, drops the
+# documents of rooms whose version moved past the one they were read at.
+CACHE_SIZE = int(os.environ.get("HOTEL_ROOM_CACHE_SIZE", "1024"))
+
+ROOM_DOCUMENT = """
+    SELECT r.*,
+        (SELECT json_group_array(feature_name) FROM (
+            SELECT rf.feature_name
+            FROM room_feature_map rfm
+            JOIN room_features rf ON rfm.feature_id = rf.feature_id
+            WHERE rfm.room_id = r.room_id
+            ORDER BY rfm.feature_id
+        )) AS features,
+        (SELECT json_group_array(service_name) FROM (
+            SELECT rs.service_name
+            FROM room_service_map rsm
+            JOIN room_services rs ON rsm.service_id = rs.service_id
+            WHERE rsm.room_id = r.room_id
+            ORDER BY rsm.service_id
+        )) AS services,
+        (SELECT json_group_array(json_object(
+            'review_id', review_id, 'rating', rating, 'comment', comment,
+            'created_at', created_at, 'user_name', user_name)) FROM (
+            SELECT rv.review_id, rv.rating, rv.comment, rv.created_at, u.name AS user_name
+            FROM reviews rv
+            JOIN users u ON rv.user_id = u.user_id
+            WHERE rv.room_id = r.room_id
+            ORDER BY rv.created_at DESC, rv.review_id DESC
+        )) AS reviews,
+        rr.avg_rating,
+        rr.review_count,
+        (SELECT version FROM room_versions WHERE room_id = r.room_id) AS version
+    FROM rooms r
+    LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
+    WHERE r.room_id = ?
+"""
+
+
+def read_room_document(db, room_id):
+    """(document, version) for one room, or (None, None) if there is no such room"""
+    row = db.execute(ROOM_DOCUMENT, (room_id,)).fetchone()
+    if row is None:
+        return None, None
+    document = dict(row)
+    version = document.pop("version") or 0
+    for name in ("features", "services", "reviews"):
+        document[name] = json.loads(document[name])
+    document["avg_rating"] = round(document["avg_rating"], 1) if document["avg_rating"] else 0
+    document["review_count"] = document["review_count"] if document["review_count"] else 0
+    return document, version
+
+
+class RoomDocumentCache:
+    def __init__(self, path, size=CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        storage_profile.apply_profile(self._conn)
+        self._documents = OrderedDict()  # room_id -> (version, document)
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._seen = self._conn.execute(
+            "SELECT COALESCE(MAX(version), 0) FROM room_versions"
+        ).fetchone()[0]
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, db, room_id):
+        """The room's document, from memory when no write has touched it since"""
+        with self._lock:
+            self._sync()
+            cached = self._documents.get(room_id)
+            if cached is not None:
+                self._documents.move_to_end(room_id)
+                self._stats["hits"] += 1
+                return cached[1]
+            self._stats["misses"] += 1
+        document, version = read_room_document(db, room_id)
+        if document is not None:
+            with self._lock:
+                self._sync()
+                # A write may have landed (and been synced) after our read
+                latest = self._conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) FROM room_versions WHERE room_id = ?", (room_id,)
+                ).fetchone()[0]
+                current = self._documents.get(room_id)
+                if latest == version and (current is None or current[0] < version):
+                    self._documents[room_id] = (version, document)
+                    self._documents.move_to_end(room_id)
+                while len(self._documents) > self.size:
+                    self._documents.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return document
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._documents), size=self.size)
+
+    def _sync(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        changed = self._conn.execute(
+            "SELECT room_id, version FROM room_versions WHERE version > ?", (self._seen,)
+        ).fetchall()
+        for room_id, room_version in changed:
+            self._seen = max(self._seen, room_version)
+            cached = self._documents.get(room_id)
+            if cached is not None and cached[0] < room_version:
+                del self._documents[room_id]
+                self._stats["invalidations"] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_room_cache(path=None):
+    """Process-wide room document cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if path is None:
+                    from db_pool import pool
+                    path = pool.path
+                _cache = RoomDocumentCache(path)
+    return _cache
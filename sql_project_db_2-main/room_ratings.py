@@ -0,0 +1,77 @@
+"""Per-room rating aggregates kept by triggers (see migrations.ROOM_RATINGS).
+
+Room listings read review_count and avg_rating from room_ratings instead
+of running AVG()/COUNT() subqueries over reviews for every room, and the
+min_rating filter seeks idx_room_ratings_avg. This module recomputes the
+table from reviews, either to rebuild it or to check the trigger-kept
+values for drift.
+
+Run: python room_ratings.py [--db hotel_booking.db] [--rebuild]
+"""
+import argparse
+import sqlite3
+import sys
+
+# What the listings used to compute per room
+RAW_RATINGS = """
+    SELECT room_id,
+        COUNT(*) AS review_count,
+        COUNT(rating) AS rating_count,
+        COALESCE(SUM(rating), 0) AS rating_sum,
+        AVG(rating) AS avg_rating
+    FROM reviews
+    WHERE room_id IS NOT NULL
+    GROUP BY room_id
+"""
+
+
+def rebuild_ratings(conn):
+    """Recompute room_ratings from reviews in the caller's transaction"""
+    conn.execute("DELETE FROM room_ratings")
+    conn.execute(f"""
+        INSERT INTO room_ratings (room_id, review_count, rating_count, rating_sum)
+        SELECT room_id, review_count, rating_count, rating_sum FROM ({RAW_RATINGS})
+    """)
+
+
+def find_drift(conn):
+    """[(room_id, stored, actual)] for every room whose aggregates disagree with reviews"""
+    stored = {row[0]: tuple(row[1:]) for row in conn.execute(
+        "SELECT room_id, review_count, rating_count, rating_sum, avg_rating FROM room_ratings"
+    )}
+    drift = []
+    for room_id, *actual in conn.execute(RAW_RATINGS):
+        have = stored.pop(room_id, None)
+        if have != tuple(actual):
+            drift.append((room_id, have, tuple(actual)))
+    # Rooms without reviews any more must be back to zero
+    for room_id, have in stored.items():
+        if have != (0, 0, 0, None):
+            drift.append((room_id, have, (0, 0, 0, None)))
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check (and optionally rebuild) the room rating aggregates")
+    parser.add_argument("--db", default="hotel_booking.db")
+    parser.add_argument("--rebuild", action="store_true", help="recompute room_ratings from scratch")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("BEGIN IMMEDIATE")  # no writes between reading and comparing
+    drift = find_drift(conn)
+    for room_id, stored, actual in drift[:20]:
+        print(f"❌ room {room_id}: stored {stored}, actual {actual}")
+    if args.rebuild:
+        rebuild_ratings(conn)
+        conn.commit()
+        print("✅ Room ratings rebuilt")
+    else:
+        conn.rollback()
+        print(f"{'❌' if drift else '✅'} {len(drift)} rooms drifted")
+    conn.close()
+    return 1 if drift and not args.rebuild else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Precomputed room popularity behind /rooms/search?sort=popularity|best.
+
+Popularity is the number of bookings made for a room in the last
+POPULARITY_DAYS days, cancelled ones excluded. It moves slowly and is
+expensive to count per request, so room_scores (migrations.ROOM_SCORES)
+stores it per room and a background ScoreRefresher recomputes the whole
+table every REFRESH_INTERVAL seconds. A refresh that changed any score
+bumps score_state.version, which tells the room catalog to reload the
+scores and the response cache to drop the listings ordered by them; one
+that found the same scores only updates score_state.computed_at.
+
+Run: python room_scores.py [--db hotel_booking.db]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+
+import storage_profile
+
+POPULARITY_DAYS = 90
+REFRESH_INTERVAL = float(os.environ.get("HOTEL_SCORE_REFRESH_INTERVAL", "300"))
+# Recompute the scores on a background thread while the app runs
+RUN_REFRESHER = os.environ.get("HOTEL_SCORE_REFRESHER", "1") == "1"
+
+# Seeks idx_bookings_created to the window, then groups by room; the
+# unary + keeps the planner from walking every booking in room_id order
+# through idx_bookings_room_stays to skip the grouping sort
+POPULARITY = """
+    SELECT room_id, COUNT(*) AS popularity
+    FROM bookings
+    WHERE created_at >= datetime('now', ?) AND booking_status != 'Cancelled' AND room_id IS NOT NULL
+    GROUP BY +room_id
+"""
+
+
+def window():
+    return f"-{POPULARITY_DAYS} days"
+
+
+# Rows that differ between the stored scores and the ones just counted,
+# in either direction
+SCORE_CHANGES = """
+    SELECT EXISTS (
+        SELECT room_id, popularity FROM room_scores EXCEPT SELECT room_id, popularity FROM temp.new_room_scores
+    ) OR EXISTS (
+        SELECT room_id, popularity FROM temp.new_room_scores EXCEPT SELECT room_id, popularity FROM room_scores
+    )
+"""
+
+
+def compute_scores(conn):
+    """Recompute room_scores in the caller's transaction; True if they changed.
+
+    Unchanged scores are left alone and keep their version, so the catalog
+    and the cached listings ordered by them stay valid.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS new_room_scores (room_id INTEGER PRIMARY KEY, popularity INTEGER)")
+    conn.execute("DELETE FROM temp.new_room_scores")
+    conn.execute(f"INSERT INTO temp.new_room_scores (room_id, popularity) {POPULARITY}", (window(),))
+    changed = bool(conn.execute(SCORE_CHANGES).fetchone()[0])
+    if changed:
+        conn.execute("DELETE FROM room_scores")
+        conn.execute("INSERT INTO room_scores (room_id, popularity) SELECT room_id, popularity FROM temp.new_room_scores")
+        conn.execute("UPDATE score_state SET version = version + 1 WHERE id = 1")
+    conn.execute("UPDATE score_state SET computed_at = CURRENT_TIMESTAMP WHERE id = 1")
+    conn.execute("DELETE FROM temp.new_room_scores")
+    return changed
+
+
+def refresh_scores(conn, wait=True):
+    """Recompute the scores in their own transaction; returns the new version.
+
+    With wait=False a refresh that would have to wait for another writer
+    is skipped (returns None); the previous scores stay in place.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    if wait:
+        conn.execute("BEGIN IMMEDIATE")
+    else:
+        timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {timeout}")
+    try:
+        compute_scores(conn)
+        version = conn.execute("SELECT version FROM score_state WHERE id = 1").fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return version
+
+
+# ---------------- Background refresher ----------------
+class ScoreRefresher(threading.Thread):
+    """Refreshes the scores once on start, then every `interval` seconds"""
+
+    def __init__(self, path, interval=REFRESH_INTERVAL):
+        super().__init__(name="score-refresher", daemon=True)
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"refreshes": 0, "skipped": 0, "errors": 0, "version": None}
+
+    def run(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        storage_profile.apply_profile(conn)
+        try:
+            while True:
+                try:
+                    version = refresh_scores(conn, wait=False)
+                    with self._lock:
+                        if version is None:
+                            self._stats["skipped"] += 1
+                        else:
+                            self._stats["refreshes"] += 1
+                            self._stats["version"] = version
+                except sqlite3.Error:
+                    with self._lock:
+                        self._stats["errors"] += 1
+                if self._stop_event.wait(self.interval):
+                    break
+        finally:
+            conn.close()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, interval=self.interval)
+
+
+_refresher = None
+
+
+def start_refresher(path=None, **options):
+    """Start the process-wide score refresher (no-op if already running)"""
+    global _refresher
+    if _refresher is not None and _refresher.is_alive():
+        return _refresher
+    if path is None:
+        from db_pool import pool
+        path = pool.path
+    _refresher = ScoreRefresher(path, **options)
+    _refresher.start()
+    return _refresher
+
+
+def stop_refresher():
+    global _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the room popularity scores")
+    parser.add_argument("--db", default="hotel_booking.db")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    version = refresh_scores(conn)
+    rooms, bookings = conn.execute("SELECT COUNT(*), COALESCE(SUM(popularity), 0) FROM room_scores").fetchone()
+    print(f"✅ Scores version {version}: {bookings} bookings in the last {POPULARITY_DAYS} days over {rooms} rooms")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
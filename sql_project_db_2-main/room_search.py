@@ -0,0 +1,123 @@
+"""Full-text index for the room listings' destination search (see migrations.ROOM_SEARCH).
+
+room_search is an FTS5 table with one row per room (rowid = room_id) over
+its room_number, room_type, description and feature names, kept current by
+triggers on rooms, room_feature_map and room_features. The listing routes
+turn the destination text into an FTS5 query with match_expression() and
+join MATCHING_ROOMS, which also yields the bm25 relevance they can sort on.
+This module can also rebuild the index or check it against the rooms.
+
+Run: python room_search.py [--db hotel_booking.db] [--rebuild] [--query "sea view"]
+"""
+import argparse
+import re
+import sqlite3
+import sys
+
+# What the index should hold for each room
+INDEXED_ROOMS = """
+    SELECT r.room_id, r.room_number, r.room_type, r.description,
+        (SELECT group_concat(feature_name, ' ') FROM (
+            SELECT rf.feature_name
+            FROM room_feature_map rfm
+            JOIN room_features rf ON rfm.feature_id = rf.feature_id
+            WHERE rfm.room_id = r.room_id
+            ORDER BY rfm.feature_id
+        )) AS features
+    FROM rooms r
+"""
+
+# The table's rank function: bm25 with column weights, as a hit on the
+# room number or type says more than one in a long description. Read
+# through the rank column, it can still be sorted on after the listings'
+# GROUP BY, where bm25() itself can no longer be called.
+RANK = "bm25(10.0, 5.0, 1.0, 2.0)"
+
+# Rooms matching an FTS5 query, best first when ordered by relevance
+MATCHING_ROOMS = """
+    SELECT rowid AS room_id, rank AS relevance
+    FROM room_search WHERE room_search MATCH ?
+"""
+
+TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def match_expression(text):
+    """FTS5 query for a destination string, or None if it has nothing to search for.
+
+    Quoted parts are phrases ("sea view"); every other word matches as a
+    prefix (gard -> Garden). All parts must match, in any column.
+    """
+    parts = []
+    for phrase, word in TERM.findall(text or ""):
+        term = phrase or word
+        if not re.search(r"[^\W_]", term):
+            continue  # punctuation only; the tokenizer would drop it anyway
+        quoted = '"' + term.replace('"', '""') + '"'
+        parts.append(quoted if phrase else quoted + "*")
+    return " ".join(parts) or None
+
+
+def rebuild_index(conn):
+    """Re-index every room in the caller's transaction"""
+    conn.execute("DELETE FROM room_search")
+    conn.execute(f"""
+        INSERT INTO room_search (rowid, room_number, room_type, description, features)
+        {INDEXED_ROOMS}
+    """)
+
+
+def find_drift(conn):
+    """[(room_id, indexed, actual)] for every room whose index row is missing or out of date"""
+    indexed = {row[0]: tuple(row[1:]) for row in conn.execute(
+        "SELECT rowid, room_number, room_type, description, features FROM room_search"
+    )}
+    drift = []
+    for room_id, *actual in conn.execute(INDEXED_ROOMS):
+        have = indexed.pop(room_id, None)
+        if have != tuple(actual):
+            drift.append((room_id, have, tuple(actual)))
+    # Deleted rooms must be gone from the index
+    for room_id, have in indexed.items():
+        drift.append((room_id, have, None))
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check (and optionally rebuild) the room search index")
+    parser.add_argument("--db", default="hotel_booking.db")
+    parser.add_argument("--rebuild", action="store_true", help="re-index every room from scratch")
+    parser.add_argument("--query", help="show the rooms a destination search matches, best first")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.query is not None:
+        match = match_expression(args.query)
+        print(f"MATCH {match!r}")
+        rows = conn.execute(f"""
+            SELECT r.room_id, r.room_number, r.room_type, m.relevance
+            FROM ({MATCHING_ROOMS}) m JOIN rooms r ON r.room_id = m.room_id
+            ORDER BY m.relevance
+        """, (match,)).fetchall() if match else []
+        for room_id, room_number, room_type, relevance in rows:
+            print(f"  {relevance:8.3f}  room {room_id} ({room_number}, {room_type})")
+        conn.close()
+        return 0
+
+    conn.execute("BEGIN IMMEDIATE")  # no writes between reading and comparing
+    drift = find_drift(conn)
+    for room_id, indexed, actual in drift[:20]:
+        print(f"❌ room {room_id}: indexed {indexed}, actual {actual}")
+    if args.rebuild:
+        rebuild_index(conn)
+        conn.commit()
+        print("✅ Room search index rebuilt")
+    else:
+        conn.rollback()
+        print(f"{'❌' if drift else '✅'} {len(drift)} rooms drifted")
+    conn.close()
+    return 1 if drift and not args.rebuild else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
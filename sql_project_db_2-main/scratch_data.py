@@ -0,0 +1,57 @@
+"""Scratch databases and random writes for the check_*.py property checks.
+
+seed_data.py builds large, realistic datasets for the benchmarks. The
+checks want the opposite: a few rows they can change at random, step by
+step, and compare against fresh queries after each change. They share:
+
+  build_database(conn, ...)        migrate, then guests, features,
+                                   services and rooms
+  ids(conn, table, key)            every key in a table
+  run_random_action(conn, rng, actions)
+                                   run one action picked by weight, commit
+
+An action is a (weight, function) pair; the function may return anything.
+Checks that set HOTEL_* variables import this module after them, as they
+do the app modules (migrations reads some settings on import).
+"""
+from migrations import migrate
+
+
+def build_database(conn, guests=0, features=(), services=(), rooms=(), room_columns=()):
+    """Migrate conn's database and add the rows a check starts from.
+
+    Guests are user_id 1..guests, "Guest <n>" with a password of 'x';
+    rooms are rows of room_columns.
+    """
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO users (user_id, name, email, password) VALUES (?, ?, ?, 'x')",
+        [(n, f"Guest {n}", f"guest{n}@example.com") for n in range(1, guests + 1)]
+    )
+    conn.executemany("INSERT INTO room_features (feature_name) VALUES (?)", [(name,) for name in features])
+    conn.executemany("INSERT INTO room_services (service_name) VALUES (?)", [(name,) for name in services])
+    if rooms:
+        conn.executemany(
+            f"INSERT INTO rooms ({', '.join(room_columns)}) VALUES ({', '.join('?' * len(room_columns))})", rooms
+        )
+    conn.commit()
+    return conn
+
+
+def ids(conn, table, key):
+    return [row[0] for row in conn.execute(f"SELECT {key} FROM {table}")]
+
+
+def run_random_action(conn, rng, actions, ignore=()):
+    """Run one of the (weight, action) pairs and commit.
+
+    A write that raises one of `ignore` (a constraint the check provokes on
+    purpose) changed nothing and is skipped.
+    """
+    weights = [weight for weight, _ in actions]
+    _, action = rng.choices(actions, weights)[0]
+    try:
+        action()
+    except ignore:
+        pass
+    conn.commit()
@@ -1,146 +1,516 @@
+"""Seed data for the hotel booking database.
+
+Without --profile, inserts the handful of hand-written demo rows into
+--db, as this script always has. With --profile it builds a new database
+of that size instead: a synthetic hotel with users, rooms and their
+features and services, non-overlapping booking calendars around --anchor
+("today"), payments, refunds, reviews and invoices. The same profile,
+--seed and --anchor always give the same rows.
+
+The base tables are bulk loaded at schema version 2, before any index or
+trigger exists, with journaling off and one executemany per table per
+calendar window (tens of thousands of rows at prod size); the
+remaining migrations then build the indexes and backfill the derived
+tables (stats, rollups, ratings, search index, scores) set-based.
+Benchmarks share the profiles through dataset(), which builds each one
+once into a cache directory and hands out scratch copies.
+
+Run: python seed_data.py [--db hotel_booking.db]
+     python seed_data.py --profile prod --db prod.db [--seed 1 --anchor 2026-06-01]
+"""
+import argparse
+import os
+import random
+import shutil
 import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+
+from migrations import migrate
+from passwords import hash_password
+from storage_profile import apply_profile
+
+# ---------------- Dataset profiles ----------------
+# history_days of past stays before the anchor, plus FUTURE_DAYS of
+# advance bookings after it; review_rate is the share of completed stays
+# that get reviewed
+PROFILES = {
+    "small": {"users": 2000, "rooms": 200, "bookings": 20000, "history_days": 365, "review_rate": 0.3},
+    "prod": {"users": 200000, "rooms": 5000, "bookings": 1000000, "history_days": 730, "review_rate": 0.2},
+    "huge": {"users": 2000000, "rooms": 50000, "bookings": 10000000, "history_days": 1095, "review_rate": 0.2},
+}
+FUTURE_DAYS = 180
+ANCHOR = date(2026, 6, 1)
+PASSWORD = "pass123"  # every generated user's password
+# Generated datasets are cached here and copied for each benchmark run
+CACHE_DIR = os.environ.get("HOTEL_DATASET_CACHE", os.path.join(tempfile.gettempdir(), "hotel-datasets"))
+
+# Bulk-load settings: nothing to recover from if the load dies half-way,
+# the half-built file is simply thrown away
+BULK_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "locking_mode": "EXCLUSIVE",
+    "cache_size": -512000,
+    "temp_store": "MEMORY",
+}
+WINDOW_DAYS = 28  # calendars are generated (and ids handed out) a window at a time
+
+# room_type -> (share of rooms, lowest price, highest price, extra features)
+ROOM_TYPES = {
+    "Single": (0.25, 1500, 2500, 0),
+    "Double": (0.30, 2500, 4000, 1),
+    "Twin": (0.12, 2500, 3800, 1),
+    "Deluxe": (0.15, 3500, 5500, 2),
+    "Suite": (0.10, 5500, 9000, 3),
+    "Family Suite": (0.06, 7000, 11000, 3),
+    "Penthouse": (0.02, 12000, 20000, 5),
+}
+FEATURES = ["AC", "WiFi", "TV", "Balcony", "Mini Fridge", "Sea View", "Bathtub", "Safe", "Kitchenette", "Work Desk"]
+# Chance of each feature before the room type's extras
+FEATURE_ODDS = [0.9, 0.95, 0.8, 0.3, 0.35, 0.15, 0.2, 0.4, 0.1, 0.5]
+SEA_VIEW = FEATURES.index("Sea View")
+SERVICES = ["Breakfast", "Laundry", "Room Service", "Airport Pickup", "Spa Access", "Late Checkout"]
+SERVICE_ODDS = [0.7, 0.5, 0.6, 0.2, 0.1, 0.25]
+VIEWS = ["city", "garden", "pool", "river", "courtyard"]
+FIRST_NAMES = ["Rahim", "Karim", "Nusrat", "Ayesha", "Tanvir", "Farhana", "Sabbir", "Mitu", "Arif", "Sumaiya",
+               "Imran", "Jannat", "Rakib", "Tania", "Hasan", "Lamia", "Fahim", "Rumana", "Nayeem", "Sadia"]
+LAST_NAMES = ["Uddin", "Ahmed", "Jahan", "Hossain", "Islam", "Rahman", "Chowdhury", "Akter", "Karim", "Sarkar"]
+# Stay lengths and how many days ahead stays are booked, drawn uniformly
+NIGHTS = [1] * 30 + [2] * 25 + [3] * 18 + [4] * 10 + [5] * 6 + [7] * 6 + [10] * 3 + [14] * 2
+LEAD_DAYS = [0] * 10 + [1] * 10 + [2, 3, 5, 7] * 8 + [10, 14, 21, 30] * 5 + [45, 60, 90, 120] * 2
+PAYMENT_METHODS = ["Paytm", "bKash", "Card", "Card", "Cash"]
+COMMENTS = {
+    1: ["Very disappointing stay", "Room was dirty and noisy"],
+    2: ["Below expectations", "AC did not work properly"],
+    3: ["Average stay", "Okay for the price"],
+    4: ["Very good experience", "Comfortable room, friendly staff"],
+    5: ["Excellent service and clean room", "Luxury stay, highly recommended"],
+}
+
+
+# ---------------- Demo rows ----------------
+def seed_demo(conn):
+    """The hand-written demo rows"""
+    cursor = conn.cursor()
+
+    # Enable foreign keys
+    cursor.execute("PRAGMA foreign_keys = ON")
+
+    # ================= ADMINS =================
+    cursor.executemany("""
+    INSERT OR IGNORE INTO admins (username, password, role)
+    VALUES (?, ?, ?)
+    """, [
+        ("admin", hash_password("admin123"), "super_admin"),
+        ("manager", hash_password("manager123"), "admin")
+    ])
+
+    # ================= USERS =================
+    cursor.executemany("""
+    INSERT INTO users (name, email, password, phone, status)
+    VALUES (?, ?, ?, ?, ?)
+    """, [
+        ("Rahim Uddin", "rahim@gmail.com", hash_password("pass123"), "01711111111", "active"),
+        ("Karim Ahmed", "karim@gmail.com", hash_password("pass123"), "01822222222", "active"),
+        ("Nusrat Jahan", "nusrat@gmail.com", hash_password("pass123"), "01933333333", "active"),
+        ("Banned User", "banned@gmail.com", hash_password("pass123"), "01644444444", "banned")
+    ])
+
+    # ================= ROOMS =================
+    cursor.executemany("""
+    INSERT INTO rooms (room_number, room_type, price, status, description)
+    VALUES (?, ?, ?, ?, ?)
+    """, [
+        ("101", "Single", 2000, "Available", "Single bed AC room"),
+        ("102", "Double", 3000, "Available", "Double bed AC room"),
+        ("201", "Deluxe", 4500, "Available", "Deluxe room with balcony"),
+        ("202", "Suite", 6500, "Available", "Luxury suite room")
+    ])
+
+    # ================= ROOM FEATURES =================
+    cursor.executemany("""
+    INSERT INTO room_features (feature_name)
+    VALUES (?)
+    """, [
+        ("AC",),
+        ("WiFi",),
+        ("TV",),
+        ("Balcony",),
+        ("Mini Fridge",)
+    ])
+
+    # ================= ROOM SERVICES =================
+    cursor.executemany("""
+    INSERT INTO room_services (service_name)
+    VALUES (?)
+    """, [
+        ("Breakfast",),
+        ("Laundry",),
+        ("Room Service",),
+        ("Airport Pickup",)
+    ])
+
+    # ================= FEATURE MAPPING =================
+    cursor.executemany("""
+    INSERT INTO room_feature_map (room_id, feature_id)
+    VALUES (?, ?)
+    """, [
+        (1, 1), (1, 2), (1, 3),
+        (2, 1), (2, 2), (2, 3),
+        (3, 1), (3, 2), (3, 3), (3, 4),
+        (4, 1), (4, 2), (4, 3), (4, 4), (4, 5)
+    ])
+
+    # ================= SERVICE MAPPING =================
+    cursor.executemany("""
+    INSERT INTO room_service_map (room_id, service_id)
+    VALUES (?, ?)
+    """, [
+        (1, 1), (1, 3),
+        (2, 1), (2, 2), (2, 3),
+        (3, 1), (3, 2), (3, 3),
+        (4, 1), (4, 2), (4, 3), (4, 4)
+    ])
+
+    # ================= BOOKINGS =================
+    cursor.executemany("""
+    INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        (1, 1, "2026-02-10", "2026-02-12", "Confirmed", "Arrived"),
+        (2, 2, "2026-02-15", "2026-02-18", "Confirmed", "Not Arrived"),
+        (3, 3, "2026-03-01", "2026-03-05", "Pending", "Not Arrived")
+    ])
+
+    # ================= PAYMENTS =================
+    cursor.executemany("""
+    INSERT INTO payments (booking_id, amount, payment_method, payment_status)
+    VALUES (?, ?, ?, ?)
+    """, [
+        (1, 4000, "Paytm", "Success"),
+        (2, 9000, "Paytm", "Success"),
+        (3, 18000, "Paytm", "Pending")
+    ])
+
+    # ================= REFUNDS =================
+    cursor.executemany("""
+    INSERT INTO refunds (payment_id, refund_amount, refund_status)
+    VALUES (?, ?, ?)
+    """, [
+        (2, 3000, "Completed")
+    ])
+
+    # ================= REVIEWS =================
+    cursor.executemany("""
+    INSERT INTO reviews (user_id, room_id, rating, comment)
+    VALUES (?, ?, ?, ?)
+    """, [
+        (1, 1, 5, "Excellent service and clean room"),
+        (2, 2, 4, "Very good experience"),
+        (3, 3, 5, "Luxury stay, highly recommended")
+    ])
+
+    # ================= INVOICES =================
+    cursor.executemany("""
+    INSERT INTO invoices (booking_id, total_amount)
+    VALUES (?, ?)
+    """, [
+        (1, 4000),
+        (2, 9000),
+        (3, 18000)
+    ])
+
+    # ================= SYSTEM SETTINGS =================
+    cursor.executemany("""
+    INSERT INTO system_settings (setting_key, setting_value)
+    VALUES (?, ?)
+    """, [
+        ("site_status", "online"),
+        ("booking_enabled", "true"),
+        ("maintenance_mode", "false")
+    ])
+
+    conn.commit()
+
+
+# ---------------- Synthetic dataset ----------------
+# Bump when the generator changes, so cached datasets are rebuilt
+GENERATOR_VERSION = 2
+
+
+class Calendar:
+    """'YYYY-MM-DD' strings and 'YYYY-MM-DD HH:MM:SS' stamps by day ordinal"""
+
+    def __init__(self, first, last):
+        self.first = first
+        self.days = [date.fromordinal(day).isoformat() for day in range(first, last + 1)]
+        self.times = [f" {minute // 60:02d}:{minute % 60:02d}:00" for minute in range(0, 24 * 60, 15)]
+
+    def stamp(self, day, rng):
+        return self.days[day - self.first] + self.times[int(rng.random() * len(self.times))]
+
+
+def user_rows(rng, users, calendar, first_day):
+    # One hash (one salt) for every generated user: a KDF-cost hash each
+    # would take hours at prod size. The salt is random, so this is the one
+    # value that differs between two runs with the same seed.
+    password = hash_password(PASSWORD)
+    rand = rng.random
+    for user_id in range(1, users + 1):
+        first = FIRST_NAMES[int(rand() * len(FIRST_NAMES))]
+        last = LAST_NAMES[int(rand() * len(LAST_NAMES))]
+        yield (user_id, f"{first} {last}", f"{first}.{last}.{user_id}@example.com".lower(), password,
+               f"01{7 + user_id % 3}{user_id:08d}", "banned" if rand() < 0.01 else "active",
+               calendar.stamp(first_day + int(rand() * 365), rng))
+
+
+def room_rows(rng, rooms):
+    """(room row, feature ids, service ids) per room"""
+    types = list(ROOM_TYPES)
+    shares = [ROOM_TYPES[name][0] for name in types]
+    for room_id in range(1, rooms + 1):
+        room_type = rng.choices(types, shares)[0]
+        _, low, high, extras = ROOM_TYPES[room_type]
+        features = {i for i, odds in enumerate(FEATURE_ODDS) if rng.random() < odds}
+        features.update(rng.sample(range(len(FEATURES)), extras))
+        services = [i + 1 for i, odds in enumerate(SERVICE_ODDS) if rng.random() < odds]
+        view = "sea" if SEA_VIEW in features else rng.choice(VIEWS)
+        named = [FEATURES[i].lower() for i in sorted(features) if i >= 3 and i != SEA_VIEW][:2]
+        description = f"{room_type} room with {view} view"
+        if named:
+            description += ", " + " and ".join(named)
+        row = (room_id, f"{(room_id - 1) // 50 + 1}{(room_id - 1) % 50 + 1:02d}", room_type,
+               float(rng.randrange(low, high + 1, 50)),
+               "Maintenance" if rng.random() < 0.03 else "Available", description)
+        yield row, [i + 1 for i in sorted(features)], services
+
+
+def generate(path, profile="small", seed=1, anchor=ANCHOR, **sizes):
+    """Build a new database at `path`; returns the number of rows loaded per table.
+
+    `sizes` overrides the profile's settings (users=..., bookings=...).
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    settings = dict(PROFILES[profile], **sizes)
+    rng = random.Random(seed)
+    today = anchor.toordinal()
+    start, end = today - settings["history_days"], today + FUTURE_DAYS
+    calendar = Calendar(start - 400, end + 30)
+
+    conn = sqlite3.connect(path)
+    for pragma, value in BULK_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    migrate(conn, target=2)  # tables only: indexes and triggers come after the load
+    counts = dict.fromkeys(["users", "rooms", "room_feature_map", "room_service_map", "bookings",
+                            "payments", "refunds", "reviews", "invoices"], 0)
+
+    conn.execute("BEGIN")
+    seed_demo_lookups(conn)
+    users = settings["users"]
+    conn.executemany(
+        "INSERT INTO users (user_id, name, email, password, phone, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        user_rows(rng, users, calendar, start - 365)
+    )
+    counts["users"] = users
+
+    prices, weights, quality = [], [], []
+    rooms, feature_map, service_map = [], [], []
+    for row, features, services in room_rows(rng, settings["rooms"]):
+        rooms.append(row)
+        feature_map.extend((row[0], feature_id) for feature_id in features)
+        service_map.extend((row[0], service_id) for service_id in services)
+        prices.append(row[3])
+        weights.append(rng.lognormvariate(0, 0.5))  # demand
+        quality.append(rng.uniform(2.5, 4.8))  # where its ratings centre
+    conn.executemany("INSERT INTO rooms (room_id, room_number, room_type, price, status, description) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", rooms)
+    conn.executemany("INSERT INTO room_feature_map (room_id, feature_id) VALUES (?, ?)", feature_map)
+    conn.executemany("INSERT INTO room_service_map (room_id, service_id) VALUES (?, ?)", service_map)
+    counts.update(rooms=len(rooms), room_feature_map=len(feature_map), room_service_map=len(service_map))
+
+    write_bookings(conn, rng, settings, calendar, start, end, today, prices, weights, quality, counts)
+    conn.commit()
+
+    migrate(conn)  # indexes, triggers, and the derived tables backfilled from the rows above
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA locking_mode = NORMAL")
+    apply_profile(conn)
+    conn.close()
+    return counts
+
+
+def seed_demo_lookups(conn):
+    """Admins, feature and service names and settings: the fixed lookup rows"""
+    conn.executemany("INSERT INTO admins (username, password, role) VALUES (?, ?, ?)",
+                     [("admin", hash_password("admin123"), "super_admin"),
+                      ("manager", hash_password("manager123"), "admin")])
+    conn.executemany("INSERT INTO room_features (feature_id, feature_name) VALUES (?, ?)",
+                     list(enumerate(FEATURES, 1)))
+    conn.executemany("INSERT INTO room_services (service_id, service_name) VALUES (?, ?)",
+                     list(enumerate(SERVICES, 1)))
+    conn.executemany("INSERT INTO system_settings (setting_key, setting_value) VALUES (?, ?)",
+                     [("site_status", "online"), ("booking_enabled", "true"), ("maintenance_mode", "false")])
+
+
+def write_bookings(conn, rng, settings, calendar, start, end, today, prices, weights, quality, counts):
+    """Bookings with their payments, refunds, invoices and reviews.
+
+    Each room gets back-to-back stays separated by random gaps, so a
+    room's stays never overlap; busier rooms (higher weight) get shorter
+    gaps. The calendars advance WINDOW_DAYS at a time, and the stays
+    starting in a window get their booking ids in created_at order.
+    """
+    target, users, review_rate = settings["bookings"], settings["users"], settings["review_rate"]
+    # Hot loop: everything below is a local, stamps are built inline
+    rand = rng.random
+    nights_table, leads, methods = NIGHTS, LEAD_DAYS, PAYMENT_METHODS
+    days, first_day, times = calendar.days, calendar.first, calendar.times
+    ntimes = len(times)
+    mean_nights = sum(NIGHTS) / len(NIGHTS)
+    total_weight = sum(weights)
+    gaps, cursors = [], []
+    for weight in weights:
+        # Aim 2% over the target; the last window is cut to size
+        cycle = (end - start) * total_weight / (target * 1.02 * weight)
+        gaps.append(2 * max(0.0, cycle - mean_nights))
+        cursors.append(start + int(rand() * cycle))
+
+    booking_id = payment_id = 0
+    for window in range(start, end, WINDOW_DAYS):
+        window_end = min(window + WINDOW_DAYS, end)
+        stays = []
+        for room, gap in enumerate(gaps):
+            day = cursors[room]
+            while day < window_end:
+                nights = nights_table[int(rand() * len(nights_table))]
+                created = min(day - leads[int(rand() * len(leads))], today - int(rand() * 3))
+                stays.append((days[created - first_day] + times[int(rand() * ntimes)], created, day, nights, room))
+                day += nights + int(rand() * gap)
+            cursors[room] = day
+        stays.sort()
+        stays = stays[:target - booking_id]
+
+        bookings, payments, refunds, invoices, reviews = [], [], [], [], []
+        for created_at, created, check_in, nights, room in stays:
+            booking_id += 1
+            check_out = check_in + nights
+            user_id = 1 + int(users * rand() ** 2)  # a few regulars book a lot
+            chance = rand()
+            if check_out <= today:
+                status = "Cancelled" if chance < 0.08 else "Confirmed"
+                arrival = "Not Arrived" if status == "Cancelled" or chance > 0.98 else "Arrived"
+            elif check_in <= today:
+                status, arrival = "Confirmed", "Arrived"
+            else:
+                status = "Cancelled" if chance < 0.1 else "Pending" if chance < 0.5 else "Confirmed"
+                arrival = "Not Arrived"
+            bookings.append((booking_id, user_id, room + 1, days[check_in - first_day], days[check_out - first_day],
+                             status, arrival, created_at))
+
+            amount = prices[room] * nights
+            paid_on = min(created + int(rand() * 2), today)
+            if status == "Confirmed" or (status == "Cancelled" and rand() < 0.4):
+                payment_id += 1
+                paid_at = days[paid_on - first_day] + times[int(rand() * ntimes)]
+                payments.append((payment_id, booking_id, amount, methods[int(rand() * len(methods))],
+                                 "Completed", paid_at))
+                if status == "Cancelled":
+                    refunded_on = min(paid_on + 1 + int(rand() * 5), today)
+                    refunds.append((payment_id, amount if rand() < 0.5 else amount / 2,
+                                    "Completed" if refunded_on < today - 7 else "Initiated",
+                                    days[refunded_on - first_day] + times[int(rand() * ntimes)]))
+                else:
+                    invoices.append((booking_id, amount, paid_at))
+            elif status == "Pending" and rand() < 0.5:
+                payment_id += 1
+                payments.append((payment_id, booking_id, amount, methods[int(rand() * len(methods))],
+                                 "Pending", days[paid_on - first_day] + times[int(rand() * ntimes)]))
+            if arrival == "Arrived" and check_out <= today and rand() < review_rate:
+                rating = min(5, max(1, round(rng.gauss(quality[room], 0.9))))
+                reviews.append((user_id, room + 1, rating, COMMENTS[rating][int(rand() * 2)],
+                                days[min(check_out + int(rand() * 7), today) - first_day] + times[int(rand() * ntimes)]))
+
+        conn.executemany("INSERT INTO bookings (booking_id, user_id, room_id, check_in, check_out, booking_status, "
+                         "arrival_status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", bookings)
+        conn.executemany("INSERT INTO payments (payment_id, booking_id, amount, payment_method, payment_status, "
+                         "payment_date) VALUES (?, ?, ?, ?, ?, ?)", payments)
+        conn.executemany("INSERT INTO refunds (payment_id, refund_amount, refund_status, refund_date) "
+                         "VALUES (?, ?, ?, ?)", refunds)
+        conn.executemany("INSERT INTO invoices (booking_id, total_amount, invoice_date) VALUES (?, ?, ?)", invoices)
+        conn.executemany("INSERT INTO reviews (user_id, room_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)",
+                         reviews)
+        for table, rows in (("bookings", bookings), ("payments", payments), ("refunds", refunds),
+                            ("invoices", invoices), ("reviews", reviews)):
+            counts[table] += len(rows)
+        if booking_id >= target:
+            break
+
+
+def dataset(profile, seed=1):
+    """Path to a scratch copy of a generated dataset.
+
+    The dataset itself is generated into CACHE_DIR the first time it is
+    asked for; every caller gets its own copy to write to.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    name = f"{profile}-seed{seed}-{ANCHOR.isoformat()}-v{GENERATOR_VERSION}.db"
+    cached = os.path.join(CACHE_DIR, name)
+    if not os.path.exists(cached):
+        partial = cached + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        generate(partial, profile, seed)
+        os.replace(partial, cached)
+    copy = os.path.join(tempfile.mkdtemp(), name)
+    shutil.copyfile(cached, copy)
+    return copy
+
+
+def add_dataset_argument(parser):
+    parser.add_argument("--dataset", choices=list(PROFILES),
+                        help="run on a generated seed_data.py dataset instead of building one")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Insert the demo rows, or generate a synthetic dataset")
+    parser.add_argument("--db", default="hotel_booking.db")
+    parser.add_argument("--profile", choices=list(PROFILES), help="generate a new database of this size")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=ANCHOR, help="the dataset's today")
+    parser.add_argument("--force", action="store_true", help="replace --db if it exists")
+    for setting in ("users", "rooms", "bookings"):
+        parser.add_argument(f"--{setting}", type=int, help="override the profile's count")
+    args = parser.parse_args()
+
+    if args.profile is None:
+        conn = sqlite3.connect(args.db)
+        seed_demo(conn)
+        conn.close()
+        print("✅ All seed data inserted successfully!")
+        return 0
+
+    if os.path.exists(args.db):
+        if not args.force:
+            print(f"❌ {args.db} already exists (use --force to replace it)")
+            return 1
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    sizes = {setting: getattr(args, setting) for setting in ("users", "rooms", "bookings")
+             if getattr(args, setting) is not None}
+    started = time.perf_counter()
+    counts = generate(args.db, args.profile, args.seed, args.anchor, **sizes)
+    print(f"✅ {args.profile} dataset (seed {args.seed}, today {args.anchor}) written to {args.db} "
+          f"in {time.perf_counter() - started:.1f}s")
+    for table, count in counts.items():
+        print(f"   {table:<17}{count:>12,}")
+    return 0
+
 
-conn = sqlite3.connect("hotel_booking.db")
-cursor = conn.cursor()
-
-# Enable foreign keys
-cursor.execute("PRAGMA foreign_keys = ON")
-
-# ================= ADMINS =================
-cursor.executemany("""
-INSERT OR IGNORE INTO admins (username, password, role)
-VALUES (?, ?, ?)
-""", [
-    ("admin", "admin123", "super_admin"),
-    ("manager", "manager123", "admin")
-])
-
-# ================= USERS =================
-cursor.executemany("""
-INSERT INTO users (name, email, password, phone, status)
-VALUES (?, ?, ?, ?, ?)
-""", [
-    ("Rahim Uddin", "rahim@gmail.com", "pass123", "01711111111", "active"),
-    ("Karim Ahmed", "karim@gmail.com", "pass123", "01822222222", "active"),
-    ("Nusrat Jahan", "nusrat@gmail.com", "pass123", "01933333333", "active"),
-    ("Banned User", "banned@gmail.com", "pass123", "01644444444", "banned")
-])
-
-# ================= ROOMS =================
-cursor.executemany("""
-INSERT INTO rooms (room_number, room_type, price, status, description)
-VALUES (?, ?, ?, ?, ?)
-""", [
-    ("101", "Single", 2000, "Available", "Single bed AC room"),
-    ("102", "Double", 3000, "Available", "Double bed AC room"),
-    ("201", "Deluxe", 4500, "Available", "Deluxe room with balcony"),
-    ("202", "Suite", 6500, "Available", "Luxury suite room")
-])
-
-# ================= ROOM FEATURES =================
-cursor.executemany("""
-INSERT INTO room_features (feature_name)
-VALUES (?)
-""", [
-    ("AC",),
-    ("WiFi",),
-    ("TV",),
-    ("Balcony",),
-    ("Mini Fridge",)
-])
-
-# ================= ROOM SERVICES =================
-cursor.executemany("""
-INSERT INTO room_services (service_name)
-VALUES (?)
-""", [
-    ("Breakfast",),
-    ("Laundry",),
-    ("Room Service",),
-    ("Airport Pickup",)
-])
-
-# ================= FEATURE MAPPING =================
-cursor.executemany("""
-INSERT INTO room_feature_map (room_id, feature_id)
-VALUES (?, ?)
-""", [
-    (1, 1), (1, 2), (1, 3),
-    (2, 1), (2, 2), (2, 3),
-    (3, 1), (3, 2), (3, 3), (3, 4),
-    (4, 1), (4, 2), (4, 3), (4, 4), (4, 5)
-])
-
-# ================= SERVICE MAPPING =================
-cursor.executemany("""
-INSERT INTO room_service_map (room_id, service_id)
-VALUES (?, ?)
-""", [
-    (1, 1), (1, 3),
-    (2, 1), (2, 2), (2, 3),
-    (3, 1), (3, 2), (3, 3),
-    (4, 1), (4, 2), (4, 3), (4, 4)
-])
-
-# ================= BOOKINGS =================
-cursor.executemany("""
-INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status)
-VALUES (?, ?, ?, ?, ?, ?)
-""", [
-    (1, 1, "2026-02-10", "2026-02-12", "Confirmed", "Arrived"),
-    (2, 2, "2026-02-15", "2026-02-18", "Confirmed", "Not Arrived"),
-    (3, 3, "2026-03-01", "2026-03-05", "Pending", "Not Arrived")
-])
-
-# ================= PAYMENTS =================
-cursor.executemany("""
-INSERT INTO payments (booking_id, amount, payment_method, payment_status)
-VALUES (?, ?, ?, ?)
-""", [
-    (1, 4000, "Paytm", "Success"),
-    (2, 9000, "Paytm", "Success"),
-    (3, 18000, "Paytm", "Pending")
-])
-
-# ================= REFUNDS =================
-cursor.executemany("""
-INSERT INTO refunds (payment_id, refund_amount, refund_status)
-VALUES (?, ?, ?)
-""", [
-    (2, 3000, "Completed")
-])
-
-# ================= REVIEWS =================
-cursor.executemany("""
-INSERT INTO reviews (user_id, room_id, rating, comment)
-VALUES (?, ?, ?, ?)
-""", [
-    (1, 1, 5, "Excellent service and clean room"),
-    (2, 2, 4, "Very good experience"),
-    (3, 3, 5, "Luxury stay, highly recommended")
-])
-
-# ================= INVOICES =================
-cursor.executemany("""
-INSERT INTO invoices (booking_id, total_amount)
-VALUES (?, ?)
-""", [
-    (1, 4000),
-    (2, 9000),
-    (3, 18000)
-])
-
-# ================= SYSTEM SETTINGS =================
-cursor.executemany("""
-INSERT INTO system_settings (setting_key, setting_value)
-VALUES (?, ?)
-""", [
-    ("site_status", "online"),
-    ("booking_enabled", "true"),
-    ("maintenance_mode", "false")
-])
-
-conn.commit()
-conn.close()
-
-print("✅ All seed data inserted successfully!")
+if __name__ == "__main__":
+    sys.exit(main())
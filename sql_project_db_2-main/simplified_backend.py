@@ -1,35 +1,57 @@
 from flask import Flask, request, jsonify
 from flask_swagger_ui import get_swaggerui_blueprint
 from flask_cors import CORS
-import sqlite3
 from datetime import datetime, timedelta
 import jwt
-import os
+import uuid
 from auth import *
+from db_pool import get_db, init_pool
+from metrics import init_metrics
+from pagination import EXPOSED_HEADERS, paginate
+from dashboard_stats import read_stats
+import rollups
+from availability import ROOM_IS_FREE, get_engine, validate_stay
+from response_cache import get_cache
+from room_details import get_room_cache
+from room_catalog import SORTS, get_catalog
+import room_scores
+import write_queue
+import room_search
+from sql_profiler import SORTS as QUERY_SORTS, profiler
+from token_cache import get_token_cache
+from passwords import PasswordBusy, busy_response, start_workers
 
 app = Flask(__name__)
-CORS(app, origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:5175", "http://127.0.0.1:5173", "http://127.0.0.1:5174", "http://127.0.0.1:5175"])
+CORS(app, expose_headers=EXPOSED_HEADERS, origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:5175", "http://127.0.0.1:5173", "http://127.0.0.1:5174", "http://127.0.0.1:5175"])
 
 # JWT Secret Key
 app.config['SECRET_KEY'] = 'hotel_booking_secret_key_2026_v2'
 
+start_workers()  # password hashing processes, forked before any thread starts
+
 # Database connection helper
-def get_db():
-    conn = sqlite3.connect("hotel_booking.db")
-    conn.row_factory = sqlite3.Row
-    return conn
+init_pool(app)
+init_metrics(app)  # per-route latency, SQL and status counts on /metrics
+get_engine()  # load the booking calendars up front
+get_cache()
+get_room_cache()
+get_catalog()
+get_token_cache()
+if room_scores.RUN_REFRESHER:
+    room_scores.start_refresher()
 
 # JWT token generation
 def create_token(user_data, user_type):
     payload = {
         'user': user_data,
         'type': user_type,
-        'exp': datetime.utcnow() + timedelta(hours=24)
+        'exp': datetime.utcnow() + timedelta(hours=24),
+        'jti': uuid.uuid4().hex  # unique, so a new login never gets back a revoked token
     }
     return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
 
 # JWT token verification
-def verify_token(token):
+def decode_token(token):
     try:
         payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
         return payload
@@ -38,17 +60,23 @@ def verify_token(token):
     except jwt.InvalidTokenError:
         return None
 
+def verify_token(token):
+    """Decoded payload of a valid, unrevoked token (from the token cache after the first time), else None"""
+    return get_token_cache().verify(token, decode_token)
+
+def request_token():
+    token = request.headers.get('Authorization')
+    if token and token.startswith('Bearer '):
+        token = token[7:]
+    return token
+
 # Middleware to verify token
 def token_required(f):
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
+        if not request.headers.get('Authorization'):
             return jsonify({'error': 'Token is missing'}), 401
         
-        if token.startswith('Bearer '):
-            token = token[7:]
-        
-        payload = verify_token(token)
+        payload = verify_token(request_token())
         if not payload:
             return jsonify({'error': 'Token is invalid'}), 401
             
@@ -101,6 +129,8 @@ def login():
         
         return jsonify({"error": "Invalid credentials"}), 401
     
+    except PasswordBusy:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -120,6 +150,20 @@ def register():
         else:
             return jsonify({"error": message}), 400
     
+    except PasswordBusy:
+        return busy_response()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/auth/logout", methods=["POST"])
+@token_required
+def logout(payload):
+    """Revoke the token the request was made with"""
+    try:
+        db = get_db()
+        get_token_cache().revoke(db, request_token(), payload['exp'])
+        db.commit()
+        return jsonify({"message": "Logged out"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -132,28 +176,49 @@ def admin_dashboard(payload):
     
     try:
         db = get_db()
-        # Get dashboard statistics
+        # Get dashboard statistics (one row kept current by triggers)
+        row = read_stats(db)
         stats = {
-            "total_users": db.execute("SELECT COUNT(*) as count FROM users").fetchone()['count'],
-            "total_rooms": db.execute("SELECT COUNT(*) as count FROM rooms").fetchone()['count'],
-            "total_bookings": db.execute("SELECT COUNT(*) as count FROM bookings").fetchone()['count'],
-            "pending_bookings": db.execute("SELECT COUNT(*) as count FROM bookings WHERE booking_status = 'Pending'").fetchone()['count'],
-            "confirmed_bookings": db.execute("SELECT COUNT(*) as count FROM bookings WHERE booking_status = 'Confirmed'").fetchone()['count'],
-            "cancelled_bookings": db.execute("SELECT COUNT(*) as count FROM bookings WHERE booking_status = 'Cancelled'").fetchone()['count'],
-            "total_revenue": db.execute("SELECT SUM(amount) as total FROM payments WHERE payment_status = 'Completed'").fetchone()['total'] or 0,
-            "total_revenue_today": db.execute("SELECT SUM(amount) as total FROM payments WHERE payment_status = 'Completed' AND DATE(payment_date) = DATE('now')").fetchone()['total'] or 0,
-            "bookings_today": db.execute("SELECT COUNT(*) as count FROM bookings WHERE DATE(created_at) = DATE('now')").fetchone()['count'],
-            "active_users": db.execute("SELECT COUNT(DISTINCT user_id) as count FROM bookings WHERE booking_status = 'Confirmed'").fetchone()['count'],
-            "occupancy_rate": round(db.execute("""
-                SELECT CAST(SUM(CASE WHEN status = 'Occupied' THEN 1 ELSE 0 END) AS FLOAT) * 100 / COUNT(*) as rate
-                FROM rooms
-            """).fetchone()['rate'] or 0, 2)
+            "total_users": row["total_users"],
+            "total_rooms": row["total_rooms"],
+            "total_bookings": row["total_bookings"],
+            "pending_bookings": row["pending_bookings"],
+            "confirmed_bookings": row["confirmed_bookings"],
+            "cancelled_bookings": row["cancelled_bookings"],
+            "total_revenue": row["completed_revenue"],
+            "total_revenue_today": row["revenue_today"],
+            "bookings_today": row["bookings_today"],
+            "active_users": row["active_users"],
+            "occupancy_rate": round(row["occupied_rooms"] * 100 / row["total_rooms"], 2) if row["total_rooms"] else 0
         }
         db.close()
         return jsonify(stats), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/admin/cache", methods=["GET"])
+@token_required
+def admin_cache_stats(payload):
+    """Hit/miss/eviction counters of the room search, room detail and verified token caches"""
+    if payload['type'] != 'admin':
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify({"responses": get_cache().stats(), "room_details": get_room_cache().stats(),
+                    "tokens": get_token_cache().stats()}), 200
+
+@app.route("/admin/queries", methods=["GET"])
+@token_required
+def admin_query_profile(payload):
+    """Top SQL fingerprints (?sort=total|max|count|avg, ?limit=20) and the recent slow queries"""
+    if payload['type'] != 'admin':
+        return jsonify({"error": "Unauthorized"}), 403
+    sort = request.args.get('sort', 'total')
+    if sort not in QUERY_SORTS:
+        return jsonify({"error": f"sort must be one of: {', '.join(QUERY_SORTS)}"}), 400
+    limit = request.args.get('limit', '20')
+    if not limit.isdigit() or int(limit) < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    return jsonify(profiler.report(sort, int(limit))), 200
+
 @app.route("/admin/analytics", methods=["GET"])
 @token_required
 def admin_analytics(payload):
@@ -162,42 +227,41 @@ def admin_analytics(payload):
     
     try:
         db = get_db()
+        rollups.refresh_rollups(db, wait=False)
+        since = db.execute("SELECT date('now', '-30 days')").fetchone()[0]
         
         # Get booking trends for the last 30 days
-        booking_trends = db.execute("""
-            SELECT DATE(created_at) as date, COUNT(*) as count
-            FROM bookings
-            WHERE created_at >= date('now', '-30 days')
-            GROUP BY DATE(created_at)
-            ORDER BY DATE(created_at)
-        """).fetchall()
+        booking_trends = rollups.query(db, "bookings", """
+            SELECT day as date, SUM(bookings) as count
+            FROM facts
+            GROUP BY day
+            ORDER BY day
+        """, start=since).fetchall()
         
         # Get revenue trends for the last 30 days
-        revenue_trends = db.execute("""
-            SELECT DATE(b.created_at) as date, SUM(p.amount) as revenue
-            FROM bookings b
-            JOIN payments p ON b.booking_id = p.booking_id
-            WHERE p.payment_status = 'Completed' AND b.created_at >= date('now', '-30 days')
-            GROUP BY DATE(b.created_at)
-            ORDER BY DATE(b.created_at)
-        """).fetchall()
+        revenue_trends = rollups.query(db, "bookings", """
+            SELECT day as date, SUM(paid_revenue) as revenue
+            FROM facts
+            GROUP BY day
+            HAVING SUM(paid_bookings) > 0
+            ORDER BY day
+        """, start=since).fetchall()
         
         # Get popular room types
-        popular_rooms = db.execute("""
-            SELECT r.room_type, COUNT(*) as count
-            FROM bookings b
-            JOIN rooms r ON b.room_id = r.room_id
-            GROUP BY r.room_type
-            ORDER BY count DESC
+        popular_rooms = rollups.query(db, "bookings", """
+            SELECT room_type, SUM(bookings) as count
+            FROM facts
+            WHERE room_found
+            GROUP BY room_type
+            ORDER BY count DESC, room_type
             LIMIT 5
         """).fetchall()
         
         # Get monthly revenue
-        monthly_revenue = db.execute("""
-            SELECT strftime('%Y-%m', created_at) as month, SUM(amount) as revenue
-            FROM payments
-            WHERE payment_status = 'Completed'
-            GROUP BY strftime('%Y-%m', created_at)
+        monthly_revenue = rollups.query(db, "payments", """
+            SELECT NULLIF(substr(day, 1, 7), '') as month, SUM(revenue) as revenue
+            FROM facts
+            GROUP BY month
             ORDER BY month DESC
             LIMIT 12
         """).fetchall()
@@ -226,28 +290,24 @@ def admin_reports(payload):
         end_date = request.args.get('end_date', '2030-12-31')
         
         db = get_db()
+        rollups.refresh_rollups(db, wait=False)
+        period = {"start": start_date, "end": end_date}
         
         if report_type == 'summary':
+            stats = read_stats(db)
             report = {
                 "period": f"{start_date} to {end_date}",
-                "total_bookings": db.execute("""
-                    SELECT COUNT(*) as count FROM bookings
-                    WHERE created_at BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['count'],
-                "total_revenue": db.execute("""
-                    SELECT SUM(amount) as total FROM payments
-                    WHERE payment_status = 'Completed' AND payment_date BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['total'] or 0,
-                "avg_booking_value": db.execute("""
-                    SELECT AVG(p.amount) as avg FROM payments p
-                    JOIN bookings b ON p.booking_id = b.booking_id
-                    WHERE p.payment_status = 'Completed' AND b.created_at BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['avg'] or 0,
-                "occupancy_rate": db.execute("""
-                    SELECT CAST(SUM(CASE WHEN status = 'Occupied' THEN 1 ELSE 0 END) AS FLOAT) * 100 / COUNT(*) as rate
-                    FROM rooms
-                """).fetchone()['rate'] or 0,
-                "top_customers": db.execute("""
+                "total_bookings": rollups.query(db, "bookings", """
+                    SELECT COALESCE(SUM(bookings), 0) as count FROM facts
+                """, **period).fetchone()['count'],
+                "total_revenue": rollups.query(db, "payments", """
+                    SELECT SUM(revenue) as total FROM facts
+                """, **period).fetchone()['total'] or 0,
+                "avg_booking_value": rollups.query(db, "bookings", """
+                    SELECT SUM(paid_revenue) / SUM(paid_bookings) as avg FROM facts
+                """, **period).fetchone()['avg'] or 0,
+                "occupancy_rate": stats["occupied_rooms"] * 100 / stats["total_rooms"] if stats["occupied_rooms"] else 0,
+                "top_customers": [dict(row) for row in db.execute("""
                     SELECT u.name, u.email, COUNT(b.booking_id) as booking_count
                     FROM users u
                     JOIN bookings b ON u.user_id = b.user_id
@@ -255,59 +315,48 @@ def admin_reports(payload):
                     GROUP BY u.user_id
                     ORDER BY booking_count DESC
                     LIMIT 5
-                """, (start_date, end_date)).fetchall()
+                """, (start_date, end_date)).fetchall()]
             }
         elif report_type == 'financial':
             report = {
                 "period": f"{start_date} to {end_date}",
-                "total_revenue": db.execute("""
-                    SELECT SUM(amount) as total FROM payments
-                    WHERE payment_status = 'Completed' AND payment_date BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['total'] or 0,
-                "refunds_processed": db.execute("""
-                    SELECT SUM(refund_amount) as total FROM refunds
-                    WHERE refund_date BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['total'] or 0,
-                "net_revenue": db.execute("""
-                    SELECT 
-                        COALESCE(SUM(p.amount), 0) - COALESCE(SUM(r.refund_amount), 0) as net
-                    FROM payments p
-                    LEFT JOIN refunds r ON p.payment_id = r.payment_id
-                    WHERE p.payment_status = 'Completed' AND p.payment_date BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['net'] or 0,
-                "revenue_by_payment_method": db.execute("""
-                    SELECT payment_method, SUM(amount) as total
-                    FROM payments
-                    WHERE payment_status = 'Completed' AND payment_date BETWEEN ? AND ?
+                "total_revenue": rollups.query(db, "payments", """
+                    SELECT SUM(revenue) as total FROM facts
+                """, **period).fetchone()['total'] or 0,
+                "refunds_processed": rollups.query(db, "refunds", """
+                    SELECT SUM(refunded) as total FROM facts
+                """, **period).fetchone()['total'] or 0,
+                "net_revenue": rollups.query(db, "payments", """
+                    SELECT COALESCE(SUM(net_gross), 0) - COALESCE(SUM(net_refunds), 0) as net FROM facts
+                """, **period).fetchone()['net'] or 0,
+                "revenue_by_payment_method": [dict(row) for row in rollups.query(db, "payments", """
+                    SELECT payment_method, SUM(revenue) as total
+                    FROM facts
                     GROUP BY payment_method
-                """, (start_date, end_date)).fetchall()
+                """, **period).fetchall()]
             }
         elif report_type == 'booking':
             report = {
                 "period": f"{start_date} to {end_date}",
-                "total_bookings": db.execute("""
-                    SELECT COUNT(*) as count FROM bookings
-                    WHERE created_at BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['count'],
-                "confirmed_bookings": db.execute("""
-                    SELECT COUNT(*) as count FROM bookings
-                    WHERE booking_status = 'Confirmed' AND created_at BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['count'],
-                "cancelled_bookings": db.execute("""
-                    SELECT COUNT(*) as count FROM bookings
-                    WHERE booking_status = 'Cancelled' AND created_at BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['count'],
-                "avg_stay_duration": db.execute("""
-                    SELECT AVG(julianday(check_out) - julianday(check_in)) as avg_days
-                    FROM bookings
-                    WHERE created_at BETWEEN ? AND ?
-                """, (start_date, end_date)).fetchone()['avg_days'] or 0,
-                "bookings_by_status": db.execute("""
-                    SELECT booking_status, COUNT(*) as count
-                    FROM bookings
-                    WHERE created_at BETWEEN ? AND ?
+                "total_bookings": rollups.query(db, "bookings", """
+                    SELECT COALESCE(SUM(bookings), 0) as count FROM facts
+                """, **period).fetchone()['count'],
+                "confirmed_bookings": rollups.query(db, "bookings", """
+                    SELECT COALESCE(SUM(bookings), 0) as count FROM facts
+                    WHERE booking_status = 'Confirmed'
+                """, **period).fetchone()['count'],
+                "cancelled_bookings": rollups.query(db, "bookings", """
+                    SELECT COALESCE(SUM(bookings), 0) as count FROM facts
+                    WHERE booking_status = 'Cancelled'
+                """, **period).fetchone()['count'],
+                "avg_stay_duration": rollups.query(db, "bookings", """
+                    SELECT SUM(nights) / SUM(stays) as avg_days FROM facts
+                """, **period).fetchone()['avg_days'] or 0,
+                "bookings_by_status": [dict(row) for row in rollups.query(db, "bookings", """
+                    SELECT booking_status, SUM(bookings) as count
+                    FROM facts
                     GROUP BY booking_status
-                """, (start_date, end_date)).fetchall()
+                """, **period).fetchall()]
             }
         
         db.close()
@@ -323,9 +372,13 @@ def admin_get_users(payload):
     
     try:
         db = get_db()
-        users = db.execute("SELECT user_id, name, email, phone, status, created_at FROM users ORDER BY created_at DESC").fetchall()
+        response = paginate(
+            db,
+            "SELECT user_id, name, email, phone, status, created_at FROM users",
+            [("created_at", "DESC"), ("user_id", "DESC")]
+        )
         db.close()
-        return jsonify([dict(user) for user in users]), 200
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -337,15 +390,33 @@ def admin_get_bookings(payload):
     
     try:
         db = get_db()
-        bookings = db.execute("""
+        response = paginate(db, """
             SELECT b.*, u.name as user_name, u.email as user_email, r.room_number, r.room_type
             FROM bookings b
             JOIN users u ON b.user_id = u.user_id
             JOIN rooms r ON b.room_id = r.room_id
-            ORDER BY b.created_at DESC
-        """).fetchall()
+        """, [("b.created_at", "DESC"), ("b.booking_id", "DESC")])
         db.close()
-        return jsonify([dict(booking) for booking in bookings]), 200
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/admin/payments", methods=["GET"])
+@token_required
+def admin_get_payments(payload):
+    if payload['type'] != 'admin':
+        return jsonify({"error": "Unauthorized"}), 403
+    
+    try:
+        db = get_db()
+        response = paginate(db, """
+            SELECT p.*, b.room_id, u.name as user_name, u.email as user_email
+            FROM payments p
+            LEFT JOIN bookings b ON p.booking_id = b.booking_id
+            LEFT JOIN users u ON b.user_id = u.user_id
+        """, [("p.payment_id", "DESC")])
+        db.close()
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -383,79 +454,113 @@ def create_booking(payload):
         check_in = data.get("check_in")
         check_out = data.get("check_out")
         
-        db = get_db()
-        # Check if room is available
-        conflict = db.execute("""
-            SELECT * FROM bookings 
-            WHERE room_id = ? AND booking_status IN ('Pending', 'Confirmed')
-            AND ((check_in <= ? AND check_out >= ?) OR (check_in <= ? AND check_out >= ?))
-        """, (room_id, check_out, check_in, check_in, check_out)).fetchone()
+        if not all([room_id, check_in, check_out]):
+            return jsonify({"error": "room_id, check_in and check_out are required"}), 400
         
-        if conflict:
-            db.close()
-            return jsonify({"error": "Room not available for selected dates"}), 400
+        date_error = validate_stay(check_in, check_out)
+        if date_error:
+            return jsonify({"error": date_error}), 400
         
-        # Create booking
-        db.execute("""
-            INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (user_id, room_id, check_in, check_out, "Pending", "Not Arrived"))
-        
-        db.commit()
-        booking_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
-        db.close()
+        # The writer thread runs the conflict check and the insert in one
+        # transaction, group-committed with other requests' writes
+        try:
+            booking_id = write_queue.get_writer().run(
+                write_queue.create_booking, user_id, room_id, check_in, check_out
+            )
+        except write_queue.StayConflict:
+            return jsonify({"error": "Room not available for selected dates"}), 400
+        except write_queue.WriteTimeout as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
         
         return jsonify({"message": "Booking created successfully", "booking_id": booking_id}), 201
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/user/bookings/batch", methods=["POST"])
+@token_required
+def create_group_booking(payload):
+    """Book many rooms at once: {"bookings": [{room_id, check_in, check_out}, ...], "atomic": true}.
+
+    All stays are checked and inserted in one transaction. With atomic
+    (the default) either every stay is booked or none is; otherwise each
+    stay that can be booked is. The response has one result per stay.
+    """
+    if payload['type'] != 'user':
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        body, status = write_queue.book_group(payload['user']['user_id'], request.json or {})
+        return jsonify(body), status
+    except write_queue.WriteTimeout as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ================== PUBLIC ROUTES ==================
+# ?sort= for the room listings; relevance ranks destination matches by bm25
+LISTING_ORDER = {
+    "price": "r.price ASC",
+    "relevance": "rs.relevance, r.price ASC",
+}
+
+def listing_sort(modes=LISTING_ORDER):
+    """The listing's sort mode, or None if ?sort= names none of `modes`"""
+    sort = request.args.get('sort', 'price')
+    return sort if sort in modes else None
+
 @app.route("/rooms/available", methods=["GET"])
 def get_available_rooms():
     try:
         check_in = request.args.get('check_in')
         check_out = request.args.get('check_out')
         destination = request.args.get('destination', '').lower()
+        sort = listing_sort()
+        if not sort:
+            return jsonify({"error": f"sort must be one of: {', '.join(LISTING_ORDER)}"}), 400
+        match = room_search.match_expression(destination)
+        if not match:
+            sort = "price"  # nothing to rank on
+        stay = (check_in, check_out) if check_in and check_out else None
+        
+        # Same filters -> same cached body, whatever the query string looked like
+        cache = get_cache()
+        cache_key = ("available", stay, match, sort)
+        body, version = cache.get(cache_key)
+        if body is not None:
+            return app.response_class(body, mimetype="application/json"), 200
         
         db = get_db()
         
+        # Destination text is looked up in the full-text index
+        params = []
+        search_join = ""
+        if match:
+            search_join = f"JOIN ({room_search.MATCHING_ROOMS}) rs ON rs.room_id = r.room_id"
+            params.append(match)
+        
         # Base query
-        base_query = """
+        base_query = f"""
             SELECT r.*, 
                    rf.feature_name as feature,
                    GROUP_CONCAT(rf.feature_name) as features,
-                   (SELECT AVG(rating) FROM reviews WHERE room_id = r.room_id) as avg_rating,
-                   (SELECT COUNT(*) FROM reviews WHERE room_id = r.room_id) as reviews_count
+                   rr.avg_rating as avg_rating,
+                   COALESCE(rr.review_count, 0) as reviews_count
             FROM rooms r
+            {search_join}
+            LEFT JOIN room_ratings rr ON rr.room_id = r.room_id
             LEFT JOIN room_feature_map rfm ON r.room_id = rfm.room_id
             LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
             WHERE r.status = 'Available'
         """
         
         # Add date filtering if dates are provided
-        params = []
         if check_in and check_out:
-            booked_room_ids = db.execute("""
-                SELECT DISTINCT room_id FROM bookings 
-                WHERE (check_in <= ? AND check_out >= ?) 
-                AND booking_status IN ('Pending', 'Confirmed')
-            """, (check_out, check_in)).fetchall()
-            
-            booked_ids = [row['room_id'] for row in booked_room_ids]
-            
-            if booked_ids:
-                placeholders = ','.join('?' * len(booked_ids))
-                base_query += f" AND r.room_id NOT IN ({placeholders})"
-                params.extend(booked_ids)
-        
-        # Add destination filtering if provided
-        if destination:
-            base_query += " AND (r.room_type LIKE ? OR r.description LIKE ?)"
-            params.extend([f'%{destination}%', f'%{destination}%'])
+            base_query += f" AND {ROOM_IS_FREE}"
+            params.extend([check_in, check_out])
         
         # Group by room and order
-        base_query += " GROUP BY r.room_id ORDER BY r.price ASC"
+        base_query += f" GROUP BY r.room_id ORDER BY {LISTING_ORDER[sort]}"
         
         rooms = db.execute(base_query, params).fetchall()
         db.close()
@@ -471,58 +576,23 @@ def get_available_rooms():
                 room_dict['features'] = []
             processed_rooms.append(room_dict)
         
-        return jsonify(processed_rooms), 200
+        response = jsonify(processed_rooms)
+        cache.put(cache_key, response.get_data(), version,
+                  rooms=[room['room_id'] for room in processed_rooms], stay=stay, text=match is not None)
+        return response, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route("/rooms/<int:room_id>", methods=["GET"])
 def get_room_details(room_id):
     try:
+        # Room, features, services, reviews and rating in one query, cached per room
         db = get_db()
-        room = db.execute("SELECT * FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
+        room = get_room_cache().get(db, room_id)
+        db.close()
         if not room:
             return jsonify({"error": "Room not found"}), 404
-        
-        # Get room features and services
-        features = db.execute("""
-            SELECT rf.feature_name 
-            FROM room_feature_map rfm
-            JOIN room_features rf ON rfm.feature_id = rf.feature_id
-            WHERE rfm.room_id = ?
-        """, (room_id,)).fetchall()
-        
-        services = db.execute("""
-            SELECT rs.service_name 
-            FROM room_service_map rsm
-            JOIN room_services rs ON rsm.service_id = rs.service_id
-            WHERE rsm.room_id = ?
-        """, (room_id,)).fetchall()
-        
-        # Get room reviews
-        reviews = db.execute("""
-            SELECT r.review_id, r.rating, r.comment, r.created_at, u.name as user_name
-            FROM reviews r
-            JOIN users u ON r.user_id = u.user_id
-            WHERE r.room_id = ?
-            ORDER BY r.created_at DESC
-        """, (room_id,)).fetchall()
-        
-        room_dict = dict(room)
-        room_dict['features'] = [f['feature_name'] for f in features]
-        room_dict['services'] = [s['service_name'] for s in services]
-        room_dict['reviews'] = [dict(review) for review in reviews]
-        
-        # Calculate average rating
-        avg_rating = db.execute("""
-            SELECT AVG(rating) as avg_rating, COUNT(*) as review_count
-            FROM reviews WHERE room_id = ?
-        """, (room_id,)).fetchone()
-        
-        room_dict['avg_rating'] = round(avg_rating['avg_rating'], 1) if avg_rating['avg_rating'] else 0
-        room_dict['review_count'] = avg_rating['review_count'] if avg_rating['review_count'] else 0
-        
-        db.close()
-        return jsonify(room_dict), 200
+        return jsonify(room), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -538,78 +608,71 @@ def search_rooms():
         max_price = request.args.get('max_price', type=float)
         room_type = request.args.get('room_type', '').lower()
         min_rating = request.args.get('min_rating', type=float)
+        features = sorted({name.strip().lower() for name in request.args.get('features', '').split(',') if name.strip()})
+        with_facets = request.args.get('facets', '0') == '1'
+        sort = listing_sort(SORTS)
+        if not sort:
+            return jsonify({"error": f"sort must be one of: {', '.join(SORTS)}"}), 400
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                return jsonify({"error": "limit must be a positive integer"}), 400
+            limit = int(limit)
+        match = room_search.match_expression(destination)
+        if not match and sort == "relevance":
+            sort = "price"  # nothing to rank on
+        stay = (check_in, check_out) if check_in and check_out else None
+        
+        cache = get_cache()
+        cache_key = ("search", stay, match, min_price, max_price, room_type, min_rating, tuple(features), sort,
+                     limit, with_facets)
+        body, version = cache.get(cache_key)
+        if body is not None:
+            return app.response_class(body, mimetype="application/json"), 200
         
         db = get_db()
         
-        # Base query with joins for features and ratings
-        base_query = """
-            SELECT r.*,
-                   GROUP_CONCAT(rf.feature_name) as features,
-                   (SELECT AVG(rating) FROM reviews WHERE room_id = r.room_id) as avg_rating,
-                   (SELECT COUNT(*) FROM reviews WHERE room_id = r.room_id) as reviews_count
-            FROM rooms r
-            LEFT JOIN room_feature_map rfm ON r.room_id = rfm.room_id
-            LEFT JOIN room_features rf ON rfm.feature_id = rf.feature_id
-            WHERE r.status = 'Available'
-        """
+        # Destination text is looked up in the full-text index
+        relevance = None
+        if match:
+            relevance = dict(db.execute(room_search.MATCHING_ROOMS, (match,)).fetchall())
         
-        params = []
-        
-        # Add date filtering if dates are provided
+        # Keep the rooms free for the whole stay
+        free = None
         if check_in and check_out:
-            booked_room_ids = db.execute("""
-                SELECT DISTINCT room_id FROM bookings 
-                WHERE (check_in <= ? AND check_out >= ?) 
-                AND booking_status IN ('Pending', 'Confirmed')
-            """, (check_out, check_in)).fetchall()
-            
-            booked_ids = [row['room_id'] for row in booked_room_ids]
-            
-            if booked_ids:
-                placeholders = ','.join('?' * len(booked_ids))
-                base_query += f" AND r.room_id NOT IN ({placeholders})"
-                params.extend(booked_ids)
-        
-        # Add price filtering
-        if min_price is not None:
-            base_query += " AND r.price >= ?"
-            params.append(min_price)
-        if max_price is not None:
-            base_query += " AND r.price <= ?"
-            params.append(max_price)
-        
-        # Add room type filtering
-        if room_type:
-            base_query += " AND LOWER(r.room_type) LIKE ?"
-            params.append(f'%{room_type}%')
-        
-        # Add destination filtering
-        if destination:
-            base_query += " AND (LOWER(r.room_type) LIKE ? OR LOWER(r.description) LIKE ?)"
-            params.extend([f'%{destination}%', f'%{destination}%'])
-        
-        # Add rating filtering
-        if min_rating is not None:
-            base_query += " AND (SELECT AVG(rating) FROM reviews WHERE room_id = r.room_id) >= ?"
-            params.append(min_rating)
-        
-        # Group by room and order by price
-        base_query += " GROUP BY r.room_id ORDER BY r.price ASC"
-        
-        rooms = db.execute(base_query, params).fetchall()
-        db.close()
-        
-        # Process the results
-        processed_rooms = []
-        for room in rooms:
-            room_dict = dict(room)
-            if room_dict['features']:
-                room_dict['features'] = room_dict['features'].split(',')
+            if validate_stay(check_in, check_out) is None:
+                free = lambda room_ids: get_engine().free_rooms(room_ids, check_in, check_out)
             else:
-                room_dict['features'] = []
-            processed_rooms.append(room_dict)
+                # Not dates the calendars understand; compare them as the SQL always did
+                free_ids = {row['room_id'] for row in db.execute(
+                    f"SELECT r.room_id FROM rooms r WHERE {ROOM_IS_FREE}", (check_in, check_out)
+                )}
+                free = lambda room_ids: free_ids
+        db.close()
         
-        return jsonify(processed_rooms), 200
+        # Status, price, type, rating, feature and date filters, the facet
+        # counts over what passes them and the ranking run on the in-memory catalog
+        result = get_catalog().search(
+            min_price=min_price,
+            max_price=max_price,
+            room_type=f'%{room_type}%' if room_type else None,
+            min_rating=min_rating,
+            features=features,
+            rooms=relevance,
+            free=free,
+            facets=with_facets,
+            sort=sort,
+            limit=limit,
+        )
+        processed_rooms, facets = result if with_facets else (result, None)
+        
+        response = jsonify({"rooms": processed_rooms, "facets": facets} if with_facets else processed_rooms)
+        # Counts over a limited listing also cover rooms it leaves out
+        listed = None if with_facets and limit is not None else [room['room_id'] for room in processed_rooms]
+        cache.put(cache_key, response.get_data(), version, rooms=listed, stay=stay,
+                  ratings=min_rating is not None or sort in ("rating", "best"),
+                  text=match is not None or bool(features), scores=sort in ("popularity", "best"))
+        return response, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -702,7 +765,8 @@ def home():
         "endpoints": {
             "authentication": {
                 "login": "POST /auth/login",
-                "register": "POST /auth/register"
+                "register": "POST /auth/register",
+                "logout": "POST /auth/logout"
             },
             "public": {
                 "available_rooms": "GET /rooms/available",
@@ -713,12 +777,15 @@ def home():
             "user_protected": {
                 "my_bookings": "GET /user/bookings",
                 "create_booking": "POST /user/bookings",
+                "create_group_booking": "POST /user/bookings/batch",
                 "add_review": "POST /reviews"
             },
             "admin_protected": {
                 "dashboard": "GET /admin/dashboard",
                 "analytics": "GET /admin/analytics",
                 "reports": "GET /admin/reports",
+                "response_cache": "GET /admin/cache",
+                "query_profile": "GET /admin/queries",
                 "manage_users": "GET /admin/users",
                 "manage_bookings": "GET /admin/bookings"
             }
@@ -0,0 +1,207 @@
+import logging
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+# ---------------- SQL profiler ----------------
+# Every statement run through a pooled connection handle
+# (db_pool.PooledConnection.execute/executemany) is timed and added to
+# the totals of its fingerprint: the statement with comments, literals
+# and parameters replaced by ? and whitespace collapsed, so
+#
+#   SELECT * FROM rooms WHERE room_id = 7   and
+#   SELECT * FROM rooms  WHERE room_id = ?
+#
+# are the same entry, as are IN lists and VALUES rows of any length.
+# attach(conn) also sets a trace callback on every pooled connection; it
+# counts the statements SQLite starts while a timed call runs, so a slow
+# entry shows the nested statements it set off: trigger bodies, FTS5
+# index writes, the work of a PRAGMA (the trace reports them with the
+# text of the statement that started them).
+#
+# A statement slower than SLOW_MS is logged (logger "hotel.sql") and kept
+# in the last SLOW_LOG_SIZE slow entries with its parameter shapes (types,
+# never values) and its EXPLAIN QUERY PLAN, captured right away on the
+# same connection. GET /admin/queries lists the top fingerprints.
+#
+# Time is the time spent in execute(): for a query, running it up to its
+# first row (all of it for GROUP BY / ORDER BY plans), not the fetches.
+# The writer thread's statements do not go through a handle and are not
+# profiled.
+ENABLED = os.environ.get("HOTEL_SQL_PROFILE", "1") == "1"
+SLOW_MS = float(os.environ.get("HOTEL_SLOW_QUERY_MS", "100"))
+SLOW_LOG_SIZE = int(os.environ.get("HOTEL_SLOW_QUERY_LOG", "100"))
+# Distinct fingerprints kept; statements beyond that are totalled under OTHER
+MAX_FINGERPRINTS = 1000
+OTHER = "<other>"
+SORTS = {
+    "total": lambda entry: entry.seconds,
+    "max": lambda entry: entry.max_seconds,
+    "count": lambda entry: entry.count,
+    "avg": lambda entry: entry.seconds / entry.count,
+}
+
+log = logging.getLogger("hotel.sql")
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w.])", re.I)
+_PARAMETERS = re.compile(r"[:@$][A-Za-z_]\w*|\?\d*")
+_SPACE = re.compile(r"\s+")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+def fingerprint(sql):
+    """The statement with literals and parameters as ?, lists as (...)"""
+    sql = _COMMENTS.sub(" ", sql)
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _PARAMETERS.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip().rstrip(";").strip()
+    sql = _LISTS.sub("(...)", sql)
+    return _ROWS.sub("(...)", sql)
+
+
+def parameter_shape(parameters):
+    """Types of the bound parameters, runs collapsed: "(int, str x3, None)" """
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f":{name} {type_name(value)}" for name, value in parameters.items()) + "}"
+    if not isinstance(parameters, (list, tuple)):
+        return type_name(parameters)  # not parameters sqlite3 accepts
+    parts = []
+    for value in parameters:
+        name = type_name(value)
+        if parts and parts[-1][0] == name:
+            parts[-1][1] += 1
+        else:
+            parts.append([name, 1])
+    return "(" + ", ".join(name if count == 1 else f"{name} x{count}" for name, count in parts) + ")"
+
+
+def type_name(value):
+    return "None" if value is None else type(value).__name__
+
+
+class Fingerprint:
+    __slots__ = ("count", "seconds", "max_seconds", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow = 0
+
+
+class Profiler:
+    def __init__(self, slow_ms=SLOW_MS, slow_log_size=SLOW_LOG_SIZE, enabled=ENABLED):
+        self.enabled = enabled
+        self.slow_seconds = slow_ms / 1000
+        self._lock = threading.Lock()
+        self._fingerprints = {}  # fingerprint -> Fingerprint
+        self._known = {}  # statement text -> fingerprint
+        self._slow = deque(maxlen=slow_log_size)
+        self._local = threading.local()
+
+    # ---- connection hooks ----
+    def attach(self, conn):
+        """on_connect hook: count the statements SQLite starts on `conn`"""
+        if self.enabled:
+            conn.set_trace_callback(self._traced)
+
+    def _traced(self, statement):
+        if statement.startswith("BEGIN"):
+            return  # the sqlite3 module's implicit BEGIN before a write
+        local = self._local
+        local.started = getattr(local, "started", 0) + 1
+
+    def statements_started(self):
+        """Statements traced on this thread so far (a timed call takes the difference)"""
+        return getattr(self._local, "started", 0)
+
+    # ---- recording ----
+    def record(self, conn, sql, parameters, seconds, many=False, traced=0):
+        if not isinstance(sql, str):
+            return  # sqlite3 refused the call already
+        known = self._known.get(sql)
+        if known is None:
+            known = fingerprint(sql)
+            if len(self._known) >= MAX_FINGERPRINTS * 4:
+                self._known.clear()
+            self._known[sql] = known
+        slow = seconds >= self.slow_seconds
+        with self._lock:
+            entry = self._fingerprints.get(known)
+            if entry is None:
+                if len(self._fingerprints) >= MAX_FINGERPRINTS:
+                    known = OTHER
+                entry = self._fingerprints.setdefault(known, Fingerprint())
+            entry.count += 1
+            entry.seconds += seconds
+            if seconds > entry.max_seconds:
+                entry.max_seconds = seconds
+            if slow:
+                entry.slow += 1
+        if slow:
+            self._log_slow(conn, sql, known, parameters, seconds, many, traced)
+
+    def _log_slow(self, conn, sql, known, parameters, seconds, many, traced):
+        rows = None
+        if many:
+            parameters = list(parameters)
+            rows, parameters = len(parameters), (parameters[0] if parameters else ())
+        shape = parameter_shape(parameters)
+        try:
+            plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+        except Exception as exc:  # not explainable (PRAGMA, DDL) or the connection is busy
+            plan = [f"no plan: {exc}"]
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "ms": round(seconds * 1000, 2),
+            "fingerprint": known,
+            "parameters": shape if rows is None else f"{rows} rows of {shape}",
+            "nested_statements": max(0, traced - (rows or 1)),
+            "plan": plan,
+        }
+        with self._lock:
+            self._slow.append(entry)
+        log.warning("slow query %.1f ms: %s params=%s nested=%d plan=%s",
+                    entry["ms"], known, entry["parameters"], entry["nested_statements"], " | ".join(plan))
+
+    # ---- reading ----
+    def report(self, sort="total", limit=20):
+        """Top `limit` fingerprints by `sort` (see SORTS) and the recent slow statements, newest first"""
+        with self._lock:
+            entries = sorted(self._fingerprints.items(), key=lambda item: SORTS[sort](item[1]), reverse=True)
+            statements = sum(entry.count for entry in self._fingerprints.values())
+            seconds = sum(entry.seconds for entry in self._fingerprints.values())
+            slow = list(self._slow)[::-1]
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_seconds * 1000,
+            "statements": statements,
+            "total_ms": round(seconds * 1000, 2),
+            "fingerprints": len(entries),
+            "top": [
+                {
+                    "fingerprint": known,
+                    "count": entry.count,
+                    "total_ms": round(entry.seconds * 1000, 3),
+                    "avg_ms": round(entry.seconds * 1000 / entry.count, 3),
+                    "max_ms": round(entry.max_seconds * 1000, 3),
+                    "slow": entry.slow,
+                }
+                for known, entry in entries[:limit]
+            ],
+            "slow_queries": slow,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._fingerprints.clear()
+            self._slow.clear()
+
+
+profiler = Profiler()
@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import threading
+import time
+
+# ---------------- Storage profiles ----------------
+# PRAGMAs applied to every connection when it is opened. busy_timeout goes
+# first so that switching journal_mode waits for other writers instead of
+# failing with "database is locked".
+PROFILES = {
+    # WAL lets /rooms/available readers run while a booking INSERT commits
+    "default": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        # A checkpoint that restarts the WAL cuts the file back to this
+        # size, so PASSIVE checkpoints alone keep it bounded too
+        "journal_size_limit": 64 * 1024 * 1024,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+    },
+    # Same as default but fsyncs the WAL on every commit
+    "durable": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "journal_size_limit": 64 * 1024 * 1024,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+    },
+    # The old rollback-journal behaviour, kept for benchmarks
+    "legacy": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+    },
+}
+
+PROFILE = os.environ.get("HOTEL_DB_PROFILE", "default")
+
+# Checkpointer thresholds
+CHECKPOINT_INTERVAL = float(os.environ.get("HOTEL_WAL_CHECKPOINT_INTERVAL", "1.0"))
+CHECKPOINT_BYTES = int(os.environ.get("HOTEL_WAL_CHECKPOINT_BYTES", str(4 * 1024 * 1024)))
+TRUNCATE_BYTES = int(os.environ.get("HOTEL_WAL_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
+MAX_CHECKPOINT_LAG = float(os.environ.get("HOTEL_WAL_MAX_LAG", "30"))
+
+
+def apply_profile(conn, profile=None):
+    """Apply a storage profile's PRAGMAs to a freshly opened connection"""
+    settings = PROFILES[profile or PROFILE]
+    for pragma, value in settings.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    # With the background checkpointer running, writers skip the
+    # automatic checkpoint that would otherwise stall a request
+    if _checkpointer is not None and _checkpointer.is_alive():
+        conn.execute("PRAGMA wal_autocheckpoint = 0")
+    return conn
+
+
+def wal_size(path):
+    try:
+        return os.path.getsize(path + "-wal")
+    except OSError:
+        return 0
+
+
+# ---------------- Background checkpointer ----------------
+class Checkpointer(threading.Thread):
+    """Checkpoints the WAL off the request path.
+
+    A PASSIVE checkpoint runs when the WAL grows past `checkpoint_bytes` or
+    when frames have been waiting longer than `max_lag` seconds; past
+    `truncate_bytes` a TRUNCATE checkpoint also shrinks the file.
+    """
+
+    def __init__(self, path, interval=CHECKPOINT_INTERVAL, checkpoint_bytes=CHECKPOINT_BYTES,
+                 truncate_bytes=TRUNCATE_BYTES, max_lag=MAX_CHECKPOINT_LAG):
+        super().__init__(name="wal-checkpointer", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self.truncate_bytes = truncate_bytes
+        self.max_lag = max_lag
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._last_checkpoint = time.time()
+        self._stats = {
+            "checkpoints": 0,
+            "truncations": 0,
+            "busy_checkpoints": 0,
+            "errors": 0,
+            "last_checkpoint_at": None,
+            "last_duration_seconds": 0.0,
+            "wal_frames": 0,
+            "checkpointed_frames": 0,
+        }
+
+    def run(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        apply_profile(self._conn)
+        try:
+            while not self._stop_event.wait(self.interval):
+                try:
+                    self.maybe_checkpoint()
+                except Exception:
+                    # Connections opened while this thread runs never
+                    # checkpoint themselves: keep the loop going whatever happens
+                    with self._lock:
+                        self._stats["errors"] += 1
+        finally:
+            self._conn.close()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def maybe_checkpoint(self):
+        size = wal_size(self.path)
+        lag = time.time() - self._last_checkpoint
+        if size >= self.checkpoint_bytes or (size > 0 and lag >= self.max_lag):
+            mode = "TRUNCATE" if size >= self.truncate_bytes else "PASSIVE"
+            return self.checkpoint(mode)
+        return None
+
+    def checkpoint(self, mode="PASSIVE"):
+        started = time.time()
+        busy, log_frames, done_frames = self._conn.execute(
+            f"PRAGMA wal_checkpoint({mode})"
+        ).fetchone()
+        finished = time.time()
+        with self._lock:
+            self._stats["checkpoints"] += 1
+            self._stats["last_duration_seconds"] = finished - started
+            self._stats["wal_frames"] = log_frames
+            self._stats["checkpointed_frames"] = done_frames
+            if mode == "TRUNCATE":
+                self._stats["truncations"] += 1
+            if busy:
+                self._stats["busy_checkpoints"] += 1
+            elif done_frames == log_frames:
+                self._last_checkpoint = finished
+                self._stats["last_checkpoint_at"] = finished
+        return busy, log_frames, done_frames
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            last = self._last_checkpoint
+        size = wal_size(self.path)
+        stats["wal_size_bytes"] = size
+        stats["pending_frames"] = max(stats["wal_frames"] - stats["checkpointed_frames"], 0)
+        stats["checkpoint_lag_seconds"] = round(time.time() - last, 3) if size else 0.0
+        return stats
+
+
+_checkpointer = None
+
+
+def start_checkpointer(path, **thresholds):
+    """Start the process-wide checkpointer (no-op if already running)"""
+    global _checkpointer
+    if _checkpointer is not None and _checkpointer.is_alive():
+        return _checkpointer
+    if PROFILES[PROFILE].get("journal_mode") != "WAL":
+        return None
+    _checkpointer = Checkpointer(path, **thresholds)
+    _checkpointer.start()
+    return _checkpointer
+
+
+def stop_checkpointer():
+    global _checkpointer
+    if _checkpointer is not None:
+        _checkpointer.stop()
+        _checkpointer = None
+
+
+def storage_stats(path):
+    """WAL size and checkpoint lag, whether or not the checkpointer runs"""
+    if _checkpointer is not None:
+        stats = _checkpointer.stats()
+    else:
+        stats = {"wal_size_bytes": wal_size(path), "checkpoint_lag_seconds": None}
+    stats["profile"] = PROFILE
+    return stats
@@ -0,0 +1,90 @@
+import os
+
+from flask import Response, current_app, request, stream_with_context
+
+# ---------------- Streaming responses ----------------
+# Large exports are written out as the cursor is read: rows come off SQLite
+# FETCH_SIZE at a time and are encoded and sent before the next batch is
+# fetched, so memory stays flat however many rows the query returns.
+#
+# The body is a JSON array by default, or newline-delimited JSON (one
+# object per line) when the client's Accept header prefers NDJSON.
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+NDJSON_TYPES = (NDJSON, "application/jsonl", "application/x-jsonlines")
+FETCH_SIZE = int(os.environ.get("HOTEL_STREAM_FETCH_SIZE", "500"))
+
+
+def wants_ndjson():
+    best = request.accept_mimetypes.best_match((JSON,) + NDJSON_TYPES, default=JSON)
+    return best in NDJSON_TYPES
+
+
+def encode_rows(rows):
+    dumps = current_app.json.dumps
+    return [dumps(dict(row), separators=(",", ":")) for row in rows]
+
+
+def iter_json_array(cursor, size):
+    yield "["
+    separator = ""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        # One dumps() per batch; strip the batch's own brackets
+        yield separator + current_app.json.dumps([dict(row) for row in rows], separators=(",", ":"))[1:-1]
+        separator = ","
+    yield "]\n"
+
+
+def iter_ndjson(cursor, size):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield "\n".join(encode_rows(rows)) + "\n"
+
+
+def stream_cursor(cursor, ndjson=None, size=None, release=None):
+    """Response that streams every remaining row of an executed cursor.
+
+    release(), if given, is called once the stream is done with the
+    cursor's connection (after the last chunk, or when the client goes away).
+    """
+    ndjson = wants_ndjson() if ndjson is None else ndjson
+    size = size or FETCH_SIZE
+    chunks = iter_ndjson(cursor, size) if ndjson else iter_json_array(cursor, size)
+
+    done = []
+
+    def finish():
+        if done:
+            return
+        done.append(True)
+        cursor.close()
+        if release is not None:
+            release()
+
+    def generate():
+        try:
+            yield from chunks
+        finally:
+            finish()
+
+    # The request ends (and tears down) before the first chunk is sent, so
+    # the cursor's connection must not be the request's pooled one: callers
+    # detach it first (db_pool.detach_db) and it goes back to the pool here.
+    # stream_with_context keeps the request context for the JSON encoder.
+    response = Response(stream_with_context(generate()), mimetype=NDJSON if ndjson else JSON)
+    response.call_on_close(finish)  # also when the body was never iterated
+    return response
+
+
+def rows_response(rows, ndjson=None):
+    """An already-fetched (bounded) list of rows in the negotiated format"""
+    ndjson = wants_ndjson() if ndjson is None else ndjson
+    if not ndjson:
+        return current_app.json.response([dict(row) for row in rows])
+    body = "".join(line + "\n" for line in encode_rows(rows))
+    return Response(body, mimetype=NDJSON)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import storage_profile
+
+# ---------------- Verified token cache ----------------
+# Every protected request used to check the JWT's HMAC signature and parse
+# its JSON again, and the admin dashboard sends the same token with each
+# of the requests a refresh makes. A token that verified once is kept
+# here with its decoded payload, keyed by its SHA-256 (the token itself is
+# not kept), LRU-ordered and bounded by count, and served from memory
+# until its exp claim passes. Tokens that fail to verify are not cached.
+#
+# Revoking a token (revoke(), called by POST /auth/logout) writes its hash
+# to revoked_tokens (migrations.REVOKED_TOKENS). Like the other caches,
+# every lookup first compares PRAGMA data_version and, if anything
+# committed, drops the tokens revoked since, so a logout in one worker
+# process holds in all of them. A token not in the cache is looked up in
+# revoked_tokens after it verifies, before it is cached.
+#
+# The payload is shared by every request that presents the token; routes
+# read it and must not change it.
+CACHE_SIZE = int(os.environ.get("HOTEL_TOKEN_CACHE_SIZE", "4096"))
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TokenCache:
+    def __init__(self, path, size=CACHE_SIZE, clock=time.time):
+        self.path = path
+        self.size = size
+        self.clock = clock  # what the exp claims are compared to
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        storage_profile.apply_profile(self._conn)
+        self._tokens = OrderedDict()  # token hash -> (exp, payload)
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._seen = self._conn.execute(
+            "SELECT COALESCE(MAX(revoked_id), 0) FROM revoked_tokens"
+        ).fetchone()[0]
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "revoked": 0, "rejected": 0, "evictions": 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def verify(self, token, decode):
+        """The token's payload, from memory if it verified before, else decode(token) (None if invalid)"""
+        key = token_hash(token)
+        with self._lock:
+            self._sync()
+            cached = self._tokens.get(key)
+            if cached is not None:
+                if self.clock() < cached[0]:
+                    self._tokens.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return cached[1]
+                del self._tokens[key]
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+        payload = decode(token)
+        if payload is None:
+            return None
+        expires = payload.get("exp")
+        with self._lock:
+            self._sync()
+            revoked = self._conn.execute(
+                "SELECT 1 FROM revoked_tokens WHERE token_hash = ?", (key,)
+            ).fetchone()
+            if revoked:
+                self._stats["rejected"] += 1
+                return None
+            if isinstance(expires, (int, float)):  # one without exp is verified every time
+                self._tokens[key] = (expires, payload)
+                self._tokens.move_to_end(key)
+                while len(self._tokens) > self.size:
+                    self._tokens.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return payload
+
+    def revoke(self, db, token, expires):
+        """Refuse `token` from now on, in every process, once `db` commits"""
+        key = token_hash(token)
+        db.execute("DELETE FROM revoked_tokens WHERE expires <= ?", (int(self.clock()),))
+        db.execute(
+            "INSERT OR IGNORE INTO revoked_tokens (token_hash, expires) VALUES (?, ?)", (key, int(expires))
+        )
+        with self._lock:
+            if self._tokens.pop(key, None) is not None:
+                self._stats["revoked"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(self._stats, entries=len(self._tokens), size=self.size,
+                        hit_rate=round(self._stats["hits"] / lookups, 4) if lookups else None)
+
+    def _sync(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        revoked = self._conn.execute(
+            "SELECT revoked_id, token_hash FROM revoked_tokens WHERE revoked_id > ?", (self._seen,)
+        ).fetchall()
+        for revoked_id, key in revoked:
+            self._seen = max(self._seen, revoked_id)
+            if self._tokens.pop(key, None) is not None:
+                self._stats["revoked"] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache(path=None):
+    """Process-wide verified token cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if path is None:
+                    from db_pool import pool
+                    path = pool.path
+                _cache = TokenCache(path)
+    return _cache
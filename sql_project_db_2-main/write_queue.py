@@ -0,0 +1,425 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import storage_profile
+from availability import ACTIVE_STATUSES, RoomCalendar, day_number, get_engine, validate_stay
+
+# ---------------- Single-writer queue ----------------
+# Booking and payment writes from every request thread go through one
+# writer thread instead of each request opening its own transaction.
+# Request threads contend on a queue, not on the database lock, and many
+# writes share one commit (and one WAL sync):
+#
+#   submit(op, *args) -> Future     run(op, *args) -> op's result
+#
+# The writer takes the first queued operation, gathers up to MAX_BATCH
+# more (waiting at most MAX_WAIT_MS after the first), and runs them all
+# in one BEGIN IMMEDIATE transaction, each inside its own SAVEPOINT: an
+# operation that raises is rolled back alone and its caller's future gets
+# the exception, the rest commit together. Futures resolve only after the
+# COMMIT, so a caller never sees a result that could still be lost.
+#
+# An operation is a function op(conn, batch, *args). Conflict checks read
+# the availability engine (committed bookings; nothing else can commit
+# while the batch holds the write lock) plus the stays booked earlier in
+# the same batch, which the engine cannot see yet. Those are only the
+# stays of operations that returned: one that raised is rolled back with
+# everything it booked.
+#
+# run() waits WRITE_TIMEOUT for the commit. An operation still queued by
+# then is cancelled (the writer skips cancelled items) and WriteTimeout
+# raised: nothing was written and the client may retry. One the writer has
+# already started can still commit, so run() keeps waiting for it.
+MAX_BATCH = int(os.environ.get("HOTEL_WRITE_BATCH", "64"))
+MAX_WAIT_MS = float(os.environ.get("HOTEL_WRITE_WAIT_MS", "2"))
+# How long run() waits for a queued operation before cancelling it
+WRITE_TIMEOUT = float(os.environ.get("HOTEL_WRITE_TIMEOUT", "30"))
+# Most stays one POST /user/bookings/batch may book
+MAX_GROUP_SIZE = int(os.environ.get("HOTEL_MAX_GROUP_BOOKING", "200"))
+
+
+class WriteRejected(Exception):
+    """An operation refused to write; the message is safe to show the client"""
+
+
+class WriteTimeout(Exception):
+    """run() cancelled an operation that was still queued; nothing was written"""
+
+
+class RoomNotFound(WriteRejected):
+    pass
+
+
+class RoomUnavailable(WriteRejected):
+    pass
+
+
+class StayConflict(WriteRejected):
+    pass
+
+
+class GroupRejected(WriteRejected):
+    """An all-or-nothing group booking refused; `results` says which stays failed"""
+
+    def __init__(self, results):
+        refused = sum(isinstance(result, WriteRejected) for result in results)
+        super().__init__(f"No bookings were created: {refused} of {len(results)} stays could not be booked")
+        self.results = results
+
+
+class Batch:
+    """What the operations of one transaction share.
+
+    `engine` is anything with is_free(room_id, check_in, check_out), so a
+    Batch can also stack on another one to hold the stays of one operation.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._stays = {}  # room_id -> RoomCalendar of stays booked in this batch
+        self._added = []  # the add_stay() arguments, for merge()
+
+    def is_free(self, room_id, check_in, check_out):
+        if not self.engine.is_free(room_id, check_in, check_out):
+            return False
+        calendar = self._stays.get(int(room_id))
+        return calendar is None or calendar.is_free(day_number(check_in), day_number(check_out))
+
+    def add_stay(self, booking_id, room_id, check_in, check_out):
+        calendar = self._stays.setdefault(int(room_id), RoomCalendar())
+        calendar.add(booking_id, day_number(check_in), day_number(check_out))
+        self._added.append((booking_id, room_id, check_in, check_out))
+
+    def merge(self, other):
+        """Take on the stays of a Batch stacked on this one"""
+        for stay in other._added:
+            self.add_stay(*stay)
+
+
+class WriteItem:
+    __slots__ = ("op", "args", "future", "queued_at")
+
+    def __init__(self, op, args):
+        self.op = op
+        self.args = args
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, path, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, engine=None, connect=None):
+        self.path = path
+        self._connect = connect
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._engine = engine
+        self._pid = os.getpid()
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "operations": 0,
+            "rejected": 0,
+            "failed": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "largest_batch": 0,
+            "queue_wait_seconds": 0.0,
+            "commit_seconds": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    # ---- callers ----
+    def submit(self, op, *args):
+        """Queue op(conn, batch, *args); the future resolves once it is committed"""
+        item = WriteItem(op, args)
+        self._queue.put(item)
+        return item.future
+
+    def run(self, op, *args, timeout=WRITE_TIMEOUT):
+        """Queue op and wait for it: its result, or the exception it raised"""
+        future = self.submit(op, *args)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise WriteTimeout("Too many bookings in progress, try again shortly") from None
+            return future.result()  # already running: it may commit, so wait for the outcome
+
+    def stop(self, timeout=5):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        batches = max(1, stats["batches"])
+        stats["avg_batch"] = round(stats["operations"] / batches, 2)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    # ---- writer thread ----
+    def _run(self):
+        if self._connect is not None:
+            conn = self._connect()
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            storage_profile.apply_profile(conn)
+        try:
+            while True:
+                items = self._gather()
+                if items is None:
+                    return
+                self._commit(conn, items)
+        finally:
+            conn.close()
+
+    def _gather(self):
+        """The next batch: the first queued item plus whatever follows it in time"""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                self._queue.put(_STOP)  # finish this batch, then stop
+                break
+            items.append(item)
+        return items
+
+    def _commit(self, conn, items):
+        started = time.monotonic()
+        items = [item for item in items if item.future.set_running_or_notify_cancel()]
+        if not items:
+            return
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            batch = Batch(self._engine or get_engine())
+            for item in items:
+                conn.execute("SAVEPOINT write_op")
+                # The op books into its own Batch: if it raises, the stays
+                # it added go with its savepoint instead of blocking later ops
+                op_batch = Batch(batch)
+                try:
+                    result = item.op(conn, op_batch, *item.args)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((item, None, exc))
+                else:
+                    conn.execute("RELEASE write_op")
+                    batch.merge(op_batch)
+                    outcomes.append((item, result, None))
+            conn.commit()
+        except Exception as exc:
+            # BEGIN or COMMIT failed (or the connection broke): nothing was written
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._stats["failed_batches"] += 1
+                self._stats["failed"] += len(items)
+            for item in items:
+                item.future.set_exception(exc)
+            return
+        finished = time.monotonic()
+        with self._lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["operations"] += len(items)
+            stats["largest_batch"] = max(stats["largest_batch"], len(items))
+            stats["queue_wait_seconds"] += sum(started - item.queued_at for item in items)
+            stats["commit_seconds"] += finished - started
+            for _, _, exc in outcomes:
+                if isinstance(exc, WriteRejected):
+                    stats["rejected"] += 1
+                elif exc is not None:
+                    stats["failed"] += 1
+        for item, result, exc in outcomes:
+            if exc is None:
+                item.future.set_result(result)
+            else:
+                item.future.set_exception(exc)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer(path=None):
+    """Process-wide write queue, started on first use (and again after a fork)"""
+    global _writer
+    if _writer is None or _writer._pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer._pid != os.getpid():
+                if path is None:
+                    from db_pool import pool
+                    _writer = WriteQueue(pool.path, connect=pool.connect)
+                else:
+                    _writer = WriteQueue(path)
+    return _writer
+
+
+# ---------------- Operations ----------------
+def create_booking(conn, batch, user_id, room_id, check_in, check_out, check_room=False):
+    """Book a stay if the room is free for it; returns the booking_id.
+
+    With check_room the room must also exist and be Available.
+    """
+    if check_room:
+        room = conn.execute("SELECT status FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
+        if room is None:
+            raise RoomNotFound("Room does not exist")
+    if not batch.is_free(room_id, check_in, check_out):
+        raise StayConflict("Room is already booked for the selected dates")
+    if check_room and room[0] != "Available":
+        raise RoomUnavailable("Room is not available")
+    booking_id = conn.execute("""
+        INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status)
+        VALUES (?, ?, ?, ?, 'Pending', 'Not Arrived')
+    """, (user_id, room_id, check_in, check_out)).lastrowid
+    batch.add_stay(booking_id, room_id, check_in, check_out)
+    return booking_id
+
+
+def insert_booking(conn, batch, user_id, room_id, check_in, check_out, booking_status, arrival_status):
+    """Insert a booking row as given (no conflict check); returns the booking_id"""
+    booking_id = conn.execute(
+        "INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status) VALUES (?, ?, ?, ?, ?, ?)",
+        (user_id, room_id, check_in, check_out, booking_status, arrival_status)
+    ).lastrowid
+    if booking_status in ACTIVE_STATUSES and validate_stay(check_in, check_out) is None:
+        batch.add_stay(booking_id, room_id, check_in, check_out)
+    return booking_id
+
+
+def insert_payment(conn, batch, booking_id, amount, payment_method, payment_status):
+    """Insert a payment row; returns the payment_id"""
+    return conn.execute(
+        "INSERT INTO payments (booking_id, amount, payment_method, payment_status) VALUES (?, ?, ?, ?)",
+        (booking_id, amount, payment_method, payment_status)
+    ).lastrowid
+
+
+def create_bookings(conn, batch, user_id, stays, atomic=True, check_room=False):
+    """Book several (room_id, check_in, check_out) stays for one user.
+
+    Returns one result per stay: the new booking_id, or the WriteRejected
+    that refused it. Stays are checked against each other as well as the
+    existing bookings, and the rooms are looked up in one query. With
+    atomic, a single refusal books nothing and raises GroupRejected.
+    """
+    stays = [(int(room_id), check_in, check_out) for room_id, check_in, check_out in stays]
+    statuses = {}
+    if check_room:
+        room_ids = sorted({room_id for room_id, _, _ in stays})
+        statuses = dict(conn.execute(
+            f"SELECT room_id, status FROM rooms WHERE room_id IN ({','.join('?' * len(room_ids))})", room_ids
+        ))
+    requested = Batch(batch)  # this group's stays on top of the transaction's
+    results = []
+    for i, (room_id, check_in, check_out) in enumerate(stays):
+        try:
+            if check_room and room_id not in statuses:
+                raise RoomNotFound("Room does not exist")
+            if not requested.is_free(room_id, check_in, check_out):
+                raise StayConflict("Room is already booked for the selected dates")
+            if check_room and statuses[room_id] != "Available":
+                raise RoomUnavailable("Room is not available")
+        except WriteRejected as exc:
+            results.append(exc)
+            continue
+        requested.add_stay(f"stay {i}", room_id, check_in, check_out)  # not None: that is "ignore nothing"
+        results.append(None)
+    if atomic and any(results):
+        raise GroupRejected(results)
+
+    for i, (room_id, check_in, check_out) in enumerate(stays):
+        if results[i] is None:
+            results[i] = conn.execute("""
+                INSERT INTO bookings (user_id, room_id, check_in, check_out, booking_status, arrival_status)
+                VALUES (?, ?, ?, ?, 'Pending', 'Not Arrived')
+            """, (user_id, room_id, check_in, check_out)).lastrowid
+            batch.add_stay(results[i], room_id, check_in, check_out)
+    return results
+
+
+# ---------------- Group bookings ----------------
+def book_group(user_id, data):
+    """Run a POST /user/bookings/batch body for user_id; returns (response body, status).
+
+    data is {"bookings": [{room_id, check_in, check_out}, ...], "atomic": true}.
+    Each stay is validated, the valid ones are booked in one operation
+    (rooms must exist and be Available), and the body has one result per
+    stay: its booking_id or the reason it was not booked. Raises
+    WriteTimeout when the operation was cancelled.
+    """
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}, 400
+    items = data.get("bookings")
+    atomic = data.get("atomic", True)
+    if not isinstance(items, list) or not items:
+        return {"error": "bookings must be a non-empty list"}, 400
+    if len(items) > MAX_GROUP_SIZE:
+        return {"error": f"At most {MAX_GROUP_SIZE} bookings per request"}, 400
+    if not isinstance(atomic, bool):
+        return {"error": "atomic must be true or false"}, 400
+
+    results = []
+    stays = []
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        result = {"room_id": item.get("room_id"), "check_in": item.get("check_in"), "check_out": item.get("check_out")}
+        if not all(result.values()):
+            result["error"] = "room_id, check_in and check_out are required"
+        elif not isinstance(result["room_id"], int) or isinstance(result["room_id"], bool):
+            result["error"] = "room_id must be an integer"
+        else:
+            result["error"] = validate_stay(result["check_in"], result["check_out"])
+            if result["error"] is None:
+                del result["error"]
+                stays.append(result)
+        results.append(result)
+
+    # One transaction checks every room and stay, then inserts
+    invalid = len(results) - len(stays)
+    if stays and not (atomic and invalid):
+        try:
+            outcomes = get_writer().run(
+                create_bookings, user_id,
+                [(stay["room_id"], stay["check_in"], stay["check_out"]) for stay in stays], atomic, True
+            )
+        except GroupRejected as exc:
+            outcomes = exc.results
+        for stay, outcome in zip(stays, outcomes):
+            if isinstance(outcome, WriteRejected):
+                stay["error"] = str(outcome)
+            elif outcome is not None:
+                stay["booking_id"] = outcome
+    for result in results:
+        if "booking_id" not in result and "error" not in result:
+            result["error"] = "Not booked: another booking in the request failed"
+
+    booked = sum("booking_id" in result for result in results)
+    if not booked:
+        message = "No bookings were created" if atomic else "None of the bookings could be created"
+        return {"error": message, "booked": 0, "results": results}, 400
+    return {"message": f"{booked} of {len(results)} bookings created", "booked": booked, "results": results}, 201